@@ -87,7 +87,8 @@ class CustomUserAdmin(UserAdmin):
         (_('Roles y estado'), {'fields': ('is_active', 'groups')}),
         (_('Fechas relevantes'), {'fields': ('last_login', 'date_joined')}),
     )
-    search_fields = ('email', 'name')
+    # La búsqueda por nombre tolera errores de tipeo mediante trigramas (pg_trgm)
+    search_fields = ('email', 'name', 'name__trigram_word_similar')
     ordering = ('email',)
     filter_horizontal = ('groups', 'user_permissions',)
 
@@ -4,7 +4,7 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from notification.tasks import send_notification_task
+from notification import outbox
 
 import notification.service
 from app.forms import CustomAuthenticationForm, CustomUserCreationForm, PasswordResetForm, SetPasswordForm
@@ -104,7 +104,7 @@ def reset_password_view(request):
             context = {
                 "reset_link": reset_link
             }
-            send_notification_task.delay(email_subject, [user.email], context, template)
+            outbox.enqueue(email_subject, [user.email], context, template)
             messages.success(request, "¡Envío de correo electrónico de recuperación exitoso!")
             return redirect('login')
         else:
@@ -0,0 +1,136 @@
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Prefijos de las claves en caché: tareas pendientes y métricas por tarea
+PENDING_PREFIX = 'cms:coalesce:pending'
+METRICS_PREFIX = 'cms:coalesce:metrics'
+
+# Métricas registradas por cada tarea
+METRICS = ('enqueued', 'collapsed')
+
+
+def _pending_key(task_name, object_id):
+    return f'{PENDING_PREFIX}:{task_name}:{object_id}'
+
+
+def _metric_key(task_name, metric):
+    return f'{METRICS_PREFIX}:{task_name}:{metric}'
+
+
+def _count(task_name, metric):
+    key = _metric_key(task_name, metric)
+    # `add` crea el contador sin vencimiento si no existe, `incr` es atómico en Redis
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # El contador fue desalojado entre ambas operaciones
+        cache.set(key, 1, timeout=None)
+
+
+def _shared_cache():
+    # La caché local de Django es propia de cada proceso: el worker no podría liberar la marca del proceso web
+    return not settings.CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+
+
+def enqueue(task, object_id, countdown=None):
+    """
+    Encola una tarea identificada por el ID de un objeto, salvo que ya haya una pendiente para el mismo objeto.
+
+    La marca de tarea pendiente se registra con `cache.add`, que en Redis es un `SET NX` compartido por todos
+    los procesos. La tarea se ejecuta luego de `TASK_COALESCING_COUNTDOWN` segundos, de modo que una ráfaga de
+    cambios sobre el mismo objeto se resuelve con una única ejecución. La tarea debe estar decorada con
+    :func:`coalesced` para liberar la marca al iniciar.
+
+    Si hay una transacción abierta, la marca se registra y la tarea se encola recién al confirmarse, por lo que
+    una transacción revertida no deja una marca que descarte los encolados posteriores. Si la caché no es
+    compartida entre procesos (caché local de Django), la tarea se encola siempre, sin agrupar.
+
+    :param task: Tarea de Celery que recibe el ID del objeto como único argumento.
+    :type task: Task
+    :param object_id: ID del objeto sobre el que opera la tarea.
+    :type object_id: int
+    :param countdown: Segundos de espera antes de ejecutar la tarea. Por defecto `TASK_COALESCING_COUNTDOWN`.
+    :type countdown: int
+    :return: False si se agrupó con una tarea ya pendiente, True en otro caso. Los encolados repetidos dentro
+             de una misma transacción se agrupan al confirmarse.
+    :rtype: bool
+    """
+
+    if countdown is None:
+        countdown = settings.TASK_COALESCING_COUNTDOWN
+
+    _count(task.name, 'enqueued')
+    if not _shared_cache():
+        transaction.on_commit(lambda: task.apply_async(args=[object_id], countdown=countdown))
+        return True
+
+    key = _pending_key(task.name, object_id)
+    if cache.get(key) is not None:
+        _count(task.name, 'collapsed')
+        return False
+
+    def send():
+        # La marca vence por si la tarea nunca llega a ejecutarse, para no bloquear futuros encolados
+        if not cache.add(key, 1, timeout=countdown + settings.TASK_COALESCING_TIMEOUT):
+            _count(task.name, 'collapsed')
+            return
+        task.apply_async(args=[object_id], countdown=countdown)
+
+    transaction.on_commit(send)
+    return True
+
+
+def coalesced(func):
+    """
+    Decorador para tareas encoladas con :func:`enqueue`.
+
+    Libera la marca de tarea pendiente antes de ejecutar la tarea, por lo que la ejecución lee todos los cambios
+    realizados hasta ese momento y cualquier cambio posterior vuelve a encolarla. Debe aplicarse debajo de
+    `@shared_task()` y la tarea debe conservar el nombre por defecto (`módulo.función`).
+
+    :param func: Función de la tarea, que recibe el ID del objeto como primer argumento.
+    :type func: function
+    :return: Función decorada.
+    :rtype: function
+    """
+
+    task_name = f'{func.__module__}.{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(object_id, *args, **kwargs):
+        cache.delete(_pending_key(task_name, object_id))
+        return func(object_id, *args, **kwargs)
+
+    return wrapper
+
+
+def get_metrics(task_name):
+    """
+    Devuelve las métricas de agrupamiento de una tarea.
+
+    :param task_name: Nombre de la tarea de Celery.
+    :type task_name: str
+    :return: Diccionario con la cantidad de encolados solicitados (`enqueued`), los agrupados con una tarea
+             pendiente (`collapsed`) y la proporción agrupada (`ratio`).
+    :rtype: dict
+    """
+
+    values = cache.get_many([_metric_key(task_name, metric) for metric in METRICS])
+    metrics = {metric: values.get(_metric_key(task_name, metric), 0) for metric in METRICS}
+    metrics['ratio'] = metrics['collapsed'] / metrics['enqueued'] if metrics['enqueued'] else 0.0
+    return metrics
+
+
+def reset_metrics(task_name):
+    """
+    Reinicia las métricas de agrupamiento de una tarea.
+
+    :param task_name: Nombre de la tarea de Celery.
+    :type task_name: str
+    """
+
+    cache.delete_many([_metric_key(task_name, metric) for metric in METRICS])
@@ -154,7 +154,7 @@ class ProfileUpdateForm(forms.ModelForm):
 
     class Meta:
         model = CustomUser
-        fields = ['photo', 'name', 'about']
+        fields = ['photo', 'name', 'about', 'notification_frequency']
 
     def __init__(self, *args, **kwargs):
         """
@@ -184,6 +184,15 @@ class ProfileUpdateForm(forms.ModelForm):
                 raise ValidationError('Solo se permiten archivos con extensión .jpg, .jpeg o .png.')
         return photo
 
+    def clean_notification_frequency(self):
+        """
+        Mantiene la frecuencia de notificaciones actual si no se indicó una nueva.
+
+        :return: La frecuencia de notificaciones del usuario.
+        :rtype: str
+        """
+        return self.cleaned_data.get('notification_frequency') or self.instance.notification_frequency
+
     def save(self, commit=True):
         """
         Guarda los cambios en el perfil del usuario.
@@ -0,0 +1,83 @@
+import select
+
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+
+def notify(channel):
+    """
+    Envía un aviso a los procesos que esperan en un canal de PostgreSQL (:class:`Listener`).
+
+    `pg_notify` es transaccional: si hay una transacción abierta, el aviso se entrega recién al confirmarse,
+    y los avisos repetidos de una misma transacción se entregan una única vez.
+
+    :param channel: Nombre del canal.
+    :type channel: str
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, ''])
+
+
+class Listener:
+    """
+    Espera los avisos de :func:`notify` en un canal con `LISTEN` sobre la conexión por defecto.
+
+    Los avisos recibidos mientras la conexión ejecuta otras consultas no se pierden: se registran y la siguiente
+    espera termina de inmediato. Si la conexión se renueva, se vuelve a ejecutar `LISTEN`.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.connection = None
+        self.pending = False
+
+    def _received(self, notify):
+        self.pending = True
+
+    def listen(self):
+        """
+        Se suscribe al canal si la conexión actual aún no lo está.
+        """
+
+        connection.ensure_connection()
+        if self.connection is connection.connection:
+            return
+        self.connection = connection.connection
+        if is_psycopg3:
+            self.connection.add_notify_handler(self._received)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {connection.ops.quote_name(self.channel)}')
+        # Los avisos enviados antes de suscribirse se perdieron
+        self.pending = True
+
+    def wait(self, timeout):
+        """
+        Espera un aviso durante a lo sumo `timeout` segundos.
+
+        :param timeout: Segundos máximos de espera.
+        :type timeout: float
+        :return: True si se recibió un aviso, False si se cumplió el tiempo de espera.
+        :rtype: bool
+        """
+
+        self.listen()
+        conn = self.connection
+        if not is_psycopg3:
+            conn.poll()
+            if conn.notifies:
+                conn.notifies.clear()
+                self.pending = True
+        if self.pending:
+            self.pending = False
+            return True
+
+        if is_psycopg3:
+            received = any(True for _ in conn.notifies(timeout=timeout, stop_after=1))
+        else:
+            received = bool(select.select([conn], [], [], timeout)[0])
+            conn.poll()
+            received = received or bool(conn.notifies)
+            conn.notifies.clear()
+        self.pending = False
+        return received
@@ -0,0 +1,41 @@
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+# Prefijo de las claves de los bloqueos en caché
+LOCK_PREFIX = 'cms:lock'
+
+
+@contextmanager
+def cache_lock(name, timeout):
+    """
+    Bloqueo no bloqueante basado en la caché por defecto, para evitar ejecuciones superpuestas de una tarea.
+
+    El bloqueo se toma con `cache.add`, que en Redis es un `SET NX` compartido por todos los procesos y
+    workers; con la caché local de Django solo excluye ejecuciones del mismo proceso. El bloqueo vence
+    luego de `timeout` segundos por si el proceso que lo tomó se interrumpe.
+
+    Uso::
+
+        with cache_lock('expire_contents', timeout=300) as acquired:
+            if not acquired:
+                return
+
+    :param name: Nombre del bloqueo.
+    :type name: str
+    :param timeout: Segundos de vigencia del bloqueo.
+    :type timeout: int
+    :return: True si se obtuvo el bloqueo, False si otra ejecución lo tiene.
+    :rtype: bool
+    """
+
+    key = f'{LOCK_PREFIX}:{name}'
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout=timeout)
+    try:
+        yield acquired
+    finally:
+        # Solo se libera si sigue siendo propio, por si venció y lo tomó otra ejecución
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
@@ -0,0 +1,121 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.utils import timezone
+
+from app.models import CustomUser
+from app.pagination import KeysetPaginator
+from category.models import Category
+from content.models import Content
+
+
+class Command(BaseCommand):
+    """
+    Compara la latencia de la paginación clásica (COUNT + OFFSET) contra la paginación por cursor
+    del inicio para una página profunda.
+
+    Uso::
+
+        ./manage.py benchmark_home_pagination --seed 50000 --page 1000
+        ./manage.py benchmark_home_pagination --cleanup
+    """
+
+    help = 'Compara la latencia de la paginación por OFFSET y por cursor del listado del inicio.'
+
+    bench_email = 'benchmark-pagination@cms.local'
+    bench_category = 'Benchmark paginación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Cantidad de contenidos publicados a crear antes de medir.')
+        parser.add_argument('--page', type=int, default=1000, help='Número de página a medir.')
+        parser.add_argument('--per-page', type=int, default=10, help='Cantidad de contenidos por página.')
+        parser.add_argument('--repeat', type=int, default=5, help='Cantidad de repeticiones de cada medición.')
+        parser.add_argument('--cleanup', action='store_true', help='Elimina los datos de prueba creados con --seed.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Content.objects.filter(autor__email=self.bench_email).delete()
+            Category.objects.filter(name=self.bench_category).delete()
+            CustomUser.objects.filter(email=self.bench_email).delete()
+            self.stdout.write(f'Se eliminaron {deleted} registros de prueba.')
+            return
+
+        if options['seed']:
+            self.seed(options['seed'])
+
+        per_page = options['per_page']
+        page = options['page']
+        contents = Content.objects.filter(
+            is_active=True,
+            category__is_active=True,
+            state=Content.StateChoices.publish,
+            date_published__isnull=False,
+        ).select_related('category', 'autor').order_by('-date_published', '-id')
+
+        # Cursor equivalente al final de la página anterior, calculado fuera de la medición
+        offset = (page - 1) * per_page
+        keyset = KeysetPaginator(contents, per_page, ordering=('-date_published', '-id'))
+        boundary = contents[offset - 1:offset].first() if offset else None
+        if offset and boundary is None:
+            raise CommandError('No hay suficientes contenidos para la página indicada.')
+        cursor = keyset.encode_cursor(boundary, backwards=False) if boundary else None
+
+        def offset_page():
+            return list(Paginator(contents, per_page).page(page).object_list)
+
+        def keyset_page():
+            return list(keyset.get_page(cursor))
+
+        offset_rows = offset_page()
+        keyset_rows = keyset_page()
+        if [c.id for c in offset_rows] != [c.id for c in keyset_rows]:
+            self.stderr.write('Advertencia: las páginas obtenidas por ambos métodos no coinciden.')
+
+        offset_ms = self.measure(offset_page, options['repeat'])
+        keyset_ms = self.measure(keyset_page, options['repeat'])
+
+        self.stdout.write(f'Contenidos publicados: {contents.count()}  página: {page}  por página: {per_page}')
+        self.stdout.write(f'OFFSET + COUNT : mediana {offset_ms:.2f} ms')
+        self.stdout.write(f'Cursor (keyset): mediana {keyset_ms:.2f} ms')
+        if keyset_ms:
+            self.stdout.write(f'Mejora: x{offset_ms / keyset_ms:.1f}')
+
+    @staticmethod
+    def measure(fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def seed(self, amount):
+        autor = CustomUser.objects.filter(email=self.bench_email).first()
+        if not autor:
+            autor = CustomUser.objects.create_user(email=self.bench_email, name='Benchmark', password=None)
+        category, _ = Category.objects.get_or_create(
+            name=self.bench_category,
+            defaults={'description': 'Datos de prueba', 'type': Category.TypeChoices.public},
+        )
+
+        now = timezone.now()
+        batch = []
+        for i in range(amount):
+            batch.append(Content(
+                title=f'Contenido de prueba {i}',
+                summary='Resumen de prueba',
+                content='<p>Contenido de prueba</p>',
+                category=category,
+                autor=autor,
+                state=Content.StateChoices.publish,
+                date_published=now - timedelta(minutes=i + 1),
+            ))
+            if len(batch) >= 5000:
+                Content.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Content.objects.bulk_create(batch)
+        self.stdout.write(f'Se crearon {amount} contenidos de prueba.')
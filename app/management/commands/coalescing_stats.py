@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from app import coalescing
+
+# Tareas encoladas a través de `app.coalescing`
+COALESCED_TASKS = (
+    'content.tasks.update_reactions',
+    'content.tasks.update_rating_avg',
+)
+
+
+class Command(BaseCommand):
+    """
+    Muestra cuántos encolados de cada tarea se agruparon con una tarea pendiente.
+
+    Uso::
+
+        ./manage.py coalescing_stats
+        ./manage.py coalescing_stats --reset
+    """
+
+    help = 'Muestra las métricas de agrupamiento de las tareas de recálculo por objeto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', action='append', help='Nombre de la tarea a consultar. Puede repetirse.')
+        parser.add_argument('--reset', action='store_true', help='Reinicia las métricas luego de mostrarlas.')
+
+    def handle(self, *args, **options):
+        for task_name in options['task'] or COALESCED_TASKS:
+            metrics = coalescing.get_metrics(task_name)
+            self.stdout.write(
+                f"{task_name}: {metrics['enqueued']} encolados, {metrics['collapsed']} agrupados "
+                f"({metrics['ratio']:.1%})"
+            )
+            if options['reset']:
+                coalescing.reset_metrics(task_name)
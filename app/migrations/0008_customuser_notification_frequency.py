@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='notification_frequency',
+            field=models.CharField(choices=[('immediate', 'Inmediata'), ('hourly', 'Resumen cada hora'), ('daily', 'Resumen diario')], default='immediate', max_length=10, verbose_name='Frecuencia de notificaciones'),
+        ),
+    ]
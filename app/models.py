@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db.backends.base.schema import logger
@@ -62,6 +63,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         - about (CharField): Campo de texto para la descripción del usuario.
         - is_active (BooleanField): Indica si el usuario está activo.
         - date_joined (DateTimeField): Fecha de registro del usuario.
+        - notification_frequency (CharField): Frecuencia con la que recibe los avisos de nuevos contenidos de sus suscripciones.
 
     :config:
         - USERNAME_FIELD: Campo que se utiliza como identificador único (correo electrónico).
@@ -73,6 +75,22 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         - permissions (list): Lista de permisos personalizados asociados al modelo de usuario.
     """
 
+    class NotificationFrequencyChoices(models.TextChoices):
+        """
+        Frecuencias con las que un usuario recibe los avisos de nuevos contenidos en sus categorías suscritas.
+
+        :attribute immediate: Un correo por cada contenido publicado.
+        :type immediate: str
+        :attribute hourly: Un resumen por hora.
+        :type hourly: str
+        :attribute daily: Un resumen diario.
+        :type daily: str
+        """
+
+        immediate = 'immediate', ('Inmediata')
+        hourly = 'hourly', ('Resumen cada hora')
+        daily = 'daily', ('Resumen diario')
+
     email = models.EmailField(unique=True, verbose_name=('Correo Electrónico'))
     name = models.CharField(max_length=255, verbose_name=('Nombre'))
     photo = models.ImageField(upload_to='profile_pics/', storage=PublicMediaStorage, null=True, blank=True,verbose_name=('Foto de perfil'))
@@ -80,6 +98,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True, verbose_name='Activo')
     date_joined = models.DateTimeField(default=timezone.now, verbose_name=('Fecha de registro'))
     stripe_customer_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='ID de Cliente en Stripe')
+    notification_frequency = models.CharField(
+        max_length=10,
+        choices=NotificationFrequencyChoices.choices,
+        default=NotificationFrequencyChoices.immediate,
+        verbose_name='Frecuencia de notificaciones',
+    )
 
     objects = CustomUserManager()
 
@@ -95,10 +119,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             - verbose_name (str): Nombre legible para el modelo en singular.
             - verbose_name_plural (str): Nombre legible para el modelo en plural.
             - permissions (list): Lista de permisos personalizados asociados al modelo de usuario.
+            - indexes (list): Índice de trigramas sobre el nombre para la búsqueda difusa de autores.
         """
 
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='user_name_trgm_idx'),
+        ]
         permissions = [
             # Permisos para contenido
             ("create_content", "Crear contenidos"),
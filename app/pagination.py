@@ -0,0 +1,200 @@
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    """
+    Error lanzado cuando un cursor de paginación no es válido o fue manipulado.
+    """
+
+
+class KeysetPage:
+    """
+    Página obtenida mediante paginación por cursor (keyset).
+
+    Expone la misma interfaz básica que `django.core.paginator.Page` utilizada por las plantillas
+    (`object_list`, `has_next`, `has_previous`), junto con los cursores opacos para navegar
+    a la página siguiente o anterior.
+
+    :attribute object_list: Lista de objetos de la página.
+    :type object_list: list
+    :attribute next_cursor: Cursor opaco para obtener la página siguiente, o None.
+    :type next_cursor: str
+    :attribute previous_cursor: Cursor opaco para obtener la página anterior, o None.
+    :type previous_cursor: str
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        """
+        Indica si existe una página siguiente.
+
+        :return: True si hay más elementos después de esta página.
+        :rtype: bool
+        """
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        """
+        Indica si existe una página anterior.
+
+        :return: True si hay elementos antes de esta página.
+        :rtype: bool
+        """
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor (keyset) sobre un queryset con un orden total.
+
+    A diferencia de `django.core.paginator.Paginator`, no ejecuta un `COUNT(*)` ni utiliza `OFFSET`:
+    cada página se obtiene filtrando por la tupla de valores del último elemento visto, por lo que
+    el costo de obtener una página es constante sin importar su profundidad.
+
+    El orden debe ser total (el último campo debe ser único, por ejemplo `id`) para que ningún
+    elemento se repita ni se omita entre páginas.
+
+    :param queryset: Queryset a paginar. Se le aplicará el orden indicado en `ordering`.
+    :type queryset: QuerySet
+    :param per_page: Cantidad de elementos por página.
+    :type per_page: int
+    :param ordering: Campos de ordenamiento, con prefijo `-` para orden descendente.
+    :type ordering: tuple
+    """
+
+    salt = 'app.pagination.keyset'
+
+    def __init__(self, queryset, per_page, ordering=('-date_published', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def get_page(self, cursor=None):
+        """
+        Obtiene la página correspondiente al cursor indicado.
+
+        :param cursor: Cursor opaco recibido de una página anterior. Si es None se devuelve la primera página.
+        :type cursor: str
+        :return: La página solicitada.
+        :rtype: KeysetPage
+        :raises InvalidCursor: Si el cursor no es válido.
+        """
+
+        if not cursor:
+            return self._forward_page(None)
+
+        values, backwards = self.decode_cursor(cursor)
+        if backwards:
+            return self._backward_page(values)
+        return self._forward_page(values)
+
+    def _forward_page(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards=False))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        next_cursor = self.encode_cursor(rows[-1], backwards=False) if has_next else None
+        previous_cursor = self.encode_cursor(rows[0], backwards=True) if values is not None and rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def _backward_page(self, values):
+        queryset = self.queryset.order_by(*[self._flip(field) for field in self.ordering])
+        queryset = queryset.filter(self._after(values, backwards=True))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = list(reversed(rows[:self.per_page]))
+
+        previous_cursor = self.encode_cursor(rows[0], backwards=True) if has_previous else None
+        next_cursor = self.encode_cursor(rows[-1], backwards=False) if rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def _after(self, values, backwards):
+        """
+        Construye el filtro equivalente a la comparación de tuplas `(campo_1, ..., campo_n) > valores`
+        respetando la dirección de cada campo.
+        """
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != backwards
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def encode_cursor(self, obj, backwards):
+        """
+        Genera un cursor opaco y firmado a partir de los valores de ordenamiento de un objeto.
+
+        :param obj: Objeto a partir del cual se continúa la paginación.
+        :type obj: Model
+        :param backwards: Indica si el cursor apunta a la página anterior.
+        :type backwards: bool
+        :return: Cursor firmado.
+        :rtype: str
+        """
+
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = {'dt': value.isoformat()}
+            values.append(value)
+        return signing.dumps({'v': values, 'b': backwards}, salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        """
+        Decodifica un cursor generado por `encode_cursor`.
+
+        :param cursor: Cursor firmado.
+        :type cursor: str
+        :return: Tupla con los valores de ordenamiento y la dirección del cursor.
+        :rtype: tuple
+        :raises InvalidCursor: Si la firma no es válida o el contenido no corresponde al ordenamiento.
+        """
+
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            raise InvalidCursor('Cursor de paginación inválido.')
+
+        values = data.get('v') if isinstance(data, dict) else None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor('Cursor de paginación inválido.')
+
+        decoded = []
+        for value in values:
+            if value is None:
+                # Los campos de ordenamiento no admiten nulos: no se puede comparar contra ellos
+                raise InvalidCursor('Cursor de paginación inválido.')
+            if isinstance(value, dict):
+                value = parse_datetime(value.get('dt') or '')
+                if value is None:
+                    raise InvalidCursor('Cursor de paginación inválido.')
+            decoded.append(value)
+        return decoded, bool(data.get('b'))
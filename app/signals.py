@@ -1,14 +1,11 @@
-import stripe
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
 from app.models import CustomUser
-from cms.profile import base
+from suscription import stripe_sync
 from suscription.models import Suscription
 import notification.service
 
-stripe.api_key = base.STRIPE_SECRET_KEY
-
 @receiver(pre_save, sender=CustomUser)
 def cache_previous_user(sender, instance, *args, **kwargs):
     """
@@ -37,7 +34,7 @@ def post_save_user_handler(sender, instance, created, **kwargs):
     """
     Maneja eventos después de guardar una instancia de usuario, incluyendo actualizaciones en Stripe y envío de notificaciones.
 
-    Este metodo se ejecuta después de que una instancia de `CustomUser` ha sido guardada. Dependiendo de los cambios realizados (como desactivación de la cuenta, cambio de nombre o email), actualiza la información relacionada en Stripe y envía notificaciones correspondientes.
+    Este metodo se ejecuta después de que una instancia de `CustomUser` ha sido guardada. Dependiendo de los cambios realizados (como desactivación de la cuenta, cambio de nombre o email), registra la actualización de la información relacionada en Stripe, que se ejecuta en segundo plano (`suscription.stripe_sync`), y envía notificaciones correspondientes.
 
     - Si el usuario fue desactivado, se notificará de la desactivación y se cancelarán las suscripciones en Stripe.
     - Si el nombre fue cambiado, se actualizará en Stripe.
@@ -61,17 +58,18 @@ def post_save_user_handler(sender, instance, created, **kwargs):
             # Desactivar todas las suscripciones activas en stripe
             if instance.stripe_customer_id:
                 list_subscriptions = Suscription.objects.filter(user=instance, state=Suscription.SuscriptionState.active, stripe_subscription_id__isnull=False)
-                for subscription in list_subscriptions:
-                    stripe.Subscription.modify(
-                        subscription.stripe_subscription_id,
-                        cancel_at_period_end=True,
-                    )
+                stripe_sync.enqueue(f'user:{instance.pk}', 'call', [
+                    {'operation': 'Subscription.modify', 'args': [subscription_id], 'kwargs': {'cancel_at_period_end': True}}
+                    for subscription_id in list_subscriptions.values_list('stripe_subscription_id', flat=True)
+                ])
 
         # Si se cambio el nombre
         if instance.name != instance.__original_user.name:
             # Actualizar el nombre en Stripe
             if instance.stripe_customer_id:
-                stripe.Customer.modify(
+                stripe_sync.enqueue_call(
+                    f'user:{instance.pk}',
+                    'Customer.modify',
                     instance.stripe_customer_id,
                     name=instance.name,
                 )
@@ -81,7 +79,9 @@ def post_save_user_handler(sender, instance, created, **kwargs):
             notification.service.user_email_changed(instance, instance.__original_user.email)
             # Actualizar el email en Stripe
             if instance.stripe_customer_id:
-                stripe.Customer.modify(
+                stripe_sync.enqueue_call(
+                    f'user:{instance.pk}',
+                    'Customer.modify',
                     instance.stripe_customer_id,
                     email=instance.email,
                 )
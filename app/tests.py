@@ -1,14 +1,28 @@
+from io import StringIO
+from unittest.mock import patch
+
 from django.db.models.signals import pre_save, post_save
 from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from app.forms import ChangePasswordForm, CustomUserCreationForm, ProfileUpdateForm
 from django.contrib.auth import get_user_model
 from app.forms import CustomAuthenticationForm
 import os
 
+from app import coalescing
+from app.pagination import KeysetPaginator
 from app.models import CustomUser
 from app.signals import cache_previous_user, post_save_user_handler
+from category.models import Category
+from category.signals import cache_previous_category, post_save_category_handler
+from content.models import Content
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
 
 
 @override_settings(DEFAULT_FILE_STORAGE='storages.backends.s3boto3.S3Boto3Storage')
@@ -427,3 +441,227 @@ class ChangePasswordFormTest(TestCase):
         }
         form = ChangePasswordForm(user=self.user, data=form_data)
         self.assertFalse(form.is_valid(), "El formulario debería ser inválido si la contraseña nueva tiene menos de 8 carácteres.")
+
+
+class HomeKeysetPaginationTest(TestCase):
+    """
+    Clase de pruebas para la paginación por cursor del listado de contenidos del inicio.
+    """
+
+    def setUp(self):
+        """
+        Crea un autor, dos categorías públicas y 25 contenidos publicados con fechas distintas.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+
+        self.autor = get_user_model().objects.create_user(
+            email='autor@example.com',
+            name='Autor',
+            password='testpassword123'
+        )
+        self.category = Category.objects.create(name='Pública', type=Category.TypeChoices.public)
+        self.other_category = Category.objects.create(name='Otra', type=Category.TypeChoices.public)
+
+        now = timezone.now()
+        self.contents = []
+        for i in range(25):
+            self.contents.append(Content.objects.create(
+                title=f'Contenido {i}',
+                summary='Resumen',
+                content='Texto',
+                category=self.category if i % 5 else self.other_category,
+                autor=self.autor,
+                state=Content.StateChoices.publish,
+                date_published=now - timedelta(hours=i + 1),
+            ))
+
+    def tearDown(self):
+        """
+        Reconecta las señales desconectadas en `setUp`.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        super().tearDown()
+
+    def test_walk_forward_and_back(self):
+        """
+        Recorre todas las páginas con el cursor siguiente y vuelve con el cursor anterior,
+        verificando que no se repitan ni se omitan contenidos.
+        """
+
+        seen = []
+        response = self.client.get(reverse('home'))
+        pages = [response.context['page_obj']]
+        seen.extend(c.id for c in pages[-1])
+        while pages[-1].has_next():
+            response = self.client.get(reverse('home'), {'cursor': pages[-1].next_cursor})
+            pages.append(response.context['page_obj'])
+            seen.extend(c.id for c in pages[-1])
+
+        expected = [c.id for c in self.contents]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0].has_previous())
+
+        response = self.client.get(reverse('home'), {'cursor': pages[2].previous_cursor})
+        self.assertEqual([c.id for c in response.context['page_obj']], [c.id for c in pages[1]])
+
+    def test_cursor_keeps_filters(self):
+        """
+        Verifica que la paginación por cursor respete el filtro de categoría y lo conserve en los enlaces.
+        """
+
+        response = self.client.get(reverse('home'), {'cat': self.category.id})
+        page = response.context['page_obj']
+        self.assertEqual(response.context['filter_query'], f'cat={self.category.id}')
+        self.assertTrue(all(c.category_id == self.category.id for c in page))
+
+        response = self.client.get(reverse('home'), {'cat': self.category.id, 'cursor': page.next_cursor})
+        self.assertTrue(all(c.category_id == self.category.id for c in response.context['page_obj']))
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """
+        Verifica que un cursor manipulado devuelva la primera página en lugar de un error.
+        """
+
+        response = self.client.get(reverse('home'), {'cursor': 'manipulado'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c.id for c in response.context['page_obj']], [c.id for c in self.contents[:10]])
+
+    def test_published_without_date_is_excluded(self):
+        """
+        Verifica que un contenido publicado sin fecha de publicación no aparezca en el listado y que un cursor
+        con valores nulos devuelva la primera página en lugar de un error.
+        """
+
+        undated = Content.objects.create(
+            title='Sin fecha', summary='Resumen', content='Texto', category=self.category, autor=self.autor,
+            state=Content.StateChoices.publish,
+        )
+        Content.objects.filter(pk=undated.pk).update(date_published=None)
+        undated.refresh_from_db()
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual([c.id for c in response.context['page_obj']], [c.id for c in self.contents[:10]])
+
+        paginator = KeysetPaginator(Content.objects.all(), 10, ordering=('-date_published', '-id'))
+        response = self.client.get(reverse('home'), {'cursor': paginator.encode_cursor(undated, backwards=False)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c.id for c in response.context['page_obj']], [c.id for c in self.contents[:10]])
+
+    def test_legacy_page_parameter(self):
+        """
+        Verifica que el parámetro `page` siga utilizando la paginación clásica.
+        """
+
+        response = self.client.get(reverse('home'), {'page': 2})
+        self.assertFalse(response.context['cursor_mode'])
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_benchmark_rejects_page_beyond_dataset(self):
+        """
+        Verifica que el benchmark de paginación informe un error si no hay contenidos suficientes para la página.
+        """
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_home_pagination', '--page', 100, '--repeat', 1, stdout=StringIO())
+
+
+class TaskCoalescingTest(TestCase):
+    """
+    Pruebas para el agrupamiento de tareas encoladas por ID de objeto (`app.coalescing`).
+    """
+
+    class FakeTask:
+        """
+        Tarea de prueba que registra los encolados en lugar de enviarlos a Celery.
+        """
+
+        name = 'app.tests.fake_task'
+
+        def __init__(self):
+            self.calls = []
+
+        def apply_async(self, args, countdown):
+            self.calls.append((args, countdown))
+
+    def setUp(self):
+        """
+        Limpia la caché para que las marcas y métricas de otras pruebas no interfieran.
+        """
+        cache.clear()
+        self.task = self.FakeTask()
+        # La caché local de las pruebas se comparte entre la petición y la tarea, que corren en el mismo proceso
+        patcher = patch.object(coalescing, '_shared_cache', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_duplicate_enqueues_are_collapsed(self):
+        """
+        Verifica que los encolados repetidos para un mismo objeto se agrupen en una única tarea,
+        y que se cuenten en las métricas.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                coalescing.enqueue(self.task, 7, countdown=3)
+            coalescing.enqueue(self.task, 8, countdown=3)
+
+        self.assertFalse(coalescing.enqueue(self.task, 7, countdown=3))
+        self.assertEqual(self.task.calls, [([7], 3), ([8], 3)])
+        self.assertEqual(coalescing.get_metrics(self.task.name), {'enqueued': 7, 'collapsed': 5, 'ratio': 5 / 7})
+
+        coalescing.reset_metrics(self.task.name)
+        self.assertEqual(coalescing.get_metrics(self.task.name)['enqueued'], 0)
+
+    def test_running_task_releases_pending_mark(self):
+        """
+        Verifica que al ejecutarse la tarea se libere la marca, de modo que los cambios posteriores la vuelvan a encolar.
+        """
+        received = []
+
+        def fake_task(object_id):
+            received.append(object_id)
+
+        fake_task.__module__ = 'app.tests'
+        task = coalescing.coalesced(fake_task)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coalescing.enqueue(self.task, 7)
+        self.assertFalse(coalescing.enqueue(self.task, 7))
+        task(7)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(coalescing.enqueue(self.task, 7))
+
+        self.assertEqual(received, [7])
+        self.assertEqual(len(self.task.calls), 2)
+
+    def test_rolled_back_enqueue_leaves_no_mark(self):
+        """
+        Verifica que un encolado de una transacción revertida no deje la marca, para no descartar los encolados posteriores.
+        """
+        with self.captureOnCommitCallbacks(execute=False):
+            coalescing.enqueue(self.task, 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(coalescing.enqueue(self.task, 7))
+        self.assertEqual(len(self.task.calls), 1)
+
+    def test_local_cache_enqueues_without_mark(self):
+        """
+        Verifica que con una caché propia de cada proceso las tareas se encolen siempre, sin registrar la marca.
+        """
+        with patch.object(coalescing, '_shared_cache', return_value=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(coalescing.enqueue(self.task, 7))
+                self.assertTrue(coalescing.enqueue(self.task, 7))
+
+        self.assertEqual(len(self.task.calls), 2)
+        self.assertIsNone(cache.get(coalescing._pending_key(self.task.name, 7)))
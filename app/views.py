@@ -1,9 +1,9 @@
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
-from django.utils import timezone
+from app.pagination import KeysetPaginator, InvalidCursor
 from category.models import Category
 from content.models import Content
+from content.search import search_contents, fuzzy_match, highlight
 from suscription.models import Suscription
 
 
@@ -17,11 +17,14 @@ def home_view(request):
     :type request: HttpRequest
 
     Lógica:
-        - Filtra los contenidos activos, publicados y disponibles antes de la fecha actual.
+        - Filtra los contenidos activos y publicados que tienen fecha de publicación.
         - Aplica filtros adicionales según la categoría seleccionada, favoritos del usuario,
-          y búsqueda por título o nombre del autor.
+          y búsqueda de texto completo (título, resumen, cuerpo y etiquetas) o aproximada por título, nombre
+          del autor o de la categoría, tolerando errores de tipeo.
+          Los resultados de una búsqueda se ordenan por relevancia y se resaltan las coincidencias.
         - Divide los contenidos marcados como importantes en grupos de 5.
-        - Configura la paginación para mostrar un máximo de 10 contenidos por página.
+        - Configura la paginación para mostrar un máximo de 10 contenidos por página. Por defecto se pagina
+          por cursor (`cursor`) sobre `(date_published, id)`; el parámetro `page` mantiene la paginación clásica.
 
     :raises Http404: Si no se encuentra la categoría especificada en el filtro.
 
@@ -34,13 +37,14 @@ def home_view(request):
     category = None
     query = request.GET.get('query')
     favs = request.GET.get('favs')
-    # Filtra los contenidos activos y publicados, y los ordena por fecha de publicación
+    # Filtra los contenidos activos y publicados, y los ordena por fecha de publicación.
+    # Los publicados sin fecha (por ejemplo, reactivados desde inactivo) no tienen lugar en el cursor
     contents = Content.objects.filter(
         is_active=True,
         category__is_active=True,
         state=Content.StateChoices.publish,
-        date_published__lt=timezone.now()
-    ).select_related('category', 'autor').order_by('-date_published')
+        date_published__isnull=False,
+    ).select_related('category', 'autor').order_by('-date_published', '-id')
 
     importants = list(divide_in_groups(contents.filter(important__exact=True), 5))
 
@@ -69,25 +73,51 @@ def home_view(request):
     #     if not request.user.is_authenticated:
     #         contents = contents.filter(category__type=Category.TypeChoices.public)
 
-    # Si ingreso un parámetro de buscar, filtrar con un OR por titulo y nombre del autor
+    # Si ingreso un parámetro de buscar, filtrar por texto completo o por similitud de trigramas y ordenar por relevancia
+    ordering = ('-date_published', '-id')
     if query:
-        contents = contents.filter(
-            Q(title__icontains=query) | Q(autor__name__icontains=query)
-        )
+        contents = search_contents(contents, query, extra=fuzzy_match(query))
+        ordering = ('-rank', '-id')
 
-    # Configura la paginación con un máximo de 10 contenidos por página
-    paginator = Paginator(contents, 10)
+    # Parámetros de filtro que deben conservarse al navegar entre páginas
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
+    filter_params.pop('cursor', None)
+
+    # Paginación clásica por número de página, se mantiene para los enlaces existentes con ?page=
     str_page_number = request.GET.get('page')
-    # Si no se especifica número de página, se establece en la primera página
-    if str_page_number is None or str_page_number == '':
-        page_number = 1
+    if str_page_number:
+        paginator = Paginator(contents.order_by(*ordering), 10)
+        try:
+            page_number = int(str_page_number)
+        except ValueError:
+            page_number = 1
+        if page_number < 1: page_number = 1
+        page_obj = paginator.get_page(page_number)
+        cursor_mode = False
     else:
-        page_number = int(str_page_number)
-    if (page_number is None) or (page_number < 1): page_number = 1
-    page_obj = paginator.get_page(page_number)
+        # Paginación por cursor sobre (date_published, id) o (rank, id), sin COUNT(*) ni OFFSET
+        paginator = KeysetPaginator(contents, 10, ordering=ordering)
+        try:
+            page_obj = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            page_obj = paginator.get_page(None)
+        cursor_mode = True
+
+    if query:
+        for content in page_obj:
+            content.title_highlight = highlight(content.title_headline)
+            content.summary_highlight = highlight(content.summary_headline)
 
     # Renderiza la plantilla con los contenidos paginados y la información de la categoría y búsqueda
-    return render(request, 'inicio.html', {'page_obj': page_obj, 'category': category, 'query': query, 'importants': importants})
+    return render(request, 'inicio.html', {
+        'page_obj': page_obj,
+        'cursor_mode': cursor_mode,
+        'filter_query': filter_params.urlencode(),
+        'category': category,
+        'query': query,
+        'importants': importants,
+    })
 
 def divide_in_groups(lista, tamaño):
     """
@@ -38,8 +38,8 @@ class CategoryAdmin(admin.ModelAdmin):
     # Añadir filtros para estos campos
     list_filter = ('type', 'is_active', 'is_moderated')
 
-    # Habilitar búsqueda por estos campos
-    search_fields = ('name', 'description')
+    # Habilitar búsqueda por estos campos, el nombre también por similitud de trigramas (pg_trgm)
+    search_fields = ('name', 'name__trigram_word_similar', 'description')
 
     # Campos a mostrar en el formulario de creación y edición
     fields = ('name', 'description', 'type', 'is_active', 'is_moderated', 'price')
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
@@ -38,6 +39,8 @@ class Category(models.Model):
         :type verbose_name_plural: str
         :attribute db_table: Nombre de la tabla en la base de datos.
         :type db_table: str
+        :attribute indexes: Índice de trigramas sobre el nombre para la búsqueda difusa.
+        :type indexes: list
 
     Métodos:
         :method __str__: Retorna una representación en cadena del objeto `Category`.
@@ -91,6 +94,9 @@ class Category(models.Model):
         verbose_name = 'Categoría'
         verbose_name_plural = 'Categorías'
         db_table = 'category'
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='category_name_trgm_idx'),
+        ]
 
 
     def __str__(self):
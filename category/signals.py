@@ -1,13 +1,11 @@
-import stripe
+from django.db import transaction
 from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
 
 from category.models import Category
-from cms.profile import base
+from notification.tasks import CATEGORY_FIELDS, notify_category_change
+from suscription import stripe_sync
 from suscription.models import Suscription
-import notification.service
-
-stripe.api_key = base.STRIPE_SECRET_KEY
 
 
 @receiver(pre_save, sender=Category)
@@ -34,13 +32,30 @@ def cache_previous_category(sender, instance, *args, **kwargs):
 
     instance.__original_category = original_category
 
+def _notify_subscribers(category, notification_name, *args):
+    """
+    Encola al confirmarse la transacción la notificación de un cambio de la categoría a sus suscriptores.
+
+    :param category: La categoría guardada.
+    :type category: Category
+    :param notification_name: Notificación de `notification.service` a enviar.
+    :type notification_name: str
+    :param args: Argumentos adicionales de la notificación.
+    :type args: list
+    """
+
+    fields = {field: getattr(category, field) for field in CATEGORY_FIELDS}
+    transaction.on_commit(lambda: notify_category_change.delay(category.pk, notification_name, fields, *args))
+
+
 @receiver(post_save, sender=Category)
 def post_save_category_handler(sender, instance, created, **kwargs):
     """
     Maneja eventos después de guardar una instancia de categoría.
 
-    Realiza acciones como la creación de productos y precios en Stripe, manejo de suscripciones,
-    y notificaciones según los cambios en las propiedades de la categoría.
+    Registra las operaciones a realizar en Stripe (creación de productos y precios, manejo de suscripciones),
+    que se ejecutan en segundo plano, y encola las notificaciones a los suscriptores según los cambios en las
+    propiedades de la categoría.
 
     :param sender: La clase del modelo que está enviando la señal (`Category`).
     :type sender: class
@@ -52,27 +67,14 @@ def post_save_category_handler(sender, instance, created, **kwargs):
     :type kwargs: dict
     """
 
+    # Las operaciones en Stripe se registran para ejecutarse en segundo plano (`suscription.stripe_sync`),
+    # por lo que guardar la categoría no espera a Stripe
+    key = f'category:{instance.pk}'
+
     # Si se creo una categoría de pago
     if created and instance.type == Category.TypeChoices.paid:
-        # Crear el producto en Stripe
-        product = stripe.Product.create(
-            name=instance.name,
-            description=instance.description,
-            active=instance.is_active,
-        )
-
-        # Crear el precio del producto en Stripe
-        price = stripe.Price.create(
-            product=product.id,
-            unit_amount=instance.price,  # Stripe maneja los precios en centavos
-            currency='PYG',
-            recurring={"interval": "day"},  # Suscripción mensual
-        )
-
-        # Guardar los IDs del producto y precio en el modelo de categoría
-        instance.stripe_product_id = product.id
-        instance.stripe_price_id = price.id
-        instance.save()
+        # Crear el producto y el precio en Stripe
+        stripe_sync.enqueue(key, 'create_category_product', [{'category_id': instance.pk}])
 
 
 
@@ -82,126 +84,80 @@ def post_save_category_handler(sender, instance, created, **kwargs):
         # Si la categoría se cambio de tipo a pago
         if instance.type != instance.__original_category.type and instance.type == Category.TypeChoices.paid:
 
-            notification.service.category_changed_to_paid(instance)
+            _notify_subscribers(instance, 'category_changed_to_paid')
 
             # Si la categoria no tiene un producto en Stripe
             if not instance.stripe_product_id:
-                # Crear el producto en Stripe
-                product = stripe.Product.create(
-                    name=instance.name,
-                    description=instance.description,
-                    active=instance.is_active,
-                )
-                # Crear el precio del producto en Stripe
-                price = stripe.Price.create(
-                    product=product.id,
-                    unit_amount=instance.price,
-                    currency='PYG',
-                    recurring={"interval": "day"},
-                )
-                # Guardar los IDs del producto y precio en el modelo de categoría
-                instance.stripe_product_id = product.id
-                instance.stripe_price_id = price.id
-                instance.save()
+                # Crear el producto y el precio en Stripe
+                stripe_sync.enqueue(key, 'create_category_product', [{'category_id': instance.pk}])
             else:
-                stripe.Product.modify(
-                    instance.stripe_product_id,
-                    active=instance.is_active,
-                    metadata={'category_paid': True},
-                )
+                stripe_sync.enqueue(key, 'modify_category_product', [
+                    {'category_id': instance.pk, 'fields': {'active': instance.is_active, 'metadata': {'category_paid': True}}},
+                ])
 
             list_subscriptions = Suscription.objects.filter(category=instance)
-            for subscription in list_subscriptions:
-                if subscription.stripe_subscription_id:
-                    suscription_stripe = stripe.Subscription.retrieve(subscription.stripe_subscription_id)
-                    if suscription_stripe.status == 'active':
-                        subscription.state = Suscription.SuscriptionState.pending_cancellation
-                        subscription.save()
-                        stripe.Subscription.modify(
-                            subscription.stripe_subscription_id,
-                            metadata={'category_paid': True}, #  Poner metadata en las suscripciones category_paid = True para que cuando se cancele la suscripcion  en el werbhok se envie notifacion de cancelacion a los usuarios y se cancele la suscripcion en la base de datos
-                        )
-                    else:
-                        subscription.state = Suscription.SuscriptionState.cancelled
-                        subscription.save()
-                else:
-                    if subscription.state == 'active':
-                        subscription.state = Suscription.SuscriptionState.cancelled
-                        subscription.save()
+            # Las suscripciones con Stripe se cancelan al finalizar el período según su estado en Stripe
+            stripe_sync.enqueue(key, 'cancel_for_paid_category', [
+                {'suscription_id': subscription.pk} for subscription in list_subscriptions if subscription.stripe_subscription_id
+            ])
+            list_subscriptions.filter(stripe_subscription_id__isnull=True, state=Suscription.SuscriptionState.active).update(
+                state=Suscription.SuscriptionState.cancelled,
+            )
 
 
         # Si la categoría se cambio de pago a tipo a no pago
         if instance.type != instance.__original_category.type and instance.__original_category.type == Category.TypeChoices.paid:
 
-            notification.service.category_changed_to_not_paid(instance)
+            _notify_subscribers(instance, 'category_changed_to_not_paid')
 
-            stripe.Product.modify(
-                instance.stripe_product_id,
-                metadata={'category_paid': False},
-                active=False,
-            )
+            stripe_sync.enqueue(key, 'modify_category_product', [
+                {'category_id': instance.pk, 'fields': {'metadata': {'category_paid': False}, 'active': False}},
+            ])
 
-            list_subscriptions = Suscription.objects.filter(category=instance)
-            for subscription in list_subscriptions:
-                if subscription.stripe_subscription_id:
-                    suscription_stripe = stripe.Subscription.retrieve(subscription.stripe_subscription_id)
-                    if suscription_stripe.status == 'active' and subscription.state != Suscription.SuscriptionState.pending_cancellation:
-                        stripe.Subscription.modify(
-                            subscription.stripe_subscription_id,
-                            cancel_at_period_end=True,
-                            metadata={'category_paid': False}, # Poner metadata en las suscripciones category_paid = False para cuando se cancele la suscripcion no se envie notifacion de cancelacion a los usuarios y no se ponga cancelado en la suscripcion en la base de datos
-                        )
+            list_subscriptions = Suscription.objects.filter(category=instance, stripe_subscription_id__isnull=False)
+            stripe_sync.enqueue(key, 'cancel_for_free_category', [
+                {'suscription_id': subscription_id} for subscription_id in list_subscriptions.values_list('pk', flat=True)
+            ])
 
 
         # Si se cambio el precio
         if instance.price != instance.__original_category.price and instance.type == Category.TypeChoices.paid:
 
             if instance.stripe_price_id:
-                old_price_stripe = stripe.Price.retrieve(
-                    instance.stripe_price_id,
-                )
-                old_price = old_price_stripe.unit_amount
-
-                if old_price != instance.price:
 
-                    # SI la categoria vieja es una categoria no de pago
-                    if not instance.__original_category.price:
-                        notification.service.category_price_changed(instance, False)
+                # SI la categoria vieja es una categoria no de pago
+                if not instance.__original_category.price:
+                    _notify_subscribers(instance, 'category_price_changed', False)
 
-                    # Desactivar el precio anterior
-                    stripe.Price.modify(
-                        instance.stripe_price_id,
-                        active=False,
-                        metadata={'new_price': instance.price},
-                    )
+                # Desactivar el precio anterior
+                stripe_sync.enqueue(key, 'deactivate_category_price', [
+                    {'price_id': instance.stripe_price_id, 'new_price': instance.price},
+                ])
 
 
         # Si se cambio el estado de la categoría
         if instance.is_active != instance.__original_category.is_active:
 
-            notification.service.category_state_changed(instance)
+            _notify_subscribers(instance, 'category_state_changed')
 
             # Si la categoría es de pago se modifica en Stripe
             if instance.type == Category.TypeChoices.paid:
-                stripe.Product.modify(
-                    instance.stripe_product_id,
-                    active=instance.is_active,
-                )
+                stripe_sync.enqueue(key, 'modify_category_product', [
+                    {'category_id': instance.pk, 'fields': {'active': instance.is_active}},
+                ])
 
 
         # Si se cambio el nombre o la descripción de la categoría
         if instance.name != instance.__original_category.name or instance.description != instance.__original_category.description:
 
             if instance.name != instance.__original_category.name:
-                notification.service.category_name_changed(instance, instance.__original_category.name)
+                _notify_subscribers(instance, 'category_name_changed', instance.__original_category.name)
 
-            # Si la categoría existe en stripe se modifica el producto
-            if instance.stripe_product_id:
-                stripe.Product.modify(
-                    instance.stripe_product_id,
-                    name=instance.name,
-                    description=instance.description,
-                )
+            # Si la categoría existe en stripe, o se creará por ser de pago, se modifica el producto
+            if instance.stripe_product_id or instance.type == Category.TypeChoices.paid:
+                stripe_sync.enqueue(key, 'modify_category_product', [
+                    {'category_id': instance.pk, 'fields': {'name': instance.name, 'description': instance.description}},
+                ])
 
 
 # Signal para manejar antes de eliminar la categoría
@@ -248,7 +204,9 @@ def handle_category_after_delete(sender, instance, **kwargs):
 
     if original_category.stripe_product_id:
         # Desactivar el producto en Stripe
-        stripe.Product.modify(
+        stripe_sync.enqueue_call(
+            f'category:{original_category.pk}',
+            'Product.modify',
             original_category.stripe_product_id,
             active=False,
         )
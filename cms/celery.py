@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 from cms.profile import base
 
@@ -14,9 +15,39 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Celery beat settings
 app.conf.beat_schedule = {
+    'dispatch_scheduled_events_task': {
+        'task': 'content.tasks.dispatch_scheduled_events',
+        'schedule': 60.0,  # Cada minuto, respaldo del proceso run_scheduler
+    },
     'expire_contents_task': {
         'task': 'content.tasks.expire_contents',
-        'schedule': 60.0,  # Cada minuto
+        'schedule': 3600.0,  # Cada hora, para contenidos sin evento de expiración
+    },
+    'dispatch_notification_outbox_task': {
+        'task': 'notification.tasks.dispatch_notification_outbox',
+        'schedule': 60.0,  # Cada minuto, respaldo del proceso run_notification_dispatcher
+    },
+    'send_hourly_digests_task': {
+        'task': 'notification.tasks.send_notification_digests',
+        'schedule': crontab(minute=0),
+        'args': ('hourly',),
+    },
+    'send_daily_digests_task': {
+        'task': 'notification.tasks.send_notification_digests',
+        'schedule': crontab(minute=0, hour=base.NOTIFICATION_DIGEST_HOUR),
+        'args': ('daily',),
+    },
+    'process_pending_stripe_events_task': {
+        'task': 'suscription.tasks.process_pending_stripe_events',
+        'schedule': 60.0,  # Cada minuto, reintenta los eventos de Stripe que fallaron
+    },
+    'sync_stripe_task': {
+        'task': 'suscription.tasks.sync_stripe',
+        'schedule': 60.0,  # Cada minuto, reintenta las operaciones de Stripe que fallaron
+    },
+    'flush_content_counters_task': {
+        'task': 'content.tasks.flush_content_counters',
+        'schedule': float(base.CONTENT_COUNTERS_FLUSH_INTERVAL),
     },
 }
 
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'storages',
     'app',
     'crispy_forms',
@@ -89,6 +90,10 @@ WSGI_APPLICATION = 'cms.wsgi.application'
 
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
+# Búsqueda difusa por trigramas (pg_trgm): umbrales de similitud usados por los operadores % y %>
+TRIGRAM_SIMILARITY_THRESHOLD = config('TRIGRAM_SIMILARITY_THRESHOLD', default=0.3, cast=float)
+TRIGRAM_WORD_SIMILARITY_THRESHOLD = config('TRIGRAM_WORD_SIMILARITY_THRESHOLD', default=0.4, cast=float)
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -100,6 +105,11 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='postgres'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'OPTIONS': {
+            # Los umbrales se envían al abrir la conexión para no ejecutar un SET adicional por solicitud
+            'options': f'-c pg_trgm.similarity_threshold={TRIGRAM_SIMILARITY_THRESHOLD} '
+                       f'-c pg_trgm.word_similarity_threshold={TRIGRAM_WORD_SIMILARITY_THRESHOLD}',
+        },
     }
 }
 
@@ -176,6 +186,23 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='secretemail')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='secretpassword')
 
+# Envío de correos en lote reutilizando la conexión de cada worker (`notification.mailer`)
+EMAIL_BATCH_SIZE = config('EMAIL_BATCH_SIZE', default=50, cast=int)  # Mensajes por lote
+EMAIL_RATE_LIMIT = config('EMAIL_RATE_LIMIT', default=0, cast=float)  # Mensajes por segundo, 0 sin límite
+EMAIL_CONNECTION_MAX_IDLE = config('EMAIL_CONNECTION_MAX_IDLE', default=60, cast=int)  # Segundos
+EMAIL_MAX_RETRIES = config('EMAIL_MAX_RETRIES', default=3, cast=int)
+EMAIL_RETRY_DELAY = config('EMAIL_RETRY_DELAY', default=60, cast=int)  # Segundos
+EMAIL_RENDER_CACHE_SIZE = config('EMAIL_RENDER_CACHE_SIZE', default=128, cast=int)  # Correos renderizados por proceso
+
+# Destinatarios por tarea al notificar a todos los suscriptores de una categoría (`notification.fanout`)
+NOTIFICATION_FANOUT_CHUNK_SIZE = config('NOTIFICATION_FANOUT_CHUNK_SIZE', default=500, cast=int)
+# Usuarios por lote al enviar los resúmenes de nuevos contenidos (`notification.digest`)
+NOTIFICATION_DIGEST_BATCH_SIZE = config('NOTIFICATION_DIGEST_BATCH_SIZE', default=200, cast=int)
+NOTIFICATION_DIGEST_HOUR = config('NOTIFICATION_DIGEST_HOUR', default=8, cast=int)  # Hora local del resumen diario
+# Correos por lote y segundos máximos de espera del despachador de la tabla de salida (`notification.outbox`)
+NOTIFICATION_OUTBOX_BATCH_SIZE = config('NOTIFICATION_OUTBOX_BATCH_SIZE', default=200, cast=int)
+NOTIFICATION_OUTBOX_MAX_SLEEP = config('NOTIFICATION_OUTBOX_MAX_SLEEP', default=60, cast=int)
+
 CMS_DOCS_URL = config('CMS_DOCS_URL', default='https://docs.is2equipo10.me')
 
 JAZZMIN_SETTINGS = {
@@ -251,6 +278,20 @@ CELERY_TASK_SERIALIZER='json'
 CELERY_TIMEZONE='America/Asuncion'
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 
+# Contadores de visualizaciones y compartidos acumulados antes de volcarse en la base de datos
+CONTENT_COUNTERS_FLUSH_INTERVAL = config('CONTENT_COUNTERS_FLUSH_INTERVAL', default=10, cast=int)  # Segundos
+CONTENT_COUNTERS_LOCAL_MAX_PENDING = config('CONTENT_COUNTERS_LOCAL_MAX_PENDING', default=100, cast=int)
+
+# Vigencia máxima del bloqueo de la tarea de expiración de contenidos
+EXPIRE_CONTENTS_LOCK_TIMEOUT = config('EXPIRE_CONTENTS_LOCK_TIMEOUT', default=300, cast=int)  # Segundos
+
+# Espera máxima del despachador de eventos programados entre dos revisiones de la tabla de eventos
+SCHEDULER_MAX_SLEEP = config('SCHEDULER_MAX_SLEEP', default=60, cast=int)  # Segundos
+
+# Agrupamiento de tareas de recálculo encoladas para un mismo objeto
+TASK_COALESCING_COUNTDOWN = config('TASK_COALESCING_COUNTDOWN', default=5, cast=int)  # Segundos
+TASK_COALESCING_TIMEOUT = config('TASK_COALESCING_TIMEOUT', default=300, cast=int)  # Segundos adicionales de vigencia de la marca
+
 # CELERY BEAT SCHEDULER
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
@@ -259,3 +300,18 @@ STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default="stripe-secret-key")
 
 # Configuracion para escuchar eventos de Stripe
 ENDPOINT_SECRET = config('ENDPOINT_SECRET', default="stripe-endpoint-secret")
+
+# Filas leídas de la base de datos por vez al exportar los pagos (`suscription.views.export_to_csv`/`export_to_excel`)
+FINANCE_EXPORT_CHUNK_SIZE = config('FINANCE_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Llamadas a Stripe (`suscription.stripe_gateway`): hilos para las consultas en paralelo y vigencia de las consultas en caché
+STRIPE_GATEWAY_MAX_WORKERS = config('STRIPE_GATEWAY_MAX_WORKERS', default=8, cast=int)
+STRIPE_GATEWAY_CACHE_TTL = config('STRIPE_GATEWAY_CACHE_TTL', default=30, cast=int)  # Segundos
+
+# Intentos de procesamiento de un evento del webhook de Stripe antes de marcarlo como fallido (`suscription.webhooks`)
+STRIPE_EVENT_MAX_ATTEMPTS = config('STRIPE_EVENT_MAX_ATTEMPTS', default=5, cast=int)
+
+# Operaciones de sincronización con Stripe registradas por las señales de los modelos (`suscription.stripe_sync`)
+STRIPE_SYNC_BATCH_SIZE = config('STRIPE_SYNC_BATCH_SIZE', default=100, cast=int)
+STRIPE_SYNC_MAX_ATTEMPTS = config('STRIPE_SYNC_MAX_ATTEMPTS', default=5, cast=int)
+STRIPE_SYNC_RETRY_DELAY = config('STRIPE_SYNC_RETRY_DELAY', default=60, cast=int)  # Segundos por intento fallido
@@ -24,8 +24,9 @@ Rutas:
     - 'profile/<int:id>/': Ruta para la vista de perfil de otro usuario, utilizando `other_profile_view`.
     - 'change-password/': Ruta para cambiar la contraseña del usuario autenticado, utilizando `change_password`.
 """
-from content.views import kanban_board, report_post, update_content_state, view_version, validate_permission_kanban_api, \
-    like_content, dislike_content, view_count_share
+from content.views import kanban_board, bulk_update_content_state, kanban_column_api, kanban_transitions_api, report_post, update_content_state, view_version, validate_permission_kanban_api, \
+    like_content, dislike_content, view_count_share, search_contents_api, \
+    user_reactions_api
 from django.contrib import admin
 from django.urls import include, path
 from app.auth.views import register_view, login_view, logout_view, reset_password_view, password_reset_confirm_view
@@ -39,7 +40,8 @@ from category.views import categories_by_type
 from rating import views as rating_views
 from stadistic.views import view_stadistics, top_liked, top_rating, top_disliked, top_view, top_shares
 from suscription.views import suscribe_category, unsuscribe_category, create_checkout_session, stripe_webhook, \
-    my_subscriptions, finances, category_totals, category_timeline, daily_totals, table_data, export_to_excel
+    my_subscriptions, finances, category_totals, category_timeline, daily_totals, finance_charts, table_data, export_to_excel, \
+    export_to_csv
 
 urlpatterns = [
 
@@ -67,7 +69,10 @@ urlpatterns = [
     path('content/<int:id>/', view_content, name='content_view'),
     path('content/<int:content_id>/history/<int:history_id>', view_version, name='view_content_version'),
     path('tablero/', kanban_board, name='kanban_board'),
+    path('api/kanban/transitions/', kanban_transitions_api, name='kanban_transitions_api'),
+    path('api/kanban/<str:state>/', kanban_column_api, name='kanban_column_api'),
     path('api/update-content-state/<int:content_id>/', update_content_state, name='update_content_state'),
+    path('api/update-content-state/bulk/', bulk_update_content_state, name='bulk_update_content_state'),
     path('content/<int:pk>/edit/', ContentUpdateView.as_view(), name='edit_content'),
     path('report/<int:content_id>/', report_post, name='report_post'),  # Ruta para reportar
     path('api/validate-permission-kanban/', validate_permission_kanban_api, name='validate_permission_kanban_api'),
@@ -75,12 +80,14 @@ urlpatterns = [
     # Content - Reactions
     path('like/<int:content_id>/', like_content, name='like_content'),
     path('dislike/<int:content_id>/', dislike_content, name='dislike_content'),
+    path('api/reactions/', user_reactions_api, name='user_reactions_api'),
 
     # Rating
     path('rate/<int:content_id>/', rating_views.rate_content, name='rate_content'),
 
     # Share
     path('share/<int:content_id>/', view_count_share, name='share_content'),
+    path('api/search/', search_contents_api, name='search_contents_api'),
 
     # Category
     path('category/<str:type>/', categories_by_type, name='categories_by_type'),
@@ -103,8 +110,10 @@ urlpatterns = [
     path('finances/category_totals/',category_totals, name='finances_category'),
     path('finances/category_timeline/', category_timeline, name='finances_category_timeline'),
     path('finances/daily_totals/', daily_totals, name='finances_daily_totals'),
+    path('finances/charts/', finance_charts, name='finances_charts'),
     path('finances/table_data/', table_data, name='finances_table_data'),
     path('finances/export_to_excel/', export_to_excel, name='finances_export_to_excel'),
+    path('finances/export_to_csv/', export_to_csv, name='finances_export_to_csv'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
@@ -33,8 +33,8 @@ class ContentAdmin(admin.ModelAdmin):
     # Añadir filtros para estos campos
     list_filter = ('state', 'is_active', 'category', 'important')
 
-    # Habilitar búsqueda por estos campos
-    search_fields = ('title', 'summary', 'autor__name', 'category__name')
+    # Habilitar búsqueda por estos campos, el título y el autor también por similitud de trigramas (pg_trgm)
+    search_fields = ('title', 'title__trigram_word_similar', 'summary', 'autor__name', 'autor__name__trigram_word_similar', 'category__name')
 
     # Campos a mostrar en el formulario de creación y edición
     fields = ('title', 'summary', 'category', 'autor', 'state', 'is_active', 'date_create', 'date_published' ,'date_expire','display_tags', 'important')
@@ -21,3 +21,14 @@ class ContentConfig(AppConfig):
     name = 'content'
     verbose_name = ("Gestión de contenidos")
 
+
+    def ready(self):
+        """
+        Metodo llamado cuando la aplicación está lista.
+
+        Se utiliza para importar las señales asociadas con la aplicación de contenidos.
+
+        :return: None
+        :rtype: None
+        """
+        import content.signals
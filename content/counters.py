@@ -0,0 +1,213 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
+from django.utils import timezone
+
+from content.models import Content, CounterFlush
+
+# Contadores de `Content` que se pueden acumular en el buffer
+COUNTER_FIELDS = ('views_count', 'shares_count')
+
+# Claves de Redis: incrementos pendientes y lote en proceso de volcado
+PENDING_KEY = 'cms:content:counters'
+FLUSHING_KEY = 'cms:content:counters:flushing'
+BATCH_FIELD = '__batch__'
+
+# Borra el lote solo si sigue siendo el mismo, para no descartar uno nuevo tomado por otro volcado
+_DELETE_BATCH_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Tiempo que se conservan los lotes aplicados, para detectar volcados repetidos
+FLUSH_RETENTION = timezone.timedelta(days=1)
+
+_local_lock = threading.Lock()
+_local_buffer = {}
+_local_since = None
+
+
+def _uses_redis():
+    return settings.CACHES['default']['BACKEND'].startswith('django_redis')
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def increment(content_id, field, amount=1):
+    """
+    Acumula el incremento de un contador de un contenido para volcarlo luego en lote.
+
+    Si la caché por defecto es Redis, el incremento se registra con un `HINCRBY` y lo vuelca la tarea
+    periódica `flush_content_counters`. En otro caso se acumula en memoria del proceso que atiende la
+    petición y se vuelca al alcanzar `CONTENT_COUNTERS_LOCAL_MAX_PENDING` incrementos o, al finalizar
+    una petición (ver :func:`flush_if_due`), luego de `CONTENT_COUNTERS_FLUSH_INTERVAL` segundos.
+    El buffer en memoria es propio de cada proceso, por lo que en producción se requiere Redis.
+
+    :param content_id: ID del contenido.
+    :type content_id: int
+    :param field: Nombre del contador (`views_count` o `shares_count`).
+    :type field: str
+    :param amount: Cantidad a incrementar.
+    :type amount: int
+    :raises ValueError: Si el contador no es válido.
+    """
+
+    global _local_since
+
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f"Contador '{field}' no válido.")
+
+    if _uses_redis():
+        _redis().hincrby(PENDING_KEY, f'{int(content_id)}:{field}', amount)
+        return
+
+    with _local_lock:
+        key = (int(content_id), field)
+        _local_buffer[key] = _local_buffer.get(key, 0) + amount
+        if _local_since is None:
+            _local_since = time.monotonic()
+        pending = sum(_local_buffer.values())
+        expired = _local_expired()
+
+    if pending >= settings.CONTENT_COUNTERS_LOCAL_MAX_PENDING or expired:
+        flush()
+
+
+def _local_expired():
+    return _local_since is not None and time.monotonic() - _local_since >= settings.CONTENT_COUNTERS_FLUSH_INTERVAL
+
+
+def flush_if_due():
+    """
+    Vuelca el buffer en memoria del proceso si sus incrementos llevan `CONTENT_COUNTERS_FLUSH_INTERVAL` segundos pendientes.
+
+    Se ejecuta al finalizar cada petición (`request_finished`), ya que la tarea periódica `flush_content_counters`
+    corre en el worker de Celery y no tiene acceso al buffer de los procesos web. Con Redis no hace nada.
+    """
+
+    if _uses_redis() or not _local_expired():
+        return
+    _flush_local()
+
+
+def flush():
+    """
+    Vuelca en la base de datos todos los incrementos acumulados con un único UPDATE.
+
+    Con Redis, los incrementos pendientes se renombran atómicamente a una clave de volcado junto con
+    un identificador de lote. El lote se registra en `CounterFlush` en la misma transacción que el UPDATE,
+    por lo que si el proceso se interrumpe antes de borrar la clave, el siguiente volcado detecta
+    el lote ya aplicado y no lo vuelve a sumar.
+
+    :return: Cantidad de contenidos actualizados.
+    :rtype: int
+    """
+
+    if _uses_redis():
+        return _flush_redis()
+    return _flush_local()
+
+
+def _flush_local():
+    global _local_buffer, _local_since
+
+    with _local_lock:
+        buffer, _local_buffer, _local_since = _local_buffer, {}, None
+    try:
+        return _apply(_group(buffer.items()))
+    except Exception:
+        # Se devuelven los incrementos al buffer para no perderlos si falla la base de datos
+        with _local_lock:
+            for key, amount in buffer.items():
+                _local_buffer[key] = _local_buffer.get(key, 0) + amount
+        raise
+
+
+def _flush_redis():
+    client = _redis()
+    # Si quedó un lote sin terminar se vuelve a procesar, si no se toma el pendiente.
+    # HSETNX solo asigna el identificador al lote recién renombrado.
+    pipe = client.pipeline(transaction=True)
+    pipe.renamenx(PENDING_KEY, FLUSHING_KEY)
+    pipe.hsetnx(FLUSHING_KEY, BATCH_FIELD, uuid.uuid4().hex)
+    pipe.execute(raise_on_error=False)
+
+    data = {key.decode(): value.decode() for key, value in client.hgetall(FLUSHING_KEY).items()}
+    batch_id = data.pop(BATCH_FIELD, None)
+
+    updated = 0
+    if data:
+        items = []
+        for key, amount in data.items():
+            content_id, field = key.split(':', 1)
+            items.append(((int(content_id), field), int(amount)))
+        try:
+            with transaction.atomic():
+                CounterFlush.objects.create(batch_id=batch_id)
+                updated = _apply(_group(items))
+        except IntegrityError:
+            # El lote ya fue aplicado por un volcado anterior que no llegó a borrar la clave
+            updated = 0
+    client.eval(_DELETE_BATCH_SCRIPT, 1, FLUSHING_KEY, BATCH_FIELD, batch_id)
+
+    # Los lotes viejos ya no pueden repetirse
+    CounterFlush.objects.filter(flushed_at__lt=timezone.now() - FLUSH_RETENTION).delete()
+    return updated
+
+
+def _group(items):
+    """
+    Agrupa los incrementos por contenido.
+
+    :param items: Pares `((content_id, campo), cantidad)`.
+    :type items: iterable
+    :return: Diccionario `{content_id: {campo: cantidad}}`.
+    :rtype: dict
+    """
+
+    grouped = {}
+    for (content_id, field), amount in items:
+        if field in COUNTER_FIELDS and amount:
+            grouped.setdefault(content_id, dict.fromkeys(COUNTER_FIELDS, 0))[field] += amount
+    return grouped
+
+
+def _apply(grouped):
+    """
+    Aplica los incrementos agrupados con un único `UPDATE ... FROM (VALUES ...)`.
+
+    :param grouped: Diccionario `{content_id: {campo: cantidad}}`.
+    :type grouped: dict
+    :return: Cantidad de contenidos actualizados.
+    :rtype: int
+    """
+
+    if not grouped:
+        return 0
+
+    table = connection.ops.quote_name(Content._meta.db_table)
+    columns = ', '.join(COUNTER_FIELDS)
+    assignments = ', '.join(f'{field} = {table}.{field} + v.{field}' for field in COUNTER_FIELDS)
+    row = '(' + ', '.join(['%s::bigint'] * (len(COUNTER_FIELDS) + 1)) + ')'
+    values = ', '.join([row] * len(grouped))
+    params = []
+    for content_id, amounts in sorted(grouped.items()):
+        params.append(content_id)
+        params.extend(amounts[field] for field in COUNTER_FIELDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET {assignments} '
+            f'FROM (VALUES {values}) AS v(id, {columns}) '
+            f'WHERE {table}.id = v.id',
+            params,
+        )
+        return cursor.rowcount
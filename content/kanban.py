@@ -0,0 +1,169 @@
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from app.pagination import KeysetPaginator
+from content.models import Content
+from content.service import user_capabilities
+
+# Columnas del tablero, en orden, con la etiqueta que se muestra en cada una
+KANBAN_COLUMNS = (
+    (Content.StateChoices.draft, 'Borrador'),
+    (Content.StateChoices.revision, 'Edicion'),
+    (Content.StateChoices.to_publish, 'A publicar'),
+    (Content.StateChoices.publish, 'Publicado'),
+    (Content.StateChoices.inactive, 'Inactivo'),
+)
+
+# Cantidad de tarjetas que se cargan por columna en cada página
+KANBAN_PAGE_SIZE = 20
+
+# Orden de las tarjetas dentro de cada columna, el último campo es único para que el orden sea total
+KANBAN_ORDERING = ('-date_create', '-id')
+
+
+class KanbanColumn:
+    """
+    Columna del tablero Kanban con la primera página de tarjetas de un estado.
+
+    :attribute state: Estado de los contenidos de la columna.
+    :type state: str
+    :attribute label: Etiqueta de la columna.
+    :type label: str
+    :attribute items: Contenidos de la página cargada.
+    :type items: list
+    :attribute total: Cantidad total de contenidos de la columna.
+    :type total: int
+    :attribute next_cursor: Cursor para cargar la página siguiente, o None si no hay más contenidos.
+    :type next_cursor: str
+    """
+
+    def __init__(self, state, label, items=None, total=0, next_cursor=None):
+        self.state = state
+        self.label = label
+        self.items = items or []
+        self.total = total
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def can_view_board(user):
+    """
+    Indica si el usuario puede acceder al tablero Kanban.
+
+    :param user: Usuario autenticado.
+    :type user: CustomUser
+    :return: True si tiene alguno de los permisos de gestión de contenidos.
+    :rtype: bool
+    """
+
+    return bool(user_capabilities(user))
+
+
+def sees_all_contents(user):
+    """
+    Indica si el usuario ve los contenidos de todos los autores en el tablero.
+
+    :param user: Usuario autenticado.
+    :type user: CustomUser
+    :return: True para editores, publicadores y usuarios que pueden cambiar el estado activo.
+    :rtype: bool
+    """
+
+    return bool(user_capabilities(user) & {'edit', 'publish', 'edit_is_active'})
+
+
+def board_queryset(user, query=None, autor_id=None, category_id=None):
+    """
+    Contenidos visibles en el tablero para un usuario, con los filtros aplicados en la base de datos.
+
+    Los editores y publicadores ven todos los contenidos activos; los autores solo los suyos.
+    La búsqueda por título o nombre del autor utiliza `icontains`, que aprovecha los índices de trigramas.
+
+    :param user: Usuario autenticado.
+    :type user: CustomUser
+    :param query: Texto a buscar en el título o el nombre del autor.
+    :type query: str
+    :param autor_id: ID del autor por el que se filtra.
+    :type autor_id: int
+    :param category_id: ID de la categoría por la que se filtra.
+    :type category_id: int
+    :return: Queryset de contenidos con la categoría y el autor incluidos.
+    :rtype: QuerySet
+    """
+
+    contents = Content.objects.filter(is_active=True, category__is_active=True).select_related('category', 'autor')
+    if not sees_all_contents(user):
+        contents = contents.filter(autor=user)
+    if query:
+        contents = contents.filter(Q(title__icontains=query) | Q(autor__name__icontains=query))
+    if autor_id:
+        contents = contents.filter(autor_id=autor_id)
+    if category_id:
+        contents = contents.filter(category_id=category_id)
+    return contents
+
+
+def load_board(queryset, per_page=KANBAN_PAGE_SIZE):
+    """
+    Carga la primera página de cada columna del tablero con una única consulta.
+
+    Numera los contenidos de cada estado con `ROW_NUMBER() OVER (PARTITION BY state ...)` y se queda con
+    las primeras `per_page + 1` filas de cada uno; la fila adicional solo indica si la columna tiene más contenidos.
+    El total de cada columna se obtiene con un `COUNT(*)` sobre la misma partición.
+
+    :param queryset: Contenidos visibles, generalmente obtenidos con :func:`board_queryset`.
+    :type queryset: QuerySet
+    :param per_page: Cantidad de tarjetas por columna.
+    :type per_page: int
+    :return: Diccionario ordenado de etiqueta de columna a :class:`KanbanColumn`.
+    :rtype: dict
+    """
+
+    paginator = KeysetPaginator(queryset, per_page, ordering=KANBAN_ORDERING)
+    columns = {state: KanbanColumn(state, label) for state, label in KANBAN_COLUMNS}
+    order_by = [F(field[1:]).desc() if field.startswith('-') else F(field).asc() for field in KANBAN_ORDERING]
+    rows = (
+        queryset
+        .annotate(
+            column_row=Window(RowNumber(), partition_by=[F('state')], order_by=order_by),
+            column_total=Window(Count('id'), partition_by=[F('state')]),
+        )
+        .filter(column_row__lte=per_page + 1)
+        .order_by('state', 'column_row')
+    )
+    for content in rows:
+        column = columns.get(content.state)
+        if column is None:
+            continue
+        column.total = content.column_total
+        if content.column_row <= per_page:
+            column.items.append(content)
+        else:
+            column.next_cursor = paginator.encode_cursor(column.items[-1], backwards=False)
+    return {column.label: column for column in columns.values()}
+
+
+def load_column(queryset, state, cursor=None, per_page=KANBAN_PAGE_SIZE):
+    """
+    Carga una página de una columna del tablero a partir del cursor devuelto por la página anterior.
+
+    :param queryset: Contenidos visibles, generalmente obtenidos con :func:`board_queryset`.
+    :type queryset: QuerySet
+    :param state: Estado de la columna.
+    :type state: str
+    :param cursor: Cursor de la página siguiente. Si es None se devuelve la primera página.
+    :type cursor: str
+    :param per_page: Cantidad de tarjetas por página.
+    :type per_page: int
+    :return: Página de contenidos de la columna.
+    :rtype: KeysetPage
+    :raises InvalidCursor: Si el cursor no es válido.
+    """
+
+    paginator = KeysetPaginator(queryset.filter(state=state), per_page, ordering=KANBAN_ORDERING)
+    return paginator.get_page(cursor)
@@ -0,0 +1,124 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from app.models import CustomUser
+from category.models import Category
+from content.models import Content
+
+WORDS = [
+    'montañas', 'política', 'economía', 'tecnología', 'educación', 'música', 'deportes', 'ciencia',
+    'historia', 'cocina', 'viajes', 'salud', 'cultura', 'literatura', 'energía', 'elecciones',
+    'inflación', 'fútbol', 'galaxias', 'vacunas', 'agricultura', 'inteligencia', 'artificial', 'Paraguay',
+]
+NAMES = ['Esteban', 'Mónica', 'Joaquín', 'Sofía', 'Andrés', 'Lucía', 'Ramón', 'Belén', 'Martín', 'Noemí']
+SURNAMES = ['Fernández', 'González', 'Benítez', 'Giménez', 'Villalba', 'Martínez', 'Acuña', 'Ayala']
+
+
+class Command(BaseCommand):
+    """
+    Compara los planes de ejecución y la latencia de la búsqueda por `icontains` contra la búsqueda
+    difusa por trigramas (pg_trgm) sobre el título del contenido, el nombre del autor y el de la categoría.
+
+    Uso::
+
+        ./manage.py benchmark_fuzzy_search --seed 200000 --users 5000
+        ./manage.py benchmark_fuzzy_search --title "montanas" --author "Estevan" --category "economia" --plans
+        ./manage.py benchmark_fuzzy_search --cleanup
+    """
+
+    help = 'Compara la búsqueda por icontains y por similitud de trigramas con EXPLAIN ANALYZE.'
+
+    bench_email_domain = 'benchmark-fuzzy.cms.local'
+    bench_category_prefix = 'Benchmark trigramas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Cantidad de contenidos a crear antes de medir.')
+        parser.add_argument('--users', type=int, default=1000, help='Cantidad de autores a crear junto con --seed.')
+        parser.add_argument('--title', default='montanas', help='Texto (posiblemente mal escrito) a buscar en los títulos.')
+        parser.add_argument('--author', default='Estevan', help='Texto a buscar en los nombres de autores.')
+        parser.add_argument('--category', default='economia', help='Texto a buscar en los nombres de categorías.')
+        parser.add_argument('--repeat', type=int, default=5, help='Cantidad de repeticiones de cada medición.')
+        parser.add_argument('--plans', action='store_true', help='Muestra los planes de ejecución completos.')
+        parser.add_argument('--cleanup', action='store_true', help='Elimina los datos de prueba creados con --seed.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Content.objects.filter(autor__email__endswith=self.bench_email_domain).delete()
+            Category.objects.filter(name__startswith=self.bench_category_prefix).delete()
+            CustomUser.objects.filter(email__endswith=self.bench_email_domain).delete()
+            self.stdout.write(f'Se eliminaron {deleted} registros de prueba.')
+            return
+
+        if options['seed']:
+            self.seed(options['seed'], options['users'])
+
+        cases = [
+            ('Título', Content.objects.all(), 'title', options['title']),
+            ('Autor', CustomUser.objects.all(), 'name', options['author']),
+            ('Categoría', Category.objects.all(), 'name', options['category']),
+        ]
+        for label, queryset, field, text in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: "{text}" ({queryset.count()} filas)'))
+            for lookup in ('icontains', 'trigram_word_similar'):
+                filtered = queryset.filter(**{f'{field}__{lookup}': text}).values('id')
+                matches = filtered.count()
+                elapsed = self.measure(lambda: list(filtered.all()), options['repeat'])
+                plan = filtered.explain(analyze=True, buffers=True)
+                scans = sorted({line.strip().lstrip('-> ').split('  ')[0] for line in plan.splitlines() if 'Scan' in line})
+                self.stdout.write(f'  {lookup:<22} coincidencias: {matches:<8} mediana: {elapsed:.2f} ms')
+                self.stdout.write(f'  {"":<22} accesos: {"; ".join(scans)}')
+                if options['plans']:
+                    self.stdout.write('\n'.join(f'      {line}' for line in plan.splitlines()))
+
+    @staticmethod
+    def measure(fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def seed(self, amount, users):
+        rng = random.Random(10)
+        authors = CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f'autor{i}@{self.bench_email_domain}',
+                name=f'{rng.choice(NAMES)} {rng.choice(SURNAMES)} {i}',
+                password='!',
+            )
+            for i in range(users)
+        ])
+        categories = Category.objects.bulk_create([
+            Category(name=f'{self.bench_category_prefix} {word}', description='Datos de prueba', type=Category.TypeChoices.public)
+            for word in WORDS
+        ])
+
+        now = timezone.now()
+        batch = []
+        for i in range(amount):
+            batch.append(Content(
+                title=' '.join(rng.sample(WORDS, 4)).capitalize(),
+                summary='Resumen de prueba',
+                content='<p>Contenido de prueba</p>',
+                category=rng.choice(categories),
+                autor=rng.choice(authors),
+                state=Content.StateChoices.publish,
+                date_published=now,
+            ))
+            if len(batch) >= 5000:
+                Content.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Content.objects.bulk_create(batch)
+
+        # Actualiza las estadísticas para que el planificador considere los índices de trigramas
+        with connection.cursor() as cursor:
+            for model in (Content, CustomUser, Category):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        self.stdout.write(f'Se crearon {amount} contenidos y {users} autores de prueba.')
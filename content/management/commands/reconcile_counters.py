@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from content.service import reconcile_reaction_counters
+from rating.service import recompute_rating_aggregates
+
+
+class Command(BaseCommand):
+    """
+    Recalcula en lote los contadores de reacciones y los acumulados de calificación de los contenidos para reparar desvíos.
+
+    Uso::
+
+        ./manage.py reconcile_counters --dry-run
+        ./manage.py reconcile_counters
+    """
+
+    help = 'Recalcula likes_count, dislikes_count y los acumulados de calificación de todos los contenidos con consultas agrupadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa la cantidad de contenidos con desvíos.')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_reaction_counters(dry_run=options['dry_run'])
+        ratings = recompute_rating_aggregates(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'Contenidos con contadores desviados: {drifted}')
+            self.stdout.write(f'Contenidos con calificaciones desviadas: {ratings}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Se corrigieron los contadores de {drifted} contenidos.'))
+            self.stdout.write(self.style.SUCCESS(f'Se corrigieron las calificaciones de {ratings} contenidos.'))
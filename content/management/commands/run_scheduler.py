@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from app.listener import Listener
+from content import scheduler
+
+
+class Command(BaseCommand):
+    """
+    Despachador de los eventos de publicación y expiración de contenidos.
+
+    Ejecuta los eventos vencidos y duerme hasta la fecha del próximo evento, o hasta recibir un aviso de que
+    se programó uno nuevo (`LISTEN`/`NOTIFY` de PostgreSQL), por lo que cada evento se ejecuta en su fecha exacta.
+
+    Uso::
+
+        ./manage.py run_scheduler
+        ./manage.py run_scheduler --once
+    """
+
+    help = 'Ejecuta los eventos programados de publicación y expiración de contenidos en su fecha exacta.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Ejecuta los eventos vencidos y termina.')
+        parser.add_argument('--max-sleep', type=int, default=settings.SCHEDULER_MAX_SLEEP,
+                            help='Segundos máximos de espera entre dos revisiones de los eventos.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self._dispatch()
+            return
+
+        listener = Listener(scheduler.SCHEDULER_CHANNEL)
+        while True:
+            try:
+                # La suscripción se hace antes de revisar los eventos para no perder los avisos intermedios
+                listener.listen()
+                self._dispatch()
+                next_run_at = scheduler.next_run_at()
+                timeout = options['max_sleep']
+                if next_run_at is not None:
+                    timeout = min(max((next_run_at - timezone.now()).total_seconds(), 0), timeout)
+                if timeout > 0:
+                    listener.wait(timeout)
+            except OperationalError as e:
+                self.stderr.write(f'Error de conexión con la base de datos: {e}')
+                connection.close()
+                time.sleep(options['max_sleep'])
+
+    def _dispatch(self):
+        dispatched = scheduler.dispatch_due_events()
+        if dispatched:
+            self.stdout.write(f'{timezone.now():%Y-%m-%d %H:%M:%S} Contenidos publicados o expirados: {dispatched}')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0011_remove_historicalcontent_important'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(condition=models.Q(('is_active', True), ('state', 'publish')), fields=['-date_published', '-id'], name='content_published_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 03:45
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Carga inicial del vector de búsqueda, equivalente a content.search.build_search_vector
+BACKFILL_SEARCH_VECTOR = """
+UPDATE content c SET search_vector =
+    setweight(to_tsvector('spanish', coalesce(c.title, '')), 'A')
+    || setweight(to_tsvector('spanish', coalesce(c.summary, '')), 'B')
+    || setweight(to_tsvector('spanish', coalesce(regexp_replace(c.content, '<[^>]+>', ' ', 'g'), '')), 'C')
+    || setweight(to_tsvector('spanish', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM taggit_taggeditem ti
+        JOIN taggit_tag t ON t.id = ti.tag_id
+        JOIN django_content_type ct ON ct.id = ti.content_type_id
+        WHERE ct.app_label = 'content' AND ct.model = 'content' AND ti.object_id = c.id
+    ), '')), 'D');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0012_content_published_keyset_idx'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='content',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 03:51
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_trigram_search'),
+        ('content', '0013_content_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='content_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
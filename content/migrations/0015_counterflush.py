@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0014_content_title_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterFlush',
+            fields=[
+                ('batch_id', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Lote')),
+                ('flushed_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de volcado')),
+            ],
+            options={
+                'verbose_name': 'Volcado de contadores',
+                'verbose_name_plural': 'Volcados de contadores',
+                'db_table': 'content_counter_flush',
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-18 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Copia las reacciones de las tablas ManyToMany; si un usuario tenía ambas, se conserva el "me gusta"
+COPY_REACTIONS = """
+INSERT INTO content_reaction (content_id, user_id, value)
+SELECT content_id, customuser_id, 1 FROM content_likes
+ON CONFLICT (content_id, user_id) DO NOTHING;
+INSERT INTO content_reaction (content_id, user_id, value)
+SELECT content_id, customuser_id, -1 FROM content_dislikes
+ON CONFLICT (content_id, user_id) DO NOTHING;
+"""
+
+RESTORE_REACTIONS = """
+INSERT INTO content_likes (content_id, customuser_id)
+SELECT content_id, user_id FROM content_reaction WHERE value = 1;
+INSERT INTO content_dislikes (content_id, customuser_id)
+SELECT content_id, user_id FROM content_reaction WHERE value = -1;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('content', '0015_counterflush'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.SmallIntegerField(choices=[(1, 'Me gusta'), (-1, 'No me gusta')], verbose_name='Reacción')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='content.content', verbose_name='Contenido')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Reacción',
+                'verbose_name_plural': 'Reacciones',
+                'db_table': 'content_reaction',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('content', 'user'), name='content_reaction_unique'),
+        ),
+        migrations.RunSQL(COPY_REACTIONS, reverse_sql=RESTORE_REACTIONS),
+        migrations.RemoveField(
+            model_name='content',
+            name='dislikes',
+        ),
+        migrations.RemoveField(
+            model_name='content',
+            name='likes',
+        ),
+    ]
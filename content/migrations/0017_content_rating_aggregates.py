@@ -0,0 +1,73 @@
+# Generated by Django 4.2 on 2026-10-18 04:12
+
+from django.db import migrations, models
+
+# Inicializa los acumulados de calificación a partir de las calificaciones existentes
+BACKFILL_RATING_AGGREGATES = """
+UPDATE content c SET
+    rating_sum = r.total,
+    rating_count = r.votes,
+    rating_1 = r.r1,
+    rating_2 = r.r2,
+    rating_3 = r.r3,
+    rating_4 = r.r4,
+    rating_5 = r.r5,
+    rating_avg = r.total::float / r.votes
+FROM (
+    SELECT content_id, SUM(rating) AS total, COUNT(*) AS votes,
+           COUNT(*) FILTER (WHERE rating = 1) AS r1,
+           COUNT(*) FILTER (WHERE rating = 2) AS r2,
+           COUNT(*) FILTER (WHERE rating = 3) AS r3,
+           COUNT(*) FILTER (WHERE rating = 4) AS r4,
+           COUNT(*) FILTER (WHERE rating = 5) AS r5
+    FROM rating_rating
+    GROUP BY content_id
+) r
+WHERE r.content_id = c.id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0016_reaction'),
+        ('rating', '0002_alter_rating_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='rating_1',
+            field=models.IntegerField(default=0, verbose_name='Calificaciones de 1 estrella'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_2',
+            field=models.IntegerField(default=0, verbose_name='Calificaciones de 2 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_3',
+            field=models.IntegerField(default=0, verbose_name='Calificaciones de 3 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_4',
+            field=models.IntegerField(default=0, verbose_name='Calificaciones de 4 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_5',
+            field=models.IntegerField(default=0, verbose_name='Calificaciones de 5 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_count',
+            field=models.IntegerField(default=0, verbose_name='Cantidad de calificaciones'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_sum',
+            field=models.IntegerField(default=0, verbose_name='Suma de calificaciones'),
+        ),
+        migrations.RunSQL(BACKFILL_RATING_AGGREGATES, reverse_sql=migrations.RunSQL.noop),
+    ]
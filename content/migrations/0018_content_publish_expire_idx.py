@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0017_content_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(condition=models.Q(('state', 'publish')), fields=['date_expire'], name='content_publish_expire_idx'),
+        ),
+    ]
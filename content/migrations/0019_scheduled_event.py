@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-18 04:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Los contenidos publicados con fecha de publicación futura vuelven a 'A publicar' con su evento de publicación,
+# y los contenidos publicados con fecha de expiración reciben su evento de expiración.
+SCHEDULE_EXISTING_CONTENTS = """
+INSERT INTO content_scheduled_event (content_id, kind, run_at, created_at)
+SELECT id, 'publish', date_published, now() FROM content
+WHERE state = 'publish' AND date_published > now();
+
+UPDATE content SET state = 'to_publish'
+WHERE id IN (SELECT content_id FROM content_scheduled_event WHERE kind = 'publish');
+
+INSERT INTO content_scheduled_event (content_id, kind, run_at, created_at)
+SELECT id, 'expire', date_expire, now() FROM content
+WHERE state = 'publish' AND date_expire IS NOT NULL;
+"""
+
+UNSCHEDULE_EXISTING_CONTENTS = """
+UPDATE content SET state = 'publish'
+WHERE id IN (SELECT content_id FROM content_scheduled_event WHERE kind = 'publish');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0018_content_publish_expire_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('publish', 'Publicación'), ('expire', 'Expiración')], max_length=20, verbose_name='Tipo')),
+                ('run_at', models.DateTimeField(verbose_name='Fecha de ejecución')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_events', to='content.content', verbose_name='Contenido')),
+            ],
+            options={
+                'verbose_name': 'Evento programado',
+                'verbose_name_plural': 'Eventos programados',
+                'db_table': 'content_scheduled_event',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='scheduledevent',
+            index=models.Index(fields=['run_at'], name='content_scheduled_run_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduledevent',
+            constraint=models.UniqueConstraint(fields=('content', 'kind'), name='content_scheduled_event_unique'),
+        ),
+        migrations.RunSQL(SCHEDULE_EXISTING_CONTENTS, reverse_sql=UNSCHEDULE_EXISTING_CONTENTS),
+    ]
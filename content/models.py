@@ -5,8 +5,9 @@ from simple_history.models import HistoricalRecords
 from app.models import CustomUser
 from category.models import Category
 from taggit.managers import TaggableManager
-from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Q
 
 class Content (models.Model):
     """
@@ -35,13 +36,15 @@ class Content (models.Model):
     :type content: RichTextUploadingField
     :attribute tags: Administrador de etiquetas para asociar palabras clave al contenido.
     :type tags: TaggableManager
-    :attribute likes: Relación con los usuarios que han dado "me gusta" al contenido.
-    :type likes: ManyToManyField
-    :attribute dislikes: Relación con los usuarios que han dado "no me gusta" al contenido.
-    :type dislikes: ManyToManyField
-    :attribute rating_avg: Promedio de calificaciones del contenido.
+    :attribute rating_avg: Promedio de calificaciones del contenido, derivado de `rating_sum` y `rating_count`.
     :type rating_avg: FloatField
-    :attribute likes_count: Cantidad total de "me gusta".
+    :attribute rating_sum: Suma de todas las calificaciones del contenido.
+    :type rating_sum: IntegerField
+    :attribute rating_count: Cantidad de calificaciones del contenido.
+    :type rating_count: IntegerField
+    :attribute rating_1: Cantidad de calificaciones de 1 estrella (ídem `rating_2` a `rating_5`).
+    :type rating_1: IntegerField
+    :attribute likes_count: Cantidad total de "me gusta" (ver `Reaction`).
     :type likes_count: IntegerField
     :attribute dislikes_count: Cantidad total de "no me gusta".
     :type dislikes_count: IntegerField
@@ -51,6 +54,8 @@ class Content (models.Model):
     :type shares_count: IntegerField
     :attribute important: Indica si el contenido está marcado como "destacado".
     :type important: BooleanField
+    :attribute search_vector: Vector de búsqueda de texto completo, mantenido por `content.signals`.
+    :type search_vector: SearchVectorField
     """
 
     title = models.CharField(max_length=255, verbose_name='Título')
@@ -63,15 +68,22 @@ class Content (models.Model):
     date_published = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de publicación')
     content = RichTextUploadingField(verbose_name='Contenido')  # Campo de texto enriquecido con CKEditor 5
     tags = TaggableManager()
-    history = HistoricalRecords(excluded_fields=['rating_avg', 'likes_count', 'dislikes_count', 'views_count', 'shares_count', 'important'])
-    likes = models.ManyToManyField(get_user_model(), related_name='liked_content', blank=True)
-    dislikes = models.ManyToManyField(get_user_model(), related_name='disliked_content', blank=True)
+    history = HistoricalRecords(excluded_fields=['rating_avg', 'likes_count', 'dislikes_count', 'views_count', 'shares_count', 'important', 'search_vector',
+                                                 'rating_sum', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'])
     rating_avg = models.FloatField(default = 0.0, verbose_name="Promedio de calificación")
+    rating_sum = models.IntegerField(default=0, verbose_name="Suma de calificaciones")
+    rating_count = models.IntegerField(default=0, verbose_name="Cantidad de calificaciones")
+    rating_1 = models.IntegerField(default=0, verbose_name="Calificaciones de 1 estrella")
+    rating_2 = models.IntegerField(default=0, verbose_name="Calificaciones de 2 estrellas")
+    rating_3 = models.IntegerField(default=0, verbose_name="Calificaciones de 3 estrellas")
+    rating_4 = models.IntegerField(default=0, verbose_name="Calificaciones de 4 estrellas")
+    rating_5 = models.IntegerField(default=0, verbose_name="Calificaciones de 5 estrellas")
     likes_count = models.IntegerField(default=0, verbose_name="Cantidad de likes")
     dislikes_count = models.IntegerField(default=0, verbose_name="Cantidad de dislikes")
     views_count = models.IntegerField(default=0, verbose_name="Cantidad de visualizaciones")
     shares_count = models.IntegerField(default=0, verbose_name="Cantidad de compartidos")
     important = models.BooleanField(default=False, verbose_name="Destacado")
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class StateChoices(models.TextChoices):
         """
@@ -132,6 +144,24 @@ class Content (models.Model):
         verbose_name = 'Contenido'
         verbose_name_plural = 'Contenidos'
         db_table = 'content'
+        indexes = [
+            # Índice para la paginación por cursor del inicio sobre (date_published, id)
+            models.Index(
+                fields=['-date_published', '-id'],
+                name='content_published_keyset_idx',
+                condition=Q(state='publish', is_active=True),
+            ),
+            # Índice para la búsqueda de texto completo
+            GinIndex(fields=['search_vector'], name='content_search_vector_idx'),
+            # Índice de trigramas para la búsqueda difusa por título
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='content_title_trgm_idx'),
+            # Índice para la búsqueda de contenidos publicados vencidos
+            models.Index(
+                fields=['date_expire'],
+                name='content_publish_expire_idx',
+                condition=Q(state='publish'),
+            ),
+        ]
 
 
     def __str__(self):
@@ -146,14 +176,29 @@ class Content (models.Model):
 
     def update_rating_avg(self):
         """
-        Actualiza el promedio de calificación del contenido.
+        Recalcula los acumulados de calificación del contenido a partir de todas sus calificaciones.
 
-        Calcula el promedio de las calificaciones asociadas al contenido y actualiza el campo `rating_avg`.
+        Actualiza `rating_sum`, `rating_count`, el histograma (`rating_1` a `rating_5`) y `rating_avg`.
         """
 
-        avg_rating = self.rating_set.aggregate(Avg('rating'))['rating__avg']
-        self.rating_avg = avg_rating or 0.0
-        self.save()
+        from rating.service import recompute_rating_aggregates
+        recompute_rating_aggregates([self.id])
+        self.refresh_from_db(fields=['rating_avg', 'rating_sum', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'])
+
+    def rating_distribution(self):
+        """
+        Devuelve la distribución de calificaciones del contenido a partir de los acumulados, sin consultas adicionales.
+
+        :return: Lista de diccionarios con las estrellas, la cantidad y el porcentaje, de 5 a 1 estrella.
+        :rtype: list
+        """
+
+        distribution = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'rating_{stars}')
+            percent = round(count * 100 / self.rating_count) if self.rating_count else 0
+            distribution.append({'stars': stars, 'count': count, 'percent': percent})
+        return distribution
 
     def get_state_name(self, state):
         """
@@ -178,6 +223,56 @@ class Content (models.Model):
             return "Desconocido"
         
 
+class Reaction(models.Model):
+    """
+    Modelo que representa la reacción ("me gusta" o "no me gusta") de un usuario sobre un contenido.
+
+    Cada usuario puede tener a lo sumo una reacción por contenido, garantizado por una restricción única,
+    lo que permite alternarla con una única sentencia `INSERT ... ON CONFLICT` (ver `content.service.toggle_reaction`).
+
+    :attribute user: Usuario que reaccionó.
+    :type user: ForeignKey
+    :attribute content: Contenido sobre el que se reaccionó.
+    :type content: ForeignKey
+    :attribute value: Valor de la reacción, definido en `ValueChoices`.
+    :type value: SmallIntegerField
+    """
+
+    class ValueChoices(models.IntegerChoices):
+        """
+        Enumeración de los valores posibles de una reacción.
+
+        :attribute like: Reacción de "me gusta".
+        :type like: int
+        :attribute dislike: Reacción de "no me gusta".
+        :type dislike: int
+        """
+
+        like = 1, ('Me gusta')
+        dislike = -1, ('No me gusta')
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='reactions', verbose_name='Usuario')
+    content = models.ForeignKey(Content, on_delete=models.CASCADE, related_name='reactions', verbose_name='Contenido')
+    value = models.SmallIntegerField(choices=ValueChoices.choices, verbose_name='Reacción')
+
+    class Meta:
+        verbose_name = 'Reacción'
+        verbose_name_plural = 'Reacciones'
+        db_table = 'content_reaction'
+        constraints = [
+            models.UniqueConstraint(fields=['content', 'user'], name='content_reaction_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Devuelve una representación en cadena de la reacción.
+
+        :return: El usuario, la reacción y el contenido.
+        :rtype: str
+        """
+        return f"{self.user} - {self.get_value_display()} - {self.content}"
+
+
 class Report(models.Model):
     """
     Modelo que representa un reporte asociado a un contenido.
@@ -223,4 +318,82 @@ class Report(models.Model):
         :return: Una cadena que describe el reporte, indicando el reportante y el contenido.
         :rtype: str
         """
-        return f"Reporte de {self.email if self.email else self.reported_by} sobre {self.content.title}"
\ No newline at end of file
+        return f"Reporte de {self.email if self.email else self.reported_by} sobre {self.content.title}"
+
+class CounterFlush(models.Model):
+    """
+    Registro de los lotes de contadores ya volcados en la base de datos.
+
+    Permite que el volcado de los contadores acumulados (`content.counters`) sea idempotente: el lote se registra
+    en la misma transacción que actualiza los contadores, por lo que un lote repetido se detecta y se descarta.
+
+    :attribute batch_id: Identificador único del lote.
+    :type batch_id: CharField
+    :attribute flushed_at: Fecha en la que se aplicó el lote.
+    :type flushed_at: DateTimeField
+    """
+
+    batch_id = models.CharField(max_length=64, primary_key=True, verbose_name='Lote')
+    flushed_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de volcado')
+
+    class Meta:
+        verbose_name = 'Volcado de contadores'
+        verbose_name_plural = 'Volcados de contadores'
+        db_table = 'content_counter_flush'
+
+
+class ScheduledEvent(models.Model):
+    """
+    Evento pendiente sobre un contenido: su publicación o su expiración en una fecha exacta.
+
+    Los eventos se crean al programar la publicación de un contenido y al publicarlo con fecha de expiración,
+    y se eliminan al ejecutarse (`content.scheduler`). Cada contenido tiene a lo sumo un evento de cada tipo.
+
+    :attribute content: Contenido sobre el que se ejecuta el evento.
+    :type content: ForeignKey
+    :attribute kind: Tipo de evento (publicación o expiración).
+    :type kind: CharField
+    :attribute run_at: Fecha en la que debe ejecutarse el evento.
+    :type run_at: DateTimeField
+    :attribute created_at: Fecha de creación del evento.
+    :type created_at: DateTimeField
+    """
+
+    class KindChoices(models.TextChoices):
+        """
+        Tipos de eventos programados.
+
+        :attribute publish: Publicación de un contenido en estado 'A publicar'.
+        :type publish: str
+        :attribute expire: Expiración de un contenido publicado.
+        :type expire: str
+        """
+
+        publish = 'publish', ('Publicación')
+        expire = 'expire', ('Expiración')
+
+    content = models.ForeignKey(Content, on_delete=models.CASCADE, related_name='scheduled_events', verbose_name='Contenido')
+    kind = models.CharField(max_length=20, choices=KindChoices.choices, verbose_name='Tipo')
+    run_at = models.DateTimeField(verbose_name='Fecha de ejecución')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+
+    class Meta:
+        verbose_name = 'Evento programado'
+        verbose_name_plural = 'Eventos programados'
+        db_table = 'content_scheduled_event'
+        constraints = [
+            models.UniqueConstraint(fields=['content', 'kind'], name='content_scheduled_event_unique'),
+        ]
+        indexes = [
+            # Índice para obtener los eventos vencidos y la fecha del próximo evento
+            models.Index(fields=['run_at'], name='content_scheduled_run_at_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Devuelve una representación legible del evento.
+
+        :return: El tipo de evento, el contenido y la fecha de ejecución.
+        :rtype: str
+        """
+        return f"{self.get_kind_display()} de {self.content_id} - {self.run_at}"
@@ -0,0 +1,179 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app import listener
+from app.models import CustomUser
+from content import service
+from content.models import Content, ScheduledEvent
+
+# Canal de PostgreSQL en el que se avisa al despachador que cambiaron los eventos programados
+SCHEDULER_CHANNEL = 'content_scheduler'
+
+PUBLISHED_CHANGE_REASON = 'Publicación programada'
+
+# Cambia el estado de los contenidos de un lote de eventos y devuelve sus filas completas.
+# Solo se actualizan los contenidos que siguen en el estado esperado y cuya fecha ya se cumplió.
+TRANSITION_CONTENTS_SQL = """
+UPDATE {{content}} SET state = %(new_state)s
+WHERE id = ANY(%(ids)s) AND state = %(old_state)s AND {date_column} <= %(now)s
+RETURNING {{columns}}
+"""
+
+
+def scheduled_publication_message(date_published):
+    """
+    Mensaje que se registra y se devuelve al programar la publicación de un contenido.
+
+    :param date_published: Fecha de publicación programada.
+    :type date_published: datetime
+    :return: Mensaje con la fecha en la zona horaria local.
+    :rtype: str
+    """
+
+    return f"Publicación programada para el {timezone.localtime(date_published):%d/%m/%Y %H:%M}"
+
+
+def notify_dispatcher():
+    """
+    Avisa al despachador (`./manage.py run_scheduler`) que cambiaron los eventos programados.
+
+    `pg_notify` es transaccional: si hay una transacción abierta, el aviso se entrega recién al confirmarse.
+    """
+
+    listener.notify(SCHEDULER_CHANNEL)
+
+
+def _upsert(events):
+    ScheduledEvent.objects.bulk_create(
+        events, update_conflicts=True, unique_fields=['content', 'kind'], update_fields=['run_at'],
+    )
+    notify_dispatcher()
+
+
+def schedule_publication(contents):
+    """
+    Programa la publicación de contenidos en estado 'A publicar' para su fecha de publicación.
+
+    :param contents: Contenidos con fecha de publicación futura.
+    :type contents: list
+    """
+
+    if contents:
+        _upsert([
+            ScheduledEvent(content_id=content.id, kind=ScheduledEvent.KindChoices.publish, run_at=content.date_published)
+            for content in contents
+        ])
+
+
+def sync_events(contents):
+    """
+    Ajusta los eventos programados de los contenidos a su estado actual.
+
+    Los contenidos publicados con fecha de expiración tienen un evento de expiración; los eventos de expiración
+    de los demás contenidos y los eventos de publicación de los contenidos que ya no están en 'A publicar' se
+    eliminan, para que un contenido devuelto a revisión no se publique sin una nueva aprobación.
+
+    :param contents: Contenidos cuyo estado cambió.
+    :type contents: list
+    """
+
+    if not contents:
+        return
+
+    expiring = [content for content in contents if content.state == Content.StateChoices.publish and content.date_expire]
+    expiring_ids = {content.id for content in expiring}
+    pending_ids = {content.id for content in contents if content.state == Content.StateChoices.to_publish}
+    ids = [content.id for content in contents]
+    (
+        ScheduledEvent.objects
+        .filter(content_id__in=ids)
+        .exclude(kind=ScheduledEvent.KindChoices.expire, content_id__in=expiring_ids)
+        .exclude(kind=ScheduledEvent.KindChoices.publish, content_id__in=pending_ids)
+        .delete()
+    )
+    if expiring:
+        _upsert([
+            ScheduledEvent(content_id=content.id, kind=ScheduledEvent.KindChoices.expire, run_at=content.date_expire)
+            for content in expiring
+        ])
+
+
+def next_run_at():
+    """
+    Fecha del próximo evento programado.
+
+    :return: Fecha del evento más próximo, o None si no hay eventos pendientes.
+    :rtype: datetime
+    """
+
+    return ScheduledEvent.objects.order_by('run_at').values_list('run_at', flat=True).first()
+
+
+def _transition(content_ids, old_state, new_state, date_column, change_reason, now):
+    if not content_ids:
+        return []
+    params = {'ids': content_ids, 'old_state': old_state, 'new_state': new_state, 'now': now}
+    return service.update_with_history(
+        TRANSITION_CONTENTS_SQL.format(date_column=connection.ops.quote_name(date_column)), params, change_reason, now,
+    )
+
+
+def _notify(published, expired):
+    from notification.service import expired_contents
+    from notification.tasks import notify_state_changes
+
+    if published:
+        ids = [content.id for content in published]
+        notify_state_changes.delay([[content_id, Content.StateChoices.to_publish.value] for content_id in ids], ids)
+
+    titles = {}
+    for content in sorted(expired, key=lambda content: (content.date_expire, content.id)):
+        titles.setdefault(content.autor_id, []).append(content.title)
+    for autor in CustomUser.objects.filter(id__in=titles).only('id', 'email'):
+        expired_contents(autor, titles[autor.id])
+
+
+def dispatch_due_events(now=None, batch_size=100):
+    """
+    Ejecuta todos los eventos programados cuya fecha ya se cumplió.
+
+    Cada lote de eventos se bloquea con `SELECT ... FOR UPDATE SKIP LOCKED`, por lo que varios despachadores
+    (el proceso `run_scheduler` y la tarea de respaldo de Celery Beat) pueden ejecutarse a la vez sin repetir
+    eventos. Los contenidos cambian de estado con un único `UPDATE ... RETURNING` por tipo de evento, su historial
+    se registra en la misma transacción y los eventos se eliminan. Al publicarse un contenido se programa su
+    expiración. Las notificaciones se envían al confirmarse cada lote.
+
+    :param now: Fecha de referencia. Por defecto, la fecha actual.
+    :type now: datetime
+    :param batch_size: Cantidad máxima de eventos por lote.
+    :type batch_size: int
+    :return: Cantidad de contenidos publicados o expirados.
+    :rtype: int
+    """
+
+    now = now or timezone.now()
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                ScheduledEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(run_at__lte=now)
+                .order_by('run_at', 'id')[:batch_size]
+            )
+            if not events:
+                return dispatched
+
+            ScheduledEvent.objects.filter(id__in=[event.id for event in events]).delete()
+            published = _transition(
+                [event.content_id for event in events if event.kind == ScheduledEvent.KindChoices.publish],
+                Content.StateChoices.to_publish.value, Content.StateChoices.publish.value, 'date_published', PUBLISHED_CHANGE_REASON, now,
+            )
+            expired = _transition(
+                [event.content_id for event in events if event.kind == ScheduledEvent.KindChoices.expire],
+                Content.StateChoices.publish.value, Content.StateChoices.inactive.value, 'date_expire', service.EXPIRED_CHANGE_REASON, now,
+            )
+            # Los contenidos publicados con expiración vencida se expiran en el lote siguiente
+            sync_events(published)
+            transaction.on_commit(lambda published=published, expired=expired: _notify(published, expired))
+        dispatched += len(published) + len(expired)
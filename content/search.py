@@ -0,0 +1,156 @@
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Func, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from taggit.models import TaggedItem
+
+from app.models import CustomUser
+from category.models import Category
+
+# Configuración de búsqueda de texto completo utilizada para indexar y consultar los contenidos
+SEARCH_CONFIG = 'spanish'
+
+# Marcadores utilizados por ts_headline, se reemplazan por <mark> luego de escapar el texto
+_START_SEL = '\x01'
+_STOP_SEL = '\x02'
+
+
+def _tags_text(model):
+    """
+    Subconsulta que concatena los nombres de las etiquetas de cada contenido.
+
+    :param model: Modelo de contenido cuyas etiquetas se concatenan.
+    :type model: Model
+    :return: Subconsulta con los nombres de las etiquetas separados por espacios.
+    :rtype: Subquery
+    """
+
+    content_type = ContentType.objects.get_for_model(model)
+    tags = (
+        TaggedItem.objects
+        .filter(content_type=content_type, object_id=OuterRef('pk'))
+        .values('object_id')
+        .annotate(names=StringAgg('tag__name', delimiter=' '))
+        .values('names')
+    )
+    return Subquery(tags)
+
+
+def build_search_vector(model):
+    """
+    Construye la expresión del `tsvector` de un contenido.
+
+    Los pesos se asignan según la relevancia de cada campo: título (A), resumen (B),
+    cuerpo sin etiquetas HTML (C) y etiquetas (D).
+
+    :param model: Modelo de contenido sobre el que se construye el vector.
+    :type model: Model
+    :return: Expresión del vector de búsqueda.
+    :rtype: SearchVector
+    """
+
+    body = Func(F('content'), Value('<[^>]+>'), Value(' '), Value('g'), function='regexp_replace', output_field=TextField())
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('summary', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(body, weight='C', config=SEARCH_CONFIG)
+        + SearchVector(_tags_text(model), weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    """
+    Recalcula el vector de búsqueda de los contenidos indicados con un único UPDATE.
+
+    :param queryset: Contenidos a actualizar.
+    :type queryset: QuerySet
+    :return: Cantidad de contenidos actualizados.
+    :rtype: int
+    """
+
+    return queryset.update(search_vector=build_search_vector(queryset.model))
+
+
+def search_contents(queryset, query, extra=None):
+    """
+    Filtra y anota los contenidos que coinciden con una búsqueda de texto completo.
+
+    La búsqueda utiliza la sintaxis de buscadores web (`websearch_to_tsquery`), por lo que admite
+    frases entre comillas, `or` y exclusiones con `-`. Cada contenido se anota con su relevancia
+    (`rank`) y con el título y resumen resaltados (`title_headline`, `summary_headline`).
+
+    :param queryset: Contenidos sobre los que se realiza la búsqueda.
+    :type queryset: QuerySet
+    :param query: Texto ingresado por el usuario.
+    :type query: str
+    :param extra: Condición adicional que también se considera una coincidencia (con relevancia 0).
+    :type extra: Q
+    :return: Queryset filtrado y anotado, sin ordenar.
+    :rtype: QuerySet
+    """
+
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    condition = Q(search_vector=search_query)
+    if extra is not None:
+        condition |= extra
+    return queryset.filter(condition).annotate(
+        # Se convierte a double precision para que el valor sea exacto al usarse en cursores
+        rank=Cast(Coalesce(SearchRank(F('search_vector'), search_query), 0.0), output_field=FloatField()),
+        title_headline=_headline('title', search_query),
+        summary_headline=_headline('summary', search_query),
+    )
+
+
+def fuzzy_match(query):
+    """
+    Condición de coincidencia aproximada (pg_trgm) por título, nombre del autor o nombre de la categoría.
+
+    Utiliza el operador de similitud de palabras (`%>`), que tolera errores de tipeo y aprovecha los
+    índices GIN de trigramas. El umbral se define con `TRIGRAM_WORD_SIMILARITY_THRESHOLD`.
+
+    :param query: Texto ingresado por el usuario.
+    :type query: str
+    :return: Condición aplicable a un queryset de contenidos.
+    :rtype: Q
+    """
+
+    authors = CustomUser.objects.filter(name__trigram_word_similar=query).values('id')
+    categories = Category.objects.filter(name__trigram_word_similar=query).values('id')
+    return (
+        Q(title__trigram_word_similar=query)
+        | Q(autor_id__in=authors)
+        | Q(category_id__in=categories)
+    )
+
+
+def _headline(field, search_query):
+    return SearchHeadline(
+        field,
+        search_query,
+        config=SEARCH_CONFIG,
+        start_sel=_START_SEL,
+        stop_sel=_STOP_SEL,
+        highlight_all=True,
+    )
+
+
+def highlight(headline):
+    """
+    Convierte el texto devuelto por `ts_headline` en HTML seguro.
+
+    El texto se escapa antes de insertar las etiquetas `<mark>`, por lo que el contenido ingresado
+    por los usuarios nunca se interpreta como HTML.
+
+    :param headline: Texto resaltado con los marcadores internos.
+    :type headline: str
+    :return: HTML seguro con las coincidencias envueltas en `<mark>`.
+    :rtype: SafeString
+    """
+
+    if not headline:
+        return ''
+    html = escape(headline).replace(_START_SEL, '<mark>').replace(_STOP_SEL, '</mark>')
+    return mark_safe(html)
@@ -1,3 +1,195 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from content.models import Content, Reaction
+
+# Valor almacenado en `Reaction` para cada tipo de reacción
+REACTION_VALUES = {'like': Reaction.ValueChoices.like, 'dislike': Reaction.ValueChoices.dislike}
+
+# Alterna la reacción y actualiza los contadores en una única sentencia:
+#   - `removed` elimina la reacción si ya tenía el mismo valor.
+#   - `upserted` la crea o la cambia de valor si no se eliminó y el contenido existe; `inserted` indica si la fila es nueva.
+#     Si otra petición concurrente ya registró el mismo valor, el conflicto no modifica la fila ni los contadores.
+#   - `delta` suma +1/-1 por cada valor agregado o quitado, y `counters` lo aplica al contenido.
+TOGGLE_REACTION_SQL = """
+WITH removed AS (
+    DELETE FROM {reaction} WHERE content_id = %(content)s AND user_id = %(user)s AND value = %(value)s
+    RETURNING value
+), upserted AS (
+    INSERT INTO {reaction} (content_id, user_id, value)
+    SELECT %(content)s, %(user)s, %(value)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed) AND EXISTS (SELECT 1 FROM {content} WHERE id = %(content)s)
+    ON CONFLICT (content_id, user_id) DO UPDATE SET value = EXCLUDED.value
+    WHERE {reaction}.value IS DISTINCT FROM EXCLUDED.value
+    RETURNING value, (xmax = 0) AS inserted
+), delta AS (
+    SELECT value, -1 AS amount FROM removed
+    UNION ALL SELECT value, 1 FROM upserted
+    UNION ALL SELECT -value, -1 FROM upserted WHERE NOT inserted
+), counters AS (
+    UPDATE {content} SET
+        likes_count = likes_count + COALESCE((SELECT SUM(amount) FROM delta WHERE value = 1), 0),
+        dislikes_count = dislikes_count + COALESCE((SELECT SUM(amount) FROM delta WHERE value = -1), 0)
+    WHERE id = %(content)s
+    RETURNING likes_count, dislikes_count
+)
+SELECT EXISTS (SELECT 1 FROM removed), likes_count, dislikes_count FROM counters
+"""
+
+
+# Flujo de estados del tablero Kanban: nombre de cada estado y estados a los que puede avanzar o retroceder
+STATE_FLOW = {
+    'draft': {
+        'name': 'Borrador',
+        'next': ['revision', 'publish'],
+        'prev': [],
+    },
+    'revision': {
+        'name': 'Edicion',
+        'next': ['to_publish'],
+        'prev': ['draft'],
+    },
+    'to_publish': {
+        'name': 'A publicar',
+        'next': ['publish'],
+        'prev': ['revision'],
+    },
+    'publish': {
+        'name': 'Publicado',
+        'next': ['inactive'],
+        'prev': [],
+    },
+    'inactive': {
+        'name': 'Inactivo',
+        'next': [],
+        'prev': ['publish'],
+    },
+}
+
+# Permisos de gestión de contenidos que intervienen en los cambios de estado, identificados por un nombre corto
+CAPABILITIES = {
+    'create': 'app.create_content',
+    'edit': 'app.edit_content',
+    'publish': 'app.publish_content',
+    'edit_is_active': 'app.edit_is_active',
+}
+
+NO_PERMISSION_MESSAGE = 'No tienes permiso para cambiar el estado.'
+VALID_PERMISSIONS_MESSAGE = 'Permisos validados correctamente.'
+
+
+def _transition_error(caps, newState, oldState, is_moderated, is_author):
+    """
+    Reglas de permisos de un cambio de estado, evaluadas sobre los permisos del usuario ya resueltos.
+
+    Solo se utiliza para compilar :data:`TRANSITION_TABLE`, salvo para estados desconocidos.
+
+    :param caps: Permisos del usuario (ver :data:`CAPABILITIES`).
+    :type caps: frozenset
+    :param newState: El nuevo estado al que se desea cambiar.
+    :type newState: str
+    :param oldState: El estado actual del contenido.
+    :type oldState: str
+    :param is_moderated: Indica si la categoría del contenido es moderada.
+    :type is_moderated: bool
+    :param is_author: Indica si el usuario es el autor del contenido.
+    :type is_author: bool
+    :return: Mensaje de error, o None si el cambio está permitido.
+    :rtype: str
+    """
+
+    create, edit, publish, edit_is_active = (name in caps for name in ('create', 'edit', 'publish', 'edit_is_active'))
+
+    # Verificar los permisos del usuario
+    if newState == 'draft' and not edit:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'revision' and not create and not publish:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'to_publish' and not edit:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'publish' and not publish and not create and not edit_is_active:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'inactive' and not edit_is_active and not create:
+        return NO_PERMISSION_MESSAGE
+
+    # Restricciones adicionales para cambios de estados subiendo el flujo de estados
+    if newState == 'publish' and oldState == 'draft' and is_moderated and create:
+        return 'No se puede publicar un contenido de categoría moderada desde el estado de Borrador.'
+    if newState == 'publish' and oldState == 'draft' and not create:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'publish' and oldState == 'to_publish' and not publish:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'revision' and oldState == 'draft' and not create:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'revision' and oldState == 'draft' and create and not is_author:
+        return 'No puedes cambiar al estado Edicion de un contenido que no creaste.'
+    if newState == 'inactive' and oldState == 'publish' and create and not edit_is_active and not is_author:
+        return 'No puedes cambiar al estado Inactivo de un contenido que no creaste.'
+    if newState == 'publish' and oldState == 'draft' and create and not is_author and not is_moderated:
+        return 'No puedes cambiar al estado Publicado de un contenido que no creaste.'
+
+    # Restricciones adicionales para cambios de estados bajando el flujo de estados
+    if newState == 'draft' and oldState == 'revision' and not edit:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'revision' and oldState == 'to_publish' and not publish:
+        return NO_PERMISSION_MESSAGE
+    if newState == 'publish' and oldState == 'inactive' and not edit_is_active and not create:
+        return NO_PERMISSION_MESSAGE
+
+    return None
+
+
+def _compile_transition_table():
+    """
+    Evalúa las reglas de :func:`_transition_error` para todas las combinaciones de estados, permisos,
+    moderación de la categoría y autoría.
+
+    :return: Diccionario `{(oldState, newState, caps, is_moderated, is_author): mensaje de error o None}`.
+    :rtype: dict
+    """
+
+    names = list(CAPABILITIES)
+    cap_sets = [frozenset(name for bit, name in enumerate(names) if mask & (1 << bit)) for mask in range(1 << len(names))]
+    return {
+        (oldState, newState, caps, is_moderated, is_author): _transition_error(caps, newState, oldState, is_moderated, is_author)
+        for oldState in STATE_FLOW
+        for newState in STATE_FLOW
+        for caps in cap_sets
+        for is_moderated in (False, True)
+        for is_author in (False, True)
+    }
+
+
+# Estados a los que puede moverse un contenido desde cada estado
+ALLOWED_MOVES = {state: frozenset(flow['next'] + flow['prev']) for state, flow in STATE_FLOW.items()}
+
+# Resultado de las reglas de permisos para cada combinación posible, compilado una única vez al importar el módulo
+TRANSITION_TABLE = _compile_transition_table()
+
+
+def user_capabilities(user):
+    """
+    Obtiene los permisos de gestión de contenidos del usuario.
+
+    Los permisos se resuelven una única vez por objeto de usuario (es decir, por solicitud)
+    y se guardan en el propio objeto.
+
+    :param user: Usuario a consultar.
+    :type user: User
+    :return: Nombres cortos de los permisos que tiene el usuario (ver :data:`CAPABILITIES`).
+    :rtype: frozenset
+    """
+
+    caps = getattr(user, '_content_capabilities', None)
+    if caps is None:
+        if user.is_active and user.is_superuser:
+            caps = frozenset(CAPABILITIES)
+        else:
+            permissions = user.get_all_permissions()
+            caps = frozenset(name for name, perm in CAPABILITIES.items() if perm in permissions)
+        user._content_capabilities = caps
+    return caps
 
 
 def validate_permission_kanban(user, content, newState, oldState):
@@ -5,6 +197,8 @@ def validate_permission_kanban(user, content, newState, oldState):
     Valida si un usuario tiene permiso para cambiar el estado de un contenido en un flujo de trabajo tipo Kanban.
 
     Esta función asegura que las transiciones de estado de un contenido sean válidas de acuerdo con las reglas del negocio.
+    Las reglas se consultan en :data:`TRANSITION_TABLE`, compilada al importar el módulo, a partir de los permisos
+    del usuario obtenidos con :func:`user_capabilities`.
 
     :param user: Usuario que intenta realizar la acción.
     :type user: User
@@ -18,9 +212,7 @@ def validate_permission_kanban(user, content, newState, oldState):
     :return: Diccionario con el estado de la validación y un mensaje descriptivo.
     :rtype: dict
 
-    :raises KeyError: Si el `newState` o el `oldState` no son válidos dentro del flujo de estados predefinido.
-
-    Flujo de Estados:
+    Flujo de Estados (ver :data:`STATE_FLOW`):
         - draft:
             - name: "Borrador"
             - next: ["revision", "publish"]
@@ -42,89 +234,337 @@ def validate_permission_kanban(user, content, newState, oldState):
             - next: []
             - prev: ["publish"]
     """
-    stateFlow = {
-        'draft': {
-            'name': 'Borrador',
-            'next': ['revision', 'publish'],
-            'prev': [],
-        },
-        'revision': {
-            'name': 'Edicion',
-            'next': ['to_publish'],
-            'prev': ['draft'],
-        },
-        'to_publish': {
-            'name': 'A publicar',
-            'next': ['publish'],
-            'prev': ['revision'],
-        },
-        'publish': {
-            'name': 'Publicado',
-            'next': ['inactive'],
-            'prev': [],
-        },
-        'inactive': {
-            'name': 'Inactivo',
-            'next': [],
-            'prev': ['publish'],
-        },
-    }
-    
+
     # Verificar si el estado es válido
-    if newState not in stateFlow[content.state]['next'] and newState not in stateFlow[content.state]['prev'] and newState != oldState:
-        # el mensaje quiero que sea que no es posible cambiar de estado de oldState a newState
-        return {'status': 'error', 'message': f'No es posible cambiar de {stateFlow[oldState]["name"]} a {stateFlow[newState]["name"]}.'}
+    if newState not in ALLOWED_MOVES.get(content.state, ()) and newState != oldState:
+        old_name = STATE_FLOW.get(oldState, {}).get('name', oldState)
+        new_name = STATE_FLOW.get(newState, {}).get('name', newState)
+        return {'status': 'error', 'message': f'No es posible cambiar de {old_name} a {new_name}.'}
 
-    # Verificar los permisos del usuario
-    if newState == 'draft' and not user.has_perm('app.edit_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+    caps = user_capabilities(user)
+    is_moderated = content.category.is_moderated
+    is_author = content.autor_id == user.id
+    key = (oldState, newState, caps, is_moderated, is_author)
+    if key in TRANSITION_TABLE:
+        message = TRANSITION_TABLE[key]
+    else:
+        # Estados fuera del flujo, no incluidos en la tabla compilada
+        message = _transition_error(caps, newState, oldState, is_moderated, is_author)
 
-    if newState == 'revision' and not user.has_perm('app.create_content') and not user.has_perm('app.publish_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+    if message:
+        return {'status': 'error', 'message': message}
+    return {'status': 'success', 'message': VALID_PERMISSIONS_MESSAGE}
 
-    if newState == 'to_publish' and not user.has_perm('app.edit_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
-    if newState == 'publish' and not user.has_perm('app.publish_content') and not user.has_perm('app.create_content') and not user.has_perm('app.edit_is_active'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
 
-    if newState == 'inactive' and not user.has_perm('app.edit_is_active') and not user.has_perm('app.create_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+def allowed_transitions(user, contents):
+    """
+    Calcula los estados a los que el usuario puede mover cada contenido del tablero Kanban.
 
-    # Restricciones adicionales para cambios de estados subiendo el flujo de estados
-    if newState == 'publish' and oldState == 'draft' and content.category.is_moderated and user.has_perm('app.create_content'):
-        return {'status': 'error', 'message': 'No se puede publicar un contenido de categoría moderada desde el estado de Borrador.'}
+    Permite que el tablero valide los movimientos sin consultar al servidor en cada arrastre.
 
-    if newState == 'publish' and oldState == 'draft' and not user.has_perm('app.create_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+    :param user: Usuario que realiza los movimientos.
+    :type user: User
+    :param contents: Contenidos a evaluar, con la categoría incluida (`select_related('category')`).
+    :type contents: iterable
+    :return: Diccionario `{id: {'allowed': [estados], 'denied': {estado: mensaje}}}`.
+    :rtype: dict
+    """
 
-    if newState == 'publish' and oldState == 'to_publish' and not user.has_perm('app.publish_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+    result = {}
+    for content in contents:
+        allowed, denied = [], {}
+        for state in STATE_FLOW:
+            if state == content.state:
+                continue
+            validation = validate_permission_kanban(user, content, state, content.state)
+            if validation['status'] == 'success':
+                allowed.append(state)
+            else:
+                denied[state] = validation['message']
+        result[content.id] = {'allowed': allowed, 'denied': denied}
+    return result
 
-    if newState == 'revision' and oldState == 'draft' and not user.has_perm('app.create_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
 
-    if newState == 'revision' and oldState == 'draft' and user.has_perm('app.create_content') and not content.autor == user:
-        return {'status': 'error', 'message': 'No puedes cambiar al estado Edicion de un contenido que no creaste.'}
+def state_change_message(title, oldState, newState):
+    """
+    Mensaje que se envía al autor cuando su contenido cambia de estado.
 
-    if newState == 'inactive' and oldState == 'publish' and user.has_perm('app.create_content') and not user.has_perm('app.edit_is_active') and not content.autor == user:
-        return {'status': 'error', 'message': 'No puedes cambiar al estado Inactivo de un contenido que no creaste.'}
+    :param title: Título del contenido.
+    :type title: str
+    :param oldState: Estado anterior del contenido.
+    :type oldState: str
+    :param newState: Estado nuevo del contenido.
+    :type newState: str
+    :return: Mensaje de la notificación.
+    :rtype: str
+    """
 
-    if newState == 'publish' and oldState == 'draft' and user.has_perm('app.create_content') and not content.autor == user and not content.category.is_moderated:
-        return {'status': 'error', 'message': 'No puedes cambiar al estado Publicado de un contenido que no creaste.'}
+    return "Tu contenido " + title + " ha cambiado de estado " + STATE_FLOW[oldState]['name'] + " a " + STATE_FLOW[newState]['name']
 
-    # Restricciones adicionales para cambios de estados bajando el flujo de estados
-    if newState == 'draft' and oldState == 'revision' and not user.has_perm('app.edit_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
 
-    if newState == 'revision' and oldState == 'to_publish' and not user.has_perm('app.publish_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+def apply_state_changes(user, changes, batch_size=500):
+    """
+    Valida y aplica varios cambios de estado del tablero Kanban en una única transacción.
+
+    Los contenidos se obtienen y bloquean con una única consulta, cada cambio se valida con
+    :func:`validate_permission_kanban` y los cambios válidos se guardan con `bulk_update_with_history`,
+    que registra el historial (con el motivo de cada cambio) en lote. Los cambios rechazados no impiden aplicar
+    el resto. Los contenidos con fecha de publicación futura quedan en 'A publicar' y su publicación se programa
+    (`content.scheduler`). Al confirmarse la transacción se encola una única tarea que notifica a los autores y
+    a los suscriptores de los contenidos publicados.
+
+    :param user: Usuario que realiza los cambios.
+    :type user: User
+    :param changes: Lista de diccionarios con `id`, `state` y opcionalmente `reason`.
+    :type changes: list
+    :param batch_size: Cantidad de filas por sentencia al guardar los contenidos y su historial.
+    :type batch_size: int
+    :return: Lista de resultados, en el mismo orden que `changes`, con `id`, `status` (`success`, `no_change`
+             o `error`) y `message`, y `scheduled_for` si se programó la publicación.
+    :rtype: list
+    """
+
+    from content import scheduler
+    from notification.tasks import notify_state_changes
+
+    now = timezone.now()
+    results = []
+    updated = []
+    scheduled = []
+    notifications = []
+
+    with transaction.atomic():
+        ids = {change.get('id') for change in changes}
+        contents = (
+            Content.objects
+            .select_for_update(of=('self',))
+            .select_related('category', 'autor')
+            .filter(id__in=[content_id for content_id in ids if isinstance(content_id, int)], is_active=True, category__is_active=True)
+        )
+        contents = {content.id: content for content in contents}
+
+        for change in changes:
+            content_id, new_state = change.get('id'), change.get('state')
+            content = contents.get(content_id)
+            if content is None:
+                results.append({'id': content_id, 'status': 'error', 'message': 'Contenido no encontrado.'})
+                continue
+            old_state = content.state
+            if old_state == new_state:
+                results.append({'id': content_id, 'status': 'no_change', 'message': 'El estado no ha cambiado, no se actualizará.'})
+                continue
+
+            validation = validate_permission_kanban(user, content, new_state, old_state)
+            if validation['status'] == 'error':
+                results.append({'id': content_id, **validation})
+                continue
+            if new_state == 'publish' and old_state == 'inactive' and content.date_expire and now >= content.date_expire:
+                results.append({'id': content_id, 'status': 'error', 'message': 'No se puede publicar un contenido expirado.'})
+                continue
 
-    if newState == 'publish' and oldState == 'inactive' and not user.has_perm('app.edit_is_active') and not user.has_perm('app.create_content'):
-        return {'status': 'error', 'message': 'No tienes permiso para cambiar el estado.'}
+            if new_state == 'publish' and old_state != 'inactive' and (content.date_published is None or content.date_published < now):
+                content.date_published = now
+            reason = change.get('reason')
+            result = {'id': content_id, 'status': 'success', 'message': 'Estado actualizado correctamente.'}
+            # Si la fecha de publicación es futura, el contenido queda en 'A publicar' hasta que se cumpla
+            if new_state == 'publish' and content.date_published > now:
+                new_state = Content.StateChoices.to_publish.value
+                reason = reason or scheduler.scheduled_publication_message(content.date_published)
+                result['state'] = new_state
+                result['message'] = scheduler.scheduled_publication_message(content.date_published)
+                result['scheduled_for'] = content.date_published.isoformat()
+                scheduled.append(content)
+            content.state = new_state
+            content._change_reason = reason or f"Cambio de estado de {STATE_FLOW[old_state]['name']} a {STATE_FLOW[new_state]['name']}"
+            updated.append(content)
+            if new_state != old_state:
+                notifications.append([content.id, old_state])
+            results.append(result)
 
-    return {'status': 'success', 'message': 'Permisos validados correctamente.'}
+        if updated:
+            bulk_update_with_history(updated, Content, ['state', 'date_published'], batch_size=batch_size, default_user=user)
+            scheduler.sync_events(updated)
+            scheduler.schedule_publication(scheduled)
+            published = [content.id for content in updated if content.state == 'publish']
+            if notifications:
+                transaction.on_commit(lambda: notify_state_changes.delay(notifications, published))
 
+    return results
+
+
+# Marca como inactivo un lote de contenidos publicados vencidos y devuelve sus filas completas.
+# Las filas bloqueadas por otra transacción se omiten para no esperar por ellas.
+EXPIRE_CONTENTS_SQL = """
+UPDATE {content} SET state = %(inactive)s
+WHERE id IN (
+    SELECT id FROM {content}
+    WHERE state = %(publish)s AND date_expire < %(now)s
+    ORDER BY date_expire
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING {columns}
+"""
+
+EXPIRED_CHANGE_REASON = 'Contenido expirado'
+
+
+def update_with_history(sql, params, change_reason, now, batch_size=500):
+    """
+    Ejecuta una sentencia `UPDATE ... RETURNING` sobre contenidos y registra su historial en lote.
+
+    La sentencia recibe los marcadores `{content}` (tabla de contenidos) y `{columns}` (columnas a devolver),
+    y debe ejecutarse dentro de una transacción para que el historial se registre junto con el cambio.
+
+    :param sql: Sentencia con los marcadores `{content}` y `{columns}`.
+    :type sql: str
+    :param params: Parámetros de la sentencia.
+    :type params: dict
+    :param change_reason: Motivo del cambio registrado en el historial.
+    :type change_reason: str
+    :param now: Fecha registrada en el historial.
+    :type now: datetime
+    :param batch_size: Cantidad de filas por sentencia al registrar el historial.
+    :type batch_size: int
+    :return: Contenidos actualizados, ordenados por ID.
+    :rtype: list
+    """
+
+    qn = connection.ops.quote_name
+    fields = Content._meta.concrete_fields
+    sql = sql.format(
+        content=qn(Content._meta.db_table),
+        columns=', '.join(qn(field.column) for field in fields),
+    )
+    field_names = [field.attname for field in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    # RETURNING no garantiza un orden
+    contents = sorted((Content.from_db(connection.alias, field_names, row) for row in rows), key=lambda content: content.id)
+    Content.history.bulk_history_create(
+        contents, update=True, default_change_reason=change_reason, default_date=now, batch_size=batch_size,
+    )
+    return contents
+
+
+def expire_published_contents(batch_size=500):
+    """
+    Marca como inactivos todos los contenidos publicados cuya fecha de expiración ya pasó.
 
+    Cada lote se actualiza con un único `UPDATE ... RETURNING`, que aprovecha el índice parcial
+    `content_publish_expire_idx`, y su historial se registra con `bulk_history_create` en la misma transacción.
+    Los contenidos publicados expiran normalmente con su evento programado (`content.scheduler`); esta función
+    expira los que no tengan uno.
 
+    :param batch_size: Cantidad máxima de contenidos por lote.
+    :type batch_size: int
+    :return: Diccionario `{autor_id: [títulos de los contenidos expirados]}`.
+    :rtype: dict
+    """
+
+    now = timezone.now()
+    params = {
+        'inactive': Content.StateChoices.inactive.value,
+        'publish': Content.StateChoices.publish.value,
+        'now': now,
+        'limit': batch_size,
+    }
+
+    expired = {}
+    while True:
+        with transaction.atomic():
+            contents = update_with_history(EXPIRE_CONTENTS_SQL, params, EXPIRED_CHANGE_REASON, now, batch_size)
+        # Se notifican en orden de vencimiento
+        contents.sort(key=lambda content: (content.date_expire, content.id))
+        for content in contents:
+            expired.setdefault(content.autor_id, []).append(content.title)
+        if len(contents) < batch_size:
+            return expired
+
+
+def toggle_reaction(content_id, user, reaction):
+    """
+    Alterna la reacción ('me gusta' o 'no me gusta') de un usuario sobre un contenido.
+
+    Si el usuario ya tenía la reacción indicada se elimina; si tenía la contraria se reemplaza, y si no tenía
+    ninguna se crea. La reacción y los contadores `likes_count` y `dislikes_count` se actualizan con una única
+    sentencia (`DELETE` / `INSERT ... ON CONFLICT DO UPDATE` y `UPDATE` encadenados), en un solo viaje a la base de datos.
+
+    :param content_id: ID del contenido.
+    :type content_id: int
+    :param user: Usuario que reacciona.
+    :type user: CustomUser
+    :param reaction: Reacción a alternar, `'like'` o `'dislike'`.
+    :type reaction: str
+    :return: Tupla con el resultado (`'created'` o `'deleted'`) y los contadores actualizados del contenido,
+             o None si el contenido no existe.
+    :rtype: tuple
+    :raises ValueError: Si la reacción no es válida.
+    """
+
+    if reaction not in REACTION_VALUES:
+        raise ValueError(f"Reacción '{reaction}' no válida.")
+
+    qn = connection.ops.quote_name
+    sql = TOGGLE_REACTION_SQL.format(reaction=qn(Reaction._meta.db_table), content=qn(Content._meta.db_table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'content': content_id, 'user': user.id, 'value': int(REACTION_VALUES[reaction])})
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    removed, likes_count, dislikes_count = row
+    return ('deleted' if removed else 'created'), {'likes_count': likes_count, 'dislikes_count': dislikes_count}
+
+
+def get_user_reactions(user, content_ids):
+    """
+    Obtiene las reacciones de un usuario sobre varios contenidos con una única consulta.
+
+    :param user: Usuario cuyas reacciones se consultan.
+    :type user: CustomUser
+    :param content_ids: IDs de los contenidos.
+    :type content_ids: iterable
+    :return: Diccionario `{content_id: 'like' | 'dislike'}`, sin los contenidos a los que el usuario no reaccionó.
+    :rtype: dict
+    """
+
+    if not user.is_authenticated:
+        return {}
+    names = {value: name for name, value in REACTION_VALUES.items()}
+    rows = Reaction.objects.filter(user=user, content_id__in=list(content_ids)).values_list('content_id', 'value')
+    return {content_id: names[value] for content_id, value in rows}
+
+
+def reconcile_reaction_counters(dry_run=False):
+    """
+    Recalcula `likes_count` y `dislikes_count` de todos los contenidos a partir de las reacciones registradas.
+
+    Utiliza una única sentencia con los totales agrupados por contenido y solo modifica las filas cuyos contadores
+    difieren, por lo que sirve para reparar desvíos de los contadores incrementales.
+
+    :param dry_run: Si es True solo cuenta los contenidos con desvíos, sin modificarlos.
+    :type dry_run: bool
+    :return: Cantidad de contenidos con contadores desviados.
+    :rtype: int
+    """
 
+    qn = connection.ops.quote_name
+    table = qn(Content._meta.db_table)
+    totals = (
+        f'SELECT c.id, COALESCE(r.likes, 0) AS likes, COALESCE(r.dislikes, 0) AS dislikes FROM {table} c '
+        f'LEFT JOIN (SELECT content_id, COUNT(*) FILTER (WHERE value = 1) AS likes, '
+        f'COUNT(*) FILTER (WHERE value = -1) AS dislikes FROM {qn(Reaction._meta.db_table)} GROUP BY content_id) r '
+        f'ON r.content_id = c.id'
+    )
+    drift = f'{table}.likes_count <> s.likes OR {table}.dislikes_count <> s.dislikes'
 
+    with connection.cursor() as cursor:
+        if dry_run:
+            cursor.execute(f'SELECT COUNT(*) FROM {table} JOIN ({totals}) s ON s.id = {table}.id WHERE {drift}')
+            return cursor.fetchone()[0]
+        cursor.execute(
+            f'UPDATE {table} SET likes_count = s.likes, dislikes_count = s.dislikes '
+            f'FROM ({totals}) s WHERE s.id = {table}.id AND ({drift})'
+        )
+        return cursor.rowcount
@@ -0,0 +1,115 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from app import coalescing
+from content import counters
+from content.models import Content, Reaction
+from content.search import update_search_vector
+from content.tasks import update_reactions, update_rating_avg
+from rating.models import Rating
+
+
+@receiver(post_save, sender=Content)
+def update_content_search_vector(sender, instance, raw=False, **kwargs):
+    """
+    Recalcula el vector de búsqueda de un contenido luego de guardarlo.
+
+    El vector se actualiza con un UPDATE directo para no volver a disparar `post_save`
+    ni generar un registro adicional en el historial.
+
+    :param sender: La clase del modelo que envía la señal (`Content`).
+    :type sender: class
+    :param instance: El contenido guardado.
+    :type instance: Content
+    :param raw: Indica si la instancia se cargó desde un fixture.
+    :type raw: bool
+    :param kwargs: Argumentos con nombre adicionales.
+    :type kwargs: dict
+    """
+
+    if raw:
+        return
+    update_search_vector(Content.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Content.tags.through)
+def update_content_tags_search_vector(sender, instance, action, **kwargs):
+    """
+    Recalcula el vector de búsqueda de un contenido cuando cambian sus etiquetas.
+
+    :param sender: El modelo intermedio de las etiquetas.
+    :type sender: class
+    :param instance: El objeto cuyas etiquetas fueron modificadas.
+    :type instance: Model
+    :param action: Acción realizada sobre la relación (`post_add`, `post_remove`, `post_clear`, etc.).
+    :type action: str
+    :param kwargs: Argumentos con nombre adicionales.
+    :type kwargs: dict
+    """
+
+    if action not in ('post_add', 'post_remove', 'post_clear') or not isinstance(instance, Content):
+        return
+    update_search_vector(Content.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Reaction)
+@receiver(post_delete, sender=Reaction)
+def recount_content_reactions(sender, instance, raw=False, **kwargs):
+    """
+    Encola el recálculo de los contadores de reacciones cuando una reacción se modifica fuera de
+    `content.service.toggle_reaction` (administración, borrado en cascada de usuarios, etc.).
+
+    Los encolados para un mismo contenido se agrupan en una única tarea.
+
+    :param sender: La clase del modelo que envía la señal (`Reaction`).
+    :type sender: class
+    :param instance: La reacción guardada o eliminada.
+    :type instance: Reaction
+    :param raw: Indica si la instancia se cargó desde un fixture.
+    :type raw: bool
+    :param kwargs: Argumentos con nombre adicionales.
+    :type kwargs: dict
+    """
+
+    if raw:
+        return
+    coalescing.enqueue(update_reactions, instance.content_id)
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def recount_content_ratings(sender, instance, raw=False, **kwargs):
+    """
+    Encola el recálculo de los acumulados de calificación cuando una calificación se modifica fuera de
+    `rating.service.rate_content` (administración, borrado en cascada de usuarios, etc.).
+
+    Los encolados para un mismo contenido se agrupan en una única tarea.
+
+    :param sender: La clase del modelo que envía la señal (`Rating`).
+    :type sender: class
+    :param instance: La calificación guardada o eliminada.
+    :type instance: Rating
+    :param raw: Indica si la instancia se cargó desde un fixture.
+    :type raw: bool
+    :param kwargs: Argumentos con nombre adicionales.
+    :type kwargs: dict
+    """
+
+    if raw:
+        return
+    coalescing.enqueue(update_rating_avg, instance.content_id)
+
+
+@receiver(request_finished)
+def flush_content_counters(sender, **kwargs):
+    """
+    Vuelca al finalizar una petición los contadores acumulados en memoria del proceso, si corresponde.
+
+    :param sender: La clase del manejador que atendió la petición.
+    :type sender: class
+    :param kwargs: Argumentos con nombre adicionales.
+    :type kwargs: dict
+    """
+
+    counters.flush_if_due()
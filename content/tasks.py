@@ -1,55 +1,101 @@
 from celery import shared_task
-from django.db.models import Avg
-from django.utils import timezone
-from content.models import Content
-from notification.service import expire_content
+from django.conf import settings
+from django.db.models import Count, Q
+from content.models import Content, Reaction
+from notification.service import expired_contents
 from django.db.models import F
+from content import counters
+from rating.service import recompute_rating_aggregates
+from app.coalescing import coalesced
+from app.locks import cache_lock
+from app.models import CustomUser
+from content import service, scheduler
 
 @shared_task()
 def expire_contents():
     """
-    Tarea programada de Celery para expirar contenidos cuya fecha de expiración ha pasado.
+    Tarea programada de Celery para expirar contenidos cuya fecha de expiración ha pasado y no tienen un evento
+    de expiración programado (ver `dispatch_scheduled_events`).
 
+    Los contenidos se actualizan en lote y se envía una única notificación por autor. Un bloqueo en caché
+    evita que dos ejecuciones se superpongan si una de ellas tarda más que el intervalo de la tarea.
+
+    :return: Cantidad de contenidos expirados, o None si otra ejecución estaba en curso.
+    :rtype: int
     """
 
-    contents = Content.objects.filter(
-        state=Content.StateChoices.publish,
-        date_expire__lt=timezone.now()
-    )
-    for content in contents:
-        content.state = Content.StateChoices.inactive
-        content.save()
-        autor = content.autor
-        expire_content(autor,content)
+    with cache_lock('expire_contents', timeout=settings.EXPIRE_CONTENTS_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return None
+
+        expired = service.expire_published_contents()
+        for autor in CustomUser.objects.filter(id__in=expired).only('id', 'email'):
+            expired_contents(autor, expired[autor.id])
+        return sum(len(titles) for titles in expired.values())
+
+
+@shared_task()
+def dispatch_scheduled_events():
+    """
+    Tarea programada de Celery que ejecuta los eventos de publicación y expiración vencidos.
+
+    Los eventos se ejecutan normalmente en su fecha exacta con el proceso `./manage.py run_scheduler`;
+    esta tarea es un respaldo por si dicho proceso no está en ejecución.
+
+    :return: Cantidad de contenidos publicados o expirados.
+    :rtype: int
+    """
+
+    return scheduler.dispatch_due_events()
 
 
 @shared_task()
+@coalesced
 def update_rating_avg(content_id):
     """
-    Tarea programada de Celery para actualizar el promedio de calificaciones de un contenido.
+    Tarea programada de Celery para recalcular los acumulados y el promedio de calificaciones de un contenido.
+
+    Se encola con `app.coalescing.enqueue`, por lo que una ráfaga de cambios sobre el mismo contenido
+    se resuelve con una única ejecución.
 
     :param content_id: ID del contenido cuyo promedio de calificaciones se actualizará.
     :type content_id: int
     """
 
-    content = Content.objects.get(id=content_id)
-    avg_rating = content.rating_set.aggregate(Avg('rating'))['rating__avg']
-    content.rating_avg = avg_rating or 0.0
-    content.save_without_historical_record()
+    recompute_rating_aggregates([content_id])
 
 @shared_task()
+@coalesced
 def update_reactions(content_id):
     """
     Tarea programada de Celery para actualizar la cantidad de likes y dislikes de un contenido.
 
+    Se encola con `app.coalescing.enqueue`, por lo que una ráfaga de cambios sobre el mismo contenido
+    se resuelve con una única ejecución.
+
     :param content_id: ID del contenido cuyas reacciones se actualizarán.
     :type content_id: int
     """
 
-    content = Content.objects.get(id=content_id)
-    content.likes_count = content.likes.count() or 0
-    content.dislikes_count = content.dislikes.count() or 0
-    content.save_without_historical_record()
+    totals = Reaction.objects.filter(content_id=content_id).aggregate(
+        likes=Count('id', filter=Q(value=Reaction.ValueChoices.like)),
+        dislikes=Count('id', filter=Q(value=Reaction.ValueChoices.dislike)),
+    )
+    Content.objects.filter(id=content_id).update(likes_count=totals['likes'], dislikes_count=totals['dislikes'])
+
+@shared_task()
+def flush_content_counters():
+    """
+    Tarea programada de Celery para volcar en lote los contadores de visualizaciones y compartidos acumulados.
+
+    Vuelca los incrementos registrados en Redis. Sin Redis, cada proceso web vuelca su propio buffer en memoria
+    al finalizar las peticiones, y esta tarea solo alcanza el buffer del worker.
+
+    :return: Cantidad de contenidos actualizados.
+    :rtype: int
+    """
+
+    return counters.flush()
 
 @shared_task()
 def count_view(content_id):
@@ -1,17 +1,37 @@
 import json
+import threading
+import time
+from io import StringIO
+from unittest import skipIf
+from unittest.mock import patch
+
+try:
+    import fakeredis
+except ImportError:  # Dependencia de desarrollo (requirements-dev.txt)
+    fakeredis = None
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
-from django.test import TestCase
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import Permission
 from django.contrib.auth import get_user_model
+from app import coalescing
+from app.locks import cache_lock
 from app.models import CustomUser
 from app.signals import cache_previous_user, post_save_user_handler
 from category.models import Category
 from category.signals import cache_previous_category, post_save_category_handler, cache_category_before_delete, handle_category_after_delete
+from content import counters, kanban, scheduler, service
 from content.forms import ContentForm, ReportForm
-from content.models import Content, Report
-from unittest.mock import patch
+from content.models import Content, CounterFlush, Reaction, Report, ScheduledEvent
+from content.tasks import expire_contents, update_reactions
+from notification.models import OutboxNotification
 
 class ContentCreateViewTest(TestCase):
     """
@@ -565,6 +585,11 @@ class ReactionTestCase(TestCase):
         - :meth:`test_remove_dislike`: Verifica que un usuario pueda quitar un dislike de un contenido.
         - :meth:`test_like_then_dislike`: Verifica que al dar like se elimine un dislike previamente registrado.
         - :meth:`test_dislike_then_like`: Verifica que al dar dislike se elimine un like previamente registrado.
+        - :meth:`test_reconcile_counters`: Verifica que la reconciliación corrija contadores desviados.
+        - :meth:`test_toggle_is_single_query`: Verifica que alternar una reacción use una única consulta.
+        - :meth:`test_react_to_missing_content`: Verifica que no se registren reacciones a contenidos inexistentes.
+        - :meth:`test_user_reactions_api`: Verifica la consulta en lote de las reacciones del usuario.
+        - :meth:`test_recount_is_coalesced`: Verifica que los recálculos encolados por cambios fuera del servicio se agrupen.
     """
 
     def setUp(self):
@@ -628,8 +653,7 @@ class ReactionTestCase(TestCase):
         post_delete.connect(handle_category_after_delete, sender=Category)
         super().tearDown()
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_like_content(self, mock_update_reactions):
+    def test_like_content(self):
         """
         Verifica que un usuario pueda dar like a un contenido y se registre correctamente.
 
@@ -637,20 +661,21 @@ class ReactionTestCase(TestCase):
             - Hace una petición GET a la vista de like para un contenido específico.
             - Verifica que la petición sea exitosa (status code 200).
             - Verifica que el usuario haya dado like al contenido.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         url = reverse('like_content', args=[self.content.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el usuario ha dado like al contenido
-        self.assertTrue(self.content.likes.filter(id=self.user.id).exists())
+        self.assertTrue(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.like).exists())
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 1)
+        self.assertEqual(self.content.dislikes_count, 0)
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_dislike_content(self, mock_update_reactions):
+    def test_dislike_content(self):
         """
         Verifica que un usuario pueda dar dislike a un contenido y se registre correctamente.
 
@@ -658,20 +683,21 @@ class ReactionTestCase(TestCase):
             - Hace una petición GET a la vista de dislike para un contenido específico.
             - Verifica que la petición sea exitosa (status code 200).
             - Verifica que el usuario haya dado dislike al contenido.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         url = reverse('dislike_content', args=[self.content.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el usuario ha dado dislike al contenido
-        self.assertTrue(self.content.dislikes.filter(id=self.user.id).exists())
+        self.assertTrue(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike).exists())
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 0)
+        self.assertEqual(self.content.dislikes_count, 1)
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_remove_like(self, mock_update_reactions):
+    def test_remove_like(self):
         """
         Verifica que un usuario pueda quitar un like de un contenido.
 
@@ -680,10 +706,11 @@ class ReactionTestCase(TestCase):
             - Hace una petición GET a la vista de like nuevamente para quitar el like.
             - Verifica que la petición sea exitosa (status code 200).
             - Verifica que el like haya sido eliminado.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         # Primero, dar like al contenido
-        self.content.likes.add(self.user)
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.like)
+        Content.objects.filter(id=self.content.id).update(likes_count=1)
 
         # Ahora, quitar el like
         url = reverse('like_content', args=[self.content.id])
@@ -691,13 +718,14 @@ class ReactionTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el like ha sido eliminado
-        self.assertFalse(self.content.likes.filter(id=self.user.id).exists())
+        self.assertFalse(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.like).exists())
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 0)
+        self.assertEqual(self.content.dislikes_count, 0)
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_remove_dislike(self, mock_update_reactions):
+    def test_remove_dislike(self):
         """
         Verifica que un usuario pueda quitar un dislike de un contenido.
 
@@ -706,10 +734,11 @@ class ReactionTestCase(TestCase):
             - Hace una petición GET a la vista de dislike nuevamente para quitar el dislike.
             - Verifica que la petición sea exitosa (status code 200).
             - Verifica que el dislike haya sido eliminado.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         # Primero, dar dislike al contenido
-        self.content.dislikes.add(self.user)
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike)
+        Content.objects.filter(id=self.content.id).update(dislikes_count=1)
 
         # Ahora, quitar el dislike
         url = reverse('dislike_content', args=[self.content.id])
@@ -717,13 +746,14 @@ class ReactionTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el dislike ha sido eliminado
-        self.assertFalse(self.content.dislikes.filter(id=self.user.id).exists())
+        self.assertFalse(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike).exists())
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 0)
+        self.assertEqual(self.content.dislikes_count, 0)
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_like_then_dislike(self, mock_update_reactions):
+    def test_like_then_dislike(self):
         """
         Verifica que al dar like a un contenido se elimine un dislike previamente registrado.
 
@@ -731,10 +761,11 @@ class ReactionTestCase(TestCase):
             - Añade un dislike al contenido.
             - Hace una petición GET a la vista de like para cambiar el dislike por un like.
             - Verifica que el dislike haya sido eliminado y que se haya registrado el like.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         # Primero, dar dislike al contenido
-        self.content.dislikes.add(self.user)
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike)
+        Content.objects.filter(id=self.content.id).update(dislikes_count=1)
 
         # Ahora, dar like al contenido
         url = reverse('like_content', args=[self.content.id])
@@ -742,14 +773,15 @@ class ReactionTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el dislike ha sido eliminado y el contenido tiene like
-        self.assertFalse(self.content.dislikes.filter(id=self.user.id).exists())
-        self.assertTrue(self.content.likes.filter(id=self.user.id).exists())
+        self.assertFalse(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike).exists())
+        self.assertTrue(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.like).exists())
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 1)
+        self.assertEqual(self.content.dislikes_count, 0)
 
-    @patch('content.views.update_reactions.delay')  # Mock the Celery task
-    def test_dislike_then_like(self, mock_update_reactions):
+    def test_dislike_then_like(self):
         """
         Verifica que al dar dislike a un contenido se elimine un like previamente registrado.
 
@@ -757,10 +789,11 @@ class ReactionTestCase(TestCase):
             - Añade un like al contenido.
             - Hace una petición GET a la vista de dislike para cambiar el like por un dislike.
             - Verifica que el like haya sido eliminado y que se haya registrado el dislike.
-            - Asegura que la tarea Celery `update_reactions` haya sido llamada una vez.
+            - Verifica que los contadores de reacciones se hayan actualizado de forma incremental.
         """
         # Primero, dar like al contenido
-        self.content.likes.add(self.user)
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.like)
+        Content.objects.filter(id=self.content.id).update(likes_count=1)
 
         # Ahora, dar dislike al contenido
         url = reverse('dislike_content', args=[self.content.id])
@@ -768,11 +801,172 @@ class ReactionTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verificar que el like ha sido eliminado y el contenido tiene dislike
-        self.assertFalse(self.content.likes.filter(id=self.user.id).exists())
-        self.assertTrue(self.content.dislikes.filter(id=self.user.id).exists())
+        self.assertFalse(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.like).exists())
+        self.assertTrue(Reaction.objects.filter(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike).exists())
+
+        # Verificar que los contadores se actualizaron sin recontar las reacciones
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 0)
+        self.assertEqual(self.content.dislikes_count, 1)
+
+    def test_reconcile_counters(self):
+        """
+        Verifica que el comando `reconcile_counters` recalcule los contadores desviados.
+
+        Lógica:
+            - Registra un like y desvía manualmente los contadores del contenido.
+            - Ejecuta el comando en modo de prueba y verifica que no modifique los contadores.
+            - Ejecuta el comando y verifica que los contadores coincidan con las reacciones registradas.
+        """
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.like)
+        Content.objects.filter(id=self.content.id).update(likes_count=7, dislikes_count=3)
+
+        call_command('reconcile_counters', '--dry-run', stdout=StringIO())
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 7)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.likes_count, 1)
+        self.assertEqual(self.content.dislikes_count, 0)
+
+    def test_toggle_is_single_query(self):
+        """
+        Verifica que alternar una reacción se resuelva con una única consulta y devuelva los contadores actualizados.
+        """
+        with self.assertNumQueries(1):
+            result, counts = service.toggle_reaction(self.content.id, self.user, 'like')
+        self.assertEqual(result, 'created')
+        self.assertEqual(counts, {'likes_count': 1, 'dislikes_count': 0})
+
+        with self.assertNumQueries(1):
+            result, counts = service.toggle_reaction(self.content.id, self.user, 'dislike')
+        self.assertEqual(result, 'created')
+        self.assertEqual(counts, {'likes_count': 0, 'dislikes_count': 1})
+        self.assertEqual(Reaction.objects.filter(content=self.content).count(), 1)
+
+    def test_react_to_missing_content(self):
+        """
+        Verifica que reaccionar a un contenido inexistente devuelva 404 sin registrar la reacción.
+        """
+        response = self.client.get(reverse('like_content', args=[self.content.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_user_reactions_api(self):
+        """
+        Verifica que la API devuelva las reacciones del usuario para varios contenidos a la vez.
+        """
+        other = Content.objects.create(
+            title='Otro', summary='Resumen', category=self.category, autor=self.user, content='Texto',
+        )
+        untouched = Content.objects.create(
+            title='Sin reacción', summary='Resumen', category=self.category, autor=self.user, content='Texto',
+        )
+        Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.like)
+        Reaction.objects.create(user=self.user, content=other, value=Reaction.ValueChoices.dislike)
+
+        ids = f'{self.content.id},{other.id},{untouched.id}'
+        response = self.client.get(reverse('user_reactions_api'), {'ids': ids})
+        self.assertEqual(response.json()['reactions'], {str(self.content.id): 'like', str(other.id): 'dislike'})
+
+        self.client.logout()
+        response = self.client.get(reverse('user_reactions_api'), {'ids': ids})
+        self.assertEqual(response.json()['reactions'], {})
+
+    def test_recount_is_coalesced(self):
+        """
+        Verifica que las reacciones creadas o eliminadas fuera de `toggle_reaction` (por ejemplo, al eliminar usuarios)
+        encolen un único recálculo por contenido, y que ese recálculo refleje todos los cambios.
+        """
+        cache.clear()
+        users = [
+            get_user_model().objects.create_user(email=f'fan{i}@example.com', name=f'Fan {i}', password='testpassword123')
+            for i in range(3)
+        ]
+        with patch('content.tasks.update_reactions.apply_async') as mock_apply, patch.object(coalescing, '_shared_cache', return_value=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                for user in users:
+                    Reaction.objects.create(user=user, content=self.content, value=Reaction.ValueChoices.like)
+                Reaction.objects.create(user=self.user, content=self.content, value=Reaction.ValueChoices.dislike)
+                get_user_model().objects.filter(id__in=[user.id for user in users[:2]]).delete()
+
+        mock_apply.assert_called_once_with(args=[self.content.id], countdown=settings.TASK_COALESCING_COUNTDOWN)
+        update_reactions(*mock_apply.call_args.kwargs['args'])
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.likes_count, self.content.dislikes_count), (1, 1))
+        self.assertEqual(coalescing.get_metrics('content.tasks.update_reactions')['collapsed'], 5)
+
+
+class ReactionRaceTest(TransactionTestCase):
+    """
+    Pruebas de `toggle_reaction` con dos peticiones concurrentes del mismo usuario, cada una con su propia conexión.
+    """
+
+    def setUp(self):
+        """
+        Crea un usuario, una categoría y un contenido sin reacciones.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+
+        self.user = get_user_model().objects.create_user(email='testuser@example.com', name='Test User', password='testpassword123')
+        self.category = Category.objects.create(name='Test Category')
+        self.content = Content.objects.create(
+            title='Test Content', summary='Resumen', category=self.category, autor=self.user, content='Texto',
+        )
+
+    def tearDown(self):
+        """
+        Reconecta las señales desconectadas en `setUp`.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        super().tearDown()
+
+    def _wait_for_lock(self):
+        with connection.cursor() as cursor:
+            for _ in range(100):
+                # Las estadísticas se guardan por transacción: se descartan para ver el estado actual
+                cursor.execute('SELECT pg_stat_clear_snapshot()')
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database())")
+                if cursor.fetchone()[0]:
+                    return
+                time.sleep(0.05)
+        self.fail('La segunda reacción no llegó a esperar el bloqueo de la primera.')
+
+    def test_concurrent_same_reaction_does_not_switch_counters(self):
+        """
+        Verifica que dos likes simultáneos sin reacción previa no se traten como un cambio de dislike a like.
+
+        La segunda sentencia no ve la fila de la primera al eliminar, y su INSERT entra en conflicto con el mismo valor:
+        no debe sumar otro like ni restar un dislike.
+        """
+        results = []
+
+        def concurrent_like():
+            try:
+                results.append(service.toggle_reaction(self.content.id, self.user, 'like'))
+            finally:
+                connections.close_all()
 
-        # Verificar que la tarea Celery fue llamada una vez
-        mock_update_reactions.assert_called_once_with(self.content.id)
+        with transaction.atomic():
+            service.toggle_reaction(self.content.id, self.user, 'like')
+            thread = threading.Thread(target=concurrent_like)
+            thread.start()
+            self._wait_for_lock()
+        thread.join()
+
+        self.assertEqual(results, [('created', {'likes_count': 1, 'dislikes_count': 0})])
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.likes_count, self.content.dislikes_count), (1, 0))
+        self.assertEqual(Reaction.objects.filter(content=self.content).count(), 1)
 
 
 class KanbanBoardTest(TestCase):
@@ -815,8 +1009,15 @@ class KanbanBoardTest(TestCase):
         - :meth:`test_user_with_edit_content_permission`: Verifica que un usuario con permiso de edición pueda acceder al tablero.
         - :meth:`test_user_with_publish_content_permission`: Verifica que un usuario con permiso de publicación pueda acceder al tablero.
         - :meth:`test_user_with_edit_is_active_permission`: Verifica que un usuario con permiso para editar el estado activo pueda acceder al tablero.
+        - :meth:`test_board_loads_columns_in_single_query`: Verifica que el tablero cargue una página por columna sin consultas por tarjeta.
+        - :meth:`test_kanban_column_api`: Verifica la carga de las páginas siguientes de una columna.
+        - :meth:`test_board_filters`: Verifica la búsqueda y los filtros por autor y categoría en el servidor.
+        - :meth:`test_kanban_transitions_api`: Verifica la consulta en lote de los movimientos permitidos de cada contenido.
+        - :meth:`test_user_capabilities_are_resolved_once`: Verifica que los permisos se resuelvan una única vez por usuario.
+        - :meth:`test_bulk_update_content_state`: Verifica la aplicación en lote de cambios de estado con resultados por contenido.
         - :meth:`test_invalid_http_method`: Verifica que la API `update_content_state` no permita el método GET.
         - :meth:`test_creator_move_draft_to_revision`: Verifica que un creador pueda mover su contenido de borrador a revisión.
+        - :meth:`test_state_change_rollback_discards_notifications`: Verifica que un cambio de estado revertido no deje correos ni notificaciones.
         - :meth:`test_creator_move_draft_to_publish_unmoderated`: Verifica que un creador pueda publicar contenido en una categoría no moderada.
         - :meth:`test_creator_move_publish_to_inactive`: Verifica que un creador pueda mover su propio contenido de publicado a inactivo.
         - :meth:`test_creator_cannot_move_other_user_content`: Verifica que un creador no pueda cambiar el estado de un contenido que no le pertenece.
@@ -1037,6 +1238,158 @@ class KanbanBoardTest(TestCase):
                       "El contenido en estado 'Publicado' no aparece en el tablero.")
 
 
+    def _create_drafts(self, count, **kwargs):
+        return [
+            Content.objects.create(
+                title=f'Borrador {i}', summary='Resumen', category=self.category_unmoderated,
+                autor=self.user_creator, state='draft', content='Texto', **kwargs,
+            )
+            for i in range(count)
+        ]
+
+    def test_board_loads_columns_in_single_query(self):
+        """
+        Verifica que el tablero cargue una página por columna con una única consulta, incluyendo autor y categoría,
+        y que la cantidad de consultas no dependa de la cantidad de tarjetas.
+        """
+        self.client.login(email='editor@example.com', password='password123')
+        self.client.get(reverse('kanban_board'))
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('kanban_board'))
+        self._create_drafts(kanban.KANBAN_PAGE_SIZE + 5)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('kanban_board'))
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(sum('ROW_NUMBER()' in query['sql'] for query in many.captured_queries), 1)
+
+        drafts = response.context['contents']['Borrador']
+        self.assertEqual(len(drafts), kanban.KANBAN_PAGE_SIZE)
+        self.assertEqual(drafts.total, kanban.KANBAN_PAGE_SIZE + 7)
+        self.assertIsNotNone(drafts.next_cursor)
+        self.assertEqual(response.context['contents']['Inactivo'].total, 2)
+        self.assertIsNone(response.context['contents']['Inactivo'].next_cursor)
+
+    def test_kanban_column_api(self):
+        """
+        Verifica que la API de columnas devuelva las tarjetas restantes a partir del cursor del tablero,
+        y que rechace estados o cursores inválidos.
+        """
+        self._create_drafts(kanban.KANBAN_PAGE_SIZE + 5)
+        self.client.login(email='editor@example.com', password='password123')
+        drafts = self.client.get(reverse('kanban_board')).context['contents']['Borrador']
+
+        response = self.client.get(reverse('kanban_column_api', args=['draft']), {'cursor': drafts.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(len(data['ids']), 7)
+        self.assertFalse(set(data['ids']) & {content.id for content in drafts})
+        self.assertIn('kanban-item', data['html'])
+
+        self.assertEqual(self.client.get(reverse('kanban_column_api', args=['unknown'])).status_code, 400)
+        self.assertEqual(self.client.get(reverse('kanban_column_api', args=['draft']), {'cursor': 'x'}).status_code, 400)
+
+    def test_board_filters(self):
+        """
+        Verifica que la búsqueda por título o autor y los filtros por autor y categoría se apliquen en el servidor,
+        y que un autor solo vea sus propios contenidos.
+        """
+        self.client.login(email='editor@example.com', password='password123')
+
+        response = self.client.get(reverse('kanban_board'), {'q': 'other user'})
+        self.assertEqual(list(response.context['contents']['Borrador']), [self.content_other])
+
+        response = self.client.get(reverse('kanban_board'), {'q': 'creator'})
+        self.assertEqual(list(response.context['contents']['Borrador']), [self.content_draft])
+
+        response = self.client.get(reverse('kanban_board'), {'autor': self.user.id})
+        self.assertEqual(response.context['contents']['Inactivo'].total, 0)
+
+        response = self.client.get(reverse('kanban_board'), {'category': self.category_moderated.id})
+        self.assertEqual(sum(column.total for column in response.context['contents'].values()), 0)
+
+        self.client.login(email='creator@example.com', password='password123')
+        response = self.client.get(reverse('kanban_board'))
+        self.assertEqual(list(response.context['contents']['Borrador']), [self.content_draft])
+
+    def test_kanban_transitions_api(self):
+        """
+        Verifica que la API devuelva los estados permitidos y los mensajes de rechazo de cada contenido en una única respuesta,
+        coincidiendo con la validación individual, y que omita los contenidos que el usuario no ve.
+        """
+        self.client.login(email='creator@example.com', password='password123')
+        ids = f'{self.content_draft.id},{self.content_inactive.id},{self.content_other.id}'
+        response = self.client.get(reverse('kanban_transitions_api'), {'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        transitions = response.json()['transitions']
+
+        self.assertNotIn(str(self.content_other.id), transitions)
+        self.assertEqual(transitions[str(self.content_draft.id)]['allowed'], ['revision', 'publish'])
+        self.assertEqual(transitions[str(self.content_draft.id)]['denied']['to_publish'], 'No es posible cambiar de Borrador a A publicar.')
+        self.assertEqual(transitions[str(self.content_inactive.id)]['allowed'], ['publish'])
+
+        board = self.client.get(reverse('kanban_board'))
+        self.assertEqual(board.context['transitions'][self.content_draft.id]['allowed'], ['revision', 'publish'])
+
+        self.assertEqual(self.client.get(reverse('kanban_transitions_api'), {'ids': 'x'}).status_code, 400)
+
+    def test_user_capabilities_are_resolved_once(self):
+        """
+        Verifica que los permisos del usuario se resuelvan con una única consulta y se reutilicen en las validaciones siguientes.
+        """
+        user = CustomUser.objects.get(id=self.user_editor.id)
+        content = Content.objects.select_related('category').get(id=self.content_draft.id)
+        with CaptureQueriesContext(connection) as queries:
+            for state in service.STATE_FLOW:
+                service.validate_permission_kanban(user, content, state, content.state)
+        self.assertEqual(service.user_capabilities(user), frozenset({'edit'}))
+        self.assertLessEqual(len(queries.captured_queries), 2)
+
+    def test_bulk_update_content_state(self):
+        """
+        Verifica que la API en lote aplique los cambios válidos en una transacción, registre el historial con el motivo
+        de cada cambio, informe el resultado de cada uno y encole una única tarea de notificación.
+        """
+        self.client.login(email='creator@example.com', password='password123')
+        changes = [
+            {'id': self.content_draft.id, 'state': 'revision', 'reason': 'Listo para revisar'},
+            {'id': self.content_inactive.id, 'state': 'publish'},
+            {'id': self.expired_content.id, 'state': 'publish'},
+            {'id': self.content_other.id, 'state': 'revision'},
+            {'id': self.content_draft.id + 1000, 'state': 'revision'},
+        ]
+        with patch('notification.tasks.notify_state_changes.delay') as mock_notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('bulk_update_content_state'), json.dumps({'changes': changes}),
+                                            content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['success', 'success', 'error', 'error', 'error'])
+        self.assertEqual(results[2]['message'], 'No se puede publicar un contenido expirado.')
+        self.assertEqual(results[3]['message'], 'No puedes cambiar al estado Edicion de un contenido que no creaste.')
+        self.assertEqual(results[4]['message'], 'Contenido no encontrado.')
+
+        self.content_draft.refresh_from_db()
+        self.content_inactive.refresh_from_db()
+        self.assertEqual(self.content_draft.state, 'revision')
+        self.assertEqual(self.content_inactive.state, 'publish')
+        self.assertEqual(Content.objects.get(id=self.expired_content.id).state, 'inactive')
+
+        history = self.content_draft.history.first()
+        self.assertEqual(history.history_change_reason, 'Listo para revisar')
+        self.assertEqual(history.history_user, self.user_creator)
+        self.assertEqual(self.content_inactive.history.first().history_change_reason, 'Cambio de estado de Inactivo a Publicado')
+
+        mock_notify.assert_called_once_with(
+            [[self.content_draft.id, 'draft'], [self.content_inactive.id, 'inactive']], [self.content_inactive.id]
+        )
+
+        response = self.client.post(reverse('bulk_update_content_state'), json.dumps({'changes': 'x'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
     # Pruebas para la API update_content_state
     def test_invalid_http_method(self):
         """
@@ -1087,6 +1440,42 @@ class KanbanBoardTest(TestCase):
         self.assertEqual(self.content_draft.state, 'revision',
                          "El creador debería poder mover su contenido de borrador a revisión.")
 
+    def test_state_change_rollback_discards_notifications(self):
+        """
+        Verifica que el correo del cambio de estado se registre en la misma transacción que el cambio, y que la
+        notificación a los suscriptores se encole solo al confirmarse.
+
+        Lógica:
+            - Hace fallar la sincronización de eventos programados luego de registrar el correo, y luego el registro
+              del correo.
+            - Confirma que en ambos casos el estado, el correo y la notificación a los suscriptores se descartan.
+            - Publica el contenido y confirma que la notificación a los suscriptores se encola al confirmarse.
+        """
+        self.client.login(email='creator@example.com', password='password123')
+        url = reverse('update_content_state', args=[self.content_draft.id])
+        data = json.dumps({'state': 'publish'})
+
+        with patch('content.views.notify_new_content_suscription.delay') as mock_notify:
+            with patch('content.scheduler.sync_events', side_effect=RuntimeError('Error de base de datos')):
+                with self.assertRaises(RuntimeError):
+                    self.client.post(url, data=data, content_type='application/json')
+            self.content_draft.refresh_from_db()
+            self.assertEqual(self.content_draft.state, 'draft')
+            self.assertFalse(OutboxNotification.objects.exists())
+
+            # Si no se puede registrar el correo, el cambio de estado tampoco se confirma
+            with patch('notification.outbox.enqueue', side_effect=RuntimeError('Error de base de datos')):
+                with self.assertRaises(RuntimeError):
+                    self.client.post(url, data=data, content_type='application/json')
+            self.content_draft.refresh_from_db()
+            self.assertEqual(self.content_draft.state, 'draft')
+            self.assertFalse(mock_notify.called)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, data=data, content_type='application/json')
+            mock_notify.assert_called_once_with(self.content_draft.id)
+        self.assertEqual(OutboxNotification.objects.count(), 1)
+
     # Movimiento de "borrador" a "publicado" (categoría no moderada)
     def test_creator_move_draft_to_publish_unmoderated(self):
         """
@@ -1598,3 +1987,616 @@ class ReportPostViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json().get('success'), True)
         self.assertTrue(Report.objects.filter(content=self.content).exists())
+
+
+class ContentSearchTest(TestCase):
+    """
+    Clase de pruebas para la búsqueda de texto completo de contenidos.
+
+    Verifica que el vector de búsqueda se mantenga actualizado al guardar el contenido y al modificar sus etiquetas,
+    que los resultados se ordenen por relevancia y que las coincidencias se resalten de forma segura.
+    """
+
+    def setUp(self):
+        """
+        Configura el entorno necesario para los tests de búsqueda.
+
+        Crea un autor, una categoría pública y contenidos publicados con distintos campos coincidentes.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.user = get_user_model().objects.create_user(
+            email='autor@example.com',
+            name='Autor Prueba',
+            password='testpassword123'
+        )
+        self.category = Category.objects.create(name='Noticias', type=Category.TypeChoices.public)
+        published = timezone.now() - timezone.timedelta(days=1)
+        self.in_title = Content.objects.create(
+            title='Montañas de los Andes', summary='Un recorrido', content='<p>Texto</p>',
+            category=self.category, autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+        self.in_body = Content.objects.create(
+            title='Viajes', summary='Un recorrido', content='<p>Las <b>montañas</b> más altas</p>',
+            category=self.category, autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+        self.unrelated = Content.objects.create(
+            title='Cocina', summary='Recetas', content='<p>Postres</p>',
+            category=self.category, autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+
+    def tearDown(self):
+        """
+        Restablece las conexiones de señales después de cada test.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def test_results_ranked_by_field_weight(self):
+        """
+        Verifica que una coincidencia en el título tenga más relevancia que una en el cuerpo.
+
+        Lógica:
+            - Busca una palabra presente en el título de un contenido y en el cuerpo de otro.
+            - Verifica que ambos se devuelvan, el del título primero, y que no se incluyan contenidos no relacionados.
+        """
+        response = self.client.get(reverse('search_contents_api'), {'q': 'montaña'})
+        self.assertEqual(response.status_code, 200)
+        ids = [result['id'] for result in response.json()['results']]
+        self.assertEqual(ids, [self.in_title.id, self.in_body.id])
+
+    def test_tags_update_search_vector(self):
+        """
+        Verifica que agregar etiquetas a un contenido lo haga encontrable por ellas.
+
+        Lógica:
+            - Agrega una etiqueta a un contenido.
+            - Verifica que la búsqueda por la etiqueta devuelva dicho contenido.
+        """
+        self.unrelated.tags.add('gastronomía')
+        response = self.client.get(reverse('search_contents_api'), {'q': 'gastronomía'})
+        ids = [result['id'] for result in response.json()['results']]
+        self.assertEqual(ids, [self.unrelated.id])
+
+    def test_save_updates_search_vector(self):
+        """
+        Verifica que al editar el título de un contenido se actualice su vector de búsqueda.
+        """
+        self.unrelated.title = 'Helados artesanales'
+        self.unrelated.save()
+        response = self.client.get(reverse('search_contents_api'), {'q': 'helados'})
+        ids = [result['id'] for result in response.json()['results']]
+        self.assertEqual(ids, [self.unrelated.id])
+
+    def test_highlight_is_escaped(self):
+        """
+        Verifica que el resaltado envuelva las coincidencias en `<mark>` y escape el HTML del título.
+        """
+        self.unrelated.title = 'Helados <i>caseros</i>'
+        self.unrelated.save()
+        response = self.client.get(reverse('search_contents_api'), {'q': 'helados'})
+        result = response.json()['results'][0]
+        self.assertNotIn('<i>', result['title_highlight'])
+        self.assertIn('&lt;i&gt;', result['title_highlight'])
+        self.assertIn('<mark>Helados</mark>', result['title_highlight'])
+
+    def test_home_search_uses_ranking(self):
+        """
+        Verifica que la búsqueda del inicio devuelva los resultados por relevancia y resaltados.
+        """
+        response = self.client.get(reverse('home'), {'query': 'montañas'})
+        self.assertEqual(response.status_code, 200)
+        contents = list(response.context['page_obj'])
+        self.assertEqual(contents, [self.in_title, self.in_body])
+        self.assertContains(response, '<mark>Montañas</mark>')
+
+    def test_home_search_by_author_name(self):
+        """
+        Verifica que la búsqueda del inicio siga encontrando contenidos por el nombre del autor.
+        """
+        response = self.client.get(reverse('home'), {'query': 'Autor Prueba'})
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_home_fuzzy_search_by_title(self):
+        """
+        Verifica que la búsqueda del inicio tolere errores de tipeo en el título mediante trigramas.
+
+        Lógica:
+            - Busca un título mal escrito que no coincide por texto completo.
+            - Verifica que se devuelva el contenido cuyo título es similar.
+        """
+        response = self.client.get(reverse('home'), {'query': 'viajse'})
+        self.assertEqual(list(response.context['page_obj']), [self.in_body])
+
+    def test_home_fuzzy_search_by_author_name(self):
+        """
+        Verifica que la búsqueda del inicio tolere errores de tipeo en el nombre del autor.
+        """
+        other = get_user_model().objects.create_user(email='otro@example.com', name='Otro', password='testpassword123')
+        self.unrelated.autor = other
+        self.unrelated.save()
+        response = self.client.get(reverse('home'), {'query': 'Autr Prueva'})
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertNotIn(self.unrelated, list(response.context['page_obj']))
+
+    def test_search_requires_query(self):
+        """
+        Verifica que la API rechace búsquedas vacías.
+        """
+        response = self.client.get(reverse('search_contents_api'))
+        self.assertEqual(response.status_code, 400)
+
+
+class ContentCountersTest(TestCase):
+    """
+    Clase de pruebas para el buffer de contadores de visualizaciones y compartidos (`content.counters`).
+
+    Verifica que los incrementos se acumulen sin escribir en la base de datos y que se vuelquen con una única consulta.
+    """
+
+    def setUp(self):
+        """
+        Configura el entorno necesario para los tests de contadores.
+
+        Crea un autor, una categoría pública y dos contenidos publicados, y vacía el buffer local.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.user = get_user_model().objects.create_user(email='autor@example.com', name='Autor', password='testpassword123')
+        self.category = Category.objects.create(name='Noticias', type=Category.TypeChoices.public)
+        published = timezone.now() - timezone.timedelta(days=1)
+        self.content = Content.objects.create(
+            title='Contenido', summary='Resumen', content='<p>Texto</p>', category=self.category,
+            autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+        self.other = Content.objects.create(
+            title='Otro', summary='Resumen', content='<p>Texto</p>', category=self.category,
+            autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+        counters.flush()
+
+    def tearDown(self):
+        """
+        Restablece las conexiones de señales después de cada test.
+        """
+
+        counters.flush()
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def test_increments_are_buffered_and_flushed_in_one_query(self):
+        """
+        Verifica que los incrementos no se escriban hasta el volcado y que este use una única consulta.
+
+        Lógica:
+            - Registra visualizaciones y compartidos de dos contenidos.
+            - Verifica que los contadores en la base de datos no cambien.
+            - Vuelca el buffer y verifica los totales y la cantidad de consultas.
+        """
+        for _ in range(3):
+            counters.increment(self.content.id, 'views_count')
+        counters.increment(self.content.id, 'shares_count')
+        counters.increment(self.other.id, 'views_count')
+
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.flush(), 2)
+
+        self.content.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.content.views_count, self.content.shares_count), (3, 1))
+        self.assertEqual((self.other.views_count, self.other.shares_count), (1, 0))
+
+    def test_flush_twice_does_not_duplicate(self):
+        """
+        Verifica que un segundo volcado sin nuevos incrementos no modifique los contadores.
+        """
+        counters.increment(self.content.id, 'views_count')
+        counters.flush()
+        self.assertEqual(counters.flush(), 0)
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 1)
+
+    @override_settings(CONTENT_COUNTERS_LOCAL_MAX_PENDING=2)
+    def test_local_buffer_flushes_when_full(self):
+        """
+        Verifica que el buffer local se vuelque automáticamente al alcanzar el máximo de incrementos pendientes.
+        """
+        self.client.get(reverse('share_content', args=[self.content.id]))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.shares_count, 0)
+
+        self.client.get(reverse('share_content', args=[self.content.id]))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.shares_count, 2)
+
+    def test_invalid_counter(self):
+        """
+        Verifica que no se acepten contadores que no pertenecen al buffer.
+        """
+        with self.assertRaises(ValueError):
+            counters.increment(self.content.id, 'likes_count')
+
+    def test_local_buffer_flushes_at_request_end(self):
+        """
+        Verifica que el buffer en memoria del proceso web se vuelque al finalizar una petición una vez vencido el intervalo.
+        """
+        counters.increment(self.content.id, 'views_count')
+        self.client.get(reverse('home'))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 0)
+
+        with override_settings(CONTENT_COUNTERS_FLUSH_INTERVAL=0):
+            self.client.get(reverse('home'))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 1)
+
+
+@skipIf(fakeredis is None, 'Requiere fakeredis (requirements-dev.txt).')
+class RedisContentCountersTest(TestCase):
+    """
+    Clase de pruebas para el volcado de los contadores acumulados en Redis (`content.counters`), con un servidor simulado.
+    """
+
+    def setUp(self):
+        """
+        Crea un autor, una categoría pública y dos contenidos publicados, y reemplaza la conexión a Redis por una simulada.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.user = get_user_model().objects.create_user(email='autor@example.com', name='Autor', password='testpassword123')
+        self.category = Category.objects.create(name='Noticias', type=Category.TypeChoices.public)
+        published = timezone.now() - timezone.timedelta(days=1)
+        self.content = Content.objects.create(
+            title='Contenido', summary='Resumen', content='<p>Texto</p>', category=self.category,
+            autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+        self.other = Content.objects.create(
+            title='Otro', summary='Resumen', content='<p>Texto</p>', category=self.category,
+            autor=self.user, state=Content.StateChoices.publish, date_published=published,
+        )
+
+        self.redis = fakeredis.FakeRedis()
+        for target, value in (('_uses_redis', lambda: True), ('_redis', lambda: self.redis)):
+            patcher = patch.object(counters, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        Restablece las conexiones de señales después de cada test.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def test_increments_are_flushed_from_redis(self):
+        """
+        Verifica que los incrementos se registren con `HINCRBY` y que el volcado los aplique, registre el lote y borre las claves.
+        """
+        for _ in range(3):
+            counters.increment(self.content.id, 'views_count')
+        counters.increment(self.other.id, 'shares_count')
+        self.assertEqual(self.redis.hget(counters.PENDING_KEY, f'{self.content.id}:views_count'), b'3')
+
+        self.assertEqual(counters.flush(), 2)
+
+        self.content.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.content.views_count, self.other.shares_count), (3, 1))
+        self.assertEqual(CounterFlush.objects.count(), 1)
+        self.assertFalse(self.redis.exists(counters.PENDING_KEY, counters.FLUSHING_KEY))
+        self.assertEqual(counters.flush(), 0)
+
+    def test_unfinished_batch_is_flushed_before_pending(self):
+        """
+        Verifica que un lote que quedó sin aplicar se procese primero y que los incrementos nuevos esperen al siguiente volcado.
+        """
+        self.redis.hset(counters.FLUSHING_KEY, mapping={counters.BATCH_FIELD: 'interrumpido', f'{self.content.id}:views_count': 2})
+        counters.increment(self.content.id, 'views_count')
+
+        self.assertEqual(counters.flush(), 1)
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 2)
+        self.assertTrue(CounterFlush.objects.filter(batch_id='interrumpido').exists())
+
+        counters.flush()
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 3)
+
+    def test_replayed_batch_is_skipped(self):
+        """
+        Verifica que un lote ya aplicado cuya clave no llegó a borrarse no se vuelva a sumar (`IntegrityError` en `CounterFlush`).
+        """
+        CounterFlush.objects.create(batch_id='aplicado')
+        self.redis.hset(counters.FLUSHING_KEY, mapping={counters.BATCH_FIELD: 'aplicado', f'{self.content.id}:views_count': 5})
+
+        self.assertEqual(counters.flush(), 0)
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views_count, 0)
+        self.assertFalse(self.redis.exists(counters.FLUSHING_KEY))
+
+
+class ContentExpirationTest(TestCase):
+    """
+    Clase de pruebas para la expiración en lote de contenidos publicados (`content.tasks.expire_contents`).
+    """
+
+    def setUp(self):
+        """
+        Configura el entorno necesario para los tests de expiración.
+
+        Crea dos autores con contenidos publicados vencidos, un contenido publicado vigente y un borrador vencido.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        cache.clear()
+        self.autor = get_user_model().objects.create_user(email='autor@example.com', name='Autor', password='testpassword123')
+        self.other_autor = get_user_model().objects.create_user(email='otro@example.com', name='Otro', password='testpassword123')
+        self.category = Category.objects.create(name='Noticias', type=Category.TypeChoices.public)
+        published = timezone.now() - timezone.timedelta(days=3)
+        expired = timezone.now() - timezone.timedelta(hours=1)
+
+        def create(title, autor, state=Content.StateChoices.publish, date_expire=expired):
+            return Content.objects.create(
+                title=title, summary='Resumen', content='<p>Texto</p>', category=self.category, autor=autor,
+                state=state, date_published=published, date_expire=date_expire,
+            )
+
+        self.expired = [create('Primero', self.autor), create('Segundo', self.autor), create('Tercero', self.other_autor)]
+        self.current = create('Vigente', self.autor, date_expire=timezone.now() + timezone.timedelta(days=1))
+        self.draft = create('Borrador', self.autor, state=Content.StateChoices.draft)
+
+    def tearDown(self):
+        """
+        Restablece las conexiones de señales después de cada test.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    @patch('notification.outbox.enqueue')
+    def test_expire_contents_in_batches(self, mock_send_notification):
+        """
+        Verifica que los contenidos vencidos se expiren en lotes, con su registro de historial,
+        y que se envíe una única notificación por autor.
+        """
+        self.assertEqual(expire_contents(), 3)
+
+        states = dict(Content.objects.values_list('id', 'state'))
+        self.assertTrue(all(states[content.id] == Content.StateChoices.inactive for content in self.expired))
+        self.assertEqual(states[self.current.id], Content.StateChoices.publish)
+        self.assertEqual(states[self.draft.id], Content.StateChoices.draft)
+
+        history = self.expired[0].history.first()
+        self.assertEqual(history.state, Content.StateChoices.inactive)
+        self.assertEqual(history.history_type, '~')
+        self.assertEqual(history.history_change_reason, service.EXPIRED_CHANGE_REASON)
+
+        messages = {call.args[1][0]: (call.args[0], call.args[2]['message']) for call in mock_send_notification.call_args_list}
+        self.assertEqual(messages, {
+            'autor@example.com': ('Contenidos vencidos', 'Tus contenidos Primero y Segundo han expirado'),
+            'otro@example.com': ('Contenido vencido', 'Tu contenido Tercero ha expirado'),
+        })
+
+        # Con lotes pequeños se obtiene el mismo resultado
+        Content.objects.filter(id__in=[content.id for content in self.expired]).update(state=Content.StateChoices.publish)
+        self.assertEqual(sum(map(len, service.expire_published_contents(batch_size=2).values())), 3)
+
+    @patch('notification.outbox.enqueue')
+    def test_overlapping_runs_are_skipped(self, mock_send_notification):
+        """
+        Verifica que una ejecución no haga nada mientras otra tiene el bloqueo.
+        """
+        with cache_lock('expire_contents', timeout=60) as acquired:
+            self.assertTrue(acquired)
+            self.assertIsNone(expire_contents())
+        self.assertEqual(Content.objects.filter(state=Content.StateChoices.inactive).count(), 0)
+        mock_send_notification.assert_not_called()
+
+
+class ContentSchedulerTest(TestCase):
+    """
+    Clase de pruebas para la publicación y expiración programadas de contenidos (`content.scheduler`).
+
+    Métodos:
+        - :meth:`test_future_publication_is_scheduled`: Verifica que publicar con fecha futura programe la publicación.
+        - :meth:`test_dispatch_publishes_and_expires`: Verifica la ejecución de los eventos de publicación y expiración.
+        - :meth:`test_leaving_to_publish_cancels_publication`: Verifica que devolver el contenido a revisión cancele su publicación.
+        - :meth:`test_bulk_update_schedules_publication`: Verifica la programación desde la API en lote.
+        - :meth:`test_run_scheduler_once`: Verifica el comando `run_scheduler --once`.
+    """
+
+    def setUp(self):
+        """
+        Configura el entorno necesario para los tests del planificador.
+
+        Crea un publicador y un contenido en estado 'A publicar' con fecha de publicación y de expiración futuras.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.autor = get_user_model().objects.create_user(email='autor@example.com', name='Autor', password='testpassword123')
+        self.publisher = get_user_model().objects.create_user(email='publisher@example.com', name='Publicador', password='testpassword123')
+        self.publisher.user_permissions.add(Permission.objects.get(codename='publish_content'))
+        self.category = Category.objects.create(name='Noticias', type=Category.TypeChoices.public)
+        self.date_published = timezone.now() + timezone.timedelta(days=1)
+        self.date_expire = timezone.now() + timezone.timedelta(days=3)
+        self.content = Content.objects.create(
+            title='Programado', summary='Resumen', content='<p>Texto</p>', category=self.category, autor=self.autor,
+            state=Content.StateChoices.to_publish, date_published=self.date_published, date_expire=self.date_expire,
+        )
+
+    def tearDown(self):
+        """
+        Restablece las conexiones de señales después de cada test.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def events(self):
+        return dict(ScheduledEvent.objects.filter(content=self.content).values_list('kind', 'run_at'))
+
+    @patch('notification.tasks.notify_new_content_suscription.delay')
+    def test_future_publication_is_scheduled(self, mock_notify_subscribers):
+        """
+        Verifica que, al publicar un contenido con fecha de publicación futura, permanezca en 'A publicar'
+        con su evento de publicación y sin notificar aún a los suscriptores.
+        """
+        self.client.login(email='publisher@example.com', password='testpassword123')
+        response = self.client.post(reverse('update_content_state', args=[self.content.id]),
+                                    json.dumps({'state': 'publish'}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['state'], 'to_publish')
+        self.assertEqual(data['scheduled_for'], self.date_published.isoformat())
+
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.state, Content.StateChoices.to_publish)
+        self.assertEqual(self.events(), {ScheduledEvent.KindChoices.publish: self.date_published})
+        self.assertEqual(self.content.history.first().history_change_reason, data['message'])
+        mock_notify_subscribers.assert_not_called()
+
+        # Los listados públicos no muestran el contenido hasta su publicación
+        response = self.client.get(reverse('search_contents_api'), {'q': 'Programado'})
+        self.assertEqual(response.json()['results'], [])
+
+    @patch('notification.outbox.enqueue')
+    @patch('notification.tasks.notify_state_changes.delay')
+    def test_dispatch_publishes_and_expires(self, mock_notify_changes, mock_send_notification):
+        """
+        Verifica que el evento de publicación publique el contenido en su fecha, registre el historial,
+        notifique al autor y a los suscriptores y programe la expiración, que luego lo marca como inactivo.
+        """
+        scheduler.schedule_publication([self.content])
+
+        # Antes de la fecha no se ejecuta ningún evento
+        self.assertEqual(scheduler.dispatch_due_events(), 0)
+        self.assertEqual(scheduler.next_run_at(), self.date_published)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(scheduler.dispatch_due_events(now=self.date_published), 1)
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.state, Content.StateChoices.publish)
+        self.assertEqual(self.content.history.first().history_change_reason, scheduler.PUBLISHED_CHANGE_REASON)
+        self.assertEqual(self.events(), {ScheduledEvent.KindChoices.expire: self.date_expire})
+        mock_notify_changes.assert_called_once_with([[self.content.id, 'to_publish']], [self.content.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(scheduler.dispatch_due_events(now=self.date_expire), 1)
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.state, Content.StateChoices.inactive)
+        self.assertEqual(self.content.history.first().history_change_reason, service.EXPIRED_CHANGE_REASON)
+        self.assertEqual(self.events(), {})
+        mock_send_notification.assert_called_once()
+        self.assertEqual(mock_send_notification.call_args.args[2]['message'], 'Tu contenido Programado ha expirado')
+
+    def test_leaving_to_publish_cancels_publication(self):
+        """
+        Verifica que devolver a revisión un contenido con publicación programada elimine su evento,
+        y que un evento cuyo contenido ya no está en 'A publicar' no lo publique.
+        """
+        scheduler.schedule_publication([self.content])
+        self.client.login(email='publisher@example.com', password='testpassword123')
+        self.client.post(reverse('update_content_state', args=[self.content.id]),
+                         json.dumps({'state': 'revision', 'reason': 'Corregir el título'}), content_type='application/json')
+        self.assertEqual(self.events(), {})
+
+        scheduler.schedule_publication([self.content])
+        Content.objects.filter(id=self.content.id).update(state=Content.StateChoices.draft)
+        self.assertEqual(scheduler.dispatch_due_events(now=self.date_published), 0)
+        self.assertEqual(Content.objects.get(id=self.content.id).state, Content.StateChoices.draft)
+        self.assertEqual(self.events(), {})
+
+    @patch('notification.tasks.notify_state_changes.delay')
+    def test_bulk_update_schedules_publication(self, mock_notify_changes):
+        """
+        Verifica que la API en lote programe la publicación de los contenidos con fecha futura y no los
+        incluya entre los contenidos publicados a notificar.
+        """
+        self.client.login(email='publisher@example.com', password='testpassword123')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk_update_content_state'),
+                                        json.dumps({'changes': [{'id': self.content.id, 'state': 'publish'}]}),
+                                        content_type='application/json')
+
+        result = response.json()['results'][0]
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['state'], 'to_publish')
+        self.assertEqual(result['scheduled_for'], self.date_published.isoformat())
+        self.assertEqual(Content.objects.get(id=self.content.id).state, Content.StateChoices.to_publish)
+        self.assertEqual(self.events(), {ScheduledEvent.KindChoices.publish: self.date_published})
+        mock_notify_changes.assert_not_called()
+
+    @patch('notification.tasks.notify_state_changes.delay')
+    def test_run_scheduler_once(self, mock_notify_changes):
+        """
+        Verifica que `run_scheduler --once` ejecute los eventos vencidos y termine.
+        """
+        Content.objects.filter(id=self.content.id).update(date_published=timezone.now() - timezone.timedelta(minutes=1))
+        self.content.refresh_from_db()
+        scheduler.schedule_publication([self.content])
+
+        out = StringIO()
+        call_command('run_scheduler', '--once', stdout=out)
+        self.assertIn('Contenidos publicados o expirados: 1', out.getvalue())
+        self.assertEqual(Content.objects.get(id=self.content.id).state, Content.StateChoices.publish)
@@ -1,5 +1,7 @@
+from django.template.loader import render_to_string
 from django.template.response import TemplateResponse
 from django.utils import timezone
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
@@ -23,13 +25,20 @@ from simple_history.utils import update_change_reason
 from django.contrib import messages
 from django.urls import reverse
 from .service import validate_permission_kanban
-from .tasks import update_reactions, count_view, count_share
+from . import counters, kanban, scheduler
+from .search import search_contents, highlight
+from app.pagination import KeysetPaginator, InvalidCursor
+from app.models import CustomUser
 
 @login_required
 def kanban_board(request):
     """
     Muestra el tablero Kanban con los contenidos filtrados según los permisos del usuario.
 
+    Cada columna muestra solo la primera página de contenidos, obtenida para todas las columnas con una única
+    consulta; las páginas siguientes se cargan al desplazarse con `kanban_column_api`. La búsqueda (`q`) y los
+    filtros por autor (`autor`) y categoría (`category`) se aplican en la base de datos.
+
     :param request: La solicitud HTTP recibida.
     :type request: HttpRequest
 
@@ -38,48 +47,151 @@ def kanban_board(request):
     """
     user = request.user
 
-    if not (
-        user.has_perm('app.create_content') or 
-        user.has_perm('app.edit_content') or 
-        user.has_perm('app.publish_content') or
-        user.has_perm('app.edit_is_active')
-    ):
+    if not kanban.can_view_board(user):
         raise PermissionDenied
-    
-    contents = {
-        'Borrador': [],
-        'Edicion': [],
-        'A publicar': [],
-        'Publicado': [],
-        'Inactivo': [],
-    }
 
-    # Filtrar contenidos según los permisos del usuario y que estén activos
-    if user.has_perm('app.edit_content') or user.has_perm('app.publish_content') or user.has_perm('app.edit_is_active'):
-        # Los editores y publicadores ven todos los contenidos activos sin importar el autor
-        contents['Borrador'] = Content.objects.filter(state='draft', is_active=True, category__is_active=True)
-        contents['Edicion'] = Content.objects.filter(state='revision', is_active=True, category__is_active=True)
-        contents['A publicar'] = Content.objects.filter(state='to_publish', is_active=True, category__is_active=True)
-        contents['Publicado'] = Content.objects.filter(state='publish', is_active=True, category__is_active=True)
-        contents['Inactivo'] = Content.objects.filter(state='inactive', is_active=True, category__is_active=True)
-    elif user.has_perm('app.create_content'):
-        # Los autores ven solo sus contenidos activos en cualquier estado
-        contents['Borrador'] = Content.objects.filter(state='draft', autor=user, is_active=True, category__is_active=True)
-        contents['Edicion'] = Content.objects.filter(state='revision', autor=user, is_active=True, category__is_active=True)
-        contents['A publicar'] = Content.objects.filter(state='to_publish', autor=user, is_active=True, category__is_active=True)
-        contents['Publicado'] = Content.objects.filter(state='publish', autor=user, is_active=True, category__is_active=True)
-        contents['Inactivo'] = Content.objects.filter(state='inactive', autor=user, is_active=True, category__is_active=True)
+    filters = _kanban_filters(request)
+    contents = kanban.load_board(kanban.board_queryset(user, **filters))
+    # Movimientos permitidos de las tarjetas cargadas, para validar los arrastres sin consultar al servidor
+    transitions = service.allowed_transitions(user, [item for column in contents.values() for item in column])
+
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
 
     # Pasar permisos al contexto de la plantilla
     context = {
         'contents': contents,
-        'can_create_content': user.has_perm('app.create_content'),
-        'can_edit_content': user.has_perm('app.edit_content'),
-        'can_publish_content': user.has_perm('app.publish_content'),
-        'can_edit_is_active': user.has_perm('app.edit_is_active'),
+        'filters': filters,
+        'filter_query': filter_params.urlencode(),
+        'categories': Category.objects.filter(is_active=True).order_by('name').only('id', 'name'),
+        'authors': _kanban_authors(user),
+        'state_flow': service.STATE_FLOW,
+        'transitions': transitions,
+        **_kanban_permissions(user),
     }
     return render(request, 'kanban/kanban_board.html', context)
 
+@login_required
+def kanban_column_api(request, state):
+    """
+    API que devuelve la página siguiente de una columna del tablero Kanban.
+
+    Recibe el cursor devuelto por la página anterior (`cursor`) y los mismos filtros del tablero.
+
+    :param request: La solicitud HTTP recibida.
+    :type request: HttpRequest
+    :param state: Estado de la columna.
+    :type state: str
+
+    :return: Respuesta JSON con el HTML de las tarjetas (`html`), sus IDs (`ids`) y el cursor de la página siguiente (`next_cursor`).
+    :rtype: JsonResponse
+    """
+
+    user = request.user
+    if not kanban.can_view_board(user):
+        raise PermissionDenied
+    if state not in Content.StateChoices.values:
+        return JsonResponse({'status': 'error', 'message': 'Estado no válido.'}, status=400)
+
+    queryset = kanban.board_queryset(user, **_kanban_filters(request))
+    try:
+        page = kanban.load_column(queryset, state, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'message': 'Cursor de paginación inválido.'}, status=400)
+
+    html = render_to_string('kanban/_card.html', {'items': page.object_list, 'user': user, **_kanban_permissions(user)}, request=request)
+    return JsonResponse({
+        'status': 'success',
+        'html': html,
+        'ids': [content.id for content in page],
+        'next_cursor': page.next_cursor,
+    })
+
+@login_required
+def kanban_transitions_api(request):
+    """
+    API que devuelve, en una única respuesta, los estados a los que el usuario puede mover cada contenido del tablero.
+
+    El tablero la consulta al cargar nuevas tarjetas y valida los arrastres sin consultar al servidor en cada uno.
+
+    :param request: La solicitud HTTP recibida. Acepta el parámetro `ids` con los IDs de los contenidos
+                    separados por comas (máximo 100).
+    :type request: HttpRequest
+
+    :return: Respuesta JSON con un diccionario `{id: {'allowed': [estados], 'denied': {estado: mensaje}}}`;
+             los contenidos que el usuario no ve en el tablero se omiten.
+    :rtype: JsonResponse
+    """
+
+    user = request.user
+    if not kanban.can_view_board(user):
+        raise PermissionDenied
+    try:
+        content_ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Datos incorrectos.'}, status=400)
+    if len(content_ids) > 100:
+        return JsonResponse({'status': 'error', 'message': 'Se permiten como máximo 100 contenidos.'}, status=400)
+
+    contents = kanban.board_queryset(user).filter(id__in=content_ids)
+    transitions = service.allowed_transitions(user, contents)
+    return JsonResponse({'status': 'success', 'transitions': {str(key): value for key, value in transitions.items()}})
+
+def _kanban_permissions(user):
+    """
+    Permisos del usuario utilizados por las tarjetas del tablero Kanban.
+
+    :param user: Usuario autenticado.
+    :type user: CustomUser
+    :return: Diccionario con los permisos para el contexto de las plantillas.
+    :rtype: dict
+    """
+
+    caps = service.user_capabilities(user)
+    return {
+        'can_create_content': 'create' in caps,
+        'can_edit_content': 'edit' in caps,
+        'can_publish_content': 'publish' in caps,
+        'can_edit_is_active': 'edit_is_active' in caps,
+    }
+
+def _kanban_filters(request):
+    """
+    Obtiene los filtros del tablero Kanban de los parámetros de la solicitud, descartando los valores inválidos.
+
+    :param request: La solicitud HTTP recibida.
+    :type request: HttpRequest
+    :return: Diccionario con `query`, `autor_id` y `category_id`.
+    :rtype: dict
+    """
+
+    def to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        'query': request.GET.get('q', '').strip() or None,
+        'autor_id': to_int(request.GET.get('autor')),
+        'category_id': to_int(request.GET.get('category')),
+    }
+
+def _kanban_authors(user):
+    """
+    Autores disponibles para filtrar el tablero Kanban.
+
+    :param user: Usuario autenticado.
+    :type user: CustomUser
+    :return: Autores con contenidos activos, o una lista vacía si el usuario solo ve sus propios contenidos.
+    :rtype: QuerySet
+    """
+
+    if not kanban.sees_all_contents(user):
+        return []
+    autor_ids = Content.objects.filter(is_active=True).values('autor_id')
+    return CustomUser.objects.filter(id__in=autor_ids).order_by('name').only('id', 'name')
+
 @csrf_exempt
 @login_required
 def update_content_state(request, content_id):
@@ -108,15 +220,10 @@ def update_content_state(request, content_id):
 
     user = request.user
 
-    if not (
-        user.has_perm('app.create_content') or
-        user.has_perm('app.edit_content') or
-        user.has_perm('app.publish_content') or
-        user.has_perm('app.edit_is_active')
-    ):
+    if not kanban.can_view_board(user):
         raise PermissionDenied
 
-    content = get_object_or_404(Content, id=content_id)
+    content = get_object_or_404(Content.objects.select_related('category', 'autor'), id=content_id)
     if not content.is_active or not content.category.is_active:
         raise Http404
     oldState = content.state
@@ -142,21 +249,74 @@ def update_content_state(request, content_id):
     if new_state == 'publish' and oldState != 'inactive' and (content.date_published is None or content.date_published < timezone.now()):
         content.date_published = timezone.now()
 
+    # Si la fecha de publicacion es futura, el contenido queda en 'A publicar' hasta que se cumpla
+    scheduled = new_state == 'publish' and content.date_published > timezone.now()
+    if scheduled:
+        new_state = Content.StateChoices.to_publish
+        if not reason:
+            reason = scheduler.scheduled_publication_message(content.date_published)
+
     if not reason:
         reason = f"Cambio de estado de {mappState[oldState]} a {mappState[new_state]}"
 
-    content.state = new_state
-    content.save()
-    update_change_reason(content, reason)
+    # El correo al autor se registra en la tabla de salida en la misma transacción que el cambio de estado,
+    # y la notificación a los suscriptores se encola recién al confirmarse
+    with transaction.atomic():
+        content.state = new_state
+        content.save()
+        update_change_reason(content, reason)
+        if new_state != oldState:
+            notification.service.changeState([content.autor.email], content, oldState)
+        scheduler.sync_events([content])
+        if scheduled:
+            scheduler.schedule_publication([content])
+        if new_state == 'publish':
+            transaction.on_commit(lambda: notify_new_content_suscription.delay(content_id))
+
+    if scheduled:
+        return JsonResponse({
+            'status': 'success',
+            'state': new_state,
+            'scheduled_for': content.date_published.isoformat(),
+            'message': scheduler.scheduled_publication_message(content.date_published),
+        })
+    return JsonResponse({'status': 'success'})
 
-    if new_state == 'publish':
-        if content.date_published <= timezone.now():
-            notify_new_content_suscription.delay(content_id) # Notificar a los suscriptores inmediatamente
-        else:
-            notify_new_content_suscription.apply_async((content_id,), eta=content.date_published) # Programar la notificación para la fecha de publicación
+@csrf_exempt
+@login_required
+def bulk_update_content_state(request):
+    """
+    API para aplicar varios cambios de estado del tablero Kanban en una única transacción.
 
-    notification.service.changeState([content.autor.email], content, oldState)
-    return JsonResponse({'status': 'success'})
+    Recibe un JSON con la lista `changes`, donde cada elemento tiene `id`, `state` y opcionalmente `reason`
+    (máximo 100 cambios). Cada cambio se valida con las mismas reglas que `update_content_state`; los cambios
+    rechazados no impiden aplicar el resto.
+
+    :param request: La solicitud HTTP recibida.
+    :type request: HttpRequest
+
+    :return: Respuesta con el resultado de cada cambio (`results`), en el mismo orden en que se enviaron.
+    :rtype: JsonResponse
+    """
+
+    if not request.method == 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Método no permitido.'}, status=405)
+
+    user = request.user
+    if not kanban.can_view_board(user):
+        raise PermissionDenied
+
+    try:
+        changes = json.loads(request.body).get('changes')
+    except (ValueError, AttributeError):
+        changes = None
+    if not isinstance(changes, list) or not all(isinstance(change, dict) for change in changes):
+        return JsonResponse({'status': 'error', 'message': 'Datos incorrectos.'}, status=400)
+    if len(changes) > 100:
+        return JsonResponse({'status': 'error', 'message': 'Se permiten como máximo 100 cambios.'}, status=400)
+
+    results = service.apply_state_changes(user, changes)
+    return JsonResponse({'status': 'success', 'results': results})
 
 @csrf_exempt
 @login_required
@@ -185,7 +345,7 @@ def validate_permission_kanban_api(request):
         return JsonResponse({'status': 'error', 'message': 'Datos incorrectos.'}, status=400)
 
     # Obtener el contenido
-    content = get_object_or_404(Content, id=content_id)
+    content = get_object_or_404(Content.objects.select_related('category'), id=content_id)
 
     # Validar los permisos
     validation_result = validate_permission_kanban(user=user, content=content, newState=new_state, oldState=old_state)
@@ -521,17 +681,16 @@ def view_content(request, id):
                 respose_data = json.loads(response.content)
                 return redirect(respose_data["checkout_url"])
 
-    if (not content.state == Content.StateChoices.publish) or (content.date_published and content.date_published > timezone.now()):
+    if not content.state == Content.StateChoices.publish:
         if not (user.has_perm('app.create_content') or user.has_perm('app.edit_content') or user.has_perm('app.publish_content') or user.has_perm('app.edit_is_active')):
             raise Http404
 
     history = content.history.all().order_by('-history_date')
     # Obtener si el usuario ha dado like o dislike
     reaction_status = 'none'
-    user_has_liked = content.likes.filter(id=request.user.id).exists() if request.user.is_authenticated else False
-    user_has_disliked = content.dislikes.filter(id=request.user.id).exists() if request.user.is_authenticated else False
-    if user_has_liked: reaction_status = 'liked'
-    elif user_has_disliked: reaction_status = 'disliked'
+    user_reaction = service.get_user_reactions(request.user, [content.id]).get(content.id)
+    if user_reaction == 'like': reaction_status = 'liked'
+    elif user_reaction == 'dislike': reaction_status = 'disliked'
 
     # Verificar si el usuario ya ha dado una calificación (rating) al contenido
     user_rating = 0
@@ -541,8 +700,8 @@ def view_content(request, id):
         except Rating.DoesNotExist:
             user_rating = 0  # Si no ha dado ninguna calificación, usar 0
 
-    # Aumentar la cantidad de vistas del contenido
-    count_view.delay(content.id)
+    # Aumentar la cantidad de vistas del contenido, se acumula y se vuelca en lote
+    counters.increment(content.id, 'views_count')
 
     # Pasar todos los datos necesarios al contexto
     return render(request, 'content/view.html', {
@@ -646,23 +805,16 @@ def like_content(request, content_id):
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'error', 'message': 'Para poder reaccionar a contenidos debes estar registrado'}, status=403)
 
-    content = get_object_or_404(Content, id=content_id)
-
-    if content.likes.filter(id=request.user.id).exists():
-        content.likes.remove(request.user)
-        message = "Me gusta eliminado"
-        result = "deleted"
-    else:
-        content.likes.add(request.user)
-        content.dislikes.remove(request.user)
-        message = "Me gusta agregado"
-        result = "created"
-
-    update_reactions.delay(content.id)
+    toggled = service.toggle_reaction(content_id, request.user, 'like')
+    if toggled is None:
+        raise Http404
+    result, counts = toggled
+    message = "Me gusta agregado" if result == 'created' else "Me gusta eliminado"
     return JsonResponse({
         'status': 'success',
         'message': message,
         'result': result,
+        **counts,
     })
 
 def dislike_content(request, content_id):
@@ -681,23 +833,16 @@ def dislike_content(request, content_id):
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'error', 'message': 'Para poder reaccionar a contenidos debes estar registrado'}, status=403)
 
-    content = get_object_or_404(Content, id=content_id)
-
-    if content.dislikes.filter(id=request.user.id).exists():
-        content.dislikes.remove(request.user)
-        message = "No me gusta eliminado"
-        result = "deleted"
-    else:
-        content.dislikes.add(request.user)
-        content.likes.remove(request.user)
-        message = "No me gusta agregado"
-        result = "created"
-
-    update_reactions.delay(content.id)
+    toggled = service.toggle_reaction(content_id, request.user, 'dislike')
+    if toggled is None:
+        raise Http404
+    result, counts = toggled
+    message = "No me gusta agregado" if result == 'created' else "No me gusta eliminado"
     return JsonResponse({
         'status': 'success',
         'message': message,
         'result': result,
+        **counts,
     })
 
 def report_detail(request, report_id):
@@ -759,9 +904,30 @@ def view_content_detail(request, content_id):
     )
     return TemplateResponse(request, 'admin/content/content/content_detail.html', context)
 
+def user_reactions_api(request):
+    """
+    API que devuelve las reacciones del usuario actual sobre varios contenidos con una única consulta.
+
+    :param request: El objeto de solicitud HTTP. Acepta el parámetro `ids` con los IDs de los contenidos
+                    separados por comas (máximo 100).
+    :type request: HttpRequest
+
+    :return: Respuesta JSON con un diccionario `{id: 'like' | 'dislike'}`; los contenidos sin reacción se omiten.
+    :rtype: JsonResponse
+    """
+    try:
+        content_ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Datos incorrectos.'}, status=400)
+    if len(content_ids) > 100:
+        return JsonResponse({'status': 'error', 'message': 'Se permiten como máximo 100 contenidos.'}, status=400)
+
+    reactions = service.get_user_reactions(request.user, content_ids)
+    return JsonResponse({'status': 'success', 'reactions': {str(key): value for key, value in reactions.items()}})
+
 def view_count_share(request, content_id):
     """
-    Encola en el worker de Celery la tarea para incrementar el contador de compartidos de un contenido.
+    Acumula el incremento del contador de compartidos de un contenido, que se vuelca luego en lote.
 
     :param request: El objeto de solicitud HTTP.
     :type request: HttpRequest
@@ -771,5 +937,56 @@ def view_count_share(request, content_id):
     :return: Respuesta JSON con el estado de la operación.
     :rtype: JsonResponse
     """
-    count_share.delay(content_id)
+    counters.increment(content_id, 'shares_count')
     return JsonResponse({'status': 'success', 'message': 'Enqueued task.'})
+
+def search_contents_api(request):
+    """
+    API de búsqueda de texto completo sobre los contenidos publicados.
+
+    Devuelve los contenidos ordenados por relevancia, con el título y el resumen resaltados,
+    paginados por cursor.
+
+    :param request: El objeto de solicitud HTTP. Acepta los parámetros `q` (texto a buscar),
+                    `cursor` (cursor de la página) y `limit` (cantidad de resultados, máximo 50).
+    :type request: HttpRequest
+
+    :return: Respuesta JSON con los resultados y el cursor de la página siguiente.
+    :rtype: JsonResponse
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'status': 'error', 'message': 'Debe indicar un texto a buscar.'}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    contents = Content.objects.filter(
+        is_active=True,
+        category__is_active=True,
+        state=Content.StateChoices.publish,
+    ).select_related('category', 'autor')
+    paginator = KeysetPaginator(search_contents(contents, query), limit, ordering=('-rank', '-id'))
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'message': 'Cursor inválido.'}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'results': [{
+            'id': content.id,
+            'title': content.title,
+            'summary': content.summary,
+            'title_highlight': highlight(content.title_headline),
+            'summary_highlight': highlight(content.summary_headline),
+            'rank': content.rank,
+            'category': content.category.name,
+            'autor': content.autor.name,
+            'date_published': content.date_published,
+            'url': reverse('content_view', args=[content.id]),
+        } for content in page],
+        'next_cursor': page.next_cursor,
+    })
@@ -8,6 +8,12 @@ if [ "$1" = "workers" ]; then
 elif [ "$1" = "scheduled" ]; then
     echo "Executing scheduled tasks"
     celery -A cms beat -l info -f /app/logs/scheduled.log
+elif [ "$1" = "scheduler" ]; then
+    echo "Executing content scheduler"
+    python manage.py run_scheduler >> /app/logs/scheduler.log 2>&1
+elif [ "$1" = "notifications" ]; then
+    echo "Executing notification dispatcher"
+    python manage.py run_notification_dispatcher >> /app/logs/notifications.log 2>&1
 else
     echo "Executing app"
     # Ejecutar las migraciones solo si se especifica
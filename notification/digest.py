@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models import CustomUser
+from content.models import Content
+from notification.models import PendingNotification
+from notification.tasks import send_bulk_notification_task
+
+DIGEST_SUBJECT = "Resumen de nuevos contenidos en tus categorías"
+
+# Registra un aviso pendiente por cada usuario de la consulta de suscripciones, en una única sentencia
+QUEUE_PENDING_SQL = """
+INSERT INTO {table} (user_id, content_id, created_at)
+SELECT subscriptions.user_id, %s, %s FROM ({subscriptions}) AS subscriptions
+ON CONFLICT DO NOTHING
+"""
+
+DIGEST_FREQUENCIES = [CustomUser.NotificationFrequencyChoices.hourly, CustomUser.NotificationFrequencyChoices.daily]
+
+
+def queue_pending(subscriptions, content):
+    """
+    Registra el aviso de un nuevo contenido para los suscriptores que reciben resúmenes.
+
+    Los avisos se insertan con un único `INSERT ... SELECT` sobre la consulta de suscripciones, sin cargar
+    los suscriptores; un mismo contenido no se registra dos veces para un usuario.
+
+    :param subscriptions: Suscripciones a la categoría del contenido.
+    :type subscriptions: QuerySet
+    :param content: Contenido publicado.
+    :type content: Content
+    :return: Cantidad de avisos registrados.
+    :rtype: int
+    """
+
+    users = subscriptions.filter(user__notification_frequency__in=DIGEST_FREQUENCIES).values('user_id')
+    sql, params = users.query.sql_with_params()
+    table = connection.ops.quote_name(PendingNotification._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(QUEUE_PENDING_SQL.format(table=table, subscriptions=sql), [content.id, timezone.now(), *params])
+        return cursor.rowcount
+
+
+def digest_message(contents):
+    """
+    Mensaje del resumen de nuevos contenidos de un usuario.
+
+    :param contents: Pares `(título, categoría)` de los contenidos publicados, en orden de publicación.
+    :type contents: list
+    :return: Mensaje del correo.
+    :rtype: str
+    """
+
+    lines = "\n".join(f"- {title} ({category})" for title, category in contents)
+    return f"Se publicaron nuevos contenidos en las categorías a las que estás suscrito:\n\n{lines}"
+
+
+def send_digests(frequency, batch_size=None):
+    """
+    Envía un resumen por usuario con los avisos pendientes de los usuarios con la frecuencia indicada.
+
+    Los usuarios se recorren en lotes de `batch_size`, ordenados por su id. Los avisos de cada lote se bloquean
+    con `SELECT ... FOR UPDATE SKIP LOCKED` y se eliminan en la misma transacción, por lo que dos ejecuciones
+    simultáneas no envían el mismo aviso; los correos de cada lote se encolan en una única tarea de envío al
+    confirmarse la transacción. Los avisos de contenidos que ya no están publicados se descartan.
+
+    El resumen de cada hora también incluye los avisos de los usuarios que volvieron a la frecuencia inmediata,
+    para que no queden pendientes.
+
+    :param frequency: Frecuencia de los resúmenes a enviar (`hourly` o `daily`).
+    :type frequency: str
+    :param batch_size: Cantidad de usuarios por lote. Por defecto `NOTIFICATION_DIGEST_BATCH_SIZE`.
+    :type batch_size: int
+    :return: Cantidad de resúmenes enviados.
+    :rtype: int
+    """
+
+    batch_size = batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE
+    frequencies = [frequency]
+    if frequency == CustomUser.NotificationFrequencyChoices.hourly:
+        frequencies.append(CustomUser.NotificationFrequencyChoices.immediate)
+
+    sent = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            PendingNotification.objects
+            .filter(user_id__gt=last_user_id, user__notification_frequency__in=frequencies)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not user_ids:
+            return sent
+        last_user_id = user_ids[-1]
+
+        with transaction.atomic():
+            rows = list(
+                PendingNotification.objects
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(user_id__in=user_ids)
+                .order_by('user_id', 'id')
+                .values_list('id', 'user_id', 'user__email', 'user__name', 'content__title', 'content__category__name', 'content__state')
+            )
+            PendingNotification.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+            digests = {}
+            for _, user_id, email, name, title, category, state in rows:
+                if state == Content.StateChoices.publish:
+                    digests.setdefault(user_id, (email, name, []))[2].append((title, category))
+            items = [
+                (email, {"message": digest_message(contents)}, {"name": name})
+                for email, name, contents in digests.values()
+            ]
+            if items:
+                transaction.on_commit(
+                    lambda items=items: send_bulk_notification_task.delay(DIGEST_SUBJECT, items, "email/notification.html")
+                )
+        sent += len(items)
@@ -0,0 +1,88 @@
+from django.conf import settings
+
+from notification.tasks import send_bulk_notification_task
+from suscription.models import Suscription
+
+
+def active_subscriptions(category, **filters):
+    """
+    Suscripciones no canceladas de una categoría.
+
+    :param category: Categoría de las suscripciones.
+    :type category: Category
+    :param filters: Filtros adicionales sobre las suscripciones.
+    :type filters: dict
+    :return: Queryset de suscripciones.
+    :rtype: QuerySet
+    """
+
+    return Suscription.objects.filter(category=category, **filters).exclude(state=Suscription.SuscriptionState.cancelled)
+
+
+def subscriber_rows(subscriptions, *fields, chunk_size=None):
+    """
+    Recorre el correo y el nombre de cada suscriptor junto con los campos indicados, sin cargar las suscripciones
+    ni sus usuarios.
+
+    Utiliza `values_list` con `iterator`, por lo que las filas se leen de la base de datos de a `chunk_size`
+    por vez y la memoria utilizada no depende de la cantidad de suscriptores.
+
+    :param subscriptions: Suscripciones a recorrer.
+    :type subscriptions: QuerySet
+    :param fields: Campos adicionales de la suscripción a incluir en cada fila.
+    :type fields: str
+    :param chunk_size: Cantidad de filas por lectura. Por defecto `NOTIFICATION_FANOUT_CHUNK_SIZE`.
+    :type chunk_size: int
+    :return: Iterador de tuplas `(correo, nombre, *campos)`.
+    :rtype: iterator
+    """
+
+    chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    rows = subscriptions.order_by('id').values_list('user__email', 'user__name', *fields)
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def fan_out(subject, template, recipients, context, chunk_size=None):
+    """
+    Envía una notificación a muchos destinatarios encolando una tarea por cada lote de destinatarios.
+
+    Cada destinatario se indica con la clave de su contexto, de modo que los destinatarios que reciben el mismo
+    mensaje comparten un único contexto por lote, que se renderiza una única vez; el nombre de cada destinatario
+    se reemplaza en el correo ya renderizado. Cada lote se envía con `send_bulk_notification_task`, por lo que
+    una categoría con 100.000 suscriptores genera unos cientos de mensajes en el broker en lugar de 100.000.
+
+    :param subject: Asunto del correo electrónico.
+    :type subject: str
+    :param template: Ruta del template HTML que será utilizado para los correos.
+    :type template: str
+    :param recipients: Iterable de ternas `(correo, nombre, clave del contexto)`. La clave debe ser una cadena.
+    :type recipients: iterable
+    :param context: Función que recibe una clave y devuelve el contexto del correo.
+    :type context: function
+    :param chunk_size: Cantidad de destinatarios por tarea. Por defecto `NOTIFICATION_FANOUT_CHUNK_SIZE`.
+    :type chunk_size: int
+    :return: Cantidad de tareas encoladas.
+    :rtype: int
+    """
+
+    chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    contexts = {}
+    tasks = 0
+    chunk = []
+
+    def flush():
+        keys = {key for _, key, _ in chunk}
+        send_bulk_notification_task.delay(subject, chunk, template, {key: contexts[key] for key in keys})
+
+    for email, name, key in recipients:
+        if key not in contexts:
+            contexts[key] = context(key)
+        chunk.append((email, key, {'name': name}))
+        if len(chunk) >= chunk_size:
+            flush()
+            tasks += 1
+            chunk = []
+    if chunk:
+        flush()
+        tasks += 1
+    return tasks
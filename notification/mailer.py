@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.utils.html import escape, strip_tags
+
+logger = logging.getLogger(__name__)
+
+# Conexión de correo reutilizada por cada hilo de un worker
+_local = threading.local()
+
+# Marcador de un campo propio de cada destinatario (`recipient.<campo>` en el template)
+RECIPIENT_PLACEHOLDER = '[[recipient.{}]]'
+RECIPIENT_PLACEHOLDER_RE = re.compile(r'\[\[recipient\.(\w+)\]\]')
+
+# Correos ya renderizados, por hash del template y su contexto
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+class RenderedEmail:
+    """
+    Correo renderizado una única vez, en HTML y texto plano, con los campos de cada destinatario pendientes.
+
+    El resultado del template se divide en los marcadores de los campos del destinatario, de modo que generar
+    el correo de cada destinatario solo une las partes con sus valores.
+
+    :attribute html_parts: Partes del HTML; las posiciones impares son nombres de campos.
+    :type html_parts: list
+    :attribute text_parts: Partes del texto plano; las posiciones impares son nombres de campos.
+    :type text_parts: list
+    """
+
+    def __init__(self, html, text):
+        self.html_parts = RECIPIENT_PLACEHOLDER_RE.split(html)
+        self.text_parts = RECIPIENT_PLACEHOLDER_RE.split(text)
+
+    @staticmethod
+    def _fill(parts, fields, convert):
+        if len(parts) == 1:
+            return parts[0]
+        return ''.join(part if i % 2 == 0 else convert(fields.get(part, '')) for i, part in enumerate(parts))
+
+    def render(self, fields=None):
+        """
+        Genera el correo de un destinatario.
+
+        :param fields: Valores de los campos del destinatario.
+        :type fields: dict
+        :return: HTML y texto plano del correo.
+        :rtype: tuple
+        """
+
+        fields = fields or {}
+        return self._fill(self.html_parts, fields, escape), self._fill(self.text_parts, fields, str)
+
+
+def render_email(template, context, fields=()):
+    """
+    Renderiza un template de correo una única vez por proceso para cada contexto.
+
+    El resultado se guarda en una caché local, limitada a `EMAIL_RENDER_CACHE_SIZE` entradas, con el hash
+    del template, el contexto y los nombres de los campos del destinatario como clave. Los campos del destinatario
+    se renderizan como marcadores (`recipient.<campo>` en el template) que se reemplazan con
+    :meth:`RenderedEmail.render`.
+
+    :param template: Ruta del template HTML.
+    :type template: str
+    :param context: Contexto común a todos los destinatarios. Debe poder serializarse en JSON.
+    :type context: dict
+    :param fields: Nombres de los campos propios de cada destinatario.
+    :type fields: iterable
+    :return: Correo renderizado.
+    :rtype: RenderedEmail
+    """
+
+    fields = sorted(fields)
+    key = hashlib.sha256(json.dumps([template, context, fields], sort_keys=True, default=str).encode()).hexdigest()
+    with _rendered_lock:
+        rendered = _rendered.get(key)
+        if rendered is not None:
+            _rendered.move_to_end(key)
+            return rendered
+
+    full_context = dict(context)
+    if fields:
+        full_context['recipient'] = {field: RECIPIENT_PLACEHOLDER.format(field) for field in fields}
+    html = render_to_string(template, context=full_context)
+    rendered = RenderedEmail(html, strip_tags(html))
+
+    with _rendered_lock:
+        _rendered[key] = rendered
+        while len(_rendered) > settings.EMAIL_RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return rendered
+
+
+def build_email(my_subject, recipient_list, context, template, fields=None):
+    """
+    Construye un correo electrónico en formato HTML y texto plano a partir de un template.
+
+    El template se renderiza una única vez por contexto (:func:`render_email`); los campos del destinatario
+    se reemplazan en el resultado ya renderizado.
+
+    :param my_subject: Asunto del correo electrónico.
+    :type my_subject: str
+    :param recipient_list: Lista de destinatarios del correo.
+    :type recipient_list: list
+    :param context: Contexto para renderizar el template del correo.
+    :type context: dict
+    :param template: Ruta del template HTML que será utilizado para el correo.
+    :type template: str
+    :param fields: Campos propios del destinatario, por ejemplo su nombre (`{"name": ...}`). Los campos vacíos se omiten.
+    :type fields: dict
+    :return: Mensaje listo para enviarse.
+    :rtype: EmailMultiAlternatives
+    """
+
+    fields = {field: value for field, value in (fields or {}).items() if value}
+    html_message, plain_message = render_email(template, context, fields).render(fields)
+
+    message = EmailMultiAlternatives(
+        subject=my_subject,
+        body=plain_message,
+        from_email=None,
+        to=recipient_list
+    )
+
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def pooled_connection():
+    """
+    Conexión de correo del worker actual, reutilizada entre tareas para no abrir una sesión SMTP/TLS por mensaje.
+
+    La conexión se descarta si estuvo sin usarse más de `EMAIL_CONNECTION_MAX_IDLE` segundos, ya que
+    el servidor probablemente cerró la sesión.
+
+    :return: Conexión del backend de correo configurado.
+    :rtype: BaseEmailBackend
+    """
+
+    connection = getattr(_local, 'connection', None)
+    if connection is not None and time.monotonic() - _local.last_used > settings.EMAIL_CONNECTION_MAX_IDLE:
+        close_pooled_connection()
+        connection = None
+    if connection is None:
+        connection = _local.connection = get_connection()
+    _local.last_used = time.monotonic()
+    return connection
+
+
+def close_pooled_connection():
+    """
+    Cierra la conexión de correo del worker actual, si existe.
+    """
+
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"Error al cerrar la conexión de correo: {e}")
+
+
+def _send(connection, message):
+    try:
+        connection.send_messages([message])
+    except Exception:
+        # La sesión pudo haberse cortado: se reabre y se reintenta una única vez
+        connection.close()
+        connection.open()
+        connection.send_messages([message])
+
+
+def send_messages(messages, connection=None, batch_size=None, rate_limit=None):
+    """
+    Envía varios correos reutilizando una única sesión con el servidor, en lotes y con un límite de velocidad.
+
+    La sesión se abre una sola vez para todos los mensajes. Cada mensaje se envía por separado dentro de ella,
+    para que un destinatario rechazado no impida enviar el resto ni obligue a reenviar mensajes ya entregados;
+    si la sesión se corta, se reabre y el mensaje se reintenta una vez. Entre lotes se espera lo necesario para
+    no superar `rate_limit` mensajes por segundo.
+
+    :param messages: Mensajes a enviar.
+    :type messages: list
+    :param connection: Conexión a utilizar. Por defecto, la conexión del worker (:func:`pooled_connection`).
+    :type connection: BaseEmailBackend
+    :param batch_size: Cantidad de mensajes por lote. Por defecto `EMAIL_BATCH_SIZE`.
+    :type batch_size: int
+    :param rate_limit: Mensajes por segundo como máximo, 0 para no limitar. Por defecto `EMAIL_RATE_LIMIT`.
+    :type rate_limit: float
+    :return: Lista de pares `(índice del mensaje, excepción)` de los mensajes que no pudieron enviarse.
+    :rtype: list
+    """
+
+    connection = connection or pooled_connection()
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    rate_limit = settings.EMAIL_RATE_LIMIT if rate_limit is None else rate_limit
+
+    failed = []
+    started = time.monotonic()
+    # Con la sesión abierta de antemano, `send_messages` no la cierra luego de cada mensaje
+    connection.open()
+    for start in range(0, len(messages), batch_size):
+        for index, message in enumerate(messages[start:start + batch_size], start):
+            try:
+                _send(connection, message)
+            except Exception as e:
+                logger.warning(f"Error al enviar el correo a {', '.join(message.to)}: {e}")
+                failed.append((index, e))
+
+        if rate_limit:
+            wait = (start + batch_size) / rate_limit - (time.monotonic() - started)
+            if wait > 0 and start + batch_size < len(messages):
+                time.sleep(wait)
+    return failed
@@ -0,0 +1,107 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.mail.backends import locmem
+from django.core.management.base import BaseCommand, CommandError
+
+from notification import mailer
+
+
+class SessionLatencyBackend(locmem.EmailBackend):
+    """
+    Backend en memoria que simula el costo de abrir una sesión SMTP/TLS con el servidor.
+
+    Al igual que el backend SMTP, `send_messages` abre la sesión si no estaba abierta y la cierra al terminar.
+    """
+
+    def __init__(self, latency=0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.opened = False
+
+    def open(self):
+        if self.opened:
+            return False
+        time.sleep(self.latency)
+        self.opened = True
+        return True
+
+    def close(self):
+        self.opened = False
+
+    def send_messages(self, messages):
+        new_conn_created = self.open()
+        sent = super().send_messages(messages)
+        if new_conn_created:
+            self.close()
+        return sent
+
+
+class Command(BaseCommand):
+    """
+    Compara el envío de un correo por sesión (`EmailMessage.send`) contra el envío en lote de `notification.mailer`.
+
+    Por defecto utiliza un backend en memoria que simula la latencia de abrir la sesión; con `--smtp` se envían
+    los correos a un servidor SMTP local sin TLS (por ejemplo `python -m aiosmtpd -n -l localhost:8025`).
+
+    Uso::
+
+        ./manage.py benchmark_email_delivery --messages 200 --latency 80
+        ./manage.py benchmark_email_delivery --smtp localhost:8025
+    """
+
+    help = 'Compara la velocidad del envío de correos por mensaje y en lote reutilizando la sesión.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Cantidad de correos a enviar con cada método.')
+        parser.add_argument('--latency', type=float, default=50, help='Milisegundos simulados para abrir cada sesión.')
+        parser.add_argument('--smtp', help='Servidor SMTP local (host:puerto) a utilizar en lugar del backend simulado.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Cantidad de mensajes por lote.')
+        parser.add_argument('--rate-limit', type=float, default=0, help='Mensajes por segundo como máximo en el envío en lote.')
+
+    def handle(self, *args, **options):
+        if options['smtp']:
+            host, _, port = options['smtp'].partition(':')
+            if not port.isdigit():
+                raise CommandError('El servidor SMTP debe indicarse como host:puerto.')
+
+            def make_connection():
+                return get_connection('django.core.mail.backends.smtp.EmailBackend', host=host, port=int(port),
+                                      username='', password='', use_tls=False, use_ssl=False)
+        else:
+            def make_connection():
+                return SessionLatencyBackend(latency=options['latency'] / 1000)
+
+        items = [(f'benchmark{i}@cms.local', {'message': f'Mensaje de prueba {i}'}) for i in range(options['messages'])]
+
+        def build():
+            return [mailer.build_email('Benchmark', [recipient], context, 'email/notification.html') for recipient, context in items]
+
+        def per_message():
+            for message in build():
+                message.connection = make_connection()
+                message.send()
+
+        def batched():
+            connection = make_connection()
+            failed = mailer.send_messages(build(), connection=connection, batch_size=options['batch_size'],
+                                          rate_limit=options['rate_limit'])
+            connection.close()
+            if failed:
+                self.stderr.write(f'No se pudieron enviar {len(failed)} correos.')
+
+        per_message_s = self.measure(per_message)
+        batched_s = self.measure(batched)
+
+        total = len(items)
+        self.stdout.write(f'Correos por método: {total}  backend: {options["smtp"] or "simulado"}')
+        self.stdout.write(f'Una sesión por correo: {per_message_s:.2f} s ({total / per_message_s:.1f} correos/s)')
+        self.stdout.write(f'Sesión reutilizada   : {batched_s:.2f} s ({total / batched_s:.1f} correos/s)')
+        if batched_s:
+            self.stdout.write(f'Mejora: x{per_message_s / batched_s:.1f}')
+
+    @staticmethod
+    def measure(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from notification import mailer
+
+
+class Command(BaseCommand):
+    """
+    Compara el renderizado del template de un correo por destinatario contra el renderizado único de
+    `notification.mailer.render_email`, que solo reemplaza el nombre de cada destinatario.
+
+    Uso::
+
+        ./manage.py benchmark_email_rendering --recipients 10000
+    """
+
+    help = 'Compara la velocidad de renderizar el template de un correo por destinatario y una única vez.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=10000, help='Cantidad de destinatarios.')
+        parser.add_argument('--template', default='email/notification.html', help='Template del correo.')
+
+    def handle(self, *args, **options):
+        template = options['template']
+        context = {'message': 'Se ha publicado un nuevo contenido en la categoría a la que estás suscrito.'}
+        names = [f'Suscriptor {i}' for i in range(options['recipients'])]
+
+        def per_recipient():
+            for name in names:
+                html = render_to_string(template, context={**context, 'recipient': {'name': name}})
+                strip_tags(html)
+
+        def render_once():
+            mailer._rendered.clear()
+            for name in names:
+                mailer.render_email(template, context, ['name']).render({'name': name})
+
+        per_recipient_s = self.measure(per_recipient)
+        render_once_s = self.measure(render_once)
+
+        total = len(names)
+        self.stdout.write(f'Destinatarios: {total}  template: {template}')
+        self.stdout.write(f'Render por destinatario: {per_recipient_s * 1000:.0f} ms ({total / per_recipient_s:.0f} correos/s)')
+        self.stdout.write(f'Render único           : {render_once_s * 1000:.0f} ms ({total / render_once_s:.0f} correos/s)')
+        if render_once_s:
+            self.stdout.write(f'Mejora: x{per_recipient_s / render_once_s:.1f}')
+
+    @staticmethod
+    def measure(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from app.listener import Listener
+from notification import outbox
+
+
+class Command(BaseCommand):
+    """
+    Despachador de los correos de la tabla de salida (`notification.outbox`).
+
+    Envía los correos pendientes y espera el aviso de que se registraron nuevos (`LISTEN`/`NOTIFY` de PostgreSQL),
+    que llega al confirmarse la transacción que los registró.
+
+    Uso::
+
+        ./manage.py run_notification_dispatcher
+        ./manage.py run_notification_dispatcher --once
+    """
+
+    help = 'Envía en lote los correos registrados en la tabla de salida apenas se confirman.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Envía los correos pendientes y termina.')
+        parser.add_argument('--max-sleep', type=int, default=settings.NOTIFICATION_OUTBOX_MAX_SLEEP,
+                            help='Segundos máximos de espera entre dos revisiones de la tabla de salida.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self._dispatch()
+            return
+
+        listener = Listener(outbox.OUTBOX_CHANNEL)
+        while True:
+            try:
+                # La suscripción se hace antes de revisar la tabla para no perder los avisos intermedios
+                listener.listen()
+                self._dispatch()
+                listener.wait(options['max_sleep'])
+            except OperationalError as e:
+                self.stderr.write(f'Error de conexión con la base de datos: {e}')
+                connection.close()
+                time.sleep(options['max_sleep'])
+
+    def _dispatch(self):
+        dispatched = outbox.dispatch()
+        if dispatched:
+            self.stdout.write(f'{timezone.now():%Y-%m-%d %H:%M:%S} Correos enviados: {dispatched}')
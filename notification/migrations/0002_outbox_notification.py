@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 04:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0001_pending_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Asunto')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='Destinatario')),
+                ('template', models.CharField(max_length=255, verbose_name='Template')),
+                ('context', models.JSONField(verbose_name='Contexto')),
+                ('fields', models.JSONField(blank=True, null=True, verbose_name='Campos del destinatario')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de registro')),
+            ],
+            options={
+                'verbose_name': 'Correo pendiente',
+                'verbose_name_plural': 'Correos pendientes',
+                'db_table': 'notification_outbox',
+            },
+        ),
+    ]
@@ -1,3 +1,86 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from app.models import CustomUser
+from content.models import Content
+
+
+class PendingNotification(models.Model):
+    """
+    Aviso de un nuevo contenido pendiente de enviarse en el próximo resumen de un usuario.
+
+    Los usuarios que eligieron recibir resúmenes (`CustomUser.notification_frequency`) no reciben un correo por
+    cada contenido publicado: cada aviso se registra en esta tabla y se agrupan en un único correo por usuario
+    y período (ver `notification.digest`).
+
+    :attribute user: Usuario que recibirá el aviso.
+    :type user: ForeignKey
+    :attribute content: Contenido publicado.
+    :type content: ForeignKey
+    :attribute created_at: Fecha en que se registró el aviso.
+    :type created_at: DateTimeField
+    """
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='pending_notifications', verbose_name='Usuario')
+    content = models.ForeignKey(Content, on_delete=models.CASCADE, related_name='+', verbose_name='Contenido')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha de registro')
+
+    class Meta:
+        verbose_name = 'Notificación pendiente'
+        verbose_name_plural = 'Notificaciones pendientes'
+        db_table = 'notification_pending'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content'], name='notification_pending_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Devuelve una representación en cadena del aviso pendiente.
+
+        :return: El usuario y el contenido.
+        :rtype: str
+        """
+        return f"{self.user} - {self.content}"
+
+
+class OutboxNotification(models.Model):
+    """
+    Correo pendiente de enviarse, registrado en la misma transacción que el cambio que lo origina.
+
+    Los correos no se encolan en Celery desde la solicitud: se insertan en esta tabla y un despachador los envía
+    en lote (ver `notification.outbox`), por lo que un correo de una transacción revertida nunca se envía.
+
+    :attribute subject: Asunto del correo.
+    :type subject: CharField
+    :attribute recipient: Destinatario del correo.
+    :type recipient: EmailField
+    :attribute template: Ruta del template HTML del correo.
+    :type template: CharField
+    :attribute context: Contexto para renderizar el template.
+    :type context: JSONField
+    :attribute fields: Campos propios del destinatario, como su nombre.
+    :type fields: JSONField
+    :attribute created_at: Fecha en que se registró el correo.
+    :type created_at: DateTimeField
+    """
+
+    subject = models.CharField(max_length=255, verbose_name='Asunto')
+    recipient = models.EmailField(verbose_name='Destinatario')
+    template = models.CharField(max_length=255, verbose_name='Template')
+    context = models.JSONField(verbose_name='Contexto')
+    fields = models.JSONField(null=True, blank=True, verbose_name='Campos del destinatario')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha de registro')
+
+    class Meta:
+        verbose_name = 'Correo pendiente'
+        verbose_name_plural = 'Correos pendientes'
+        db_table = 'notification_outbox'
+
+    def __str__(self):
+        """
+        Devuelve una representación en cadena del correo pendiente.
+
+        :return: El destinatario y el asunto.
+        :rtype: str
+        """
+        return f"{self.recipient} - {self.subject}"
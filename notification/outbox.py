@@ -0,0 +1,75 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from app import listener
+from notification.models import OutboxNotification
+from notification.tasks import send_bulk_notification_task
+
+# Canal de PostgreSQL en el que se avisa al despachador que hay correos pendientes
+OUTBOX_CHANNEL = 'notification_outbox'
+
+
+def enqueue(subject, recipient_list, context, template, fields=None):
+    """
+    Registra un correo por destinatario en la tabla de salida, para enviarse al confirmarse la transacción actual.
+
+    Reemplaza a `send_notification_task.delay`: no se accede al broker durante la solicitud y, si la transacción
+    se revierte, el correo se descarta con ella. El despachador (`./manage.py run_notification_dispatcher`) recibe
+    un aviso al confirmarse la transacción y envía los correos en lote.
+
+    :param subject: Asunto del correo electrónico.
+    :type subject: str
+    :param recipient_list: Lista de destinatarios del correo.
+    :type recipient_list: list
+    :param context: Contexto para renderizar el template del correo. Debe poder serializarse en JSON.
+    :type context: dict
+    :param template: Ruta del template HTML que será utilizado para el correo.
+    :type template: str
+    :param fields: Campos propios del destinatario, como su nombre (`{"name": ...}`).
+    :type fields: dict
+    """
+
+    OutboxNotification.objects.bulk_create([
+        OutboxNotification(subject=subject, recipient=recipient, template=template, context=context, fields=fields)
+        for recipient in recipient_list
+    ])
+    listener.notify(OUTBOX_CHANNEL)
+
+
+def dispatch(batch_size=None):
+    """
+    Envía todos los correos pendientes de la tabla de salida.
+
+    Cada lote de correos se bloquea con `SELECT ... FOR UPDATE SKIP LOCKED`, por lo que varios despachadores
+    (el proceso `run_notification_dispatcher` y la tarea de respaldo de Celery Beat) pueden ejecutarse a la vez
+    sin repetir correos. Los correos de un lote con el mismo asunto y template se encolan en una única
+    `send_bulk_notification_task`, con un contexto por cada mensaje distinto. Las tareas se encolan antes de
+    eliminar los correos en la misma transacción: si el broker no está disponible, los correos siguen pendientes.
+
+    :param batch_size: Cantidad máxima de correos por lote. Por defecto `NOTIFICATION_OUTBOX_BATCH_SIZE`.
+    :type batch_size: int
+    :return: Cantidad de correos encolados para su envío.
+    :rtype: int
+    """
+
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            rows = list(OutboxNotification.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+            if not rows:
+                return dispatched
+
+            groups = {}
+            for row in rows:
+                items, contexts = groups.setdefault((row.subject, row.template), ([], {}))
+                key = contexts.setdefault(json.dumps(row.context, sort_keys=True), str(len(contexts)))
+                items.append((row.recipient, key, row.fields))
+            for (subject, template), (items, contexts) in groups.items():
+                contexts = {key: json.loads(context) for context, key in contexts.items()}
+                send_bulk_notification_task.delay(subject, items, template, contexts)
+
+            OutboxNotification.objects.filter(id__in=[row.id for row in rows]).delete()
+        dispatched += len(rows)
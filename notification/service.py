@@ -1,11 +1,10 @@
 from datetime import datetime
 
-import stripe
-
 from category.models import Category
-from cms.profile import base
-from notification.tasks import send_notification_task
-from django.utils.timezone import make_aware
+from content.service import state_change_message
+from notification.fanout import active_subscriptions, fan_out, subscriber_rows
+from notification import outbox
+from django.utils.timezone import localtime, make_aware
 
 from suscription.models import Suscription
 
@@ -26,27 +25,13 @@ def changeState (recipient_list, content, oldState):
     """
 
     template = "email/notification.html"
-    title = content.title
-    newState = content.state
-
-    mappState = {
-        "draft": "Borrador",
-        "revision": "Edicion",
-        "to_publish": "A publicar",
-        "publish": "Publicado",
-        "inactive": "Inactivo"
-    }
-
-    mappOldstate = mappState[oldState]
-    mappNewstate = mappState[newState]
-
-    message = "Tu contenido " + title + " ha cambiado de estado " + mappOldstate + " a " + mappNewstate
+    message = state_change_message(content.title, oldState, content.state)
 
     context = {
         "message": message
     }
 
-    send_notification_task.delay("Cambio de estado", recipient_list, context, template)
+    outbox.enqueue("Cambio de estado", recipient_list, context, template)
 
 
 def changeRole(user, groups, added):
@@ -81,7 +66,7 @@ def changeRole(user, groups, added):
     }
 
     # Enviar la notificación al usuario
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 def welcomeUser(user):
     """
@@ -103,31 +88,35 @@ def welcomeUser(user):
         "message": message,
     }
 
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
-def expire_content(autor, content):
+def expired_contents(autor, titles):
     """
-    Notifica al autor cuando su contenido ha expirado.
+    Notifica al autor, en un único correo, los contenidos suyos que han expirado.
 
-    :param autor: Autor del contenido.
+    :param autor: Autor de los contenidos.
     :type autor: User
-    :param content: Contenido que ha expirado.
-    :type content: Content
+    :param titles: Títulos de los contenidos expirados.
+    :type titles: list
 
-    La función envía una notificación al autor cuando el contenido creado por él ha llegado
-    a su fecha de expiración.
+    Si expiró un solo contenido, el mensaje lo nombra en singular.
     """
 
     template = "email/notification.html"
-    subject = "Contenido vencido"
-    message = f"Tu contenido {content.title} ha expirado"
+    if len(titles) == 1:
+        subject = "Contenido vencido"
+        message = f"Tu contenido {titles[0]} ha expirado"
+    else:
+        subject = "Contenidos vencidos"
+        message = f"Tus contenidos {', '.join(titles[:-1])} y {titles[-1]} han expirado"
 
     context = {
         "message": message,
     }
 
-    send_notification_task.delay(subject, [autor.email], context, template)
+    outbox.enqueue(subject, [autor.email], context, template)
+
 
 def payment_success(user, category, invoice):
     """
@@ -169,7 +158,7 @@ def payment_success(user, category, invoice):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
 def payment_failed(user, category, invoice,first_payment = None):
@@ -220,7 +209,7 @@ def payment_failed(user, category, invoice,first_payment = None):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
 def subscription_cancelled(user, category):
@@ -246,7 +235,7 @@ def subscription_cancelled(user, category):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
 def subscription_pending_cancellation(user, category,subscription):
@@ -282,7 +271,7 @@ def subscription_pending_cancellation(user, category,subscription):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
 def category_changed_to_paid(category):
@@ -297,10 +286,9 @@ def category_changed_to_paid(category):
 
     template = "email/notification.html"
     subject = f"La categoría {category.name} ahora es de pago"
-    list_subscriptions = Suscription.objects.filter(category=category).exclude(state=Suscription.SuscriptionState.cancelled)
-    for subscription in list_subscriptions:
-        user = subscription.user
-        if subscription.state == Suscription.SuscriptionState.active:
+
+    def context(state):
+        if state == Suscription.SuscriptionState.active:
             message = f"""
             Queremos informarte que la categoría {category.name}, a la que estás suscrito, ahora es de pago.
     
@@ -310,10 +298,11 @@ def category_changed_to_paid(category):
             message = f"""
             Queremos informarte que la categoría {category.name} ahora es de pago.
             """
-        context = {
+        return {
             "message": message,
         }
-        send_notification_task.delay(subject, [user.email], context, template)
+
+    fan_out(subject, template, subscriber_rows(active_subscriptions(category), 'state'), context)
 
 
 def category_changed_to_not_paid(category):
@@ -334,10 +323,9 @@ def category_changed_to_not_paid(category):
         "Suscriptor": "para Suscriptores"
     }
     subject = f"La categoría {category.name} ahora es {typeMapped[type]}"
-    list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False).exclude(state=Suscription.SuscriptionState.cancelled)
-    for subscription in list_subscriptions:
-        user = subscription.user
-        if subscription.state == Suscription.SuscriptionState.active:
+
+    def context(state):
+        if state == Suscription.SuscriptionState.active:
             message = f"""
             Nos complace informarte que la categoría {category.name}, a la que estabas suscrito, ahora es {typeMapped[type]}. 
     
@@ -349,10 +337,12 @@ def category_changed_to_not_paid(category):
             message = f"""
             Nos complace informarte que la categoría {category.name} ahora es {typeMapped[type]}.
             """
-        context = {
+        return {
             "message": message,
         }
-        send_notification_task.delay(subject, [user.email], context, template)
+
+    subscriptions = active_subscriptions(category, stripe_subscription_id__isnull=False)
+    fan_out(subject, template, subscriber_rows(subscriptions, 'state'), context)
 
 
 def category_price_changed(category, old_category_paid=None):
@@ -367,29 +357,27 @@ def category_price_changed(category, old_category_paid=None):
     :return: None
     """
 
-    stripe.api_key = base.STRIPE_SECRET_KEY
-
     template = "email/notification.html"
     subject = f"El precio de la categoría {category.name} ha cambiado"
-    list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False).exclude(state=Suscription.SuscriptionState.cancelled)
+    subscriptions = active_subscriptions(category, stripe_subscription_id__isnull=False)
     new_price = category.price
 
     if old_category_paid is None:
         old_category_paid = True
 
-    for subscription in list_subscriptions:
-        user = subscription.user
-
-        stripe_subscription = stripe.Subscription.retrieve(subscription.stripe_subscription_id)
-        current_period_end = stripe_subscription.current_period_end
-
-        # Convertir Unix timestamp a objetos datetime
-        dt_period_end = make_aware(datetime.fromtimestamp(current_period_end))
+    def recipients():
+        for email, name, state, current_period_end in subscriber_rows(subscriptions, 'state', 'current_period_end'):
+            # La fecha de fin del período solo se informa a los suscriptores activos de una categoría que ya era paga.
+            # Se guarda con los webhooks de Stripe (`suscription.service.sync_subscription`), sin consultar a Stripe.
+            if not (old_category_paid and state == Suscription.SuscriptionState.active) or not current_period_end:
+                yield email, name, ''
+                continue
 
-        # Conversión horaria (%d/%m/%Y %H:%M:%S %Z)
-        formatted_period_end = dt_period_end.strftime('%d/%m/%Y a las %H:%M')
+            # Conversión horaria (%d/%m/%Y %H:%M:%S %Z)
+            yield email, name, localtime(current_period_end).strftime('%d/%m/%Y a las %H:%M')
 
-        if old_category_paid and subscription.state == Suscription.SuscriptionState.active:
+    def context(formatted_period_end):
+        if formatted_period_end:
             message = f"""
             Te informamos que el precio de la categoría {category.name} ha sido actualizado a {new_price} PYS mensuales.
     
@@ -401,10 +389,11 @@ def category_price_changed(category, old_category_paid=None):
             message = f"""
             Te informamos que el precio de la categoría {category.name} ha sido actualizado a {new_price} PYS mensuales.
             """
-        context = {
+        return {
             "message": message,
         }
-        send_notification_task.delay(subject, [user.email], context, template)
+
+    fan_out(subject, template, recipients(), context)
 
 
 def category_state_changed(category):
@@ -418,23 +407,22 @@ def category_state_changed(category):
     """
 
     template = "email/notification.html"
-    list_subscriptions = Suscription.objects.filter(category=category).exclude(state=Suscription.SuscriptionState.cancelled)
+    rows = subscriber_rows(active_subscriptions(category), 'state')
 
     if category.is_active:
         subject = f"La categoría {category.name} ha sido activada: Acceso habilitado"
         message = f"""
         Nos complace informarte que la categoría {category.name} ha sido activada. A partir de ahora, puedes acceder a todos los contenidos de esta categoría nuevamente.
         """
-        for subscription in list_subscriptions:
-            user = subscription.user
-            context = {
-                "message": message,
-            }
-            send_notification_task.delay(subject, [user.email], context, template)
+        context = {
+            "message": message,
+        }
+        fan_out(subject, template, ((email, name, '') for email, name, state in rows), lambda key: context)
     else:
-        for subscription in list_subscriptions:
-            if category.type == Category.TypeChoices.paid and subscription.state == Suscription.SuscriptionState.active:
-                subject = f"La categoría {category.name} ha sido desactivada: Acceso suspendido"
+        subject = f"La categoría {category.name} ha sido desactivada: Acceso suspendido"
+
+        def context(state):
+            if category.type == Category.TypeChoices.paid and state == Suscription.SuscriptionState.active:
                 message = f"""
                 Queremos informarte que la categoría {category.name} ha sido desactivada y ya no estará disponible para acceder a sus contenidos.
 
@@ -443,15 +431,14 @@ def category_state_changed(category):
                 Lamentamos cualquier inconveniente que esto pueda causarte y agradecemos tu confianza en nosotros.
                 """
             else:
-                subject = f"La categoría {category.name} ha sido desactivada: Acceso suspendido"
                 message = f"""
                 Queremos informarte que la categoría {category.name} ha sido desactivada. A partir de ahora, ya no podrás acceder a los contenidos de esta categoría.
                 """
-            user = subscription.user
-            context = {
+            return {
                 "message": message,
             }
-            send_notification_task.delay(subject, [user.email], context, template)
+
+        fan_out(subject, template, rows, context)
 
 
 def category_name_changed(category, old_name):
@@ -468,16 +455,14 @@ def category_name_changed(category, old_name):
 
     template = "email/notification.html"
     subject = f"El nombre de la categoría {old_name} ha sido cambiado"
-    list_subscriptions = Suscription.objects.filter(category=category).exclude(state=Suscription.SuscriptionState.cancelled)
     message = f"""
     Te informamos que el nombre de la categoría {old_name} ha sido cambiado a {category.name}.
     """
-    for subscription in list_subscriptions:
-        user = subscription.user
-        context = {
-            "message": message,
-        }
-        send_notification_task.delay(subject, [user.email], context, template)
+    context = {
+        "message": message,
+    }
+    recipients = ((email, name, '') for email, name in subscriber_rows(active_subscriptions(category)))
+    fan_out(subject, template, recipients, lambda key: context)
 
 
 def user_deactivated(user):
@@ -498,7 +483,7 @@ def user_deactivated(user):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
+    outbox.enqueue(subject, [user.email], context, template)
 
 
 def user_email_changed(user, old_email):
@@ -521,5 +506,5 @@ def user_email_changed(user, old_email):
     context = {
         "message": message,
     }
-    send_notification_task.delay(subject, [user.email], context, template)
-    send_notification_task.delay(subject, [old_email], context, template)
\ No newline at end of file
+    outbox.enqueue(subject, [user.email], context, template)
+    outbox.enqueue(subject, [old_email], context, template)
\ No newline at end of file
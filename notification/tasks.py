@@ -1,17 +1,17 @@
 import logging
 
 from celery import shared_task
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.conf import settings
 
 from content.models import Content
-from suscription.models import Suscription
+from content.service import state_change_message
+from notification import mailer
+from notification.mailer import build_email
 
 logger = logging.getLogger(__name__) # __name__ será 'notifications'
 
-@shared_task()
-def send_notification_task(my_subject, recipient_list ,context, template):
+@shared_task(bind=True, max_retries=settings.EMAIL_MAX_RETRIES)
+def send_notification_task(self, my_subject, recipient_list ,context, template, fields=None):
     """
     Envía una notificación por correo electrónico de forma asíncrona.
 
@@ -23,27 +23,69 @@ def send_notification_task(my_subject, recipient_list ,context, template):
     :type context: dict
     :param template: Ruta del template HTML que será utilizado para el correo.
     :type template: str
+    :param fields: Campos propios del destinatario, como su nombre (`{"name": ...}`).
+    :type fields: dict
 
-    La función genera un mensaje en formato HTML y texto plano, y envía el correo a los destinatarios.
-    Si ocurre un error durante el envío, se registra en el logger.
+    La función genera un mensaje en formato HTML y texto plano, y lo envía utilizando la conexión del worker
+    (`notification.mailer`). Si ocurre un error durante el envío, la tarea se reintenta luego de
+    `EMAIL_RETRY_DELAY` segundos, hasta `EMAIL_MAX_RETRIES` veces; el error final se registra en el logger.
     """
 
-    html_message = render_to_string(template, context=context)
-    plain_message = strip_tags(html_message)
+    message = build_email(my_subject, recipient_list, context, template, fields)
+
+    try:
+        failed = mailer.send_messages([message])
+    except Exception as e:
+        failed = [(0, e)]
+
+    if failed:
+        error = failed[0][1]
+        if not self.request.called_directly and self.request.retries < self.max_retries:
+            raise self.retry(exc=error, countdown=settings.EMAIL_RETRY_DELAY)
+        logger.error(f"Error al enviar el correo: {error}")
+
+
+@shared_task(bind=True, max_retries=settings.EMAIL_MAX_RETRIES)
+def send_bulk_notification_task(self, my_subject, items, template, contexts=None):
+    """
+    Envía en lote un correo por destinatario, cada uno con su propio contexto, utilizando una única sesión.
 
-    message = EmailMultiAlternatives(
-        subject=my_subject,
-        body=plain_message,
-        from_email=None,
-        to=recipient_list
-    )
+    Cada contexto distinto se renderiza una única vez (`notification.mailer.render_email`) y los campos de cada
+    destinatario se reemplazan en el resultado. Los mensajes se envían con :func:`notification.mailer.send_messages`,
+    en lotes de `EMAIL_BATCH_SIZE` y respetando `EMAIL_RATE_LIMIT`. Cada mensaje que falla se reintenta por separado con
+    `send_notification_task`; si no se puede abrir la sesión, se reintenta el lote completo.
 
-    message.attach_alternative(html_message, "text/html")
+    :param my_subject: Asunto del correo electrónico.
+    :type my_subject: str
+    :param items: Lista de pares `(destinatario, contexto)`, o de ternas `(destinatario, contexto, campos)` con
+                  los campos propios de cada destinatario (`{"name": ...}`).
+    :type items: list
+    :param template: Ruta del template HTML que será utilizado para los correos.
+    :type template: str
+    :param contexts: Contextos compartidos por varios destinatarios. Si se indica, el segundo elemento de cada
+                     par de `items` es la clave de su contexto en este diccionario.
+    :type contexts: dict
+    :return: Cantidad de correos enviados.
+    :rtype: int
+    """
 
+    items = [(item[0], item[1], item[2] if len(item) > 2 else None) for item in items]
+    if contexts is not None:
+        items = [(recipient, contexts[key], fields) for recipient, key, fields in items]
+    messages = [build_email(my_subject, [recipient], context, template, fields) for recipient, context, fields in items]
     try:
-        message.send()
+        failed = mailer.send_messages(messages)
     except Exception as e:
-        logger.error(f"Error al enviar el correo: {e}")
+        mailer.close_pooled_connection()
+        if not self.request.called_directly and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=settings.EMAIL_RETRY_DELAY)
+        logger.error(f"Error al enviar los correos: {e}")
+        return 0
+
+    for index, error in failed:
+        recipient, context, fields = items[index]
+        send_notification_task.apply_async((my_subject, [recipient], context, template, fields), countdown=settings.EMAIL_RETRY_DELAY)
+    return len(messages) - len(failed)
 
 
 @shared_task()
@@ -54,18 +96,132 @@ def notify_new_content_suscription(content_id):
     :param content_id: ID del contenido que ha sido publicado.
     :type content_id: int
 
-    La función busca todas las suscripciones activas a la categoría del contenido recién publicado
-    y envía una notificación a los usuarios suscritos.
+    La función recorre las suscripciones activas a la categoría del contenido recién publicado
+    y encola una tarea de envío por cada lote de suscriptores con notificaciones inmediatas (`notification.fanout`).
+    Para los suscriptores que reciben resúmenes, el aviso se registra para su próximo resumen (`notification.digest`).
     """
 
-    content = Content.objects.get(id=content_id)
-    category_id = content.category
-    suscriptions = Suscription.objects.filter(category_id=category_id).exclude(state=Suscription.SuscriptionState.cancelled)
+    from app.models import CustomUser
+    from notification.digest import queue_pending
+    from notification.fanout import active_subscriptions, fan_out, subscriber_rows
+
+    content = Content.objects.select_related('category').get(id=content_id)
     template = "email/notification.html"
     subject = "Nuevo contenido en una categoría de tu interés"
     message = f"Se ha publicado el contenido {content.title} en la categoría {content.category.name} que podría interesarte."
     context = {
         "message": message,
     }
-    for suscription in suscriptions:
-        send_notification_task.delay(subject, [suscription.user.email], context, template)
\ No newline at end of file
+    subscriptions = active_subscriptions(content.category_id)
+    queue_pending(subscriptions, content)
+    immediate = subscriptions.filter(user__notification_frequency=CustomUser.NotificationFrequencyChoices.immediate)
+    recipients = ((email, name, '') for email, name in subscriber_rows(immediate))
+    fan_out(subject, template, recipients, lambda key: context)
+
+
+# Notificaciones de `notification.service` sobre cambios de una categoría, enviadas a todos sus suscriptores
+CATEGORY_NOTIFICATIONS = (
+    'category_changed_to_paid',
+    'category_changed_to_not_paid',
+    'category_price_changed',
+    'category_state_changed',
+    'category_name_changed',
+)
+
+# Campos de la categoría que se guardan al encolar la notificación, para informar los valores del cambio
+CATEGORY_FIELDS = ('name', 'description', 'type', 'price', 'is_active')
+
+
+@shared_task()
+def notify_category_change(category_id, notification_name, fields, *args):
+    """
+    Notifica a los suscriptores de una categoría un cambio realizado en ella.
+
+    Las señales de `Category` encolan esta tarea al confirmarse la transacción que guarda la categoría, por lo
+    que la solicitud no recorre a los suscriptores ni accede al broker por cada lote de correos, y un cambio
+    revertido no se notifica. El recorrido de los suscriptores (`notification.fanout`) se realiza en el worker.
+
+    :param category_id: ID de la categoría.
+    :type category_id: int
+    :param notification_name: Notificación a enviar, una de `CATEGORY_NOTIFICATIONS`.
+    :type notification_name: str
+    :param fields: Valores de `CATEGORY_FIELDS` de la categoría al guardarse, que se informan en los correos.
+    :type fields: dict
+    :param args: Argumentos adicionales de la notificación, como el nombre anterior de la categoría.
+    :type args: list
+    """
+
+    import notification.service
+    from category.models import Category
+
+    if notification_name not in CATEGORY_NOTIFICATIONS:
+        raise ValueError(f"Notificación '{notification_name}' no válida.")
+    category = Category.objects.filter(id=category_id).first()
+    if category is None:
+        return
+    for field in CATEGORY_FIELDS:
+        if field in fields:
+            setattr(category, field, fields[field])
+    getattr(notification.service, notification_name)(category, *args)
+
+
+@shared_task()
+def send_notification_digests(frequency):
+    """
+    Envía los resúmenes de nuevos contenidos de los usuarios con la frecuencia indicada.
+
+    :param frequency: Frecuencia de los resúmenes a enviar (`hourly` o `daily`).
+    :type frequency: str
+    :return: Cantidad de resúmenes enviados.
+    :rtype: int
+    """
+
+    from notification.digest import send_digests
+
+    return send_digests(frequency)
+
+
+@shared_task()
+def notify_state_changes(changes, published_ids=()):
+    """
+    Notifica en lote a los autores los cambios de estado realizados desde el tablero Kanban.
+
+    Obtiene todos los contenidos con una única consulta y envía los correos en lote utilizando una sola sesión.
+    Luego notifica a los suscriptores de los contenidos publicados indicados.
+
+    :param changes: Lista de pares `[content_id, estado anterior]`.
+    :type changes: list
+    :param published_ids: IDs de los contenidos publicados cuya publicación debe notificarse a los suscriptores.
+    :type published_ids: list
+    """
+
+    old_states = dict((content_id, old_state) for content_id, old_state in changes)
+    contents = Content.objects.filter(id__in=old_states).select_related('autor')
+    template = "email/notification.html"
+
+    items = [
+        (content.autor.email, {"message": state_change_message(content.title, old_states[content.id], content.state)},
+         {"name": content.autor.name})
+        for content in contents
+    ]
+    if items:
+        send_bulk_notification_task("Cambio de estado", items, template)
+
+    for content_id in published_ids:
+        notify_new_content_suscription(content_id)
+
+
+@shared_task()
+def dispatch_notification_outbox():
+    """
+    Envía los correos pendientes de la tabla de salida.
+
+    Respaldo periódico del proceso `run_notification_dispatcher`, que los envía apenas se registran.
+
+    :return: Cantidad de correos encolados para su envío.
+    :rtype: int
+    """
+
+    from notification.outbox import dispatch
+
+    return dispatch()
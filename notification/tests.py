@@ -1,8 +1,15 @@
-from django.test import TestCase
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
 from unittest.mock import patch
 from django.utils.timezone import now
 from app.models import CustomUser
 from notification.service import *
+from django.db import transaction
+from notification import mailer, outbox
+from notification.digest import send_digests
+from notification.models import OutboxNotification, PendingNotification
+from notification.tasks import notify_category_change, notify_new_content_suscription, notify_state_changes, send_bulk_notification_task
 from content.models import Content
 from category.models import Category
 from suscription.models import Suscription
@@ -96,85 +103,90 @@ class NotificationServiceTests(TestCase):
         post_delete.connect(handle_category_after_delete, sender=Category)
         super().tearDown()
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_change_state(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_change_state(self, mock_enqueue):
         """
         Prueba el cambio de estado de un contenido.
 
         Verifica que se envíe una notificación al cambiar el estado del contenido.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         changeState([self.user.email], self.content, "draft")
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Cambio de estado")
         self.assertIn("Tu contenido Test Content ha cambiado de estado", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_change_role(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_change_role(self, mock_enqueue):
         """
         Prueba el cambio de roles para un usuario.
 
         Verifica que se envíe una notificación al añadir un usuario a un grupo o rol.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         from django.contrib.auth.models import Group
         group = Group.objects.create(name="Test Group")
         changeRole(self.user, [group], added=True)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Has sido añadido a un rol.")
         self.assertIn("Test Group", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_welcome_user(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_welcome_user(self, mock_enqueue):
         """
         Prueba el envío de un mensaje de bienvenida.
 
         Verifica que se envíe una notificación al registrar un nuevo usuario.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         welcomeUser(self.user)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "¡Bienvenido a nuestra aplicación!")
         self.assertIn("Gracias por registrarte en nuestra aplicación", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_expire_content(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_expired_contents(self, mock_enqueue):
         """
-        Prueba la notificación de contenido vencido.
+        Prueba la notificación de contenidos vencidos.
 
-        Verifica que se envíe una notificación cuando un contenido ha expirado.
+        Verifica que se envíe una única notificación por autor, en singular si expiró un solo contenido.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
-        expire_content(self.user, self.content)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        expired_contents(self.user, [self.content.title])
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Contenido vencido")
         self.assertIn("Tu contenido Test Content ha expirado", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_payment_success(self, mock_send_notification_task):
+        expired_contents(self.user, ["Uno", "Dos", "Tres"])
+        args, kwargs = mock_enqueue.call_args
+        self.assertEqual(args[0], "Contenidos vencidos")
+        self.assertIn("Tus contenidos Uno, Dos y Tres han expirado", args[2]["message"])
+        self.assertEqual(mock_enqueue.call_count, 2)
+
+    @patch("notification.outbox.enqueue")
+    def test_payment_success(self, mock_enqueue):
         """
         Prueba la notificación de pago exitoso.
 
         Verifica que se envíe una notificación cuando un pago relacionado con una suscripción se procesa correctamente.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         class FakeInvoice:
@@ -189,20 +201,20 @@ class NotificationServiceTests(TestCase):
 
         invoice = FakeInvoice()
         payment_success(self.user, self.category, invoice)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Pago exitoso")
         self.assertIn("tu pago por la categoría Test Category ha sido procesado exitosamente", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_payment_failed(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_payment_failed(self, mock_enqueue):
         """
         Prueba la notificación de pago fallido.
 
         Verifica que se envíe una notificación cuando un intento de pago relacionado con una suscripción falla.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         class FakeInvoice:
@@ -212,24 +224,401 @@ class NotificationServiceTests(TestCase):
 
         invoice = FakeInvoice()
         payment_failed(self.user, self.category, invoice)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Pago fallido")
         self.assertIn("Lamentamos informarte que el intento de pago de tu suscripción", args[2]["message"])
 
-    @patch("notification.tasks.send_notification_task.delay")
-    def test_subscription_cancelled(self, mock_send_notification_task):
+    @patch("notification.outbox.enqueue")
+    def test_subscription_cancelled(self, mock_enqueue):
         """
         Prueba la notificación de cancelación de suscripción.
 
         Verifica que se envíe una notificación cuando una suscripción ha sido cancelada.
 
-        :param mock_send_notification_task: Mock que simula la tarea de envío de notificaciones.
-        :type mock_send_notification_task: MagicMock
+        :param mock_enqueue: Mock que simula el registro del correo en la tabla de salida.
+        :type mock_enqueue: MagicMock
         """
 
         subscription_cancelled(self.user, self.category)
-        mock_send_notification_task.assert_called_once()
-        args, kwargs = mock_send_notification_task.call_args
+        mock_enqueue.assert_called_once()
+        args, kwargs = mock_enqueue.call_args
         self.assertEqual(args[0], "Suscripción cancelada")
         self.assertIn("tu suscripción a la categoría Test Category ha sido cancelada", args[2]["message"])
+
+    @patch("notification.tasks.notify_new_content_suscription")
+    def test_notify_state_changes(self, mock_notify_suscription):
+        """
+        Prueba la notificación en lote de cambios de estado.
+
+        Verifica que se envíe un correo por contenido utilizando una única conexión y que solo se notifique
+        a los suscriptores de los contenidos publicados indicados.
+
+        :param mock_notify_suscription: Mock que simula la notificación a los suscriptores.
+        :type mock_notify_suscription: MagicMock
+        """
+
+        other = Content.objects.create(title="Other Content", summary="Summary", category=self.category,
+                                       autor=self.user, state=Content.StateChoices.publish, date_published=now())
+        mailer.close_pooled_connection()
+        with patch("notification.mailer.get_connection", wraps=mail.get_connection) as mock_connection:
+            notify_state_changes([[self.content.id, "revision"], [other.id, "to_publish"]], [other.id])
+
+        mock_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+        bodies = sorted(message.body for message in mail.outbox)
+        self.assertIn("Tu contenido Other Content ha cambiado de estado A publicar a Publicado", bodies[0])
+        self.assertIn("Tu contenido Test Content ha cambiado de estado Edicion a Borrador", bodies[1])
+        mock_notify_suscription.assert_called_once_with(other.id)
+
+
+class RejectingBackend(locmem.EmailBackend):
+    """
+    Backend en memoria que rechaza los correos dirigidos a `rechazado@example.com` y cuenta las sesiones abiertas.
+    """
+
+    sessions = 0
+
+    def open(self):
+        RejectingBackend.sessions += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'rechazado@example.com' in message.to:
+                raise Exception('Destinatario rechazado')
+        return super().send_messages(messages)
+
+
+class NotificationMailerTests(TestCase):
+    """
+    Clase de pruebas para el envío de correos en lote (`notification.mailer`).
+    """
+
+    template = "email/notification.html"
+
+    def setUp(self):
+        """
+        Descarta la conexión reutilizada por pruebas anteriores y reinicia el contador de sesiones.
+        """
+
+        mailer.close_pooled_connection()
+        RejectingBackend.sessions = 0
+
+    def tearDown(self):
+        """
+        Descarta la conexión creada durante la prueba.
+        """
+
+        mailer.close_pooled_connection()
+        super().tearDown()
+
+    def items(self, *recipients):
+        return [(recipient, {"message": f"Hola {recipient}"}) for recipient in recipients]
+
+    @patch("notification.mailer.time.sleep")
+    def test_send_messages_in_batches(self, mock_sleep):
+        """
+        Verifica que los mensajes se envíen en lotes con la velocidad limitada, y que un mensaje rechazado
+        no impida enviar el resto.
+        """
+        recipients = ['a@example.com', 'b@example.com', 'rechazado@example.com', 'c@example.com', 'd@example.com']
+        messages = [mailer.build_email("Asunto", [recipient], context, self.template) for recipient, context in self.items(*recipients)]
+
+        failed = mailer.send_messages(messages, connection=RejectingBackend(), batch_size=2, rate_limit=100)
+
+        self.assertEqual([index for index, error in failed], [2])
+        self.assertEqual([message.to[0] for message in mail.outbox], ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])
+        # Una sesión para todo el envío y otra al reintentar el mensaje rechazado
+        self.assertEqual(RejectingBackend.sessions, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @override_settings(EMAIL_BACKEND='notification.tests.RejectingBackend')
+    @patch("notification.tasks.send_notification_task.apply_async")
+    def test_failed_messages_are_retried_individually(self, mock_retry):
+        """
+        Verifica que el envío en lote reintente por separado, con `send_notification_task`, solo los mensajes que fallaron.
+        """
+        items = self.items('a@example.com', 'rechazado@example.com', 'b@example.com')
+
+        self.assertEqual(send_bulk_notification_task("Asunto", items, self.template), 2)
+
+        self.assertEqual(len(mail.outbox), 2)
+        mock_retry.assert_called_once()
+        self.assertEqual(mock_retry.call_args.args[0], ("Asunto", ['rechazado@example.com'], items[1][1], self.template, None))
+
+    @patch("notification.mailer.render_to_string", wraps=mailer.render_to_string)
+    def test_template_rendered_once_per_context(self, mock_render):
+        """
+        Verifica que el template se renderice una única vez por contexto y que el nombre de cada destinatario
+        se reemplace en el correo ya renderizado, escapado en el HTML.
+        """
+        context = {"message": "Render único"}
+        first = mailer.build_email("Asunto", ['a@example.com'], context, self.template, {"name": "Ana"})
+        second = mailer.build_email("Asunto", ['b@example.com'], context, self.template, {"name": "<Beto>"})
+        anonymous = mailer.build_email("Asunto", ['c@example.com'], context, self.template)
+
+        # Una vez con el campo del nombre y otra sin él
+        self.assertEqual(mock_render.call_count, 2)
+        self.assertIn("Hola Ana:", first.body)
+        self.assertIn("Hola &lt;Beto&gt;:", second.alternatives[0][0])
+        self.assertIn("Hola <Beto>:", second.body)
+        self.assertNotIn("Hola", anonymous.body)
+        self.assertIn("Render único", anonymous.body)
+
+    def test_pooled_connection_is_reused(self):
+        """
+        Verifica que la conexión del worker se reutilice entre envíos y se renueve luego de estar inactiva.
+        """
+        connection = mailer.pooled_connection()
+        self.assertIs(mailer.pooled_connection(), connection)
+        with override_settings(EMAIL_CONNECTION_MAX_IDLE=-1):
+            self.assertIsNot(mailer.pooled_connection(), connection)
+
+
+class NotificationFanOutTests(TestCase):
+    """
+    Clase de pruebas para el envío de notificaciones a todos los suscriptores de una categoría (`notification.fanout`).
+    """
+
+    def setUp(self):
+        """
+        Crea una categoría con suscriptores activos, uno pendiente de cancelación y uno cancelado.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.category = Category.objects.create(name="Fan Out", type=Category.TypeChoices.paid, price=10000)
+        states = [Suscription.SuscriptionState.active] * 3 + [
+            Suscription.SuscriptionState.pending_cancellation, Suscription.SuscriptionState.cancelled,
+        ]
+        for i, state in enumerate(states):
+            user = CustomUser.objects.create_user(email=f"subscriber{i}@example.com", name=f"Subscriber {i}", password="password123")
+            Suscription.objects.create(user=user, category=self.category, state=state, stripe_subscription_id=f"sub_{i}")
+
+    def tearDown(self):
+        """
+        Reconecta las señales después de completar las pruebas.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    @override_settings(NOTIFICATION_FANOUT_CHUNK_SIZE=2)
+    @patch("notification.tasks.send_bulk_notification_task.delay")
+    def test_one_task_per_chunk(self, mock_send_bulk):
+        """
+        Verifica que los suscriptores se lean con una única consulta y se encole una tarea por lote,
+        con un contexto por cada mensaje distinto del lote.
+        """
+        with self.assertNumQueries(1):
+            category_changed_to_paid(self.category)
+
+        self.assertEqual(mock_send_bulk.call_count, 2)
+        recipients = {}
+        names = {}
+        for call in mock_send_bulk.call_args_list:
+            subject, items, template, contexts = call.args
+            self.assertEqual(subject, "La categoría Fan Out ahora es de pago")
+            self.assertEqual(set(contexts), {key for _, key, _ in items})
+            recipients.update((email, contexts[key]["message"]) for email, key, _ in items)
+            names.update((email, fields["name"]) for email, _, fields in items)
+
+        self.assertEqual(len(recipients), 4)
+        self.assertNotIn("subscriber4@example.com", recipients)
+        self.assertIn("a la que estás suscrito", recipients["subscriber0@example.com"])
+        self.assertNotIn("a la que estás suscrito", recipients["subscriber3@example.com"])
+        self.assertEqual(names["subscriber3@example.com"], "Subscriber 3")
+
+    @patch("notification.tasks.send_bulk_notification_task.delay")
+    @patch("suscription.tasks.sync_stripe.delay")
+    @patch("notification.tasks.notify_category_change.delay")
+    def test_category_changes_are_notified_on_commit(self, mock_notify, mock_sync, mock_send_bulk):
+        """
+        Verifica que guardar una categoría encole una única tarea al confirmarse la transacción, sin recorrer a los
+        suscriptores en la solicitud, que un cambio revertido no se notifique y que la tarea envíe los correos.
+        """
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.category.name = "Renombrada"
+                self.category.save()
+                raise RuntimeError("Error al guardar")
+        self.assertFalse(mock_notify.called)
+
+        self.category.refresh_from_db()
+        self.category.name = "Renombrada"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertFalse(mock_send_bulk.called)
+        mock_notify.assert_called_once()
+        category_id, notification_name, fields, old_name = mock_notify.call_args.args
+        self.assertEqual((category_id, notification_name, fields["name"], old_name),
+                         (self.category.id, "category_name_changed", "Renombrada", "Fan Out"))
+
+        notify_category_change(*mock_notify.call_args.args)
+        self.assertEqual(mock_send_bulk.call_args.args[0], "El nombre de la categoría Fan Out ha sido cambiado")
+        self.assertEqual(len(mock_send_bulk.call_args.args[1]), 4)
+
+    @patch("notification.tasks.send_bulk_notification_task.delay")
+    def test_new_content_shares_context(self, mock_send_bulk):
+        """
+        Verifica que la notificación de un nuevo contenido envíe un único contexto para todos los suscriptores.
+        """
+        content = Content.objects.create(title="Nuevo", summary="Resumen", category=self.category,
+                                         autor=CustomUser.objects.first(), state=Content.StateChoices.publish)
+        notify_new_content_suscription(content.id)
+
+        mock_send_bulk.assert_called_once()
+        subject, items, template, contexts = mock_send_bulk.call_args.args
+        self.assertEqual(len(items), 4)
+        self.assertEqual(list(contexts), [""])
+        self.assertIn("Se ha publicado el contenido Nuevo", contexts[""]["message"])
+
+    def test_bulk_task_with_shared_contexts(self):
+        """
+        Verifica que la tarea de envío en lote resuelva el contexto de cada destinatario a partir de su clave.
+        """
+        mailer.close_pooled_connection()
+        contexts = {"a": {"message": "Mensaje A"}, "b": {"message": "Mensaje B"}}
+        items = [["uno@example.com", "a"], ["dos@example.com", "b"], ["tres@example.com", "a"]]
+
+        self.assertEqual(send_bulk_notification_task("Asunto", items, "email/notification.html", contexts), 3)
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        self.assertIn("Mensaje A", bodies["tres@example.com"])
+        self.assertIn("Mensaje B", bodies["dos@example.com"])
+
+
+class NotificationDigestTests(TestCase):
+    """
+    Clase de pruebas para los resúmenes de nuevos contenidos (`notification.digest`).
+    """
+
+    def setUp(self):
+        """
+        Crea una categoría con un suscriptor de cada frecuencia de notificaciones y un contenido publicado.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.category = Category.objects.create(name="Resumen", type=Category.TypeChoices.public)
+        self.users = {}
+        for frequency in CustomUser.NotificationFrequencyChoices.values:
+            user = CustomUser.objects.create_user(email=f"{frequency}@example.com", name=frequency.title(),
+                                                  password="password123", notification_frequency=frequency)
+            Suscription.objects.create(user=user, category=self.category, state=Suscription.SuscriptionState.active)
+            self.users[frequency] = user
+        self.content = self.create_content("Primero")
+
+    def tearDown(self):
+        """
+        Reconecta las señales después de completar las pruebas.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def create_content(self, title, state=Content.StateChoices.publish):
+        return Content.objects.create(title=title, summary="Resumen", category=self.category,
+                                      autor=self.users["immediate"], state=state)
+
+    @patch("notification.tasks.send_bulk_notification_task.delay")
+    def test_new_content_is_queued_for_digest_users(self, mock_send_bulk):
+        """
+        Verifica que solo los suscriptores inmediatos reciban el aviso y que el resto quede pendiente una única vez.
+        """
+        notify_new_content_suscription(self.content.id)
+        notify_new_content_suscription(self.content.id)
+
+        subject, items, template, contexts = mock_send_bulk.call_args.args
+        self.assertEqual([email for email, _, _ in items], ["immediate@example.com"])
+        pending = PendingNotification.objects.order_by('user_id').values_list('user__email', 'content_id')
+        self.assertEqual(list(pending), [("hourly@example.com", self.content.id), ("daily@example.com", self.content.id)])
+
+    @patch("notification.digest.send_bulk_notification_task.delay")
+    def test_send_digests(self, mock_send_bulk):
+        """
+        Verifica que se envíe un único resumen por usuario, en lotes, con los contenidos aún publicados,
+        y que los avisos enviados se eliminen.
+        """
+        second = self.create_content("Segundo")
+        hidden = self.create_content("Oculto")
+        for content in (self.content, second, hidden):
+            notify_new_content_suscription(content.id)
+        Content.objects.filter(id=hidden.id).update(state=Content.StateChoices.inactive)
+        mock_send_bulk.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(send_digests(CustomUser.NotificationFrequencyChoices.hourly, batch_size=1), 1)
+
+        mock_send_bulk.assert_called_once()
+        subject, items, template = mock_send_bulk.call_args.args
+        [(email, context, fields)] = items
+        self.assertEqual((email, fields), ("hourly@example.com", {"name": "Hourly"}))
+        self.assertIn("- Primero (Resumen)\n- Segundo (Resumen)", context["message"])
+        self.assertNotIn("Oculto", context["message"])
+        self.assertEqual(list(PendingNotification.objects.values_list('user__email', flat=True).distinct()), ["daily@example.com"])
+
+
+class NotificationOutboxTests(TestCase):
+    """
+    Clase de pruebas para la tabla de salida de correos (`notification.outbox`).
+    """
+
+    template = "email/notification.html"
+
+    def test_rolled_back_notifications_are_discarded(self):
+        """
+        Verifica que los correos registrados en una transacción revertida no queden pendientes.
+        """
+        try:
+            with transaction.atomic():
+                outbox.enqueue("Asunto", ["a@example.com"], {"message": "Mensaje"}, self.template)
+                raise RuntimeError("Error en la solicitud")
+        except RuntimeError:
+            pass
+
+        self.assertFalse(OutboxNotification.objects.exists())
+
+    @patch("notification.outbox.send_bulk_notification_task.delay")
+    def test_dispatch_groups_pending_notifications(self, mock_send_bulk):
+        """
+        Verifica que el despachador encole una tarea por asunto y template, con un contexto por mensaje
+        distinto, y que elimine los correos despachados.
+        """
+        outbox.enqueue("Asunto", ["a@example.com", "b@example.com"], {"message": "Mensaje A"}, self.template, {"name": "Ana"})
+        outbox.enqueue("Asunto", ["c@example.com"], {"message": "Mensaje C"}, self.template)
+        outbox.enqueue("Otro asunto", ["d@example.com"], {"message": "Mensaje D"}, self.template)
+
+        self.assertEqual(outbox.dispatch(batch_size=3), 4)
+
+        self.assertEqual(mock_send_bulk.call_count, 2)
+        first, second = [call.args for call in mock_send_bulk.call_args_list]
+        subject, items, template, contexts = first
+        self.assertEqual(subject, "Asunto")
+        self.assertEqual(items, [("a@example.com", "0", {"name": "Ana"}), ("b@example.com", "0", {"name": "Ana"}), ("c@example.com", "1", None)])
+        self.assertEqual(contexts, {"0": {"message": "Mensaje A"}, "1": {"message": "Mensaje C"}})
+        self.assertEqual(second[0], "Otro asunto")
+        self.assertFalse(OutboxNotification.objects.exists())
@@ -0,0 +1,133 @@
+from django.db import connection
+
+from content.models import Content
+from rating.models import Rating
+
+# Valores válidos de una calificación
+RATING_VALUES = range(1, 6)
+
+# Registra o modifica la calificación y aplica la diferencia a los acumulados del contenido en una única sentencia:
+#   - `previous` obtiene la calificación anterior del usuario, si existía.
+#   - `upserted` inserta o actualiza la calificación, solo si el contenido existe. La actualización solo se aplica
+#     si la calificación sigue siendo la leída en `previous`; si otra solicitud la modificó en paralelo no se
+#     devuelve ninguna fila y la sentencia se reintenta.
+#   - El UPDATE final suma la calificación nueva y resta la anterior a la suma, la cantidad y el histograma,
+#     y deriva `rating_avg` de los nuevos valores.
+RATE_CONTENT_SQL = """
+WITH previous AS (
+    SELECT rating FROM {rating} WHERE user_id = %(user)s AND content_id = %(content)s
+), upserted AS (
+    INSERT INTO {rating} (user_id, content_id, rating, created_at)
+    SELECT %(user)s, %(content)s, %(rating)s, NOW()
+    WHERE EXISTS (SELECT 1 FROM {content} WHERE id = %(content)s)
+    ON CONFLICT (user_id, content_id) DO UPDATE SET rating = EXCLUDED.rating
+    WHERE {rating}.rating = (SELECT rating FROM previous)
+    RETURNING rating
+), delta AS (
+    SELECT u.rating AS new, p.rating AS old FROM upserted u LEFT JOIN previous p ON TRUE
+)
+UPDATE {content} c SET
+    rating_sum = c.rating_sum + d.new - COALESCE(d.old, 0),
+    rating_count = c.rating_count + (d.old IS NULL)::int,
+    {buckets},
+    rating_avg = (c.rating_sum + d.new - COALESCE(d.old, 0))::float / (c.rating_count + (d.old IS NULL)::int)
+FROM delta d
+WHERE c.id = %(content)s
+RETURNING c.rating_avg, c.rating_count
+"""
+
+# Cantidad máxima de intentos si la calificación se modifica en paralelo
+RATE_CONTENT_ATTEMPTS = 3
+
+_BUCKET_SQL = 'rating_{n} = c.rating_{n} + (d.new = {n})::int - COALESCE((d.old = {n})::int, 0)'
+
+
+def rate_content(content_id, user, value):
+    """
+    Registra o modifica la calificación de un usuario sobre un contenido.
+
+    La calificación se guarda con un `INSERT ... ON CONFLICT DO UPDATE` y en la misma sentencia se aplica la
+    diferencia entre el valor anterior y el nuevo a `rating_sum`, `rating_count` y al histograma del contenido,
+    recalculando `rating_avg` sin volver a recorrer todas sus calificaciones.
+
+    :param content_id: ID del contenido.
+    :type content_id: int
+    :param user: Usuario que califica.
+    :type user: CustomUser
+    :param value: Calificación, entre 1 y 5.
+    :type value: int
+    :return: Diccionario con el promedio y la cantidad de calificaciones actualizados, o None si el contenido no existe.
+    :rtype: dict
+    :raises ValueError: Si la calificación no está entre 1 y 5.
+    :raises RuntimeError: Si la calificación se modifica en paralelo en todos los intentos.
+    """
+
+    if value not in RATING_VALUES:
+        raise ValueError('La calificación debe estar entre 1 y 5.')
+
+    qn = connection.ops.quote_name
+    sql = RATE_CONTENT_SQL.format(
+        rating=qn(Rating._meta.db_table),
+        content=qn(Content._meta.db_table),
+        buckets=',\n    '.join(_BUCKET_SQL.format(n=n) for n in RATING_VALUES),
+    )
+    params = {'content': content_id, 'user': user.id, 'rating': value}
+    for _ in range(RATE_CONTENT_ATTEMPTS):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is not None:
+            return {'rating_avg': row[0], 'rating_count': row[1]}
+        # Sin filas: el contenido no existe o la calificación cambió en paralelo y se vuelve a intentar
+        if not Content.objects.filter(id=content_id).exists():
+            return None
+    raise RuntimeError('No se pudo registrar la calificación por modificaciones concurrentes.')
+
+
+def recompute_rating_aggregates(content_ids=None, dry_run=False):
+    """
+    Recalcula los acumulados de calificación a partir de las calificaciones registradas.
+
+    Utiliza una única sentencia con los totales agrupados por contenido y solo modifica los contenidos cuyos
+    acumulados difieren, por lo que sirve para reparar desvíos o cambios hechos fuera de `rate_content`.
+
+    :param content_ids: IDs de los contenidos a recalcular. Si es None se recalculan todos.
+    :type content_ids: list
+    :param dry_run: Si es True solo cuenta los contenidos con desvíos, sin modificarlos.
+    :type dry_run: bool
+    :return: Cantidad de contenidos con acumulados desviados.
+    :rtype: int
+    """
+
+    qn = connection.ops.quote_name
+    table = qn(Content._meta.db_table)
+    buckets = [f'rating_{n}' for n in RATING_VALUES]
+    params = []
+    where = ''
+    if content_ids is not None:
+        where = 'WHERE c.id = ANY(%s)'
+        params.append(list(content_ids))
+
+    totals = (
+        f'SELECT c.id, COALESCE(r.total, 0) AS rating_sum, COALESCE(r.votes, 0) AS rating_count, '
+        + ', '.join(f'COALESCE(r.{bucket}, 0) AS {bucket}' for bucket in buckets)
+        + f' FROM {table} c LEFT JOIN (SELECT content_id, SUM(rating) AS total, COUNT(*) AS votes, '
+        + ', '.join(f'COUNT(*) FILTER (WHERE rating = {n}) AS rating_{n}' for n in RATING_VALUES)
+        + f' FROM {qn(Rating._meta.db_table)} GROUP BY content_id) r ON r.content_id = c.id {where}'
+    )
+    columns = ['rating_sum', 'rating_count'] + buckets
+    drift = ' OR '.join(f'{table}.{column} <> s.{column}' for column in columns)
+    drift += f' OR {table}.rating_avg <> COALESCE(s.rating_sum::float / NULLIF(s.rating_count, 0), 0)'
+
+    with connection.cursor() as cursor:
+        if dry_run:
+            cursor.execute(f'SELECT COUNT(*) FROM {table} JOIN ({totals}) s ON s.id = {table}.id WHERE {drift}', params)
+            return cursor.fetchone()[0]
+        assignments = ', '.join(f'{column} = s.{column}' for column in columns)
+        cursor.execute(
+            f'UPDATE {table} SET {assignments}, '
+            f'rating_avg = COALESCE(s.rating_sum::float / NULLIF(s.rating_count, 0), 0) '
+            f'FROM ({totals}) s WHERE s.id = {table}.id AND ({drift})',
+            params,
+        )
+        return cursor.rowcount
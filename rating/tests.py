@@ -1,6 +1,7 @@
-from unittest.mock import patch
 from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from app.models import CustomUser
@@ -26,8 +27,10 @@ class RatingTestCase(TestCase):
         - :meth:`test_rate_content_unauthenticated`: Verifica que un usuario no autenticado no pueda calificar un contenido.
         - :meth:`test_rate_content_authenticated_valid`: Verifica que un usuario autenticado pueda calificar un contenido con un valor válido (1-5).
         - :meth:`test_update_existing_rating`: Verifica que un usuario pueda actualizar su calificación previa en lugar de crear una nueva.
-        - :meth:`test_rate_content_invalid_rating`: Verifica que se pueda registrar una calificación fuera del rango esperado (sin validación de rango).
+        - :meth:`test_rate_content_invalid_rating`: Verifica que no se pueda registrar una calificación fuera del rango 1-5.
         - :meth:`test_missing_rating_value`: Verifica que se devuelva un error si no se proporciona un valor de calificación.
+        - :meth:`test_rate_missing_content`: Verifica que calificar un contenido inexistente devuelva 404.
+        - :meth:`test_rate_is_single_query`: Verifica que la calificación y sus acumulados se actualicen en una única consulta.
     """
 
     def setUp(self):
@@ -85,8 +88,7 @@ class RatingTestCase(TestCase):
         post_delete.connect(handle_category_after_delete, sender=Category)
         super().tearDown()
 
-    @patch('rating.views.update_rating_avg.delay')  # Mock the Celery task
-    def test_rate_content_unauthenticated(self, mock_update_rating_avg):
+    def test_rate_content_unauthenticated(self):
         """
         Verifica que un usuario no autenticado no pueda calificar un contenido.
 
@@ -94,15 +96,15 @@ class RatingTestCase(TestCase):
             - Realiza una solicitud POST sin autenticación a la URL de calificación.
             - Verifica que el estado de la respuesta sea 403 (prohibido).
             - Confirma que el mensaje de error sea el esperado.
-            - Verifica que la tarea Celery no haya sido llamada.
+            - Verifica que los acumulados del contenido no hayan cambiado.
         """
         response = self.client.post(self.url, {'rating': 5})
         self.assertEqual(response.status_code, 403)
         self.assertJSONEqual(response.content, {'status': 'error', 'message': 'Para poder puntuar contenidos debes estar registrado'})
-        mock_update_rating_avg.assert_not_called()
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.rating_count, 0)
 
-    @patch('rating.views.update_rating_avg.delay')  # Mock the Celery task
-    def test_rate_content_authenticated_valid(self, mock_update_rating_avg):
+    def test_rate_content_authenticated_valid(self):
         """
         Verifica que un usuario autenticado pueda calificar un contenido con un valor válido (1-5).
 
@@ -111,7 +113,7 @@ class RatingTestCase(TestCase):
             - Realiza una solicitud POST con una calificación válida.
             - Verifica que el estado de la respuesta sea 200 (éxito).
             - Confirma que la calificación fue guardada correctamente en la base de datos.
-            - Verifica que la tarea Celery fue llamada una vez.
+            - Verifica que los acumulados y el histograma del contenido se hayan actualizado.
         """
         self.client.login(email='testuser@example.com', password='testpassword123')
         response = self.client.post(self.url, {'rating': 4})
@@ -122,11 +124,14 @@ class RatingTestCase(TestCase):
         rating = Rating.objects.get(user=self.user, content=self.content)
         self.assertEqual(rating.rating, 4)
 
-        # Ensure that the mocked task was called
-        mock_update_rating_avg.assert_called_once_with(self.content.id)
+        # Verificar los acumulados del contenido
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.rating_sum, 4)
+        self.assertEqual(self.content.rating_count, 1)
+        self.assertEqual(self.content.rating_4, 1)
+        self.assertEqual(self.content.rating_avg, 4.0)
 
-    @patch('rating.views.update_rating_avg.delay')  # Mock the Celery task
-    def test_update_existing_rating(self, mock_update_rating_avg):
+    def test_update_existing_rating(self):
         """
         Verifica que un usuario pueda actualizar su calificación previa en lugar de crear una nueva.
 
@@ -134,7 +139,7 @@ class RatingTestCase(TestCase):
             - Inicia sesión y califica el contenido con un valor inicial.
             - Actualiza la calificación con un nuevo valor.
             - Verifica que la calificación haya sido actualizada correctamente.
-            - Confirma que la tarea Celery fue llamada dos veces (una para cada calificación).
+            - Confirma que los acumulados reflejen solo la calificación nueva.
         """
         # Primero, calificar el contenido con un valor de 3
         self.client.login(email='testuser@example.com', password='testpassword123')
@@ -149,34 +154,30 @@ class RatingTestCase(TestCase):
         rating = Rating.objects.get(user=self.user, content=self.content)
         self.assertEqual(rating.rating, 5)
 
-        # Ensure that the mocked task was called twice
-        self.assertEqual(mock_update_rating_avg.call_count, 2)
+        # Verificar que se reemplazó la calificación anterior en los acumulados
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.rating_sum, 5)
+        self.assertEqual(self.content.rating_count, 1)
+        self.assertEqual(self.content.rating_3, 0)
+        self.assertEqual(self.content.rating_5, 1)
+        self.assertEqual(self.content.rating_avg, 5.0)
 
-    @patch('rating.views.update_rating_avg.delay')  # Mock the Celery task
-    def test_rate_content_invalid_rating(self, mock_update_rating_avg):
+    def test_rate_content_invalid_rating(self):
         """
-        Verifica que se pueda registrar una calificación fuera del rango esperado (sin validación de rango).
+        Verifica que no se pueda registrar una calificación fuera del rango 1-5.
 
         Lógica:
             - Inicia sesión con el usuario de prueba.
             - Realiza una solicitud POST con una calificación fuera de rango (por ejemplo, 10).
-            - Verifica que la respuesta sea exitosa y que el valor fuera de rango sea registrado.
-            - Confirma que la tarea Celery fue llamada una vez.
+            - Verifica que el estado de la respuesta sea 400 y que no se haya registrado la calificación.
         """
         self.client.login(email='testuser@example.com', password='testpassword123')
-        response = self.client.post(self.url, {'rating': 10})  # Valor fuera de rango, pero permitido por la vista actual
-        self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(response.content, {'status': 'success', 'message': 'Calificación guardada correctamente', 'rating': 10})
-
-        # Verificar que la calificación fue registrada en la base de datos con el valor fuera de rango
-        rating = Rating.objects.get(user=self.user, content=self.content)
-        self.assertEqual(rating.rating, 10)
-
-        # Ensure that the mocked task was called
-        mock_update_rating_avg.assert_called_once_with(self.content.id)
+        response = self.client.post(self.url, {'rating': 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {'status': 'error', 'message': 'La calificación debe estar entre 1 y 5'})
+        self.assertFalse(Rating.objects.filter(user=self.user, content=self.content).exists())
 
-    @patch('rating.views.update_rating_avg.delay')  # Mock the Celery task
-    def test_missing_rating_value(self, mock_update_rating_avg):
+    def test_missing_rating_value(self):
         """
         Verifica que se devuelva un error si no se proporciona un valor de calificación.
 
@@ -185,10 +186,40 @@ class RatingTestCase(TestCase):
             - Realiza una solicitud POST sin proporcionar un valor de calificación.
             - Verifica que el estado de la respuesta sea 400 (error de solicitud).
             - Confirma que el mensaje de error sea el esperado.
-            - Verifica que la tarea Celery no haya sido llamada.
         """
         self.client.login(email='testuser@example.com', password='testpassword123')
         response = self.client.post(self.url)  # No se proporciona 'rating'
         self.assertEqual(response.status_code, 400)
         self.assertJSONEqual(response.content, {'status': 'error', 'message': 'No se proporcionó una calificación'})
-        mock_update_rating_avg.assert_not_called()
+
+    def test_rate_missing_content(self):
+        """
+        Verifica que calificar un contenido inexistente devuelva 404 sin registrar la calificación.
+        """
+        self.client.login(email='testuser@example.com', password='testpassword123')
+        response = self.client.post(reverse('rate_content', args=[self.content.id + 1000]), {'rating': 3})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Rating.objects.exists())
+
+    def test_rate_is_single_query(self):
+        """
+        Verifica que registrar una calificación y actualizar los acumulados se haga en una única consulta.
+        """
+        other = get_user_model().objects.create_user(email='other@example.com', name='Other User', password='testpassword123')
+        Rating.objects.create(user=other, content=self.content, rating=2)
+        self.content.update_rating_avg()
+
+        self.client.login(email='testuser@example.com', password='testpassword123')
+        self.client.post(self.url, {'rating': 5})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'rating': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum('rating_rating' in query['sql'] for query in queries.captured_queries), 1)
+
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.rating_sum, self.content.rating_count), (3, 2))
+        self.assertEqual(self.content.rating_1, 1)
+        self.assertEqual(self.content.rating_2, 1)
+        self.assertEqual(self.content.rating_5, 0)
+        self.assertEqual(self.content.rating_avg, 1.5)
+        self.assertEqual([bucket['percent'] for bucket in self.content.rating_distribution()], [0, 0, 0, 50, 50])
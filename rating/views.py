@@ -1,9 +1,7 @@
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.http import JsonResponse, Http404
 
-from content.tasks import update_rating_avg
-from .models import Rating
-from content.models import Content
+from . import service
+from .service import RATING_VALUES
 from django.views.decorators.http import require_POST
 
 @require_POST
@@ -11,7 +9,7 @@ def rate_content(request, content_id):
     """
     Permite a un usuario autenticado calificar un contenido.
 
-    Este endpoint recibe una solicitud POST para puntuar un contenido. Si el usuario ya ha calificado el contenido previamente, se actualiza la calificación. Además, se actualiza el promedio de calificaciones del contenido.
+    Este endpoint recibe una solicitud POST para puntuar un contenido. Si el usuario ya ha calificado el contenido previamente, se actualiza la calificación. Además, se actualizan los acumulados (suma, cantidad, histograma y promedio) de calificaciones del contenido.
 
     :param request: El objeto de solicitud HTTP.
     :type request: HttpRequest
@@ -22,18 +20,15 @@ def rate_content(request, content_id):
     :rtype: JsonResponse
 
     Si el usuario no está autenticado, se devuelve un error 403.
-    Si no se proporciona una calificación o el valor es inválido, se devuelve un error 400.
+    Si no se proporciona una calificación o el valor es inválido o está fuera del rango 1-5, se devuelve un error 400.
+    Si el contenido no existe, se devuelve un error 404.
     """
 
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'error', 'message': 'Para poder puntuar contenidos debes estar registrado'}, status=403)
 
-    content = get_object_or_404(Content, id=content_id)
-    user = request.user
-
     # Obtener el valor del rating enviado
     rating_value = request.POST.get('rating')
-
     if not rating_value:
         return JsonResponse({'status': 'error', 'message': 'No se proporcionó una calificación'}, status=400)
 
@@ -42,15 +37,12 @@ def rate_content(request, content_id):
     except ValueError:
         return JsonResponse({'status': 'error', 'message': 'Valor de calificación no válido'}, status=400)
 
-    # Verificar si el usuario ya ha calificado este contenido
-    rating, created = Rating.objects.get_or_create(user=user, content=content)
-
-    # Actualizar la calificación
-    rating.rating = rating_value
-    rating.save()
+    if rating_value not in RATING_VALUES:
+        return JsonResponse({'status': 'error', 'message': 'La calificación debe estar entre 1 y 5'}, status=400)
 
-    # Actualizar el promedio en el modelo Content
-    update_rating_avg.delay(content_id)
+    # Registrar o actualizar la calificación y los acumulados del contenido en una única sentencia
+    if service.rate_content(content_id, request.user, rating_value) is None:
+        raise Http404
 
     return JsonResponse(
-        {'status': 'success', 'message': 'Calificación guardada correctamente', 'rating': rating.rating})
+        {'status': 'success', 'message': 'Calificación guardada correctamente', 'rating': rating_value})
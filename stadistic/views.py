@@ -89,7 +89,7 @@ def top_liked(request):
         date_end = timezone.make_aware(date_end, timezone.get_current_timezone())
         top_contents = top_contents.filter(date_published__lte=date_end)
 
-    top_contents = top_contents.filter(state=Content.StateChoices.publish, date_published__lt=timezone.now())\
+    top_contents = top_contents.filter(state=Content.StateChoices.publish)\
                                     .values('title', 'likes_count', 'date_create', 'date_published')\
                                     .order_by('-likes_count')[:10]
     data =  {
@@ -144,7 +144,7 @@ def top_disliked(request):
         date_end = timezone.make_aware(date_end, timezone.get_current_timezone())
         top_contents = top_contents.filter(date_published__lte=date_end)
 
-    top_contents = top_contents.filter(state=Content.StateChoices.publish, date_published__lt=timezone.now())\
+    top_contents = top_contents.filter(state=Content.StateChoices.publish)\
                                     .values('title', 'dislikes_count', 'date_create', 'date_published')\
                                     .order_by('-dislikes_count')[:10]
     data =  {
@@ -167,7 +167,7 @@ def top_rating(request):
 
     :comportamiento:
         - Filtra los contenidos publicados creados por el usuario autenticado.
-        - Obtiene los 10 contenidos con el promedio de calificaciones más alto, incluyendo los campos: título, promedio de calificaciones, fecha de creación y fecha de publicación.
+        - Obtiene los 10 contenidos con el promedio de calificaciones más alto, incluyendo los campos: título, promedio y cantidad de calificaciones, histograma de estrellas (`rating_1` a `rating_5`), fecha de creación y fecha de publicación.
         - Ordena los resultados por el promedio de calificaciones en orden descendente.
         - Retorna los datos en formato JSON con el estado de éxito.
 
@@ -199,8 +199,9 @@ def top_rating(request):
         date_end = timezone.make_aware(date_end, timezone.get_current_timezone())
         top_contents = top_contents.filter(date_published__lte=date_end)
 
-    top_contents = top_contents.filter(state=Content.StateChoices.publish, date_published__lt=timezone.now()) \
-                                    .values('title', 'rating_avg', 'date_create', 'date_published') \
+    top_contents = top_contents.filter(state=Content.StateChoices.publish) \
+                                    .values('title', 'rating_avg', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+                                            'date_create', 'date_published') \
                                     .order_by('-rating_avg')[:10]
     data = {
         'status': 'success',
@@ -254,7 +255,7 @@ def top_view(request):
         date_end = timezone.make_aware(date_end, timezone.get_current_timezone())
         top_contents = top_contents.filter(date_published__lte=date_end)
 
-    top_contents = top_contents.filter(state=Content.StateChoices.publish, date_published__lt=timezone.now()) \
+    top_contents = top_contents.filter(state=Content.StateChoices.publish) \
                                     .values('title', 'views_count', 'date_create', 'date_published') \
                                     .order_by('-views_count')[:10]
     data = {
@@ -308,7 +309,7 @@ def top_shares(request):
         date_end = timezone.make_aware(date_end, timezone.get_current_timezone())
         top_contents = top_contents.filter(date_published__lte=date_end)
 
-    top_contents = top_contents.filter(state=Content.StateChoices.publish, date_published__lt=timezone.now()) \
+    top_contents = top_contents.filter(state=Content.StateChoices.publish) \
                        .values('title', 'shares_count', 'date_create', 'date_published') \
                        .order_by('-shares_count')[:10]
     data = {
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import make_aware
+
+from app.models import CustomUser
+from category.models import Category
+from suscription import service, stripe_gateway
+
+
+class Command(BaseCommand):
+    """
+    Carga en el libro de facturas (:class:`suscription.models.Invoice`) las facturas pagadas registradas en Stripe.
+
+    Recorre la API de listado de facturas de Stripe página por página, con el `PaymentIntent` y su medio de pago
+    expandidos, por lo que cada página de facturas requiere una única solicitud. Las facturas ya registradas se
+    actualizan, por lo que el comando puede ejecutarse más de una vez.
+
+    Uso::
+
+        ./manage.py backfill_invoices
+        ./manage.py backfill_invoices --since 2024-10-01
+    """
+
+    help = 'Carga en el libro de facturas las facturas pagadas registradas en Stripe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Solo las facturas creadas desde esta fecha (AAAA-MM-DD).')
+        parser.add_argument('--page-size', type=int, default=100, help='Facturas por página (máximo 100).')
+
+    def handle(self, *args, **options):
+        params = {'status': 'paid', 'limit': options['page_size'], 'expand': ['data.payment_intent.payment_method']}
+        if options['since']:
+            try:
+                since = make_aware(datetime.strptime(options['since'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('La fecha debe indicarse como AAAA-MM-DD.')
+            params['created'] = {'gte': int(since.timestamp())}
+
+        users = dict(CustomUser.objects.filter(stripe_customer_id__isnull=False).values_list('stripe_customer_id', 'id'))
+        category_ids = set(Category.objects.values_list('id', flat=True))
+
+        saved = 0
+        page = stripe_gateway.call('Invoice.list', **params)
+        while True:
+            invoices = [
+                service.build_invoice(invoice, users.get(invoice.get('customer')), category_ids)
+                for invoice in page['data']
+            ]
+            invoices = [invoice for invoice in invoices if invoice is not None]
+            service.save_invoices(invoices)
+            saved += len(invoices)
+            self.stdout.write(f'Facturas registradas: {saved}')
+
+            if not page['has_more'] or not page['data']:
+                break
+            page = stripe_gateway.call('Invoice.list', **params, starting_after=page['data'][-1]['id'])
+
+        self.stdout.write(self.style.SUCCESS(f'Se registraron {saved} facturas.'))
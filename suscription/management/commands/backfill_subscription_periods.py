@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from suscription import service, stripe_gateway
+from suscription.models import Suscription
+
+
+class Command(BaseCommand):
+    """
+    Carga el estado y el período de facturación de las suscripciones registradas antes de guardarse con los webhooks.
+
+    Las suscripciones de Stripe se consultan en paralelo, en lotes de `--batch-size`. Luego de ejecutarlo una vez,
+    los webhooks `customer.subscription.*` e `invoice.paid` mantienen los datos actualizados.
+
+    Uso::
+
+        ./manage.py backfill_subscription_periods
+        ./manage.py backfill_subscription_periods --all
+    """
+
+    help = 'Carga desde Stripe el estado y el período de facturación de las suscripciones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Actualiza también las suscripciones que ya tienen período.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Suscripciones consultadas por lote.')
+
+    def handle(self, *args, **options):
+        subscriptions = Suscription.objects.filter(stripe_subscription_id__isnull=False).exclude(stripe_subscription_id='')
+        if not options['all']:
+            subscriptions = subscriptions.filter(current_period_end__isnull=True)
+        subscription_ids = list(subscriptions.order_by('id').values_list('stripe_subscription_id', flat=True))
+
+        updated = 0
+        for start in range(0, len(subscription_ids), options['batch_size']):
+            batch = subscription_ids[start:start + options['batch_size']]
+            for subscription in stripe_gateway.retrieve_many('Subscription', batch).values():
+                updated += service.sync_subscription(subscription)
+            self.stdout.write(f'Suscripciones actualizadas: {updated}')
+
+        self.stdout.write(self.style.SUCCESS(f'Se actualizaron {updated} suscripciones.'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from suscription import stripe_gateway
+
+
+class Command(BaseCommand):
+    """
+    Muestra la cantidad de llamadas a Stripe de cada operación, su duración promedio y las consultas resueltas desde la caché.
+
+    Uso::
+
+        ./manage.py stripe_stats
+        ./manage.py stripe_stats --reset
+    """
+
+    help = 'Muestra las métricas de las llamadas a Stripe realizadas a través de suscription.stripe_gateway.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operation', action='append', help='Operación a consultar, como Subscription.retrieve. Puede repetirse.')
+        parser.add_argument('--reset', action='store_true', help='Reinicia las métricas luego de mostrarlas.')
+
+    def handle(self, *args, **options):
+        for operation in options['operation'] or stripe_gateway.get_operations():
+            metrics = stripe_gateway.get_metrics(operation)
+            self.stdout.write(
+                f"{operation}: {metrics['calls']} llamadas, {metrics['errors']} errores, "
+                f"{metrics['avg_ms']:.0f} ms promedio, {metrics['cache_hits']} desde la caché"
+            )
+            if options['reset']:
+                stripe_gateway.reset_metrics(operation)
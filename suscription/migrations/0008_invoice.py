@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('category', '0004_category_name_trgm_idx'),
+        ('suscription', '0007_alter_suscription_options_alter_suscription_category_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_invoice_id', models.CharField(max_length=255, unique=True, verbose_name='ID de Factura en Stripe')),
+                ('amount', models.PositiveBigIntegerField(verbose_name='Monto')),
+                ('currency', models.CharField(max_length=3, verbose_name='Moneda')),
+                ('paid_at', models.DateTimeField(verbose_name='Fecha de Pago')),
+                ('card_brand', models.CharField(blank=True, default='', max_length=20, verbose_name='Marca de la Tarjeta')),
+                ('card_last4', models.CharField(blank=True, default='', max_length=4, verbose_name='Últimos dígitos de la Tarjeta')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='category.category', verbose_name='Categoría')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Factura',
+                'verbose_name_plural': 'Facturas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['paid_at'], name='suscription_invoice_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['category', 'paid_at'], name='suscription_invoice_cat_idx'),
+        ),
+    ]
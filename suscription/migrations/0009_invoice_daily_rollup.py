@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    # Totales de las facturas registradas antes de crear la tabla (por ejemplo, con `backfill_invoices`)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO suscription_invoicedailyrollup (day, category_id, count, amount)
+            SELECT (paid_at AT TIME ZONE %s)::date, category_id, count(*), sum(amount)
+            FROM suscription_invoice
+            WHERE category_id IS NOT NULL
+            GROUP BY 1, 2
+        """, [settings.TIME_ZONE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0004_category_name_trgm_idx'),
+        ('suscription', '0008_invoice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Cantidad')),
+                ('amount', models.BigIntegerField(default=0, verbose_name='Monto')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='category.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Total diario de facturas',
+                'verbose_name_plural': 'Totales diarios de facturas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='invoicedailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='suscription_invoice_rollup_unique'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suscription', '0009_invoice_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suscription',
+            name='cancel_at_period_end',
+            field=models.BooleanField(default=False, verbose_name='Cancelar al Finalizar el Período'),
+        ),
+        migrations.AddField(
+            model_name='suscription',
+            name='current_period_end',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin del Período de Facturación'),
+        ),
+        migrations.AddField(
+            model_name='suscription',
+            name='current_period_start',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio del Período de Facturación'),
+        ),
+        migrations.AddField(
+            model_name='suscription',
+            name='stripe_status',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Estado en Stripe'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suscription', '0010_suscription_billing_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='ID del Evento en Stripe')),
+                ('type', models.CharField(max_length=100, verbose_name='Tipo')),
+                ('customer_id', models.CharField(blank=True, default='', max_length=255, verbose_name='ID del Cliente en Stripe')),
+                ('created', models.DateTimeField(verbose_name='Fecha de Creación en Stripe')),
+                ('payload', models.JSONField(verbose_name='Evento')),
+                ('state', models.CharField(choices=[('pending', 'Pendiente'), ('processed', 'Procesado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos Fallidos')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Recepción')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Procesamiento')),
+            ],
+            options={
+                'verbose_name': 'Evento de Stripe',
+                'verbose_name_plural': 'Eventos de Stripe',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stripeevent',
+            index=models.Index(condition=models.Q(('state', 'pending')), fields=['customer_id', 'created', 'id'], name='suscription_event_pending_idx'),
+        ),
+    ]
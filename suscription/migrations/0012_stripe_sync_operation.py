@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 05:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suscription', '0011_stripe_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeSyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name='Objeto')),
+                ('action', models.CharField(max_length=50, verbose_name='Acción')),
+                ('params', models.JSONField(default=dict, verbose_name='Parámetros')),
+                ('state', models.CharField(choices=[('pending', 'Pendiente'), ('failed', 'Fallida')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos Fallidos')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible Desde')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Registro')),
+            ],
+            options={
+                'verbose_name': 'Operación de Stripe',
+                'verbose_name_plural': 'Operaciones de Stripe',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stripesyncoperation',
+            index=models.Index(condition=models.Q(('state', 'pending')), fields=['id'], name='suscription_sync_pending_idx'),
+        ),
+    ]
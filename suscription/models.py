@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from app.models import CustomUser
 from category.models import Category
@@ -15,6 +16,17 @@ class Suscription(models.Model):
     :type date_subscribed: DateTimeField
     :param state: El estado de la suscripción, que puede ser 'Activo', 'Pendiente de pago' o 'Cancelado'.
     :type state: CharField
+    :param stripe_status: El estado de la suscripción en Stripe (`active`, `past_due`, `canceled`, ...).
+    :type stripe_status: CharField
+    :param current_period_start: Inicio del período de facturación actual.
+    :type current_period_start: DateTimeField
+    :param current_period_end: Fin del período de facturación actual.
+    :type current_period_end: DateTimeField
+    :param cancel_at_period_end: Indica si la suscripción se cancelará al finalizar el período actual.
+    :type cancel_at_period_end: BooleanField
+
+    Los datos de Stripe se actualizan con los webhooks `customer.subscription.*` e `invoice.paid`
+    (ver `suscription.service.sync_subscription`), por lo que se consultan sin llamar a su API.
 
     :Meta:
         unique_together: Define una restricción única para evitar que un usuario esté suscrito más de una vez a la misma categoría.
@@ -36,6 +48,10 @@ class Suscription(models.Model):
         default=SuscriptionState.active,
         verbose_name=('Estado de la Suscripción')
     )
+    stripe_status = models.CharField(max_length=20, blank=True, default='', verbose_name='Estado en Stripe')
+    current_period_start = models.DateTimeField(null=True, blank=True, verbose_name='Inicio del Período de Facturación')
+    current_period_end = models.DateTimeField(null=True, blank=True, verbose_name='Fin del Período de Facturación')
+    cancel_at_period_end = models.BooleanField(default=False, verbose_name='Cancelar al Finalizar el Período')
 
     class Meta:
         unique_together = ("user", "category")
@@ -43,4 +59,218 @@ class Suscription(models.Model):
         verbose_name_plural = 'Suscripciones'
 
     def __str__(self):
-        return f'Suscripción de {self.user}'
\ No newline at end of file
+        return f'Suscripción de {self.user}'
+
+
+class Invoice(models.Model):
+    """
+    Factura pagada de una suscripción, copiada de Stripe para consultar las finanzas sin llamar a su API.
+
+    Se registra al recibir el webhook `invoice.paid` (ver `suscription.service.record_invoice`); las facturas
+    anteriores se cargan con `./manage.py backfill_invoices`.
+
+    :param stripe_invoice_id: ID de la factura en Stripe.
+    :type stripe_invoice_id: CharField
+    :param user: El usuario que pagó la factura.
+    :type user: ForeignKey to CustomUser
+    :param category: La categoría de la suscripción facturada.
+    :type category: ForeignKey to Category
+    :param amount: Monto pagado, en la unidad mínima de la moneda.
+    :type amount: PositiveBigIntegerField
+    :param currency: Moneda del pago.
+    :type currency: CharField
+    :param paid_at: Fecha del pago.
+    :type paid_at: DateTimeField
+    :param card_brand: Marca de la tarjeta utilizada, vacía si se pagó con otro medio.
+    :type card_brand: CharField
+    :param card_last4: Últimos cuatro dígitos de la tarjeta utilizada.
+    :type card_last4: CharField
+    """
+
+    stripe_invoice_id = models.CharField(max_length=255, unique=True, verbose_name='ID de Factura en Stripe')
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='invoices', verbose_name='Usuario')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='invoices', verbose_name='Categoría')
+    amount = models.PositiveBigIntegerField(verbose_name='Monto')
+    currency = models.CharField(max_length=3, verbose_name='Moneda')
+    paid_at = models.DateTimeField(verbose_name='Fecha de Pago')
+    card_brand = models.CharField(max_length=20, blank=True, default='', verbose_name='Marca de la Tarjeta')
+    card_last4 = models.CharField(max_length=4, blank=True, default='', verbose_name='Últimos dígitos de la Tarjeta')
+
+    class Meta:
+        verbose_name = 'Factura'
+        verbose_name_plural = 'Facturas'
+        indexes = [
+            models.Index(fields=['paid_at'], name='suscription_invoice_paid_idx'),
+            models.Index(fields=['category', 'paid_at'], name='suscription_invoice_cat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stripe_invoice_id} - {self.amount} {self.currency}"
+
+    @property
+    def payment_method_display(self):
+        """
+        Medio de pago de la factura, como se muestra en el reporte de finanzas.
+
+        :return: Marca y últimos dígitos de la tarjeta, u "Otro" si no se pagó con tarjeta.
+        :rtype: str
+        """
+        return self.format_payment_method(self.card_brand, self.card_last4)
+
+    @staticmethod
+    def format_payment_method(card_brand, card_last4):
+        """
+        Formatea el medio de pago a partir de la marca y los últimos dígitos de la tarjeta.
+
+        :param card_brand: Marca de la tarjeta, vacía si no se pagó con tarjeta.
+        :type card_brand: str
+        :param card_last4: Últimos cuatro dígitos de la tarjeta.
+        :type card_last4: str
+        :rtype: str
+        """
+        if not card_brand:
+            return "Otro"
+        return f"{card_brand.capitalize()} •••• {card_last4}"
+
+
+class InvoiceDailyRollup(models.Model):
+    """
+    Cantidad y monto de las facturas pagadas por día y categoría, para los gráficos de finanzas.
+
+    Se mantiene al registrar facturas (ver `suscription.service.save_invoices`). Los días son fechas en la zona
+    horaria del sitio (`TIME_ZONE`).
+
+    :param day: Día de los pagos.
+    :type day: DateField
+    :param category: La categoría de las facturas.
+    :type category: ForeignKey to Category
+    :param count: Cantidad de facturas pagadas.
+    :type count: BigIntegerField
+    :param amount: Monto total pagado.
+    :type amount: BigIntegerField
+    """
+
+    day = models.DateField(verbose_name='Día')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', verbose_name='Categoría')
+    count = models.BigIntegerField(default=0, verbose_name='Cantidad')
+    amount = models.BigIntegerField(default=0, verbose_name='Monto')
+
+    class Meta:
+        verbose_name = 'Total diario de facturas'
+        verbose_name_plural = 'Totales diarios de facturas'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='suscription_invoice_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.category_id}: {self.count}"
+
+
+class StripeEvent(models.Model):
+    """
+    Evento recibido por el webhook de Stripe, pendiente de procesarse o ya procesado.
+
+    El webhook solo verifica la firma y registra el evento, por lo que responde a Stripe de inmediato; los eventos
+    se procesan en segundo plano y en orden por cliente (ver `suscription.webhooks.process_events`). El ID del
+    evento es único, por lo que los reenvíos de Stripe no se procesan dos veces.
+
+    :param event_id: ID del evento en Stripe.
+    :type event_id: CharField
+    :param type: Tipo del evento, como `invoice.paid`.
+    :type type: CharField
+    :param customer_id: ID del cliente de Stripe del evento, vacío si no corresponde a un cliente.
+    :type customer_id: CharField
+    :param created: Fecha en que Stripe creó el evento.
+    :type created: DateTimeField
+    :param payload: Evento completo recibido.
+    :type payload: JSONField
+    :param state: Estado del procesamiento del evento.
+    :type state: CharField
+    :param attempts: Cantidad de intentos de procesamiento fallidos.
+    :type attempts: PositiveIntegerField
+    :param last_error: Error del último intento fallido.
+    :type last_error: TextField
+    :param received_at: Fecha en que se recibió el evento.
+    :type received_at: DateTimeField
+    :param processed_at: Fecha en que se procesó el evento o se marcó como fallido.
+    :type processed_at: DateTimeField
+    """
+
+    class StateChoices(models.TextChoices):
+        pending = 'pending', ('Pendiente')
+        processed = 'processed', ('Procesado')
+        failed = 'failed', ('Fallido')
+
+    event_id = models.CharField(max_length=255, unique=True, verbose_name='ID del Evento en Stripe')
+    type = models.CharField(max_length=100, verbose_name='Tipo')
+    customer_id = models.CharField(max_length=255, blank=True, default='', verbose_name='ID del Cliente en Stripe')
+    created = models.DateTimeField(verbose_name='Fecha de Creación en Stripe')
+    payload = models.JSONField(verbose_name='Evento')
+    state = models.CharField(max_length=20, choices=StateChoices.choices, default=StateChoices.pending, verbose_name='Estado')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos Fallidos')
+    last_error = models.TextField(blank=True, default='', verbose_name='Último Error')
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Recepción')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Procesamiento')
+
+    class Meta:
+        verbose_name = 'Evento de Stripe'
+        verbose_name_plural = 'Eventos de Stripe'
+        indexes = [
+            # Eventos pendientes de cada cliente, en el orden en que se procesan
+            models.Index(
+                fields=['customer_id', 'created', 'id'], name='suscription_event_pending_idx',
+                condition=models.Q(state='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.type} ({self.event_id})'
+
+
+class StripeSyncOperation(models.Model):
+    """
+    Operación pendiente de sincronización con Stripe, registrada en la misma transacción que el cambio que la origina.
+
+    Las señales de categorías y usuarios no llaman a Stripe: registran en esta tabla las operaciones a realizar y
+    un worker las ejecuta en lotes, con reintentos (ver `suscription.stripe_sync`).
+
+    :param key: Objeto al que corresponde la operación, como `category:5`.
+    :type key: CharField
+    :param action: Acción a ejecutar.
+    :type action: CharField
+    :param params: Parámetros de la acción.
+    :type params: JSONField
+    :param state: Estado de la operación.
+    :type state: CharField
+    :param attempts: Cantidad de intentos fallidos.
+    :type attempts: PositiveIntegerField
+    :param last_error: Error del último intento fallido.
+    :type last_error: TextField
+    :param available_at: Fecha a partir de la cual puede ejecutarse la operación.
+    :type available_at: DateTimeField
+    :param created_at: Fecha en que se registró la operación.
+    :type created_at: DateTimeField
+    """
+
+    class StateChoices(models.TextChoices):
+        pending = 'pending', ('Pendiente')
+        failed = 'failed', ('Fallida')
+
+    key = models.CharField(max_length=100, verbose_name='Objeto')
+    action = models.CharField(max_length=50, verbose_name='Acción')
+    params = models.JSONField(default=dict, verbose_name='Parámetros')
+    state = models.CharField(max_length=20, choices=StateChoices.choices, default=StateChoices.pending, verbose_name='Estado')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos Fallidos')
+    last_error = models.TextField(blank=True, default='', verbose_name='Último Error')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='Disponible Desde')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha de Registro')
+
+    class Meta:
+        verbose_name = 'Operación de Stripe'
+        verbose_name_plural = 'Operaciones de Stripe'
+        indexes = [
+            models.Index(fields=['id'], name='suscription_sync_pending_idx', condition=models.Q(state='pending')),
+        ]
+
+    def __str__(self):
+        return f'{self.action} ({self.key})'
@@ -0,0 +1,233 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import stripe
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from suscription import stripe_gateway
+from suscription.models import Invoice, InvoiceDailyRollup, Suscription
+
+logger = logging.getLogger(__name__)
+
+# Campos actualizados cuando una factura ya registrada se recibe nuevamente
+INVOICE_UPDATE_FIELDS = ['user', 'category', 'amount', 'currency', 'paid_at', 'card_brand', 'card_last4']
+
+# Espacio de los bloqueos de PostgreSQL (`pg_advisory_xact_lock(espacio, categoría)`) que serializan
+# la actualización de los totales diarios de una categoría
+ROLLUP_LOCK_NAMESPACE = 19
+
+# Recalcula desde el libro de facturas los totales de los pares (día, categoría) indicados.
+# Cada día se recorre con el índice (category, paid_at); los totales que quedan en cero se eliminan.
+REFRESH_ROLLUPS_SQL = """
+WITH affected (day, category_id) AS (
+    SELECT * FROM unnest(%(days)s::date[], %(categories)s::bigint[])
+),
+totals AS (
+    SELECT affected.day, affected.category_id, count(invoice.id) AS count, coalesce(sum(invoice.amount), 0) AS amount
+    FROM affected
+    LEFT JOIN {invoice} invoice
+        ON invoice.category_id = affected.category_id
+        AND invoice.paid_at >= affected.day::timestamp AT TIME ZONE %(tz)s
+        AND invoice.paid_at < (affected.day + 1)::timestamp AT TIME ZONE %(tz)s
+    GROUP BY affected.day, affected.category_id
+),
+deleted AS (
+    DELETE FROM {rollup} rollup USING totals
+    WHERE rollup.day = totals.day AND rollup.category_id = totals.category_id AND totals.count = 0
+)
+INSERT INTO {rollup} (day, category_id, count, amount)
+SELECT day, category_id, count, amount FROM totals WHERE count > 0
+ON CONFLICT (day, category_id) DO UPDATE SET count = EXCLUDED.count, amount = EXCLUDED.amount
+"""
+
+
+def _card(payment_intent):
+    """
+    Obtiene la marca y los últimos dígitos de la tarjeta con la que se pagó una factura.
+
+    Si el `PaymentIntent` de la factura no viene expandido con su medio de pago, se consulta a Stripe.
+
+    :param payment_intent: ID u objeto del `PaymentIntent` de la factura.
+    :type payment_intent: str or dict
+    :return: Par `(marca, últimos dígitos)`, vacíos si no se pagó con tarjeta o no pudo consultarse.
+    :rtype: tuple
+    """
+
+    if not payment_intent:
+        return '', ''
+    try:
+        if isinstance(payment_intent, str) or isinstance(payment_intent.get('payment_method'), str):
+            payment_intent_id = payment_intent if isinstance(payment_intent, str) else payment_intent['id']
+            payment_intent = stripe_gateway.call('PaymentIntent.retrieve', payment_intent_id, expand=['payment_method'])
+    except stripe.error.StripeError as e:
+        logger.error(f"Error al obtener el medio de pago de Stripe: {e}")
+        return '', ''
+
+    card = (payment_intent.get('payment_method') or {}).get('card')
+    if not card:
+        return '', ''
+    return card['brand'], card['last4']
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value else None
+
+
+def sync_subscription(subscription):
+    """
+    Copia en la suscripción local el estado y el período de facturación de una suscripción de Stripe.
+
+    Se llama con el objeto recibido en los webhooks `customer.subscription.*`, por lo que no se consulta a Stripe.
+    La consulta en caché de la suscripción se descarta, ya que su estado cambió.
+
+    :param subscription: Suscripción de Stripe.
+    :type subscription: dict
+    :return: Cantidad de suscripciones actualizadas.
+    :rtype: int
+    """
+
+    stripe_gateway.invalidate('Subscription', subscription['id'])
+    return Suscription.objects.filter(stripe_subscription_id=subscription['id']).update(
+        stripe_status=subscription.get('status') or '',
+        current_period_start=_timestamp(subscription.get('current_period_start')),
+        current_period_end=_timestamp(subscription.get('current_period_end')),
+        cancel_at_period_end=bool(subscription.get('cancel_at_period_end')),
+    )
+
+
+def sync_invoice_period(suscription, invoice):
+    """
+    Actualiza el período de facturación de una suscripción con el período cobrado en una factura pagada.
+
+    El período se toma de la línea de la suscripción en la factura (`invoice.paid`), sin consultar a Stripe.
+
+    :param suscription: Suscripción local de la factura.
+    :type suscription: Suscription
+    :param invoice: Factura de Stripe.
+    :type invoice: dict
+    """
+
+    lines = (invoice.get('lines') or {}).get('data') or []
+    periods = [line['period'] for line in lines if line.get('type') == 'subscription' and line.get('period')]
+    if not periods:
+        return
+    stripe_gateway.invalidate('Subscription', suscription.stripe_subscription_id)
+    suscription.stripe_status = 'active'
+    suscription.current_period_start = _timestamp(max(period['start'] for period in periods))
+    suscription.current_period_end = _timestamp(max(period['end'] for period in periods))
+    suscription.save(update_fields=['stripe_status', 'current_period_start', 'current_period_end'])
+
+
+def build_invoice(invoice, user_id=None, category_ids=None):
+    """
+    Construye el registro del libro de facturas a partir de una factura pagada de Stripe.
+
+    :param invoice: Factura de Stripe (`invoice.paid`).
+    :type invoice: dict
+    :param user_id: ID del usuario que pagó la factura.
+    :type user_id: int
+    :param category_ids: IDs de las categorías existentes. Si se indica, las categorías eliminadas se registran vacías.
+    :type category_ids: set
+    :return: Factura sin guardar, o None si la factura no corresponde a una suscripción a una categoría.
+    :rtype: Invoice
+    """
+
+    metadata = (invoice.get('subscription_details') or {}).get('metadata') or {}
+    category_id = metadata.get('category_id')
+    if not category_id:
+        return None
+    category_id = int(category_id)
+    if category_ids is not None and category_id not in category_ids:
+        category_id = None
+
+    card_brand, card_last4 = _card(invoice.get('payment_intent'))
+    paid_at = invoice['status_transitions']['paid_at']
+    return Invoice(
+        stripe_invoice_id=invoice['id'],
+        user_id=user_id,
+        category_id=category_id,
+        amount=invoice['amount_paid'],
+        currency=(invoice.get('currency') or '').upper(),
+        paid_at=datetime.fromtimestamp(paid_at, tz=dt_timezone.utc),
+        card_brand=card_brand,
+        card_last4=card_last4,
+    )
+
+
+def refresh_rollups(pairs):
+    """
+    Recalcula los totales diarios (:class:`suscription.models.InvoiceDailyRollup`) de los días y categorías indicados.
+
+    Los totales se recalculan a partir del libro de facturas, por lo que recalcularlos más de una vez no altera
+    el resultado. Cada categoría se bloquea hasta el fin de la transacción para que dos registros simultáneos
+    no se pisen: el segundo espera y recalcula incluyendo la factura del primero.
+
+    :param pairs: Pares `(día, id de la categoría)`.
+    :type pairs: iterable
+    """
+
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return
+
+    sql = REFRESH_ROLLUPS_SQL.format(
+        invoice=connection.ops.quote_name(Invoice._meta.db_table),
+        rollup=connection.ops.quote_name(InvoiceDailyRollup._meta.db_table),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for category_id in sorted({category_id for _, category_id in pairs}):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [ROLLUP_LOCK_NAMESPACE, category_id])
+        cursor.execute(sql, {
+            'days': [day for day, _ in pairs],
+            'categories': [category_id for _, category_id in pairs],
+            'tz': settings.TIME_ZONE,
+        })
+
+
+def _rollup_pairs(rows):
+    return {
+        (timezone.localtime(paid_at, timezone.get_default_timezone()).date(), category_id)
+        for paid_at, category_id in rows if category_id is not None
+    }
+
+
+def save_invoices(invoices):
+    """
+    Guarda facturas en el libro con un único `INSERT ... ON CONFLICT`, actualizando las ya registradas,
+    y actualiza los totales diarios de sus días y categorías.
+
+    Stripe puede reenviar un mismo webhook, por lo que registrar una factura dos veces no la duplica. Si una
+    factura ya registrada cambió de día o de categoría, también se recalculan los totales anteriores.
+
+    :param invoices: Facturas a guardar.
+    :type invoices: list
+    """
+
+    if not invoices:
+        return
+
+    with transaction.atomic():
+        previous = Invoice.objects.filter(stripe_invoice_id__in=[invoice.stripe_invoice_id for invoice in invoices])
+        pairs = _rollup_pairs(previous.values_list('paid_at', 'category_id'))
+        Invoice.objects.bulk_create(
+            invoices, update_conflicts=True, unique_fields=['stripe_invoice_id'], update_fields=INVOICE_UPDATE_FIELDS,
+        )
+        pairs |= _rollup_pairs((invoice.paid_at, invoice.category_id) for invoice in invoices)
+        refresh_rollups(pairs)
+
+
+def record_invoice(invoice, user):
+    """
+    Registra en el libro de facturas una factura pagada recibida por el webhook `invoice.paid`.
+
+    :param invoice: Factura de Stripe.
+    :type invoice: dict
+    :param user: Usuario que pagó la factura.
+    :type user: CustomUser
+    """
+
+    record = build_invoice(invoice, user.id)
+    if record is not None:
+        save_invoices([record])
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# Cliente con la interfaz del SDK de Stripe (`client.Subscription.retrieve`, ...). Las pruebas lo reemplazan por uno local.
+client = stripe
+
+# Prefijos de las claves en caché: objetos consultados, métricas por operación y operaciones registradas
+CACHE_PREFIX = 'cms:stripe:cache'
+METRICS_PREFIX = 'cms:stripe:metrics'
+OPERATIONS_KEY = 'cms:stripe:operations'
+
+# Métricas registradas por cada operación
+METRICS = ('calls', 'errors', 'cache_hits', 'time_ms')
+
+# Recursos cuyas consultas (`retrieve`) se guardan en caché
+CACHED_RESOURCES = ('Subscription', 'Price', 'PaymentMethod')
+
+# Métodos que modifican un objeto y descartan su consulta en caché; reciben el ID del objeto como primer argumento
+WRITE_METHODS = ('modify', 'cancel', 'delete', 'detach')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _metric_key(operation, metric):
+    return f'{METRICS_PREFIX}:{operation}:{metric}'
+
+
+def _cache_key(resource, object_id):
+    return f'{CACHE_PREFIX}:{resource}:{object_id}'
+
+
+def _count(operation, metric, value=1):
+    key = _metric_key(operation, metric)
+    # `add` crea el contador sin vencimiento si no existe, `incr` es atómico en Redis
+    if cache.add(key, 0, timeout=None) and metric == 'calls':
+        # Primera llamada de la operación: se registra para poder listar sus métricas
+        cache.set(OPERATIONS_KEY, sorted(set(cache.get(OPERATIONS_KEY, [])) | {operation}), timeout=None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        # El contador fue desalojado entre ambas operaciones
+        cache.set(key, value, timeout=None)
+
+
+def _resolve(operation):
+    target = client
+    for name in operation.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.STRIPE_GATEWAY_MAX_WORKERS, thread_name_prefix='stripe')
+        return _executor
+
+
+def call(operation, *args, **kwargs):
+    """
+    Ejecuta una operación del SDK de Stripe registrando su cantidad de llamadas, errores y duración.
+
+    Las operaciones que modifican un objeto de un recurso guardado en caché (por ejemplo `Subscription.modify`)
+    descartan su consulta en caché, para que la siguiente lectura obtenga el objeto actualizado.
+
+    :param operation: Operación del SDK, como `Subscription.modify` o `checkout.Session.create`.
+    :type operation: str
+    :param args: Argumentos posicionales de la operación.
+    :type args: list
+    :param kwargs: Argumentos con nombre de la operación.
+    :type kwargs: dict
+    :return: Resultado de la operación.
+    :raises stripe.error.StripeError: Si Stripe rechaza la operación o no puede contactarse.
+    """
+
+    resource, _, method = operation.rpartition('.')
+    start = time.perf_counter()
+    try:
+        return _resolve(operation)(*args, **kwargs)
+    except Exception:
+        _count(operation, 'errors')
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _count(operation, 'calls')
+        _count(operation, 'time_ms', round(elapsed_ms))
+        logger.debug(f"Stripe {operation}: {elapsed_ms:.0f} ms")
+        if method in WRITE_METHODS and args:
+            invalidate(resource, args[0])
+
+
+def retrieve(resource, object_id):
+    """
+    Obtiene un objeto de Stripe por su ID.
+
+    Los objetos de los recursos de `CACHED_RESOURCES` se guardan en caché durante `STRIPE_GATEWAY_CACHE_TTL`
+    segundos, por lo que una misma página no consulta dos veces el mismo objeto.
+
+    :param resource: Recurso del SDK, como `Subscription` o `Price`.
+    :type resource: str
+    :param object_id: ID del objeto en Stripe.
+    :type object_id: str
+    :return: Objeto de Stripe.
+    :raises stripe.error.StripeError: Si Stripe rechaza la consulta o no puede contactarse.
+    """
+
+    operation = f'{resource}.retrieve'
+    if resource not in CACHED_RESOURCES:
+        return call(operation, object_id)
+
+    key = _cache_key(resource, object_id)
+    obj = cache.get(key)
+    if obj is not None:
+        _count(operation, 'cache_hits')
+        return obj
+    obj = call(operation, object_id)
+    cache.set(key, obj, timeout=settings.STRIPE_GATEWAY_CACHE_TTL)
+    return obj
+
+
+def invalidate(resource, object_id):
+    """
+    Descarta la consulta en caché de un objeto de Stripe, para que la siguiente lectura lo obtenga actualizado.
+
+    Se llama al modificar el objeto a través de :func:`call` y al recibir sus cambios por los webhooks.
+
+    :param resource: Recurso del SDK, como `Subscription`.
+    :type resource: str
+    :param object_id: ID del objeto en Stripe.
+    :type object_id: str
+    """
+
+    if resource in CACHED_RESOURCES:
+        cache.delete(_cache_key(resource, object_id))
+
+
+def retrieve_many(resource, object_ids):
+    """
+    Obtiene varios objetos de Stripe del mismo recurso, consultando en paralelo los que no están en caché.
+
+    Las consultas se ejecutan en un grupo de a lo sumo `STRIPE_GATEWAY_MAX_WORKERS` hilos compartido por
+    todo el proceso, por lo que una página con N objetos espera aproximadamente una consulta en lugar de N.
+    Los objetos que no pudieron obtenerse se registran en el log y se omiten del resultado.
+
+    :param resource: Recurso del SDK, como `Subscription` o `Price`.
+    :type resource: str
+    :param object_ids: IDs de los objetos en Stripe.
+    :type object_ids: iterable
+    :return: Diccionario con los objetos obtenidos por ID.
+    :rtype: dict
+    """
+
+    object_ids = list(dict.fromkeys(object_id for object_id in object_ids if object_id))
+    if not object_ids:
+        return {}
+
+    futures = {object_id: _get_executor().submit(retrieve, resource, object_id) for object_id in object_ids}
+    objects = {}
+    for object_id, future in futures.items():
+        try:
+            objects[object_id] = future.result()
+        except stripe.error.StripeError as e:
+            logger.error(f"Error al obtener {resource} {object_id} de Stripe: {e}")
+    return objects
+
+
+def get_metrics(operation):
+    """
+    Devuelve las métricas de una operación de Stripe.
+
+    :param operation: Operación del SDK, como `Subscription.retrieve`.
+    :type operation: str
+    :return: Diccionario con la cantidad de llamadas a Stripe (`calls`), las fallidas (`errors`), las consultas
+             resueltas desde la caché (`cache_hits`), la duración total (`time_ms`) y promedio (`avg_ms`) en milisegundos.
+    :rtype: dict
+    """
+
+    values = cache.get_many([_metric_key(operation, metric) for metric in METRICS])
+    metrics = {metric: values.get(_metric_key(operation, metric), 0) for metric in METRICS}
+    metrics['avg_ms'] = metrics['time_ms'] / metrics['calls'] if metrics['calls'] else 0.0
+    return metrics
+
+
+def get_operations():
+    """
+    Devuelve las operaciones de Stripe con métricas registradas.
+
+    :rtype: list
+    """
+
+    return cache.get(OPERATIONS_KEY, [])
+
+
+def reset_metrics(operation):
+    """
+    Reinicia las métricas de una operación de Stripe.
+
+    :param operation: Operación del SDK, como `Subscription.retrieve`.
+    :type operation: str
+    """
+
+    cache.delete_many([_metric_key(operation, metric) for metric in METRICS])
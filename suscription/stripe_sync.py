@@ -0,0 +1,249 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from category.models import Category
+from suscription import stripe_gateway, tasks
+from suscription.models import StripeSyncOperation, Suscription
+
+logger = logging.getLogger(__name__)
+
+def create_category_product(operation, subscriptions):
+    """
+    Crea el producto y el precio de una categoría paga en Stripe y guarda sus IDs en la categoría.
+    """
+
+    category = Category.objects.filter(pk=operation.params['category_id']).first()
+    if not category or category.stripe_product_id:
+        return
+
+    # Crear el producto en Stripe. La clave de idempotencia evita duplicarlo si la operación se repite
+    # porque el worker se interrumpió antes de confirmar la transacción
+    product = stripe_gateway.call(
+        'Product.create',
+        name=category.name,
+        description=category.description,
+        active=category.is_active,
+        idempotency_key=f'stripe-sync-{operation.id}-product',
+    )
+
+    # Crear el precio del producto en Stripe
+    price = stripe_gateway.call(
+        'Price.create',
+        product=product.id,
+        unit_amount=category.price,
+        currency='PYG',
+        recurring={"interval": "day"},
+        idempotency_key=f'stripe-sync-{operation.id}-price',
+    )
+
+    # Guardar los IDs del producto y precio sin volver a disparar las señales de la categoría
+    Category.objects.filter(pk=category.pk).update(stripe_product_id=product.id, stripe_price_id=price.id)
+
+
+def modify_category_product(operation, subscriptions):
+    """
+    Modifica el producto de Stripe de una categoría, si ya fue creado.
+    """
+
+    product_id = Category.objects.filter(pk=operation.params['category_id']).values_list('stripe_product_id', flat=True).first()
+    if product_id:
+        stripe_gateway.call('Product.modify', product_id, **operation.params['fields'])
+
+
+def deactivate_category_price(operation, subscriptions):
+    """
+    Desactiva el precio anterior de una categoría cuyo precio cambió. El webhook `price.updated` crea el nuevo precio.
+    """
+
+    params = operation.params
+    old_price = stripe_gateway.retrieve('Price', params['price_id'])
+    if old_price.unit_amount != params['new_price']:
+        stripe_gateway.call(
+            'Price.modify',
+            params['price_id'],
+            active=False,
+            metadata={'new_price': params['new_price']},
+        )
+
+
+def cancel_for_paid_category(operation, subscriptions):
+    """
+    Cancela al finalizar el período una suscripción a una categoría que pasó a ser paga, o la cancela si no está activa.
+    """
+
+    subscription = Suscription.objects.filter(pk=operation.params['suscription_id']).first()
+    if not subscription:
+        return
+    suscription_stripe = subscriptions.get(subscription.stripe_subscription_id) or stripe_gateway.retrieve('Subscription', subscription.stripe_subscription_id)
+    if suscription_stripe.status == 'active':
+        subscription.state = Suscription.SuscriptionState.pending_cancellation
+        subscription.save()
+        stripe_gateway.call(
+            'Subscription.modify',
+            subscription.stripe_subscription_id,
+            metadata={'category_paid': True}, #  Poner metadata en las suscripciones category_paid = True para que cuando se cancele la suscripcion  en el werbhok se envie notifacion de cancelacion a los usuarios y se cancele la suscripcion en la base de datos
+        )
+    else:
+        subscription.state = Suscription.SuscriptionState.cancelled
+        subscription.save()
+
+
+def cancel_for_free_category(operation, subscriptions):
+    """
+    Cancela al finalizar el período una suscripción activa a una categoría que dejó de ser paga.
+    """
+
+    subscription = Suscription.objects.filter(pk=operation.params['suscription_id']).first()
+    if not subscription:
+        return
+    suscription_stripe = subscriptions.get(subscription.stripe_subscription_id) or stripe_gateway.retrieve('Subscription', subscription.stripe_subscription_id)
+    if suscription_stripe.status == 'active' and subscription.state != Suscription.SuscriptionState.pending_cancellation:
+        stripe_gateway.call(
+            'Subscription.modify',
+            subscription.stripe_subscription_id,
+            cancel_at_period_end=True,
+            metadata={'category_paid': False}, # Poner metadata en las suscripciones category_paid = False para cuando se cancele la suscripcion no se envie notifacion de cancelacion a los usuarios y no se ponga cancelado en la suscripcion en la base de datos
+        )
+
+
+def call(operation, subscriptions):
+    """
+    Ejecuta una operación del SDK de Stripe sobre un objeto de ID conocido, como `Customer.modify`.
+    """
+
+    params = operation.params
+    stripe_gateway.call(params['operation'], *params.get('args', []), **params.get('kwargs', {}))
+
+
+# Ejecución de cada acción; cada función recibe la operación y las suscripciones de Stripe consultadas para el lote
+ACTIONS = {
+    'create_category_product': create_category_product,
+    'modify_category_product': modify_category_product,
+    'deactivate_category_price': deactivate_category_price,
+    'cancel_for_paid_category': cancel_for_paid_category,
+    'cancel_for_free_category': cancel_for_free_category,
+    'call': call,
+}
+
+# Acciones que consultan la suscripción de Stripe de una suscripción local (`params['suscription_id']`)
+SUBSCRIPTION_ACTIONS = ('cancel_for_paid_category', 'cancel_for_free_category')
+
+
+def _dispatch_later():
+    try:
+        tasks.sync_stripe.delay()
+    except Exception as e:
+        # Las operaciones ya están registradas: la tarea periódica `sync_stripe` las ejecutará
+        logger.error(f"Error al encolar la sincronización con Stripe: {e}")
+
+
+def enqueue(key, action, params_list):
+    """
+    Registra operaciones de sincronización con Stripe, para ejecutarse al confirmarse la transacción actual.
+
+    Reemplaza las llamadas a Stripe desde las señales de los modelos: las operaciones se guardan en la misma
+    transacción que el cambio que las origina y un worker las ejecuta en segundo plano, por lo que guardar un
+    objeto no espera a Stripe y, si la transacción se revierte, las operaciones se descartan con ella.
+
+    :param key: Objeto al que corresponden las operaciones, como `category:5`. Las operaciones de un mismo objeto
+                se ejecutan en el orden en que se registraron.
+    :type key: str
+    :param action: Acción a ejecutar, una de `ACTIONS`.
+    :type action: str
+    :param params_list: Parámetros de cada operación. Deben poder serializarse en JSON.
+    :type params_list: list
+    """
+
+    operations = StripeSyncOperation.objects.bulk_create([
+        StripeSyncOperation(key=key, action=action, params=params) for params in params_list
+    ])
+    if operations:
+        transaction.on_commit(_dispatch_later)
+
+
+def enqueue_call(key, operation, *args, **kwargs):
+    """
+    Registra una operación del SDK de Stripe sobre un objeto de ID conocido (ver :func:`enqueue`).
+
+    :param key: Objeto al que corresponde la operación, como `user:3`.
+    :type key: str
+    :param operation: Operación del SDK, como `Customer.modify`.
+    :type operation: str
+    """
+
+    enqueue(key, 'call', [{'operation': operation, 'args': list(args), 'kwargs': kwargs}])
+
+
+def dispatch(batch_size=None):
+    """
+    Ejecuta las operaciones de sincronización con Stripe pendientes, en lotes.
+
+    Las suscripciones de Stripe que consultan las operaciones de un lote se obtienen en paralelo antes de
+    ejecutarlas. Cada operación se toma con `FOR UPDATE SKIP LOCKED` y se ejecuta y elimina en su propia
+    transacción, por lo que varios despachadores pueden ejecutarse a la vez y una interrupción solo repite la
+    operación en curso. Una operación se ejecuta solo si no quedan operaciones anteriores del mismo objeto, para
+    respetar el orden en que se registraron. Si una operación falla, se reintenta luego de
+    `STRIPE_SYNC_RETRY_DELAY` segundos por intento y las siguientes operaciones del mismo objeto esperan a que se
+    ejecute; luego de `STRIPE_SYNC_MAX_ATTEMPTS` intentos se marca como fallida.
+
+    :param batch_size: Cantidad máxima de operaciones por lote. Por defecto `STRIPE_SYNC_BATCH_SIZE`.
+    :type batch_size: int
+    :return: Cantidad de operaciones ejecutadas.
+    :rtype: int
+    """
+
+    batch_size = batch_size or settings.STRIPE_SYNC_BATCH_SIZE
+    pending = StripeSyncOperation.objects.filter(state=StripeSyncOperation.StateChoices.pending)
+    earlier = pending.filter(key=OuterRef('key'), id__lt=OuterRef('id'))
+    executed = 0
+    while True:
+        # Los objetos con una operación esperando un reintento no avanzan, para respetar el orden
+        waiting = pending.filter(available_at__gt=timezone.now()).values('key')
+        operations = list(pending.filter(~Q(key__in=waiting)).order_by('id')[:batch_size])
+        if not operations:
+            return executed
+
+        subscription_ids = Suscription.objects.filter(
+            pk__in=[operation.params['suscription_id'] for operation in operations if operation.action in SUBSCRIPTION_ACTIONS],
+        ).values_list('stripe_subscription_id', flat=True)
+        subscriptions = stripe_gateway.retrieve_many('Subscription', subscription_ids)
+
+        done = 0
+        blocked_keys = set()
+        for candidate in operations:
+            if candidate.key in blocked_keys:
+                continue
+            with transaction.atomic():
+                operation = (
+                    pending.select_for_update(skip_locked=True)
+                    .filter(id=candidate.id)
+                    .exclude(Exists(earlier))
+                    .first()
+                )
+                if operation is None:
+                    # La ejecuta otro despachador o espera a una operación anterior del mismo objeto
+                    blocked_keys.add(candidate.key)
+                    continue
+                try:
+                    with transaction.atomic():
+                        ACTIONS[operation.action](operation, subscriptions)
+                except Exception as e:
+                    logger.exception(f"Error al ejecutar la operación de Stripe {operation.action} ({operation.key})")
+                    blocked_keys.add(operation.key)
+                    operation.attempts += 1
+                    operation.last_error = str(e)
+                    operation.available_at = timezone.now() + timedelta(seconds=settings.STRIPE_SYNC_RETRY_DELAY * operation.attempts)
+                    if operation.attempts >= settings.STRIPE_SYNC_MAX_ATTEMPTS:
+                        operation.state = StripeSyncOperation.StateChoices.failed
+                    operation.save(update_fields=['attempts', 'last_error', 'available_at', 'state'])
+                else:
+                    operation.delete()
+                    done += 1
+        executed += done
+        if not done:
+            return executed
@@ -0,0 +1,41 @@
+from celery import shared_task
+
+from suscription import webhooks
+
+
+@shared_task()
+def process_stripe_events(customer_id):
+    """
+    Procesa en orden los eventos de Stripe pendientes de un cliente, registrados por el webhook.
+
+    :param customer_id: ID del cliente de Stripe, vacío para los eventos que no corresponden a un cliente.
+    :type customer_id: str
+    """
+
+    webhooks.process_events(customer_id)
+
+
+@shared_task()
+def process_pending_stripe_events():
+    """
+    Procesa los eventos de Stripe pendientes de todos los clientes.
+
+    Respaldo de :func:`process_stripe_events`: reintenta los eventos que fallaron y procesa los que no pudieron
+    encolarse al recibirse.
+    """
+
+    webhooks.process_pending_events()
+
+
+@shared_task()
+def sync_stripe():
+    """
+    Ejecuta las operaciones de sincronización con Stripe registradas por las señales de los modelos.
+
+    Se encola al confirmarse cada transacción que registra operaciones y se ejecuta además cada minuto con
+    Celery Beat, para los reintentos.
+    """
+
+    from suscription.stripe_sync import dispatch
+
+    dispatch()
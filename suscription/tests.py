@@ -1,14 +1,29 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+
+import openpyxl
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
-from django.utils.timezone import now
+from django.utils.timezone import localtime, make_aware, now
 from django.urls import reverse
 from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
+import notification.service
 from app.models import CustomUser
 from category.models import Category
-from suscription.models import Suscription
+from notification.models import OutboxNotification
+from suscription import service, stripe_gateway, stripe_sync, webhooks
+from suscription.models import Invoice, InvoiceDailyRollup, StripeEvent, StripeSyncOperation, Suscription
 from app.signals import cache_previous_user, post_save_user_handler
 from category.signals import cache_previous_category, post_save_category_handler, cache_category_before_delete, handle_category_after_delete
 from unittest.mock import patch, MagicMock
 
+import stripe
+
 class SuscriptionTests(TestCase):
     """
     Clase que contiene pruebas unitarias para verificar el comportamiento del modelo Suscription y las vistas relacionadas.
@@ -214,3 +229,614 @@ class SuscriptionTests(TestCase):
 
         # Ensure create_checkout_session is called with correct arguments
         mock_create_checkout_session.assert_called_once_with(response.wsgi_request, self.category.id)
+
+
+class InvoiceLedgerTests(TestCase):
+    """
+    Pruebas del libro de facturas (:class:`suscription.models.Invoice`) y de los reportes de finanzas que lo consultan.
+    """
+
+    def setUp(self):
+        """
+        Crea un usuario con permiso para ver las finanzas y dos categorías pagas.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        pre_delete.disconnect(cache_category_before_delete, sender=Category)
+        post_delete.disconnect(handle_category_after_delete, sender=Category)
+
+        self.user = CustomUser.objects.create_user(email="finanzas@example.com", name="Finanzas", password="password123")
+        self.user.stripe_customer_id = "cus_finanzas"
+        self.user.save()
+        self.user.user_permissions.add(Permission.objects.get(codename='view_finances'))
+        self.news = Category.objects.create(name="Noticias", type=Category.TypeChoices.paid, price=10000)
+        self.sports = Category.objects.create(name="Deportes", type=Category.TypeChoices.paid, price=20000)
+        self.client.login(email="finanzas@example.com", password="password123")
+
+    def tearDown(self):
+        """
+        Reconecta las señales desconectadas en `setUp`.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        pre_delete.connect(cache_category_before_delete, sender=Category)
+        post_delete.connect(handle_category_after_delete, sender=Category)
+        super().tearDown()
+
+    def stripe_invoice(self, invoice_id, category, amount, paid_at, payment_intent='pi_test'):
+        return {
+            'id': invoice_id,
+            'customer': 'cus_finanzas',
+            'customer_email': 'finanzas@example.com',
+            'subscription': 'sub_test',
+            'subscription_details': {'metadata': {'category_id': str(category.id)}},
+            'amount_paid': amount,
+            'currency': 'pyg',
+            'status_transitions': {'paid_at': int(paid_at.timestamp())},
+            'payment_intent': payment_intent,
+        }
+
+    def post_event(self, mock_construct_event, event):
+        """
+        Envía un evento al webhook de Stripe y procesa los eventos encolados, como lo haría el worker de Celery.
+        """
+        mock_construct_event.return_value = event
+        with patch('suscription.tasks.process_stripe_events.delay') as mock_delay:
+            response = self.client.post(reverse('stripe_webhook'), data='{}', content_type='application/json',
+                                        HTTP_STRIPE_SIGNATURE='firma')
+        self.assertEqual(response.status_code, 200)
+        for call in mock_delay.call_args_list:
+            webhooks.process_events(*call.args)
+
+    @patch('notification.fanout.send_bulk_notification_task')
+    @patch('notification.service.payment_success')
+    @patch('stripe.PaymentIntent.retrieve')
+    @patch('stripe.Webhook.construct_event')
+    def test_webhooks_store_billing_period(self, mock_construct_event, mock_retrieve, mock_payment_success, mock_bulk_task):
+        """
+        Verifica que los webhooks `invoice.paid` y `customer.subscription.updated` guarden el estado y el período
+        de facturación de la suscripción, y que la notificación de cambio de precio use el período guardado.
+        """
+        start = make_aware(datetime(2024, 10, 1, 10, 30))
+        end = start + timedelta(days=30)
+        invoice = self.stripe_invoice('in_period', self.news, 10000, start)
+        invoice['lines'] = {'data': [{'type': 'subscription', 'period': {'start': int(start.timestamp()), 'end': int(end.timestamp())}}]}
+        mock_retrieve.return_value = {'payment_method': None}
+
+        self.post_event(mock_construct_event, {'id': 'evt_paid', 'type': 'invoice.paid', 'data': {'object': invoice}})
+        suscription = Suscription.objects.get(user=self.user, category=self.news)
+        self.assertEqual((suscription.stripe_status, suscription.current_period_start, suscription.current_period_end),
+                         ('active', start, end))
+
+        subscription = {
+            'id': 'sub_test', 'customer': 'cus_finanzas', 'status': 'past_due', 'cancel_at_period_end': True,
+            'current_period_start': int(end.timestamp()), 'current_period_end': int((end + timedelta(days=30)).timestamp()),
+            'metadata': {'category_id': str(self.news.id), 'category_paid': 'False'},
+        }
+        self.post_event(mock_construct_event, {'id': 'evt_updated', 'type': 'customer.subscription.updated',
+                                               'data': {'object': subscription, 'previous_attributes': {}}})
+        suscription.refresh_from_db()
+        self.assertEqual((suscription.stripe_status, suscription.cancel_at_period_end, suscription.current_period_end),
+                         ('past_due', True, end + timedelta(days=30)))
+
+        Suscription.objects.filter(pk=suscription.pk).update(state=Suscription.SuscriptionState.active)
+        with patch.object(stripe_gateway, 'client', FakeStripe()) as fake:
+            notification.service.category_price_changed(self.news)
+        self.assertEqual(fake.calls, [])
+        contexts = mock_bulk_task.delay.call_args.args[3]
+        self.assertIn(localtime(end + timedelta(days=30)).strftime('%d/%m/%Y a las %H:%M'), contexts[next(iter(contexts))]['message'])
+
+    @patch('notification.service.payment_success')
+    @patch('stripe.PaymentIntent.retrieve')
+    @patch('stripe.Webhook.construct_event')
+    def test_webhook_records_invoice(self, mock_construct_event, mock_retrieve, mock_payment_success):
+        """
+        Verifica que el webhook `invoice.paid` registre la factura con el medio de pago una única vez,
+        aunque Stripe reenvíe el evento.
+        """
+        paid_at = make_aware(datetime(2024, 10, 1, 10, 30))
+        invoice = self.stripe_invoice('in_webhook', self.news, 10000, paid_at)
+        mock_retrieve.return_value = {'payment_method': {'card': {'brand': 'visa', 'last4': '4242'}}}
+
+        for _ in range(2):
+            self.post_event(mock_construct_event, {'id': 'evt_webhook', 'type': 'invoice.paid', 'data': {'object': invoice}})
+
+        record = Invoice.objects.get()
+        self.assertEqual((record.stripe_invoice_id, record.user, record.category), ('in_webhook', self.user, self.news))
+        self.assertEqual((record.amount, record.currency, record.paid_at), (10000, 'PYG', paid_at))
+        self.assertEqual(record.payment_method_display, 'Visa •••• 4242')
+        mock_retrieve.assert_called_with('pi_test', expand=['payment_method'])
+
+    @patch('stripe.Subscription.cancel')
+    @patch('stripe.PaymentIntent.retrieve')
+    @patch('stripe.Webhook.construct_event')
+    def test_webhook_notifications_read_stripe_objects(self, mock_construct_event, mock_retrieve, mock_cancel):
+        """
+        Verifica que los eventos guardados se procesen con los objetos del SDK de Stripe, sin simular las
+        notificaciones: estas leen atributos como `invoice.amount_paid` o `subscription.current_period_end`.
+        """
+        start = make_aware(datetime(2024, 10, 1, 10, 30))
+        end = start + timedelta(days=30)
+        invoice = self.stripe_invoice('in_notified', self.news, 10000, start)
+        invoice['lines'] = {'object': 'list', 'data': [{'type': 'subscription', 'period': {'start': int(start.timestamp()), 'end': int(end.timestamp())}}]}
+        mock_retrieve.return_value = {'payment_method': None}
+
+        self.post_event(mock_construct_event, {'id': 'evt_paid', 'type': 'invoice.paid', 'data': {'object': invoice}})
+        self.assertEqual(Suscription.objects.get(user=self.user, category=self.news).state, Suscription.SuscriptionState.active)
+
+        subscription = {
+            'id': 'sub_test', 'object': 'subscription', 'customer': 'cus_finanzas', 'status': 'active', 'cancel_at_period_end': True,
+            'current_period_start': int(start.timestamp()), 'current_period_end': int(end.timestamp()),
+            'metadata': {'category_id': str(self.news.id)},
+        }
+        self.post_event(mock_construct_event, {'id': 'evt_updated', 'type': 'customer.subscription.updated',
+                                               'data': {'object': subscription, 'previous_attributes': {'cancel_at_period_end': False}}})
+        self.assertEqual(Suscription.objects.get(user=self.user, category=self.news).state, Suscription.SuscriptionState.pending_cancellation)
+
+        failed = dict(invoice, id='in_failed', amount_due=10000, effective_at=int(end.timestamp()))
+        self.post_event(mock_construct_event, {'id': 'evt_failed', 'type': 'invoice.payment_failed', 'data': {'object': failed}})
+        self.assertEqual(Suscription.objects.get(user=self.user, category=self.news).state, Suscription.SuscriptionState.cancelled)
+        mock_cancel.assert_called_once_with('sub_test')
+
+        self.assertEqual(set(StripeEvent.objects.values_list('state', flat=True)), {'processed'})
+        self.assertEqual(
+            list(OutboxNotification.objects.order_by('id').values_list('subject', flat=True)),
+            ['Pago exitoso', 'Tu suscripción será cancelada al final del ciclo de facturación', 'Pago fallido'],
+        )
+
+    @patch('stripe.Webhook.construct_event')
+    def test_webhook_events_processed_in_order_per_customer(self, mock_construct_event):
+        """
+        Verifica que el webhook solo registre los eventos, sin procesarlos ni duplicarlos, que se procesen en el
+        orden en que Stripe los creó y que un evento que falla detenga los siguientes del cliente hasta reintentarse.
+        """
+        Suscription.objects.create(user=self.user, category=self.news, stripe_subscription_id='sub_test')
+        created = int(make_aware(datetime(2024, 10, 1, 10, 0)).timestamp())
+
+        def subscription_event(event_id, event_type, offset, status):
+            subscription = {'id': 'sub_test', 'customer': 'cus_finanzas', 'status': status, 'cancel_at_period_end': False,
+                            'metadata': {'category_id': str(self.news.id), 'category_paid': 'False'}}
+            return {'id': event_id, 'type': event_type, 'created': created + offset,
+                    'data': {'object': subscription, 'previous_attributes': {}}}
+
+        # Stripe no garantiza el orden de entrega: el evento posterior llega primero
+        for event in [subscription_event('evt_2', 'customer.subscription.updated', 10, 'past_due'),
+                      subscription_event('evt_1', 'customer.subscription.created', 0, 'active'),
+                      subscription_event('evt_1', 'customer.subscription.created', 0, 'active')]:
+            mock_construct_event.return_value = event
+            with patch('suscription.tasks.process_stripe_events.delay') as mock_delay:
+                response = self.client.post(reverse('stripe_webhook'), data='{}', content_type='application/json',
+                                            HTTP_STRIPE_SIGNATURE='firma')
+            self.assertEqual(response.status_code, 200)
+            mock_delay.assert_called_once_with('cus_finanzas')
+
+        self.assertEqual(StripeEvent.objects.count(), 2)
+        self.assertEqual(Suscription.objects.get().stripe_status, '')
+
+        failing = MagicMock(side_effect=RuntimeError('Stripe no disponible'))
+        with patch.dict(webhooks.HANDLERS, {'customer.subscription.created': failing}):
+            self.assertEqual(webhooks.process_events('cus_finanzas'), 0)
+        first = StripeEvent.objects.get(event_id='evt_1')
+        self.assertEqual((first.state, first.attempts, first.last_error), ('pending', 1, 'Stripe no disponible'))
+        self.assertEqual(StripeEvent.objects.get(event_id='evt_2').state, 'pending')
+
+        self.assertEqual(webhooks.process_pending_events(), 2)
+        self.assertEqual(Suscription.objects.get().stripe_status, 'past_due')
+        self.assertEqual(set(StripeEvent.objects.values_list('state', flat=True)), {'processed'})
+
+    @patch('stripe.Invoice.list')
+    def test_finance_reports_use_ledger(self, mock_invoice_list):
+        """
+        Verifica que los reportes de finanzas se calculen con el libro de facturas, sin consultar a Stripe.
+        """
+        day = make_aware(datetime(2024, 10, 1, 9, 0))
+        service.save_invoices([
+            Invoice(stripe_invoice_id='in_1', user=self.user, category=self.news, amount=10000, currency='PYG', paid_at=day,
+                    card_brand='visa', card_last4='4242'),
+            Invoice(stripe_invoice_id='in_2', user=self.user, category=self.sports, amount=20000, currency='PYG',
+                    paid_at=day + timedelta(hours=5)),
+            Invoice(stripe_invoice_id='in_3', user=self.user, category=self.news, amount=10000, currency='PYG',
+                    paid_at=day + timedelta(days=1)),
+        ])
+
+        table = self.client.get(reverse('finances_table_data')).json()
+        self.assertEqual(table['total_general'], 40000)
+        self.assertEqual(table['invoices_data'][0], {
+            'fecha_pago': '01 de octubre de 2024 a las 09:00', 'suscriptor': 'Finanzas', 'categoria': 'Noticias',
+            'monto': 10000, 'metodo_pago': 'Visa •••• 4242',
+        })
+        self.assertEqual(table['invoices_data'][1]['metodo_pago'], 'Otro')
+
+        filters = {'date_end': '2024-10-01T23:59'}
+        self.assertEqual(self.client.get(reverse('finances_category'), filters).json(),
+                         {'labels': ['Deportes', 'Noticias'], 'totals': [1, 1]})
+        self.assertEqual(self.client.get(reverse('finances_daily_totals')).json(),
+                         {'dates': ['01-10-2024', '02-10-2024'], 'totals': [30000, 10000]})
+        timeline = self.client.get(reverse('finances_category_timeline'), {'category': self.news.id}).json()
+        self.assertEqual(timeline['datasets'], [{'label': 'Noticias', 'data': [10000, 10000], 'dates': ['01-10-2024', '02-10-2024']}])
+        mock_invoice_list.assert_not_called()
+
+    def test_daily_rollups(self):
+        """
+        Verifica que los totales diarios se mantengan al registrar facturas, sin duplicarse al registrarlas
+        nuevamente, y que los gráficos combinados coincidan con los calculados desde el libro de facturas.
+        """
+        day = make_aware(datetime(2024, 10, 1, 23, 30))
+        invoices = [
+            Invoice(stripe_invoice_id='in_1', user=self.user, category=self.news, amount=10000, currency='PYG', paid_at=day),
+            Invoice(stripe_invoice_id='in_2', user=self.user, category=self.news, amount=15000, currency='PYG',
+                    paid_at=day + timedelta(hours=1)),
+        ]
+        service.save_invoices(invoices)
+        service.save_invoices(invoices[:1])
+
+        rollups = InvoiceDailyRollup.objects.order_by('day').values_list('day', 'category_id', 'count', 'amount')
+        self.assertEqual(list(rollups), [
+            (date(2024, 10, 1), self.news.id, 1, 10000),
+            (date(2024, 10, 2), self.news.id, 1, 15000),
+        ])
+
+        # La factura cambia de categoría: el total anterior queda en cero y se elimina
+        moved = Invoice(stripe_invoice_id='in_2', user=self.user, category=self.sports, amount=15000, currency='PYG',
+                        paid_at=day + timedelta(hours=1))
+        service.save_invoices([moved])
+        self.assertEqual(list(rollups.values_list('category_id', flat=True)), [self.news.id, self.sports.id])
+
+        with self.assertNumQueries(5):  # Sesión, usuario, permisos (2) y totales diarios
+            charts = self.client.get(reverse('finances_charts'), {'date_begin': '2024-10-01T00:00'}).json()
+        # Con filtro de usuario se calcula desde el libro de facturas, con el mismo resultado
+        self.assertEqual(self.client.get(reverse('finances_charts'), {'user': self.user.id}).json(), charts)
+        self.assertEqual(charts['category_totals'], {'labels': ['Deportes', 'Noticias'], 'totals': [1, 1]})
+        self.assertEqual(charts['daily_totals'], {'dates': ['01-10-2024', '02-10-2024'], 'totals': [10000, 15000]})
+        self.assertEqual(charts['category_timeline']['categories'], ['Noticias', 'Deportes'])
+
+    def test_date_end_includes_last_minute(self):
+        """
+        Verifica que `date_end` incluya los pagos de su último minuto tanto en el libro de facturas como en los
+        totales diarios, para que los gráficos no cambien según cuál de los dos se consulte.
+        """
+        last_minute = make_aware(datetime(2024, 10, 1, 23, 59, 30))
+        service.save_invoices([
+            Invoice(stripe_invoice_id='in_1', user=self.user, category=self.news, amount=10000, currency='PYG',
+                    paid_at=last_minute),
+            Invoice(stripe_invoice_id='in_2', user=self.user, category=self.news, amount=15000, currency='PYG',
+                    paid_at=last_minute + timedelta(seconds=30)),
+        ])
+
+        filters = {'date_begin': '2024-10-01T00:00', 'date_end': '2024-10-01T23:59'}
+        charts = self.client.get(reverse('finances_charts'), filters).json()
+        self.assertEqual(self.client.get(reverse('finances_charts'), dict(filters, user=self.user.id)).json(), charts)
+        self.assertEqual(charts['daily_totals'], {'dates': ['01-10-2024'], 'totals': [10000]})
+        self.assertEqual(self.client.get(reverse('finances_table_data'), filters).json()['total_general'], 10000)
+
+    @patch('stripe.Invoice.list')
+    def test_backfill_invoices(self, mock_invoice_list):
+        """
+        Verifica que el comando `backfill_invoices` recorra todas las páginas de facturas de Stripe.
+        """
+        paid_at = make_aware(datetime(2024, 9, 1, 12, 0))
+        expanded = {'id': 'pi_1', 'payment_method': {'card': {'brand': 'mastercard', 'last4': '5555'}}}
+        first = self.stripe_invoice('in_1', self.news, 10000, paid_at, expanded)
+        second = self.stripe_invoice('in_2', self.sports, 20000, paid_at, None)
+        without_category = dict(second, id='in_3', subscription_details={'metadata': {}})
+        mock_invoice_list.side_effect = [
+            {'data': [first], 'has_more': True},
+            {'data': [second, without_category], 'has_more': False},
+        ]
+
+        call_command('backfill_invoices', stdout=StringIO())
+
+        self.assertEqual(mock_invoice_list.call_args_list[1].kwargs['starting_after'], 'in_1')
+        records = {record.stripe_invoice_id: record for record in Invoice.objects.all()}
+        self.assertEqual(set(records), {'in_1', 'in_2'})
+        self.assertEqual(records['in_1'].payment_method_display, 'Mastercard •••• 5555')
+        self.assertEqual(records['in_2'].user, self.user)
+
+    def test_export_streams_filtered_rows(self):
+        """
+        Verifica que las exportaciones a CSV y Excel se generen en el servidor con los filtros indicados
+        y que un usuario sin permiso de finanzas solo exporte sus propios pagos.
+        """
+        day = make_aware(datetime(2024, 10, 1, 9, 0))
+        other = CustomUser.objects.create_user(email="lector@example.com", name="Lector", password="password123")
+        service.save_invoices([
+            Invoice(stripe_invoice_id='in_1', user=self.user, category=self.news, amount=10000, currency='PYG', paid_at=day,
+                    card_brand='visa', card_last4='4242'),
+            Invoice(stripe_invoice_id='in_2', user=other, category=self.sports, amount=20000, currency='PYG',
+                    paid_at=day + timedelta(hours=5)),
+            Invoice(stripe_invoice_id='in_3', user=other, category=self.news, amount=10000, currency='PYG',
+                    paid_at=day + timedelta(days=1)),
+        ])
+
+        response = self.client.get(reverse('finances_export_to_csv'), {'date_end': '2024-10-01T23:59'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="finanzas_', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8').lstrip('﻿').splitlines()
+        self.assertEqual(lines, [
+            'Fecha del Pago,Suscriptor,Categoría,Método de Pago,Monto',
+            '01 de octubre de 2024 a las 09:00,Finanzas,Noticias,Visa •••• 4242,10000',
+            '01 de octubre de 2024 a las 14:00,Lector,Deportes,Otro,20000',
+            ',,,Total General,30000',
+        ])
+
+        response = self.client.get(reverse('finances_export_to_excel'), {'category': self.news.id})
+        workbook = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook["Suscripciones"].values)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][1:], ('Finanzas', 'Noticias', 'Visa •••• 4242', 10000))
+        self.assertEqual(rows[-1], (None, None, None, 'Total General', 20000))
+
+        self.client.login(email="lector@example.com", password="password123")
+        response = self.client.get(reverse('finances_export_to_csv'))
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[-1], ',,,Total General,30000')
+
+
+class FakeStripe:
+    """
+    Cliente local con la interfaz del SDK de Stripe usada por `suscription.stripe_gateway`.
+
+    Cada solicitud espera `latency` segundos y registra la cantidad máxima de solicitudes simultáneas.
+    Las solicitudes indicadas en `failures` fallan por error de conexión la cantidad de veces indicada.
+    """
+
+    class Resource:
+        def __init__(self, fake, name):
+            self.fake = fake
+            self.name = name
+
+        def retrieve(self, object_id):
+            return self.fake.request(self.name, 'retrieve', object_id)
+
+        def modify(self, object_id, **params):
+            return self.fake.request(self.name, 'modify', object_id, params)
+
+        def create(self, **params):
+            object_id = f"{self.name.lower()}_{len(self.fake.objects) + 1}"
+            self.fake.add(self.name, object_id)
+            return self.fake.request(self.name, 'create', object_id, params)
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.calls = []
+        self.failures = {}
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        for resource in ('Subscription', 'Price', 'Product', 'Customer'):
+            setattr(self, resource, self.Resource(self, resource))
+
+    def add(self, resource, object_id, **fields):
+        self.objects[(resource, object_id)] = {'id': object_id, **fields}
+
+    def request(self, resource, method, object_id, params=None):
+        with self.lock:
+            self.calls.append((resource, method, object_id))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            if self.failures.get((resource, method)):
+                self.failures[(resource, method)] -= 1
+                raise stripe.error.APIConnectionError("Stripe no disponible")
+            if (resource, object_id) not in self.objects:
+                raise stripe.error.InvalidRequestError(f"No such {resource}: {object_id}", 'id')
+            self.objects[(resource, object_id)].update(params or {})
+            return stripe.StripeObject.construct_from(self.objects[(resource, object_id)], 'sk_test')
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class StripeGatewayTests(TestCase):
+    """
+    Pruebas de las llamadas a Stripe a través de `suscription.stripe_gateway`, contra un cliente local.
+    """
+
+    def setUp(self):
+        """
+        Crea un usuario suscrito a tres categorías pagas y reemplaza el cliente de Stripe por uno local.
+        """
+
+        pre_save.disconnect(cache_previous_user, sender=CustomUser)
+        post_save.disconnect(post_save_user_handler, sender=CustomUser)
+        pre_save.disconnect(cache_previous_category, sender=Category)
+        post_save.disconnect(post_save_category_handler, sender=Category)
+        cache.clear()
+
+        self.fake = FakeStripe(latency=0.05)
+        patcher = patch.object(stripe_gateway, 'client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = CustomUser.objects.create_user(email="suscriptor@example.com", name="Suscriptor", password="password123")
+        period_end = int(make_aware(datetime(2024, 11, 1, 10, 30)).timestamp())
+        for i in range(3):
+            category = Category.objects.create(name=f"Categoría {i}", type=Category.TypeChoices.paid, price=10000)
+            Suscription.objects.create(user=self.user, category=category, state=Suscription.SuscriptionState.active,
+                                       stripe_subscription_id=f"sub_{i}")
+            if i:
+                self.fake.add('Subscription', f"sub_{i}", status='active', current_period_end=period_end)
+        self.client.login(email="suscriptor@example.com", password="password123")
+
+    def tearDown(self):
+        """
+        Reconecta las señales desconectadas en `setUp`.
+        """
+
+        pre_save.connect(cache_previous_user, sender=CustomUser)
+        post_save.connect(post_save_user_handler, sender=CustomUser)
+        pre_save.connect(cache_previous_category, sender=Category)
+        post_save.connect(post_save_category_handler, sender=Category)
+        super().tearDown()
+
+    def test_subscriptions_are_retrieved_concurrently_and_cached(self):
+        """
+        Verifica que `retrieve_many` consulte las suscripciones de Stripe en paralelo, que omita las que no
+        pudieron consultarse y que las consultas se guarden en caché.
+        """
+        subscriptions = stripe_gateway.retrieve_many('Subscription', ['sub_0', 'sub_1', 'sub_2'])
+
+        self.assertEqual(sorted(subscriptions), ['sub_1', 'sub_2'])
+        self.assertEqual(self.fake.max_running, 3)
+
+        stripe_gateway.retrieve_many('Subscription', ['sub_0', 'sub_1', 'sub_2'])
+        # Solo se repite la suscripción que no pudo consultarse
+        self.assertEqual(len(self.fake.calls), 4)
+        metrics = stripe_gateway.get_metrics('Subscription.retrieve')
+        self.assertEqual((metrics['calls'], metrics['errors'], metrics['cache_hits']), (4, 2, 2))
+        self.assertGreater(metrics['avg_ms'], 0)
+
+    def test_subscriptions_page_renders_stored_period(self):
+        """
+        Verifica que `backfill_subscription_periods` cargue el período de facturación desde Stripe y que la página
+        de suscripciones lo muestre sin consultar a Stripe.
+        """
+        call_command('backfill_subscription_periods', stdout=StringIO())
+        self.assertEqual(len(self.fake.calls), 3)
+        self.fake.calls.clear()
+
+        response = self.client.get(reverse('subscriptions'))
+
+        displays = sorted(str(sub.period_end_display) for sub in response.context['subscriptions'])
+        self.assertEqual(displays, ['01 de noviembre de 2024 a las 10:30'] * 2 + ['No disponible'])
+        self.assertEqual(self.fake.calls, [])
+
+    def test_modify_invalidates_cache(self):
+        """
+        Verifica que modificar una suscripción descarte su consulta en caché y que las métricas se muestren
+        con el comando `stripe_stats`.
+        """
+        self.assertEqual(stripe_gateway.retrieve('Subscription', 'sub_1').status, 'active')
+        stripe_gateway.call('Subscription.modify', 'sub_1', status='canceled')
+        self.assertEqual(stripe_gateway.retrieve('Subscription', 'sub_1').status, 'canceled')
+        self.assertEqual(stripe_gateway.retrieve('Subscription', 'sub_1').status, 'canceled')
+        self.assertEqual(len(self.fake.calls), 3)
+
+        out = StringIO()
+        call_command('stripe_stats', '--reset', stdout=out)
+        self.assertIn('Subscription.retrieve: 2 llamadas, 0 errores', out.getvalue())
+        self.assertIn('Subscription.modify: 1 llamadas', out.getvalue())
+        self.assertEqual(stripe_gateway.get_metrics('Subscription.retrieve')['calls'], 0)
+
+    def test_webhook_sync_invalidates_cache(self):
+        """
+        Verifica que guardar el estado recibido por un webhook descarte la consulta en caché de la suscripción.
+        """
+        self.assertEqual(stripe_gateway.retrieve('Subscription', 'sub_1').status, 'active')
+        self.fake.objects[('Subscription', 'sub_1')]['status'] = 'past_due'
+
+        service.sync_subscription({'id': 'sub_1', 'status': 'past_due'})
+
+        self.assertEqual(stripe_gateway.retrieve('Subscription', 'sub_1').status, 'past_due')
+        self.assertEqual(Suscription.objects.get(stripe_subscription_id='sub_1').stripe_status, 'past_due')
+
+
+@patch('notification.fanout.send_bulk_notification_task')
+@patch('notification.outbox.enqueue')
+@patch('suscription.tasks.sync_stripe.delay')
+class StripeSyncTests(TestCase):
+    """
+    Pruebas de la sincronización con Stripe en segundo plano (`suscription.stripe_sync`) registrada por las
+    señales de categorías y usuarios, contra un cliente local.
+    """
+
+    def setUp(self):
+        """
+        Reemplaza el cliente de Stripe por uno local y crea un usuario cliente de Stripe.
+        """
+
+        cache.clear()
+        self.fake = FakeStripe(latency=0.05)
+        patcher = patch.object(stripe_gateway, 'client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = CustomUser.objects.create_user(email="suscriptor@example.com", name="Suscriptor", password="password123")
+        CustomUser.objects.filter(pk=self.user.pk).update(stripe_customer_id='cus_test')
+        self.user.refresh_from_db()
+        self.fake.add('Customer', 'cus_test')
+
+    def test_category_changes_are_synced_in_background(self, mock_delay, mock_enqueue, mock_bulk_task):
+        """
+        Verifica que guardar una categoría no llame a Stripe, que las operaciones se ejecuten en orden al
+        despacharlas y que las suscripciones de Stripe de un lote se consulten en paralelo.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name="Noticias", type=Category.TypeChoices.paid, price=10000)
+            category.name = "Noticias del día"
+            category.save()
+        self.assertEqual(self.fake.calls, [])
+        self.assertTrue(mock_delay.called)
+
+        create_id = StripeSyncOperation.objects.get(action='create_category_product').id
+        self.assertEqual(stripe_sync.dispatch(), 2)
+        category.refresh_from_db()
+        product = self.fake.objects[('Product', category.stripe_product_id)]
+        price = self.fake.objects[('Price', category.stripe_price_id)]
+        self.assertEqual((product['name'], price['unit_amount']), ("Noticias del día", 10000))
+        # Las creaciones se repiten sin duplicar objetos si el worker se interrumpe antes de confirmar
+        self.assertEqual((product['idempotency_key'], price['idempotency_key']),
+                         (f'stripe-sync-{create_id}-product', f'stripe-sync-{create_id}-price'))
+
+        for i in range(3):
+            other = CustomUser.objects.create_user(email=f"lector{i}@example.com", name=f"Lector {i}", password="password123")
+            Suscription.objects.create(user=other, category=category, stripe_subscription_id=f"sub_{i}")
+            self.fake.add('Subscription', f"sub_{i}", status='active')
+        self.fake.calls.clear()
+
+        category.type = Category.TypeChoices.public
+        category.save()
+        self.assertEqual(self.fake.calls, [])
+        self.assertEqual(StripeSyncOperation.objects.count(), 4)
+
+        self.assertEqual(stripe_sync.dispatch(), 4)
+        self.assertEqual(self.fake.max_running, 3)
+        self.assertFalse(self.fake.objects[('Product', category.stripe_product_id)]['active'])
+        self.assertTrue(all(self.fake.objects[('Subscription', f"sub_{i}")]['cancel_at_period_end'] for i in range(3)))
+        self.assertFalse(StripeSyncOperation.objects.exists())
+
+    def test_free_category_edits_are_not_synced(self, mock_delay, mock_enqueue, mock_bulk_task):
+        """
+        Verifica que editar el nombre de una categoría sin producto en Stripe no registre operaciones.
+        """
+        category = Category.objects.create(name="Cultura", type=Category.TypeChoices.public)
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = "Cultura y arte"
+            category.save()
+
+        self.assertFalse(StripeSyncOperation.objects.exists())
+        self.assertFalse(mock_delay.called)
+
+    def test_failed_operations_are_retried_in_order(self, mock_delay, mock_enqueue, mock_bulk_task):
+        """
+        Verifica que una operación que falla se reintente más tarde y que las siguientes operaciones del mismo
+        objeto esperen, sin detener las de otros objetos.
+        """
+        self.fake.failures[('Customer', 'modify')] = 1
+        self.user.name = "Suscriptor Nuevo"
+        self.user.save()
+        self.user.email = "nuevo@example.com"
+        self.user.save()
+        category = Category.objects.create(name="Deportes", type=Category.TypeChoices.paid, price=20000)
+
+        self.assertEqual(stripe_sync.dispatch(), 1)
+        name_change, email_change = StripeSyncOperation.objects.order_by('id')
+        self.assertEqual((name_change.attempts, name_change.last_error), (1, "Stripe no disponible"))
+        self.assertGreater(name_change.available_at, now())
+        self.assertEqual(email_change.attempts, 0)
+        category.refresh_from_db()
+        self.assertTrue(category.stripe_product_id)
+
+        # Vence la espera del reintento
+        StripeSyncOperation.objects.update(available_at=now())
+        self.assertEqual(stripe_sync.dispatch(), 2)
+        self.assertEqual(self.fake.objects[('Customer', 'cus_test')], {'id': 'cus_test', 'name': "Suscriptor Nuevo", 'email': "nuevo@example.com"})
@@ -1,48 +1,49 @@
-import json
-import locale
+import csv
 import logging
-from io import BytesIO
+import tempfile
+from itertools import chain
 
 import openpyxl
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import stripe
 from django.core.exceptions import PermissionDenied
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.conf import settings
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
-from django.utils import timezone
+from django.utils import dateformat, timezone
 from django.utils.timezone import make_aware
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-import notification.service
 from app.models import CustomUser
 from category.models import Category
-from suscription.models import Suscription
+from suscription import stripe_gateway, tasks, webhooks
+from suscription.models import Invoice, InvoiceDailyRollup, Suscription
 from django.contrib.auth.decorators import login_required
 from cms.profile import base
 
 
 logger = logging.getLogger(__name__)
 
+# Encabezados de la exportación de pagos
+EXPORT_HEADERS = ['Fecha del Pago', 'Suscriptor', 'Categoría', 'Método de Pago', 'Monto']
+
 
 # Create your views here.
 
 def my_subscriptions(request):
     user = request.user
-    suscriptions = Suscription.objects.filter(user=user)
+    # El fin del período se guarda con los webhooks de Stripe, por lo que la página no consulta a Stripe
+    suscriptions = Suscription.objects.filter(user=user).select_related('category')
     for suscription in suscriptions:
-        try:
-            if suscription.category.type == Category.TypeChoices.paid:
-                subscription = stripe.Subscription.retrieve(suscription.stripe_subscription_id)
-                date_end = subscription.current_period_end
-                date_end_at = make_aware(datetime.fromtimestamp(date_end))
-                locale.setlocale(locale.LC_TIME, 'es_PY.UTF-8')
-                formatted_period_end = date_end_at.strftime('%d de %B de %Y a las %H:%M')
-                suscription.period_end_display = formatted_period_end
-        except stripe.error.StripeError as e:
-            suscription.period_end_display = "No disponible"
-            logger.error(f"Error al obtener la suscripción de Stripe: {e}")
+        if suscription.category.type == Category.TypeChoices.paid:
+            if suscription.current_period_end:
+                suscription.period_end_display = dateformat.format(timezone.localtime(suscription.current_period_end), r'd \d\e F \d\e Y \a \l\a\s H:i')
+            else:
+                suscription.period_end_display = "No disponible"
 
     return render(request, "subscription/subscriptions.html", {'subscriptions': suscriptions})
 
@@ -121,7 +122,8 @@ def unsuscribe_category(request, category_id):
     if category.type == Category.TypeChoices.paid:
         subscription_id = suscription.stripe_subscription_id
         try:
-            stripe.Subscription.modify(
+            stripe_gateway.call(
+                'Subscription.modify',
                 subscription_id,
                 cancel_at_period_end=True,
             )
@@ -171,7 +173,8 @@ def create_checkout_session(request, category_id):
         customer_email = None
 
     try:
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = stripe_gateway.call(
+            'checkout.Session.create',
             line_items=[
                 {
                     'price': category.stripe_price_id,
@@ -203,22 +206,18 @@ def create_checkout_session(request, category_id):
 @csrf_exempt
 def stripe_webhook(request):
     """
-    Maneja eventos de webhook provenientes de Stripe y realiza acciones según el tipo de evento.
+    Recibe los eventos de webhook de Stripe y los registra para procesarlos en segundo plano.
 
     :param request: Objeto de solicitud HTTP.
     :type request: HttpRequest
 
     Comportamiento
         - Verifica la firma del webhook y construye el evento de Stripe.
-        - Realiza acciones específicas según el tipo de evento:
-          - `checkout.session.completed`: Guarda el ID del cliente de Stripe en el usuario del sistema.
-          - `invoice.paid`: Activa o crea una suscripción en la categoría correspondiente.
-          - `invoice.payment_failed`: Marca la suscripción como cancelada y notifica el fallo de pago.
-          - `customer.subscription.deleted`: Cancela la suscripción en el sistema.
-          - `customer.subscription.updated`: Marca la suscripción como pendiente de cancelación.
-          - `product.updated`: Desactiva las suscripciones si el producto ha sido desactivado.
-          - `price.updated`: Actualiza el precio de la categoría y cancela las suscripciones activas.
-          - `customer.created`: Guarda el ID del cliente de Stripe en el usuario del sistema.
+        - Registra el evento en la tabla de eventos (:class:`suscription.models.StripeEvent`). Los reenvíos de un
+          evento ya registrado se ignoran.
+        - Encola el procesamiento de los eventos del cliente (`suscription.tasks.process_stripe_events`) y responde
+          de inmediato, sin consultar a Stripe. Los eventos se procesan en orden por cliente; las acciones de cada
+          tipo de evento se describen en `suscription.webhooks`.
 
     :return: Respuesta JSON indicando el estado de la operación.
     :rtype: JsonResponse
@@ -237,348 +236,221 @@ def stripe_webhook(request):
         # La firma del webhook no es válida
         return JsonResponse({'status': 'invalid signature'}, status=400)
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        user_id = session['metadata'].get('user_id')
+    customer_id = webhooks.store(event)
+    try:
+        tasks.process_stripe_events.delay(customer_id)
+    except Exception as e:
+        # El evento ya está registrado: la tarea periódica `process_pending_stripe_events` lo procesará
+        logger.error(f"Error al encolar el procesamiento del evento de Stripe {event['id']}: {e}")
 
-        # Obtener el usuario de la base de datos
-        try:
-            user = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
-            return JsonResponse({'status': 'user not found'}, status=404)
+    return JsonResponse({'status': 'success'}, status=200)
 
-        customer_id = session.get('customer')
 
-        if not user.stripe_customer_id:
-            user.stripe_customer_id = customer_id
-            user.save()
+def _paid_invoices(request):
+    """
+    Facturas pagadas de categorías pagas del libro de facturas, filtradas según los parámetros de la solicitud.
 
-        # Actualizar el nombre del cliente en Stripe con el nombre del usuario de tu sistema
-        try:
-            stripe.Customer.modify(
-                customer_id,
-                name=user.name,  # Nombre del usuario en tu sistema
-            )
-        except Exception as e:
-            return JsonResponse({'status': f'Error al actualizar el cliente en Stripe: {e}'}, status=500)
+    Filtros admitidos: `user`, `category`, `date_begin` y `date_end` (`%Y-%m-%dT%H:%M`, en hora local,
+    ambos inclusive). `date_end` incluye todo su minuto, igual que el día completo en los totales diarios.
 
-        invoice_id = session.get('invoice')
-        invoice = stripe.Invoice.retrieve(invoice_id)
+    :param request: Objeto de solicitud HTTP.
+    :type request: HttpRequest
+    :return: Queryset de facturas.
+    :rtype: QuerySet
+    """
 
-        payment_intent_id = invoice.get('payment_intent')
+    invoices = Invoice.objects.filter(category__type=Category.TypeChoices.paid)
+    if request.GET.get('user'):
+        invoices = invoices.filter(user_id=int(request.GET.get('user')))
+    if request.GET.get('category'):
+        invoices = invoices.filter(category_id=int(request.GET.get('category')))
+    if request.GET.get('date_begin'):
+        invoices = invoices.filter(paid_at__gte=make_aware(datetime.strptime(request.GET.get('date_begin'), '%Y-%m-%dT%H:%M')))
+    if request.GET.get('date_end'):
+        date_end = make_aware(datetime.strptime(request.GET.get('date_end'), '%Y-%m-%dT%H:%M'))
+        invoices = invoices.filter(paid_at__lt=date_end + timedelta(minutes=1))
+    return invoices
 
-        if not payment_intent_id:
-            return JsonResponse({'status': 'No se intentó realizar el pago, falta payment_intent'}, status=400)
 
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+def _uses_whole_days(request):
+    """
+    Indica si los filtros de la solicitud pueden resolverse con los totales diarios por categoría.
 
-        new_payment_method_id = payment_intent.get('payment_method')
-        new_payment_method = stripe.Customer.retrieve_payment_method(customer_id, new_payment_method_id)
+    Los totales diarios no distinguen usuarios ni horas, por lo que solo se utilizan sin filtro de usuario y con
+    un rango de fechas que comienza a las 00:00 y termina a las 23:59.
 
-        existing_payment_methods = stripe.PaymentMethod.list(
-            customer=customer_id,
-            type="card",
-        )
+    :param request: Objeto de solicitud HTTP.
+    :type request: HttpRequest
+    :rtype: bool
+    """
 
-        count_duplicate = 0
-        for payment_method in existing_payment_methods:
-            if new_payment_method['card']['fingerprint'] == payment_method['card']['fingerprint'] and new_payment_method['card']['exp_month'] == payment_method['card']['exp_month'] and new_payment_method['card']['exp_year'] == payment_method['card']['exp_year']:
-                count_duplicate += 1
-            if count_duplicate > 1:
-                stripe.PaymentMethod.detach(payment_method['id'])
-                count_duplicate -= 1
+    date_begin = request.GET.get('date_begin')
+    date_end = request.GET.get('date_end')
+    return (
+        not request.GET.get('user')
+        and (not date_begin or date_begin.endswith('T00:00'))
+        and (not date_end or date_end.endswith('T23:59'))
+    )
 
-    if event['type'] == 'invoice.paid':
-        invoice = event['data']['object']
 
-        metadata = invoice['subscription_details']['metadata']
-        category_id = metadata.get('category_id')
+def _chart_rows(request):
+    """
+    Cantidad y monto pagado por día y categoría, según los filtros de la solicitud.
 
-        if not category_id:
-            return JsonResponse({'status': 'category_id not found in metadata'}, status=400)
+    Si los filtros lo permiten, se leen de los totales diarios (:class:`suscription.models.InvoiceDailyRollup`)
+    con una única consulta por rango sobre su índice `(day, category)`; si no, se agrupan las facturas del libro.
 
-        # Obtener datos de la sesión
-        customer_id = invoice.get('customer')
-        subscription_id = invoice.get('subscription')
-        customer_email = invoice.get('customer_email')
+    :param request: Objeto de solicitud HTTP.
+    :type request: HttpRequest
+    :return: Lista de tuplas `(día, categoría, cantidad, monto)` ordenadas por día y categoría.
+    :rtype: list
+    """
 
-        try:
-            user = CustomUser.objects.get(email=customer_email)
-            if not user.stripe_customer_id:
-                user.stripe_customer_id = customer_id
-                user.save()
-            category = Category.objects.get(id=category_id)
-            suscription = Suscription.objects.filter(user=user, category=category).first()
-
-            if suscription:
-                suscription.stripe_subscription_id = subscription_id
-                suscription.state = Suscription.SuscriptionState.active
-            else:
-                suscription = Suscription(user=user, category=category, state=Suscription.SuscriptionState.active, stripe_subscription_id=subscription_id)
+    if not _uses_whole_days(request):
+        return list(
+            _paid_invoices(request)
+            .annotate(day=TruncDate('paid_at', tzinfo=timezone.get_current_timezone()))
+            .values_list('day', 'category__name')
+            .annotate(count=Count('id'), amount=Sum('amount'))
+            .order_by('day', 'category__name')
+        )
 
-            suscription.save()
+    rollups = InvoiceDailyRollup.objects.filter(category__type=Category.TypeChoices.paid)
+    if request.GET.get('category'):
+        rollups = rollups.filter(category_id=int(request.GET.get('category')))
+    if request.GET.get('date_begin'):
+        rollups = rollups.filter(day__gte=datetime.strptime(request.GET.get('date_begin'), '%Y-%m-%dT%H:%M').date())
+    if request.GET.get('date_end'):
+        rollups = rollups.filter(day__lte=datetime.strptime(request.GET.get('date_end'), '%Y-%m-%dT%H:%M').date())
+    return list(rollups.values_list('day', 'category__name', 'count', 'amount').order_by('day', 'category__name'))
+
+
+def _category_totals(rows):
+    totals = defaultdict(int)
+    for _, category, count, _ in rows:
+        totals[category] += count
+    labels = sorted(totals)
+    return {
+        'labels': labels,
+        'totals': [totals[category] for category in labels],
+    }
 
-            notification.service.payment_success(user, category, invoice)
 
-        except CustomUser.DoesNotExist:
-            return JsonResponse({'status': 'user not found'}, status=404)
-        except Category.DoesNotExist:
-            return JsonResponse({'status': 'category not found'}, status=404)
-        except Suscription.DoesNotExist:
-            return JsonResponse({'status': 'suscription not found'}, status=404)
+def _category_timeline(rows):
+    # Estructura para almacenar la suma diaria por categoría
+    category_time_data = defaultdict(dict)  # {categoria: {fecha: total_diario}}
+    all_dates = []
+    for day, category, _, amount in rows:
+        date = day.strftime('%d-%m-%Y')
+        if not all_dates or all_dates[-1] != date:
+            all_dates.append(date)
+        category_time_data[category][date] = amount
+
+    # Construir el JSON de respuesta para Chart.js, con datos de cada categoría en todas las fechas
+    return {
+        'categories': list(category_time_data.keys()),
+        'datasets': [
+            {
+                'label': category,
+                'data': [daily_totals.get(date, 0) for date in all_dates],
+                'dates': all_dates
+            }
+            for category, daily_totals in category_time_data.items()
+        ]
+    }
 
-    if event['type'] == 'invoice.payment_failed':
-        invoice = event['data']['object']
 
-        metadata = invoice['subscription_details']['metadata']
-        category_id = metadata.get('category_id')
+def _daily_totals(rows):
+    totals = {}
+    for day, _, _, amount in rows:
+        date = day.strftime('%d-%m-%Y')
+        totals[date] = totals.get(date, 0) + amount
+    return {
+        'dates': list(totals.keys()),
+        'totals': list(totals.values()),
+    }
 
-        if not category_id:
-            return JsonResponse({'status': 'category_id not found in metadata'}, status=400)
 
-        # Obtener datos de la sesión
-        customer_id = invoice.get('customer')
-        subscription_id = invoice.get('subscription')
+def _invoice_rows(request):
+    """
+    Recorre los pagos visibles para el usuario de la solicitud, ordenados por fecha, con los filtros indicados.
 
-        try:
-            user = CustomUser.objects.get(stripe_customer_id=customer_id)
-            category = Category.objects.get(id=category_id)
-            suscription = Suscription.objects.filter(user=user, category=category,stripe_subscription_id=subscription_id).first()
-
-            if suscription:
-                suscription.state = Suscription.SuscriptionState.cancelled
-                stripe.Subscription.cancel(subscription_id)
-                suscription.save()
-                if suscription.state == Suscription.SuscriptionState.cancelled:
-                    notification.service.payment_failed(user, category, invoice, True)
-                else:
-                    notification.service.payment_failed(user, category, invoice, False)
-            else:
-                notification.service.payment_failed(user, category, invoice, True)
-
-        except CustomUser.DoesNotExist:
-            return JsonResponse({'status': 'user not found'}, status=404)
-        except Category.DoesNotExist:
-            return JsonResponse({'status': 'category not found'}, status=404)
-        except Suscription.DoesNotExist:
-            return JsonResponse({'status': 'suscription not found'}, status=404)
-
-    if event['type'] == 'customer.subscription.deleted':
-        subscription = event['data']['object']
-        subscription_id = subscription['id']
-        category_id = subscription["metadata"]["category_id"]
-        customer_id = subscription.get('customer')
-        metadata = subscription['metadata']
-        category_paid = True
-
-        if "category_paid" in metadata:
-            category_paid = metadata["category_paid"]
-
-        if category_paid != 'False':
-            try:
-                user = CustomUser.objects.get(stripe_customer_id=customer_id)
-                category = Category.objects.get(id=category_id)
-                suscription = Suscription.objects.filter(user=user, category=category,stripe_subscription_id=subscription_id).first()
-                if not suscription:
-                    return JsonResponse({'status': 'suscription already deleted'}, status=200)
-                suscription.state = Suscription.SuscriptionState.cancelled
-                suscription.save()
-
-                notification.service.subscription_cancelled(user, category)
-
-            except CustomUser.DoesNotExist:
-                return JsonResponse({'status': 'user not found'}, status=404)
-            except Category.DoesNotExist:
-                return JsonResponse({'status': 'category not found'}, status=404)
-
-    if event['type'] == 'customer.subscription.updated':
-        subscription = event['data']['object']
-        pending_cancellation = subscription['cancel_at_period_end']
-        previous_attributes = event['data']['previous_attributes']
-        metadata = subscription['metadata']
-        category_paid = True
-        status = subscription['status']
-
-        # Si cambio al estado 'incomplete_expired' se cancela la suscripción sin enviar notificación
-        if 'status' in previous_attributes and status != previous_attributes['status'] and status == 'incomplete_expired':
-            stripe.Subscription.modify(
-                subscription.id,
-                category_paid=False,
-            )
-            stripe.Subscription.delete(subscription.id)
-
-        if "category_paid" in metadata:
-            category_paid = metadata["category_paid"]
-
-        #Si se cancela la suscripción al finalizar el periodo de facturación
-        if 'cancel_at_period_end' in previous_attributes and pending_cancellation and pending_cancellation != previous_attributes['cancel_at_period_end']:
-            if category_paid != 'False':
-                subscription_id = subscription['id']
-                category_id = subscription["metadata"]["category_id"]
-                customer_id = subscription.get('customer')
-
-                try:
-                    user = CustomUser.objects.get(stripe_customer_id=customer_id)
-                    category = Category.objects.get(id=category_id)
-                    suscription = Suscription.objects.filter(user=user, category=category,stripe_subscription_id=subscription_id).first()
-                    if not suscription:
-                        return JsonResponse({'status': 'suscription not found'}, status=404)
-                    suscription.state = Suscription.SuscriptionState.pending_cancellation
-                    suscription.save()
-
-                    notification.service.subscription_pending_cancellation(user, category, subscription)
-
-                except Exception as e:
-                    return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
-                except Category.DoesNotExist:
-                    return JsonResponse({'status': 'category not found'}, status=404)
-                except Suscription.DoesNotExist:
-                    return JsonResponse({'status': 'suscription not found'}, status=404)
-
-    if event['type'] == 'product.updated':
-        product = event['data']['object']
-        product_id = product['id']
-        previous_attributes = event['data']['previous_attributes']
-        active = product['active']
-        metadata = product['metadata']
-        category_paid = True
-
-        if "category_paid" in metadata:
-            category_paid = metadata["category_paid"]
-
-        # Si se desactiva el producto
-        if 'active' in previous_attributes and not active and active != previous_attributes['active']:
-            if category_paid != 'False':
-                try:
-                    category = Category.objects.get(stripe_product_id=product_id)
-                    list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False).exclude(state=Suscription.SuscriptionState.cancelled)
-                    for suscription in list_subscriptions:
-                        subscription_id = suscription.stripe_subscription_id
-                        stripe.Subscription.modify(
-                            subscription_id,
-                            cancel_at_period_end=True,
-                        )
-                except Exception as e:
-                    return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
-
-    if event['type'] == 'price.updated':
-        price = event['data']['object']
-        price_id = price['id']
-        active = price['active']
-        metada = price['metadata']
-
-        if 'new_price' in metada:
-            new_price = metada['new_price']
-        else:
-            new_price = None
-
-        # Si se cambia de precio
-        if not active and new_price and new_price != price['unit_amount']:
-            try:
-                category = Category.objects.get(stripe_price_id=price_id)
-                # Crear un nuevo precio en Stripe
-                new_price_stripe = stripe.Price.create(
-                    product=category.stripe_product_id,
-                    unit_amount=new_price,
-                    currency='PYG',
-                    recurring={"interval": "day"},
-                )
-                # Guardar el nuevo ID del precio en el modelo de categoría
-                category.stripe_price_id = new_price_stripe.id
-                category.save()
-
-                # Cancelar las suscripciones activas al finalizar el periodo de facturación actual
-                list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False, state=Suscription.SuscriptionState.active)
-                for suscription in list_subscriptions:
-                    stripe.Subscription.modify(
-                        suscription.stripe_subscription_id,
-                        cancel_at_period_end=True,
-                    )
-            except Exception as e:
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
-
-    if event['type'] == 'customer.created':
-        customer = event['data']['object']
-        customer_id = customer['id']
-        email = customer['email']
-        user = CustomUser.objects.filter(email=email).first()
-
-        if user:
-            if not user.stripe_customer_id:
-                user.stripe_customer_id = customer_id
-                user.save()
-                stripe.Customer.modify(
-                    customer_id,
-                    name=user.name,
-                )
+    Las filas se leen con un cursor del servidor de a `FINANCE_EXPORT_CHUNK_SIZE` por vez, por lo que la memoria
+    utilizada no depende de la cantidad de pagos. Los usuarios sin el permiso `app.view_finances` solo ven sus
+    propios pagos.
 
+    :param request: Objeto de solicitud HTTP.
+    :type request: HttpRequest
+    :return: Iterador de diccionarios con las columnas de la tabla de pagos.
+    :rtype: iterator
+    """
 
-    return JsonResponse({'status': 'success'}, status=200)
+    invoices = _paid_invoices(request)
+    if not request.user.has_perm('app.view_finances'):
+        invoices = invoices.filter(user=request.user)
 
-@login_required
-def table_data(request):
+    rows = (
+        invoices
+        .order_by('paid_at', 'id')
+        .values_list('paid_at', 'user__name', 'category__name', 'card_brand', 'card_last4', 'amount')
+        .iterator(chunk_size=settings.FINANCE_EXPORT_CHUNK_SIZE)
+    )
+    for paid_at, user_name, category_name, card_brand, card_last4, amount in rows:
+        yield {
+            'fecha_pago': dateformat.format(timezone.localtime(paid_at), r'd \d\e F \d\e Y \a \l\a\s H:i'),
+            'suscriptor': user_name or '',
+            'categoria': category_name,
+            'monto': amount,
+            'metodo_pago': Invoice.format_payment_method(card_brand, card_last4),
+        }
 
-    user = request.user
-    if not user.has_perm('app.view_finances'):
-        suscriptions = Suscription.objects.filter(stripe_subscription_id__isnull=False,category__type=Category.TypeChoices.paid, user=user)
-        usr = None
-    else:
-        suscriptions = Suscription.objects.filter(stripe_subscription_id__isnull=False,category__type=Category.TypeChoices.paid)
-        usr = int(request.GET.get('user')) if request.GET.get('user') else None
-
-    cat = int(request.GET.get('category')) if request.GET.get('category') else None
-    date_begin = request.GET.get('date_begin') if request.GET.get('date_begin') else None
-    date_end = request.GET.get('date_end') if request.GET.get('date_end') else None
-
-    # Aplicar filtros al queryset
-    if usr:
-        suscriptions = suscriptions.filter(user__id=usr)
-    if cat:
-        suscriptions = suscriptions.filter(category__id=cat)
-    date_begin_obj = make_aware(datetime.strptime(date_begin, '%Y-%m-%dT%H:%M')) if date_begin else None
-    date_end_obj = make_aware(datetime.strptime(date_end, '%Y-%m-%dT%H:%M')) if date_end else None
-
-    # Obtener y filtrar las facturas
-    invoices_data = []
+
+def _export_lines(request):
+    """
+    Filas de la exportación de pagos: encabezados, un pago por fila y el total general al final.
+
+    :param request: Objeto de solicitud HTTP.
+    :type request: HttpRequest
+    :return: Iterador de listas de valores.
+    :rtype: iterator
+    """
+
+    yield EXPORT_HEADERS
     total_general = 0
-    for suscription in suscriptions:
-        try:
-            category_id = suscription.category.id
-            customer_id = suscription.user.stripe_customer_id
-            invoices = stripe.Invoice.list(customer=customer_id, status='paid')
+    for invoice in _invoice_rows(request):
+        total_general += invoice['monto']
+        yield [invoice['fecha_pago'], invoice['suscriptor'], invoice['categoria'], invoice['metodo_pago'], invoice['monto']]
+    yield ["", "", "", "Total General", total_general]
 
-            for invoice in invoices['data']:
-                metadata = invoice['subscription_details']['metadata']
-                stripe_category_id = metadata.get('category_id')
 
-                if not stripe_category_id or int(stripe_category_id) != category_id:
-                    continue
+def _export_filename(extension):
+    timestamp = timezone.localtime(timezone.now()).strftime("%d-%m-%Y_%H-%M")
+    return f"finanzas_{timestamp}.{extension}"
 
-                paid_at = invoice['status_transitions']['paid_at']
-                dt_paid_at = make_aware(datetime.fromtimestamp(paid_at))
-                locale.setlocale(locale.LC_TIME, 'es_PY.UTF-8')
-                formatted_period_end = dt_paid_at.strftime('%d de %B de %Y a las %H:%M')
 
-                if (not date_begin_obj or dt_paid_at >= date_begin_obj) and (not date_end_obj or dt_paid_at <= date_end_obj):
-                    total_general += invoice['amount_paid']
+class _Echo:
+    """
+    Archivo que devuelve lo que se escribe en él, para generar cada línea del CSV sin acumularlas.
+    """
 
-                    payment_intent = stripe.PaymentIntent.retrieve(invoice['payment_intent'])
-                    payment_method = stripe.PaymentMethod.retrieve(payment_intent['payment_method'])
+    def write(self, value):
+        return value
 
-                    payment_method_details = f"{payment_method.card['brand'].capitalize()} •••• {payment_method.card['last4']}" if payment_method.card else "Otro"
 
-                    invoices_data.append({
-                        'fecha_pago': formatted_period_end,
-                        'suscriptor': suscription.user.name,
-                        'categoria': suscription.category.name,
-                        'monto': invoice['amount_paid'],
-                        'metodo_pago': payment_method_details,
-                    })
+@login_required
+def table_data(request):
+    """
+    Devuelve los pagos de suscripciones en el rango de fechas seleccionado, con el total general.
 
-        except stripe.error.StripeError:
-            return JsonResponse({"error": "Error en Stripe"}, status=500)
+    Los pagos se obtienen del libro de facturas (:class:`suscription.models.Invoice`) con una única consulta.
+    Los usuarios sin el permiso `app.view_finances` solo ven sus propios pagos.
 
-    # invoices_data = sorted(invoices_data, key=lambda x: x['fecha_pago'])
+    :param request: Objeto de solicitud HTTP.
+    :return: JsonResponse con los pagos y el total general.
+    """
+
+    invoices_data = list(_invoice_rows(request))
+    total_general = sum(invoice['monto'] for invoice in invoices_data)
     return JsonResponse({'invoices_data': invoices_data, 'total_general': total_general})
 
 @login_required
@@ -610,290 +482,109 @@ def category_totals(request):
     if not user.has_perm('app.view_finances'):
         raise PermissionDenied
 
-    # Filtrar por categoría si se seleccionó una
-    if request.GET.get('category'):
-        category_id = int(request.GET.get('category'))
-        suscriptions = Suscription.objects.filter(category_id=category_id, stripe_subscription_id__isnull=False, category__type=Category.TypeChoices.paid)
-    else:
-        suscriptions = Suscription.objects.filter(stripe_subscription_id__isnull=False, category__type=Category.TypeChoices.paid)
-
-    if request.GET.get('user'):
-        user_id = int(request.GET.get('user'))
-        suscriptions = suscriptions.filter(user_id=user_id)
-
-    # Filtrar por fechas de suscripción
-    if request.GET.get('date_begin'):
-        date_begin = request.GET.get('date_begin')
-        date_begin_obj = datetime.strptime(date_begin, '%Y-%m-%dT%H:%M')
-    else:
-        date_begin_obj = None
-
-    if request.GET.get('date_end'):
-        date_end = request.GET.get('date_end')
-        date_end_obj = datetime.strptime(date_end, '%Y-%m-%dT%H:%M')
-    else:
-        date_end_obj = None
-
-    category_payment_counts = {}
-
-    for suscription in suscriptions:
-        try:
-            category_id = suscription.category.id
-            customer_id = suscription.user.stripe_customer_id
-            invoices = stripe.Invoice.list(customer=customer_id, status='paid')
-
-            for invoice in invoices['data']:
-                metadata = invoice['subscription_details']['metadata']
-                stripe_category_id = metadata.get('category_id')
-
-                if not stripe_category_id or int(stripe_category_id) != category_id:
-                    continue
-
-                paid_at = invoice['status_transitions']['paid_at']
-
-                # Convertir Unix timestamp a objetos datetime
-                dt_paid_at = make_aware(datetime.fromtimestamp(paid_at))
-                formatted_paid_at = dt_paid_at.strftime('%Y-%m-%dT%H:%M')
-                date_paid_at = datetime.strptime(formatted_paid_at, '%Y-%m-%dT%H:%M')
-
-                if (not date_begin_obj or date_paid_at >= date_begin_obj) and (not date_end_obj or date_paid_at <= date_end_obj):
-                    category_name = suscription.category.name
-                    category_payment_counts[category_name] = category_payment_counts.get(category_name, 0) + 1
-
-        except stripe.error.StripeError as e:
-            print(f"Error al obtener facturas de Stripe: {e}")
-
-    # Preparar los datos para el gráfico
-    data = {
-        'labels': list(category_payment_counts.keys()),
-        'totals': list(category_payment_counts.values())
-    }
-
-    return JsonResponse(data)
+    return JsonResponse(_category_totals(_chart_rows(request)))
 
 
 @login_required
 def category_timeline(request):
+    """
+    Devuelve los montos pagados por día para cada categoría en el rango de fechas seleccionado.
+
+    :param request: Objeto de solicitud HTTP.
+    :return: JsonResponse con una serie por categoría, con un monto para cada fecha con pagos.
+    """
 
     user = request.user
     if not user.has_perm('app.view_finances'):
         raise PermissionDenied
 
-    # Filtrar suscripciones activas y pagadas
-    suscriptions = Suscription.objects.filter(
-        stripe_subscription_id__isnull=False,
-        category__type=Category.TypeChoices.paid
-    )
-
-    # Aplicar filtros del request
-    if request.GET.get('category'):
-        category_id = int(request.GET.get('category'))
-        suscriptions = suscriptions.filter(category_id=category_id)
-
-    if request.GET.get('user'):
-        user_id = int(request.GET.get('user'))
-        suscriptions = suscriptions.filter(user_id=user_id)
-
-    if request.GET.get('date_begin'):
-        date_begin = request.GET.get('date_begin')
-        date_begin_obj = datetime.strptime(date_begin, '%Y-%m-%dT%H:%M')
-    else:
-        date_begin_obj = None
-
-    if request.GET.get('date_end'):
-        date_end = request.GET.get('date_end')
-        date_end_obj = datetime.strptime(date_end, '%Y-%m-%dT%H:%M')
-    else:
-        date_end_obj = None
-
-    # Estructura para almacenar la suma diaria por categoría
-    category_time_data = defaultdict(lambda: defaultdict(int))  # {categoria: {fecha: total_diario}}
-
-    for suscription in suscriptions:
-        try:
-            category_id = suscription.category.id
-            customer_id = suscription.user.stripe_customer_id
-            invoices = stripe.Invoice.list(customer=customer_id, status='paid')
-
-            for invoice in invoices['data']:
-                metadata = invoice['subscription_details']['metadata']
-                stripe_category_id = metadata.get('category_id')
-
-                if not stripe_category_id or int(stripe_category_id) != category_id:
-                    continue
-
-                paid_at = invoice['status_transitions']['paid_at']
-
-                # Convertir Unix timestamp a objetos datetime
-                dt_paid_at = make_aware(datetime.fromtimestamp(paid_at))
-                formatted_paid_at = dt_paid_at.strftime('%Y-%m-%dT%H:%M')
-                date_paid_at = datetime.strptime(formatted_paid_at, '%Y-%m-%dT%H:%M')
-                dt_paid_at = dt_paid_at.strftime('%d-%m-%Y')
-
-                if (not date_begin_obj or date_paid_at >= date_begin_obj) and (not date_end_obj or date_paid_at <= date_end_obj):
-                    amount_paid = invoice['amount_paid']
-
-                    # Sumar monto a la fecha y categoría correspondiente
-                    category_name = suscription.category.name
-                    category_time_data[category_name][dt_paid_at] += amount_paid
-
-        except stripe.error.StripeError as e:
-            print(f"Error al obtener facturas de Stripe: {e}")
-
-    # Obtener todas las fechas únicas y ordenarlas
-    all_dates = sorted({date for dates in category_time_data.values() for date in dates},key=lambda x: datetime.strptime(x, '%d-%m-%Y'))
-
-    # Formatear los datos para que cada categoría tenga datos en todas las fechas
-    final_data = {}
-    for category, daily_totals in category_time_data.items():
-        final_data[category] = {
-            'dates': all_dates,
-            'amounts': [daily_totals.get(date, 0) for date in all_dates]
-        }
-
-    # Construir el JSON de respuesta para Chart.js
-    data = {
-        'categories': list(final_data.keys()),
-        'datasets': [
-            {
-                'label': category,
-                'data': final_data[category]['amounts'],
-                'dates': final_data[category]['dates']
-            }
-            for category in final_data
-        ]
-    }
-
-    return JsonResponse(data)
+    return JsonResponse(_category_timeline(_chart_rows(request)))
 
 @login_required
 def daily_totals(request):
+    """
+    Devuelve el monto total pagado por día en el rango de fechas seleccionado.
+
+    :param request: Objeto de solicitud HTTP.
+    :return: JsonResponse con las fechas y sus totales.
+    """
 
     user = request.user
     if not user.has_perm('app.view_finances'):
         raise PermissionDenied
 
-    # Filtrar suscripciones activas y pagadas
-    suscriptions = Suscription.objects.filter(
-        stripe_subscription_id__isnull=False,
-        category__type=Category.TypeChoices.paid
-    )
-
-    # Aplicar filtros del request
-    if request.GET.get('category'):
-        category_id = int(request.GET.get('category'))
-        suscriptions = suscriptions.filter(category_id=category_id)
-
-    if request.GET.get('user'):
-        user_id = int(request.GET.get('user'))
-        suscriptions = suscriptions.filter(user_id=user_id)
-
-    if request.GET.get('date_begin'):
-        date_begin = request.GET.get('date_begin')
-        date_begin_obj = datetime.strptime(date_begin, '%Y-%m-%dT%H:%M')
-    else:
-        date_begin_obj = None
-
-    if request.GET.get('date_end'):
-        date_end = request.GET.get('date_end')
-        date_end_obj = datetime.strptime(date_end, '%Y-%m-%dT%H:%M')
-    else:
-        date_end_obj = None
-
-    # Diccionario para almacenar los montos diarios
-    daily_totals = defaultdict(float)  # {fecha: total_monto}
-
-    # Recorrer cada suscripción y obtener las facturas pagadas
-    for suscription in suscriptions:
-        try:
-            category_id = suscription.category.id
-            customer_id = suscription.user.stripe_customer_id
-            invoices = stripe.Invoice.list(customer=customer_id, status='paid')
+    return JsonResponse(_daily_totals(_chart_rows(request)))
 
-            for invoice in invoices['data']:
-                metadata = invoice['subscription_details']['metadata']
-                stripe_category_id = metadata.get('category_id')
 
-                if not stripe_category_id or int(stripe_category_id) != category_id:
-                    continue
+@login_required
+def finance_charts(request):
+    """
+    Devuelve los datos de los tres gráficos de finanzas con una única consulta.
 
-                paid_at = invoice['status_transitions']['paid_at']
+    Equivale a :func:`category_totals`, :func:`category_timeline` y :func:`daily_totals` en una sola respuesta,
+    para que la página de finanzas cargue sus gráficos con una única solicitud.
 
-                # Convertir Unix timestamp a objetos datetime
-                dt_paid_at = make_aware(datetime.fromtimestamp(paid_at))
-                formatted_paid_at = dt_paid_at.strftime('%Y-%m-%dT%H:%M')
-                date_paid_at = datetime.strptime(formatted_paid_at, '%Y-%m-%dT%H:%M')
+    :param request: Objeto de solicitud HTTP.
+    :return: JsonResponse con las claves `category_totals`, `category_timeline` y `daily_totals`.
+    """
 
-                dt_paid_at = dt_paid_at.strftime('%d-%m-%Y')
+    user = request.user
+    if not user.has_perm('app.view_finances'):
+        raise PermissionDenied
 
-                if (not date_begin_obj or date_paid_at >= date_begin_obj) and (not date_end_obj or date_paid_at <= date_end_obj):
-                    amount_paid = invoice['amount_paid']
+    rows = _chart_rows(request)
+    return JsonResponse({
+        'category_totals': _category_totals(rows),
+        'category_timeline': _category_timeline(rows),
+        'daily_totals': _daily_totals(rows),
+    })
 
-                    # Acumular el monto en la fecha correspondiente
-                    daily_totals[dt_paid_at] += amount_paid
 
-        except stripe.error.StripeError as e:
-            print(f"Error al obtener facturas de Stripe: {e}")
+@login_required
+def export_to_csv(request):
+    """
+    Exporta los pagos a un archivo CSV generado a medida que se leen de la base de datos.
 
-    # Ordenar las fechas
-    sorted_dates = sorted(daily_totals.keys(), key=lambda x: datetime.strptime(x, '%d-%m-%Y'))
+    Admite los mismos filtros que :func:`table_data`. La respuesta se envía por partes
+    (`StreamingHttpResponse`), por lo que la memoria utilizada no depende de la cantidad de pagos.
 
-    # Preparar los datos para el gráfico
-    data = {
-        'dates': sorted_dates,
-        'totals': [daily_totals[date] for date in sorted_dates]
-    }
+    :param request: Objeto de solicitud HTTP.
+    :return: StreamingHttpResponse con el archivo CSV.
+    """
 
-    return JsonResponse(data)
+    writer = csv.writer(_Echo())
+    # La marca de orden de bytes permite que Excel reconozca el archivo como UTF-8
+    lines = chain(['\ufeff'], (writer.writerow(row) for row in _export_lines(request)))
+    response = StreamingHttpResponse(lines, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{_export_filename("csv")}"'
+    return response
 
 
 @login_required
 def export_to_excel(request):
+    """
+    Exporta los pagos a un archivo Excel generado en el servidor.
 
-    # Obtener los datos enviados desde el formulario
-    invoices_data_json = request.POST.get('invoices_data')
-    total_general = request.POST.get('total_general')
-
-    # Convertir los datos JSON a un objeto Python
-    invoices_data = json.loads(invoices_data_json)
-
-    if not invoices_data:
-        return JsonResponse({"error": "No hay datos para exportar"}, status=400)
-
-    # Crear el archivo Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Suscripciones"
-
-    # Agregar encabezados
-    headers = ['Fecha del Pago', 'Suscriptor', 'Categoría', 'Método de Pago', 'Monto']
-    ws.append(headers)
+    Admite los mismos filtros que :func:`table_data`. El libro se crea en modo `write_only` de openpyxl, que
+    escribe cada fila en disco en lugar de mantener la hoja en memoria, y el archivo se envía por partes
+    desde un archivo temporal.
 
-    # Agregar los datos de la tabla
-    for invoice in invoices_data:
-        ws.append([
-            invoice['fecha_pago'],
-            invoice['suscriptor'],
-            invoice['categoria'],
-            invoice['metodo_pago'],
-            invoice['monto']
-        ])
+    :param request: Objeto de solicitud HTTP.
+    :return: FileResponse con el archivo Excel.
+    """
 
-    # Agregar una fila para el total general
-    ws.append(["", "", "", "Total General", total_general])
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Suscripciones")
+    for row in _export_lines(request):
+        ws.append(row)
 
-    # Guardar el archivo en un BytesIO en lugar de HttpResponse directamente
-    excel_file = BytesIO()
+    excel_file = tempfile.TemporaryFile()
     wb.save(excel_file)
     excel_file.seek(0)  # Mover el puntero de archivo al principio
 
-    timestamp = timezone.localtime(timezone.now()).strftime("%d-%m-%Y_%H-%M")
-
-    # Configurar la respuesta HTTP para enviar el archivo
-    response = HttpResponse(
-        content=excel_file.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return FileResponse(
+        excel_file,
+        as_attachment=True,
+        filename=_export_filename("xlsx"),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     )
-    response['Content-Disposition'] = f'attachment; filename="finanzas_{timestamp}.xlsx"'
-
-    return response
\ No newline at end of file
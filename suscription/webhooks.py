@@ -0,0 +1,463 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import stripe
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+import notification.service
+from app.models import CustomUser
+from category.models import Category
+from suscription import service, stripe_gateway
+from suscription.models import StripeEvent, Suscription
+
+logger = logging.getLogger(__name__)
+
+# Espacio de los bloqueos de PostgreSQL (`pg_advisory_xact_lock(espacio, cliente)`) que serializan
+# el procesamiento de los eventos de un mismo cliente de Stripe
+EVENT_LOCK_NAMESPACE = 24
+
+
+def customer_id(event):
+    """
+    Obtiene el cliente de Stripe al que corresponde un evento.
+
+    :param event: Evento de Stripe.
+    :type event: dict
+    :return: ID del cliente, vacío si el evento no corresponde a un cliente (por ejemplo `product.updated`).
+    :rtype: str
+    """
+
+    obj = event['data']['object']
+    if obj.get('object') == 'customer':
+        return obj['id']
+    customer = obj.get('customer')
+    if isinstance(customer, dict):
+        customer = customer.get('id')
+    return customer or ''
+
+
+def checkout_session_completed(event):
+    """
+    Guarda el ID del cliente de Stripe en el usuario y elimina los medios de pago duplicados del cliente.
+    """
+
+    session = event['data']['object']
+    user_id = session['metadata'].get('user_id')
+
+    # Obtener el usuario de la base de datos
+    user = CustomUser.objects.filter(id=user_id).first()
+    if not user:
+        logger.warning(f"Evento {event['id']}: usuario {user_id} no encontrado")
+        return
+
+    customer_id = session.get('customer')
+
+    if not user.stripe_customer_id:
+        user.stripe_customer_id = customer_id
+        user.save()
+
+    # Actualizar el nombre del cliente en Stripe con el nombre del usuario de tu sistema
+    stripe_gateway.call(
+        'Customer.modify',
+        customer_id,
+        name=user.name,  # Nombre del usuario en tu sistema
+    )
+
+    invoice_id = session.get('invoice')
+    invoice = stripe_gateway.call('Invoice.retrieve', invoice_id)
+
+    payment_intent_id = invoice.get('payment_intent')
+
+    if not payment_intent_id:
+        logger.warning(f"Evento {event['id']}: no se intentó realizar el pago, falta payment_intent")
+        return
+
+    payment_intent = stripe_gateway.call('PaymentIntent.retrieve', payment_intent_id)
+
+    new_payment_method_id = payment_intent.get('payment_method')
+    new_payment_method = stripe_gateway.call('Customer.retrieve_payment_method', customer_id, new_payment_method_id)
+
+    existing_payment_methods = stripe_gateway.call(
+        'PaymentMethod.list',
+        customer=customer_id,
+        type="card",
+    )
+
+    count_duplicate = 0
+    for payment_method in existing_payment_methods:
+        if new_payment_method['card']['fingerprint'] == payment_method['card']['fingerprint'] and new_payment_method['card']['exp_month'] == payment_method['card']['exp_month'] and new_payment_method['card']['exp_year'] == payment_method['card']['exp_year']:
+            count_duplicate += 1
+        if count_duplicate > 1:
+            stripe_gateway.call('PaymentMethod.detach', payment_method['id'])
+            count_duplicate -= 1
+
+
+def invoice_paid(event):
+    """
+    Activa o crea la suscripción a la categoría de la factura, guarda su período de facturación y registra la factura.
+    """
+
+    invoice = event['data']['object']
+
+    metadata = invoice['subscription_details']['metadata']
+    category_id = metadata.get('category_id')
+
+    if not category_id:
+        logger.warning(f"Evento {event['id']}: category_id no encontrado en metadata")
+        return
+
+    # Obtener datos de la sesión
+    customer_id = invoice.get('customer')
+    subscription_id = invoice.get('subscription')
+    customer_email = invoice.get('customer_email')
+
+    user = CustomUser.objects.filter(email=customer_email).first()
+    category = Category.objects.filter(id=category_id).first()
+    if not user or not category:
+        logger.warning(f"Evento {event['id']}: usuario {customer_email} o categoría {category_id} no encontrados")
+        return
+
+    if not user.stripe_customer_id:
+        user.stripe_customer_id = customer_id
+        user.save()
+    suscription = Suscription.objects.filter(user=user, category=category).first()
+
+    if suscription:
+        suscription.stripe_subscription_id = subscription_id
+        suscription.state = Suscription.SuscriptionState.active
+    else:
+        suscription = Suscription(user=user, category=category, state=Suscription.SuscriptionState.active, stripe_subscription_id=subscription_id)
+
+    suscription.save()
+    service.sync_invoice_period(suscription, invoice)
+    service.record_invoice(invoice, user)
+
+    notification.service.payment_success(user, category, invoice)
+
+
+def invoice_payment_failed(event):
+    """
+    Cancela la suscripción de la factura y notifica el fallo de pago.
+    """
+
+    invoice = event['data']['object']
+
+    metadata = invoice['subscription_details']['metadata']
+    category_id = metadata.get('category_id')
+
+    if not category_id:
+        logger.warning(f"Evento {event['id']}: category_id no encontrado en metadata")
+        return
+
+    # Obtener datos de la sesión
+    customer_id = invoice.get('customer')
+    subscription_id = invoice.get('subscription')
+
+    user = CustomUser.objects.filter(stripe_customer_id=customer_id).first()
+    category = Category.objects.filter(id=category_id).first()
+    if not user or not category:
+        logger.warning(f"Evento {event['id']}: cliente {customer_id} o categoría {category_id} no encontrados")
+        return
+
+    suscription = Suscription.objects.filter(user=user, category=category, stripe_subscription_id=subscription_id).first()
+
+    if suscription:
+        suscription.state = Suscription.SuscriptionState.cancelled
+        stripe_gateway.call('Subscription.cancel', subscription_id)
+        suscription.save()
+        if suscription.state == Suscription.SuscriptionState.cancelled:
+            notification.service.payment_failed(user, category, invoice, True)
+        else:
+            notification.service.payment_failed(user, category, invoice, False)
+    else:
+        notification.service.payment_failed(user, category, invoice, True)
+
+
+def customer_subscription_changed(event):
+    """
+    Guarda el estado y el período de facturación de la suscripción (`customer.subscription.*`).
+    """
+
+    service.sync_subscription(event['data']['object'])
+
+
+def customer_subscription_deleted(event):
+    """
+    Cancela la suscripción en el sistema.
+    """
+
+    customer_subscription_changed(event)
+
+    subscription = event['data']['object']
+    subscription_id = subscription['id']
+    category_id = subscription["metadata"]["category_id"]
+    customer_id = subscription.get('customer')
+    metadata = subscription['metadata']
+    category_paid = True
+
+    if "category_paid" in metadata:
+        category_paid = metadata["category_paid"]
+
+    if category_paid != 'False':
+        user = CustomUser.objects.filter(stripe_customer_id=customer_id).first()
+        category = Category.objects.filter(id=category_id).first()
+        if not user or not category:
+            logger.warning(f"Evento {event['id']}: cliente {customer_id} o categoría {category_id} no encontrados")
+            return
+        suscription = Suscription.objects.filter(user=user, category=category, stripe_subscription_id=subscription_id).first()
+        if not suscription:
+            # La suscripción ya fue eliminada
+            return
+        suscription.state = Suscription.SuscriptionState.cancelled
+        suscription.save()
+
+        notification.service.subscription_cancelled(user, category)
+
+
+def customer_subscription_updated(event):
+    """
+    Marca la suscripción como pendiente de cancelación si se cancelará al finalizar el período de facturación.
+    """
+
+    customer_subscription_changed(event)
+
+    subscription = event['data']['object']
+    pending_cancellation = subscription['cancel_at_period_end']
+    previous_attributes = event['data']['previous_attributes']
+    metadata = subscription['metadata']
+    category_paid = True
+    status = subscription['status']
+
+    # Si cambio al estado 'incomplete_expired' se cancela la suscripción sin enviar notificación
+    if 'status' in previous_attributes and status != previous_attributes['status'] and status == 'incomplete_expired':
+        stripe_gateway.call(
+            'Subscription.modify',
+            subscription['id'],
+            category_paid=False,
+        )
+        stripe_gateway.call('Subscription.delete', subscription['id'])
+
+    if "category_paid" in metadata:
+        category_paid = metadata["category_paid"]
+
+    #Si se cancela la suscripción al finalizar el periodo de facturación
+    if 'cancel_at_period_end' in previous_attributes and pending_cancellation and pending_cancellation != previous_attributes['cancel_at_period_end']:
+        if category_paid != 'False':
+            subscription_id = subscription['id']
+            category_id = subscription["metadata"]["category_id"]
+            customer_id = subscription.get('customer')
+
+            user = CustomUser.objects.filter(stripe_customer_id=customer_id).first()
+            category = Category.objects.filter(id=category_id).first()
+            suscription = Suscription.objects.filter(user=user, category=category, stripe_subscription_id=subscription_id).first()
+            if not suscription:
+                logger.warning(f"Evento {event['id']}: suscripción {subscription_id} no encontrada")
+                return
+            suscription.state = Suscription.SuscriptionState.pending_cancellation
+            suscription.save()
+
+            notification.service.subscription_pending_cancellation(user, category, subscription)
+
+
+def product_updated(event):
+    """
+    Cancela al finalizar el período las suscripciones de un producto desactivado.
+    """
+
+    product = event['data']['object']
+    product_id = product['id']
+    previous_attributes = event['data']['previous_attributes']
+    active = product['active']
+    metadata = product['metadata']
+    category_paid = True
+
+    if "category_paid" in metadata:
+        category_paid = metadata["category_paid"]
+
+    # Si se desactiva el producto
+    if 'active' in previous_attributes and not active and active != previous_attributes['active']:
+        if category_paid != 'False':
+            category = Category.objects.filter(stripe_product_id=product_id).first()
+            if not category:
+                return
+            list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False).exclude(state=Suscription.SuscriptionState.cancelled)
+            for suscription in list_subscriptions:
+                subscription_id = suscription.stripe_subscription_id
+                stripe_gateway.call(
+                    'Subscription.modify',
+                    subscription_id,
+                    cancel_at_period_end=True,
+                )
+
+
+def price_updated(event):
+    """
+    Crea el nuevo precio de la categoría y cancela al finalizar el período sus suscripciones activas.
+    """
+
+    price = event['data']['object']
+    price_id = price['id']
+    active = price['active']
+    metada = price['metadata']
+
+    if 'new_price' in metada:
+        new_price = metada['new_price']
+    else:
+        new_price = None
+
+    # Si se cambia de precio
+    if not active and new_price and new_price != price['unit_amount']:
+        category = Category.objects.filter(stripe_price_id=price_id).first()
+        if not category:
+            return
+        # Crear un nuevo precio en Stripe
+        new_price_stripe = stripe_gateway.call(
+            'Price.create',
+            product=category.stripe_product_id,
+            unit_amount=new_price,
+            currency='PYG',
+            recurring={"interval": "day"},
+        )
+        # Guardar el nuevo ID del precio en el modelo de categoría
+        category.stripe_price_id = new_price_stripe.id
+        category.save()
+
+        # Cancelar las suscripciones activas al finalizar el periodo de facturación actual
+        list_subscriptions = Suscription.objects.filter(category=category, stripe_subscription_id__isnull=False, state=Suscription.SuscriptionState.active)
+        for suscription in list_subscriptions:
+            stripe_gateway.call(
+                'Subscription.modify',
+                suscription.stripe_subscription_id,
+                cancel_at_period_end=True,
+            )
+
+
+def customer_created(event):
+    """
+    Guarda el ID del cliente de Stripe en el usuario con el mismo correo.
+    """
+
+    customer = event['data']['object']
+    customer_id = customer['id']
+    email = customer['email']
+    user = CustomUser.objects.filter(email=email).first()
+
+    if user:
+        if not user.stripe_customer_id:
+            user.stripe_customer_id = customer_id
+            user.save()
+            stripe_gateway.call(
+                'Customer.modify',
+                customer_id,
+                name=user.name,
+            )
+
+
+# Procesamiento de cada tipo de evento; los demás tipos se marcan como procesados sin cambios
+HANDLERS = {
+    'checkout.session.completed': checkout_session_completed,
+    'invoice.paid': invoice_paid,
+    'invoice.payment_failed': invoice_payment_failed,
+    'customer.subscription.created': customer_subscription_changed,
+    'customer.subscription.updated': customer_subscription_updated,
+    'customer.subscription.deleted': customer_subscription_deleted,
+    'product.updated': product_updated,
+    'price.updated': price_updated,
+    'customer.created': customer_created,
+}
+
+
+def store(event):
+    """
+    Registra un evento de Stripe verificado para procesarse en segundo plano.
+
+    Stripe puede enviar un mismo evento más de una vez: el evento se inserta con `ON CONFLICT DO NOTHING` sobre
+    su ID, por lo que los reenvíos no se registran ni se procesan nuevamente.
+
+    :param event: Evento de Stripe.
+    :type event: dict
+    :return: Cliente de Stripe del evento.
+    :rtype: str
+    """
+
+    customer = customer_id(event)
+    created = event.get('created')
+    StripeEvent.objects.bulk_create([StripeEvent(
+        event_id=event['id'],
+        type=event['type'],
+        customer_id=customer,
+        created=datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else timezone.now(),
+        payload=event,
+    )], ignore_conflicts=True)
+    return customer
+
+
+def process_events(customer_id):
+    """
+    Procesa en orden los eventos pendientes de un cliente de Stripe.
+
+    Los eventos se procesan de a uno por transacción, en el orden en que Stripe los creó. Cada transacción
+    bloquea al cliente (`pg_advisory_xact_lock`), por lo que dos workers nunca procesan a la vez eventos del
+    mismo cliente y un evento no se procesa antes que uno anterior. Si un evento falla, se registra el error y
+    se detiene el procesamiento del cliente, que se reintenta más tarde con `process_pending_events`; luego de
+    `STRIPE_EVENT_MAX_ATTEMPTS` intentos el evento se marca como fallido para no bloquear los siguientes.
+
+    :param customer_id: ID del cliente de Stripe, vacío para los eventos que no corresponden a un cliente.
+    :type customer_id: str
+    :return: Cantidad de eventos procesados.
+    :rtype: int
+    """
+
+    processed = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [EVENT_LOCK_NAMESPACE, customer_id])
+            event = (
+                StripeEvent.objects
+                .filter(customer_id=customer_id, state=StripeEvent.StateChoices.pending)
+                .order_by('created', 'id')
+                .first()
+            )
+            if event is None:
+                return processed
+
+            handler = HANDLERS.get(event.type)
+            try:
+                with transaction.atomic():
+                    if handler:
+                        # Se reconstruye el objeto del SDK: las notificaciones leen atributos como `invoice.amount_paid`
+                        handler(stripe.Event.construct_from(event.payload, stripe.api_key))
+            except Exception as e:
+                logger.exception(f"Error al procesar el evento de Stripe {event.event_id}")
+                event.attempts += 1
+                event.last_error = str(e)
+                if event.attempts < settings.STRIPE_EVENT_MAX_ATTEMPTS:
+                    event.save(update_fields=['attempts', 'last_error'])
+                    return processed
+                event.state = StripeEvent.StateChoices.failed
+            else:
+                event.state = StripeEvent.StateChoices.processed
+            event.processed_at = timezone.now()
+            event.save(update_fields=['state', 'attempts', 'last_error', 'processed_at'])
+        processed += 1
+
+
+def process_pending_events():
+    """
+    Procesa los eventos pendientes de todos los clientes, incluidos los que fallaron y deben reintentarse.
+
+    :return: Cantidad de eventos procesados.
+    :rtype: int
+    """
+
+    customers = (
+        StripeEvent.objects
+        .filter(state=StripeEvent.StateChoices.pending)
+        .order_by('customer_id')
+        .values_list('customer_id', flat=True)
+        .distinct()
+    )
+    return sum(process_events(customer) for customer in list(customers))